@@ -4,9 +4,13 @@ Signal handlers for the accounts app.
 This module contains signal handlers for user-related events,
 such as user creation and permission assignment.
 """
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+
+from config.permissions import invalidate_user_scope
+from schemes.models import Scheme
 
 User = get_user_model()
 
@@ -33,3 +37,38 @@ def set_initial_user_permissions(sender, instance, created, **kwargs):
                 instance.groups.add(agent_group)
             except Group.DoesNotExist:
                 pass
+
+
+@receiver(post_save, sender=User)
+def invalidate_scope_on_user_save(sender, instance, **kwargs):
+    """Branch, superuser or active changes alter what the user can see."""
+    invalidate_user_scope(instance)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.assigned_schemes.through)
+def invalidate_scope_on_assignment_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Drop cached scopes when group or scheme assignments change.
+
+    Changes made from the user side carry the user as ``instance``; changes
+    made from the group or scheme side list the affected users in ``pk_set``
+    (or none at all on ``clear``, in which case every scope is dropped).
+    """
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_user_scope(instance)
+    elif pk_set:
+        invalidate_user_scope(user_ids=pk_set)
+    else:
+        invalidate_user_scope()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Scheme)
+@receiver(post_delete, sender=Scheme)
+def invalidate_all_scopes(sender, **kwargs):
+    """Renamed groups and moved or removed schemes can affect any user."""
+    invalidate_user_scope()
@@ -0,0 +1,139 @@
+"""
+Buffered audit log writer.
+
+Inside an ``audit_buffer()`` scope, audit entries (``AuditLog`` and
+``DataAccess``) are collected in memory instead of being inserted one by
+one, and written with one ``bulk_create`` per model when the outermost
+scope closes. When that happens inside a
+transaction the write waits for the commit (and is dropped on rollback, along
+with the changes it describes).
+
+``AuditContextMiddleware`` opens a scope for every request; bulk jobs can
+open their own::
+
+    with audit_buffer():
+        for row in rows:
+            import_row(row)
+
+With ``AUDIT_LOG_ASYNC = True`` flushed entries are handed to the
+``audit.tasks.write_audit_logs`` Celery task instead of being written in the
+request. Entries keep the timestamp of the event they record, however late
+they are written, and each flush is written in one transaction so a retried
+task cannot leave part of it behind twice.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+# Fields copied when entries are handed to the Celery task, per model
+AUDIT_ENTRY_FIELDS = {
+    'audit.auditlog': (
+        'user_id', 'username', 'action', 'ip_address', 'user_agent',
+        'content_type_id', 'object_id', 'object_repr', 'data',
+    ),
+    'audit.dataaccess': (
+        'user_id', 'username', 'ip_address',
+        'content_type_id', 'object_id', 'fields_accessed', 'access_reason',
+    ),
+}
+
+_buffer_state = threading.local()
+
+
+def is_buffering():
+    """Return True when audit entries are currently being buffered"""
+    return getattr(_buffer_state, 'depth', 0) > 0
+
+
+def buffer_entry(entry):
+    """Queue an unsaved AuditLog or DataAccess entry for the current buffer scope"""
+    entry.timestamp = entry.timestamp or timezone.now()
+    _buffer_state.entries.append(entry)
+
+
+@contextmanager
+def audit_buffer():
+    """
+    Collect audit entries and write them in one batch when the outermost
+    scope exits. Nested scopes share the outer buffer.
+    """
+    if not is_buffering():
+        _buffer_state.entries = []
+        _buffer_state.depth = 0
+    _buffer_state.depth += 1
+    try:
+        yield
+    finally:
+        _buffer_state.depth -= 1
+        if _buffer_state.depth == 0:
+            flush_audit_buffer()
+
+
+def flush_audit_buffer():
+    """
+    Write out everything buffered so far.
+
+    The write is deferred with ``transaction.on_commit`` so it only happens
+    once the surrounding transaction (if any) commits.
+    """
+    entries = getattr(_buffer_state, 'entries', None)
+    if not entries:
+        return
+    _buffer_state.entries = []
+    transaction.on_commit(lambda: dispatch_audit_entries(entries))
+
+
+def dispatch_audit_entries(entries):
+    """Write entries now, or queue them when AUDIT_LOG_ASYNC is enabled"""
+    if getattr(settings, 'AUDIT_LOG_ASYNC', False):
+        from audit.tasks import write_audit_logs
+
+        try:
+            write_audit_logs.delay([serialize_audit_entry(entry) for entry in entries])
+            return
+        except Exception as e:
+            # Never lose audit entries because the broker is unavailable
+            logger.error(f"Could not queue {len(entries)} audit entries, writing inline: {str(e)}")
+    write_audit_entries(entries)
+
+
+def write_audit_entries(entries):
+    """Insert audit rows in batches, one bulk insert per model"""
+    by_model = {}
+    for entry in entries:
+        by_model.setdefault(type(entry), []).append(entry)
+
+    written = []
+    with transaction.atomic():
+        for model, model_entries in by_model.items():
+            written.extend(model.objects.bulk_create(
+                model_entries,
+                batch_size=getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 500),
+            ))
+    return written
+
+
+def serialize_audit_entry(entry):
+    label = entry._meta.label_lower
+    payload = {field: getattr(entry, field) for field in AUDIT_ENTRY_FIELDS[label]}
+    payload['model'] = label
+    payload['timestamp'] = entry.timestamp.isoformat()
+    return payload
+
+
+def deserialize_audit_entry(payload):
+    from django.apps import apps
+
+    label = payload.get('model', 'audit.auditlog')
+    model = apps.get_model(label)
+    entry = model(**{field: payload.get(field) for field in AUDIT_ENTRY_FIELDS[label]})
+    if payload.get('timestamp'):
+        entry.timestamp = parse_datetime(payload['timestamp'])
+    return entry
@@ -1,10 +1,13 @@
 """
 Audit middleware for capturing request context (user, IP, user agent).
-Stores request information in thread-local storage for use by audit signals.
+Stores request information in thread-local storage for use by audit signals,
+and buffers the request's audit entries so they are written in one batch.
 """
 import threading
 from django.utils.deprecation import MiddlewareMixin
 
+from audit.buffer import audit_buffer
+
 # Thread-local storage for request context
 _thread_local = threading.local()
 
@@ -29,19 +32,32 @@ class AuditContextMiddleware(MiddlewareMixin):
     """
     Middleware to capture and store request context for audit logging.
     Makes request object available to signals and models without passing it everywhere.
+    Audit entries logged during the request are flushed together when it ends.
     """
     
     def process_request(self, request):
         """Store request in thread-local storage at the start of request processing"""
         set_request_context(request)
+        request._audit_buffer = audit_buffer()
+        request._audit_buffer.__enter__()
         return None
     
     def process_response(self, request, response):
         """Clear request from thread-local storage at the end of request processing"""
+        self._close_audit_buffer(request)
         clear_request_context()
         return response
     
     def process_exception(self, request, exception):
         """Clear request from thread-local storage even if exception occurs"""
+        self._close_audit_buffer(request)
         clear_request_context()
         return None
+    
+    @staticmethod
+    def _close_audit_buffer(request):
+        """Flush the request's audit entries (only once per request)"""
+        buffer = getattr(request, '_audit_buffer', None)
+        if buffer is not None:
+            del request._audit_buffer
+            buffer.__exit__(None, None, None)
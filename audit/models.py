@@ -1,8 +1,11 @@
 import json
 from django.db import models
+from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 
+from audit.buffer import buffer_entry, is_buffering
+
 
 class AuditLog(models.Model):
     """
@@ -30,7 +33,8 @@ class AuditLog(models.Model):
     ]
     
     # Fields
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Set when the entry is built, so buffered entries keep the time of the event
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
     user = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True, blank=True)
     username = models.CharField(max_length=150, blank=True)  # Stored separately in case user is deleted
     action = models.CharField(max_length=20, choices=ACTION_CHOICES)
@@ -113,7 +117,7 @@ class AuditLog(models.Model):
         """Internal method to create a log entry"""
         # Prepare data for the log entry
         ip_address = None
-        user_agent = None
+        user_agent = ''
         
         if request:
             ip_address = cls._get_client_ip(request)
@@ -132,8 +136,8 @@ class AuditLog(models.Model):
         # Get username
         username = user.username if user else 'system'
         
-        # Create the log entry
-        log_entry = cls.objects.create(
+        # Build the log entry
+        log_entry = cls(
             user=user,
             username=username,
             action=action,
@@ -145,6 +149,12 @@ class AuditLog(models.Model):
             data=changes
         )
         
+        # Inside an audit_buffer() scope the entry is written in bulk later
+        if is_buffering():
+            buffer_entry(log_entry)
+        else:
+            log_entry.save()
+        
         return log_entry
     
     @staticmethod
@@ -163,7 +173,7 @@ class DataAccess(models.Model):
     """
     Records sensitive data access for POPIA compliance.
     """
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)
     user = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True, blank=True)
     username = models.CharField(max_length=150, blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
@@ -204,8 +214,8 @@ class DataAccess(models.Model):
         # Get username
         username = user.username if user else 'system'
         
-        # Create the log entry
-        log_entry = cls.objects.create(
+        # Build the log entry
+        log_entry = cls(
             user=user,
             username=username,
             ip_address=ip_address,
@@ -215,6 +225,12 @@ class DataAccess(models.Model):
             access_reason=reason or ''
         )
         
+        # Inside an audit_buffer() scope the entry is written in bulk later
+        if is_buffering():
+            buffer_entry(log_entry)
+        else:
+            log_entry.save()
+        
         return log_entry
     
     @staticmethod
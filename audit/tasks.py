@@ -0,0 +1,29 @@
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(
+    name="audit.tasks.write_audit_logs",
+    bind=True,
+    max_retries=3,
+    default_retry_delay=30,
+)
+def write_audit_logs(self, entries):
+    """
+    Write a batch of buffered audit entries.
+
+    Args:
+        entries: List of serialized AuditLog/DataAccess field dicts (see audit.buffer)
+    """
+    try:
+        from audit.buffer import deserialize_audit_entry, write_audit_entries
+
+        logs = write_audit_entries([deserialize_audit_entry(entry) for entry in entries])
+        logger.info(f"Wrote {len(logs)} audit log entries")
+        return {"status": "success", "count": len(logs)}
+    except Exception as e:
+        logger.error(f"Error writing audit log entries: {str(e)}")
+        raise self.retry(exc=e)
@@ -8,12 +8,19 @@ Tests verify that:
 4. Admin interface is read-only and secure
 5. Management commands query audit logs correctly
 """
+import time
 import pytest
-from django.test import TestCase, RequestFactory, Client
+from unittest import mock
+from django.test import TestCase, RequestFactory, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User, Group
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
 
+from audit.buffer import audit_buffer, write_audit_entries
 from audit.models import AuditLog, DataAccess
 from audit.middleware import AuditContextMiddleware, get_request_context, set_request_context
 from audit.operations import (
@@ -21,6 +28,7 @@ from audit.operations import (
     audit_payment_processing,
     audit_sensitive_data_access,
 )
+from audit.tasks import write_audit_logs
 from members.models import Member, Policy
 from claims.models import Claim
 from payments.models import Payment
@@ -343,5 +351,162 @@ class UserLoginAuditTests(TestCase):
         # This test verifies the infrastructure is in place
 
 
+
+class BufferedAuditLogTests(TestCase):
+    """Test that buffered audit entries are written in one batch on commit"""
+    
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('buffered', 'buffered@test.com', 'testpass')
+        AuditLog.objects.all().delete()
+    
+    def log_new_members(self, count):
+        members = [
+            Member.objects.create(
+                first_name=f'Member{i}',
+                last_name='Buffered',
+                gender='Male',
+                date_of_birth=date(1990, 1, 1),
+                phone_number='0712345678',
+                email=f'member{i}@test.com',
+            )
+            for i in range(count)
+        ]
+        for member in members:
+            AuditLog.log_create(member, user=self.user)
+        return members
+    
+    def test_entries_are_written_with_one_insert_on_commit(self):
+        """Verify buffered entries produce a single bulk insert after commit"""
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            with audit_buffer():
+                members = self.log_new_members(3)
+        
+        self.assertFalse(AuditLog.objects.filter(action='create').exists())
+        self.assertEqual(len(callbacks), 1)
+        
+        with CaptureQueriesContext(connection) as context:
+            callbacks[0]()
+        
+        inserts = [q for q in context.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        logged_ids = set(AuditLog.objects.filter(action='create').values_list('object_id', flat=True))
+        self.assertEqual(logged_ids, {str(member.pk) for member in members})
+    
+    def test_nested_buffers_flush_once(self):
+        """Verify inner scopes defer to the outermost one"""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with audit_buffer():
+                AuditLog.log_login(self.user)
+                with audit_buffer():
+                    AuditLog.log_logout(self.user)
+                self.assertFalse(AuditLog.objects.exists())
+        
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(
+            sorted(AuditLog.objects.values_list('action', flat=True)),
+            ['login', 'logout'],
+        )
+    
+    def test_unbuffered_logging_writes_immediately(self):
+        """Verify logging outside a buffer keeps writing straight away"""
+        entry = AuditLog.log_login(self.user)
+        
+        self.assertIsNotNone(entry.pk)
+        self.assertEqual(AuditLog.objects.get().username, 'buffered')
+    
+    def test_middleware_flushes_request_entries(self):
+        """Verify the middleware buffers a request's entries until it ends"""
+        request = RequestFactory().get('/', HTTP_USER_AGENT='tests')
+        middleware = AuditContextMiddleware(lambda r: None)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            middleware.process_request(request)
+            AuditLog.log_login(self.user, request)
+            self.assertFalse(AuditLog.objects.exists())
+            middleware.process_response(request, None)
+        
+        self.assertEqual(AuditLog.objects.get().user_agent, 'tests')
+        self.assertIsNone(get_request_context())
+    
+    @override_settings(AUDIT_LOG_ASYNC=True)
+    def test_async_mode_queues_serialized_entries(self):
+        """Verify entries are handed to Celery when AUDIT_LOG_ASYNC is set"""
+        with mock.patch('audit.tasks.write_audit_logs.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                with audit_buffer():
+                    AuditLog.log_login(self.user)
+        
+        self.assertFalse(AuditLog.objects.exists())
+        payload = delay.call_args[0][0]
+        self.assertEqual(payload[0]['username'], 'buffered')
+        
+        write_audit_logs.apply(args=(payload,))
+        self.assertEqual(AuditLog.objects.get().user_id, self.user.pk)
+
+    def test_data_access_is_written_outside_a_buffer(self):
+        """Verify sensitive data access is logged straight away when not buffering"""
+        entry = DataAccess.log_access(self.user, ['id_number'], user=self.user, reason='support')
+        
+        self.assertIsNotNone(entry.pk)
+        self.assertEqual(DataAccess.objects.get().fields_accessed, ['id_number'])
+    
+    def test_data_access_is_written_with_the_buffer(self):
+        """Verify buffered data access entries are written alongside audit entries"""
+        with self.captureOnCommitCallbacks(execute=True):
+            with audit_buffer():
+                AuditLog.log_login(self.user)
+                DataAccess.log_access(self.user, ['id_number'], user=self.user)
+                self.assertFalse(DataAccess.objects.exists())
+        
+        self.assertEqual(DataAccess.objects.get().username, 'buffered')
+        self.assertEqual(AuditLog.objects.get().action, 'login')
+    
+    @override_settings(AUDIT_LOG_ASYNC=True)
+    def test_async_mode_keeps_data_access_entries(self):
+        """Verify queued data access entries are restored as DataAccess rows"""
+        with mock.patch('audit.tasks.write_audit_logs.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                with audit_buffer():
+                    DataAccess.log_access(self.user, ['bank_account'], user=self.user)
+        
+        write_audit_logs.apply(args=(delay.call_args[0][0],))
+        self.assertEqual(DataAccess.objects.get().fields_accessed, ['bank_account'])
+    
+    @override_settings(AUDIT_LOG_ASYNC=True)
+    def test_queued_entries_keep_the_time_of_the_event(self):
+        """Verify entries written later by the task are stamped with when they happened"""
+        with mock.patch('audit.tasks.write_audit_logs.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                with audit_buffer():
+                    before = timezone.now()
+                    AuditLog.log_login(self.user)
+                    DataAccess.log_access(self.user, ['id_number'], user=self.user)
+                    after = timezone.now()
+        
+        time.sleep(0.01)
+        write_audit_logs.apply(args=(delay.call_args[0][0],))
+        
+        for entry in (AuditLog.objects.get(), DataAccess.objects.get()):
+            self.assertTrue(before <= entry.timestamp <= after)
+    
+    def test_a_failed_flush_writes_nothing(self):
+        """Verify a flush is all or nothing, so a retried task does not duplicate rows"""
+        entries = [
+            AuditLog(user=self.user, username='buffered', action=AuditLog.ACTION_LOGIN),
+            DataAccess(
+                user=self.user,
+                username='buffered',
+                content_type=ContentType.objects.get_for_model(self.user),
+                object_id=str(self.user.pk),
+                fields_accessed=['id_number'],
+            ),
+        ]
+        
+        with mock.patch.object(DataAccess.objects, 'bulk_create', side_effect=RuntimeError('lost connection')):
+            with self.assertRaises(RuntimeError):
+                write_audit_entries(entries)
+        
+        self.assertFalse(AuditLog.objects.exists())
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -5,8 +5,11 @@ This module defines the permissions associated with each role in the system.
 It serves as a single source of truth for role-based access control throughout the application.
 """
 
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 
+from legacyadmin.cache import get_cache_timeout
+
 CANONICAL_ROLE_HIERARCHY = [
     "Superuser",
     "Administrator",
@@ -73,21 +76,163 @@ ROLE_PERMISSIONS = {
 }
 
 
+# Roles that see every scheme and branch.
+UNRESTRICTED_ROLES = ("Administrator", "Compliance Auditor", "Finance Officer", "Claims Officer")
+
+USER_SCOPE_CACHE_PREFIX = "user_scope"
+USER_SCOPE_VERSION_KEY = f"{USER_SCOPE_CACHE_PREFIX}:version"
+PERMISSION_CONTEXT_CACHE_PREFIX = "permission_context"
+
+
 def normalize_role_name(role_name):
     return ROLE_ALIASES.get(role_name, role_name)
 
 
-def get_canonical_group_names(user):
+class UserScope:
+    """
+    Roles, permissions and accessible scheme/branch IDs resolved for one user.
+
+    ``scheme_ids`` and ``branch_ids`` are ``None`` when the user is not
+    restricted to particular schemes or branches.
+    """
+
+    def __init__(self, roles, permissions, scheme_ids, branch_ids):
+        self.roles = tuple(roles)
+        self.permissions = frozenset(permissions)
+        self.scheme_ids = None if scheme_ids is None else frozenset(scheme_ids)
+        self.branch_ids = None if branch_ids is None else frozenset(branch_ids)
+
+    @property
+    def is_unrestricted(self):
+        return self.scheme_ids is None
+
+    def has_role(self, *role_names):
+        canonical_targets = {normalize_role_name(role_name) for role_name in role_names}
+        return any(role in canonical_targets for role in self.roles)
+
+    def has_permission(self, permission):
+        return "all" in self.permissions or permission in self.permissions
+
+    def can_access_scheme(self, scheme_id):
+        return self.scheme_ids is None or scheme_id in self.scheme_ids
+
+    def can_access_branch(self, branch_id):
+        return self.branch_ids is None or branch_id in self.branch_ids
+
+    def to_cache(self):
+        return {
+            "roles": list(self.roles),
+            "permissions": sorted(self.permissions),
+            "scheme_ids": None if self.scheme_ids is None else sorted(self.scheme_ids),
+            "branch_ids": None if self.branch_ids is None else sorted(self.branch_ids),
+        }
+
+    @classmethod
+    def from_cache(cls, data):
+        return cls(data["roles"], data["permissions"], data["scheme_ids"], data["branch_ids"])
+
+
+def resolve_user_scope(user):
+    """Build a UserScope for ``user`` straight from the database."""
+    from schemes.models import Scheme
+
     if user.is_superuser:
-        return ["Superuser"]
-    return [normalize_role_name(group.name) for group in user.groups.all()]
+        return UserScope(["Superuser"], ["all"], None, None)
+
+    roles = [normalize_role_name(name) for name in user.groups.values_list("name", flat=True)]
+    permissions = set()
+    for role in roles:
+        permissions.update(ROLE_PERMISSIONS.get(role, []))
+    if "all" in permissions:
+        permissions = {"all"}
+
+    if any(role in UNRESTRICTED_ROLES for role in roles):
+        return UserScope(roles, permissions, None, None)
+
+    scheme_ids = set()
+    branch_ids = set()
+    if "Scheme Manager" in roles or "Internal Admin" in roles:
+        assigned = list(user.assigned_schemes.values_list("id", "branch_id"))
+        scheme_ids = {scheme_id for scheme_id, _ in assigned}
+        branch_ids = {branch_id for _, branch_id in assigned if branch_id}
+    if "Branch Owner" in roles:
+        # Branch owners see their own branch; scheme assignments win for schemes.
+        branch_ids = {user.branch_id} if user.branch_id else set()
+        if not ("Scheme Manager" in roles or "Internal Admin" in roles) and user.branch_id:
+            scheme_ids = set(Scheme.objects.filter(branch_id=user.branch_id).values_list("id", flat=True))
+    return UserScope(roles, permissions, scheme_ids, branch_ids)
+
+
+def user_scope_cache_key(user_id):
+    version = cache.get(USER_SCOPE_VERSION_KEY, 0)
+    return f"{USER_SCOPE_CACHE_PREFIX}:{version}:{user_id}"
+
+
+def permission_context_cache_key(user_id):
+    # Shares the scope version, so invalidating scopes also drops these
+    version = cache.get(USER_SCOPE_VERSION_KEY, 0)
+    return f"{PERMISSION_CONTEXT_CACHE_PREFIX}:{version}:{user_id}"
+
+
+def get_user_scope(user):
+    """
+    Return the UserScope for ``user``.
+
+    The scope is memoized on the user object for the rest of the request and
+    shared across requests through the cache for a short time. It is dropped
+    by ``invalidate_user_scope`` when group or scheme assignments change.
+    """
+    scope = getattr(user, "_user_scope", None)
+    if scope is not None:
+        return scope
+
+    if user.pk is None:
+        scope = resolve_user_scope(user)
+    else:
+        cache_key = user_scope_cache_key(user.pk)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            scope = UserScope.from_cache(cached)
+        else:
+            scope = resolve_user_scope(user)
+            cache.set(cache_key, scope.to_cache(), get_cache_timeout("user_scope"))
+
+    user._user_scope = scope
+    return scope
+
+
+def invalidate_user_scope(user=None, user_ids=None):
+    """
+    Drop cached scopes for the given user and/or user IDs.
+
+    With no arguments every cached scope is invalidated, which is what scheme
+    and group changes need because they can affect any number of users.
+    """
+    if user is None and not user_ids:
+        try:
+            cache.incr(USER_SCOPE_VERSION_KEY)
+        except ValueError:
+            cache.set(USER_SCOPE_VERSION_KEY, 1, None)
+        return
+
+    ids = set(user_ids or [])
+    if user is not None:
+        user.__dict__.pop("_user_scope", None)
+        user.__dict__.pop("_permission_context", None)
+        ids.add(user.pk)
+    ids.discard(None)
+    cache.delete_many(
+        [user_scope_cache_key(user_id) for user_id in ids] +
+        [permission_context_cache_key(user_id) for user_id in ids]
+    )
+
+
+def get_canonical_group_names(user):
+    return list(get_user_scope(user).roles)
 
 
 def user_has_role(user, *role_names):
-    canonical_targets = {normalize_role_name(role_name) for role_name in role_names}
-    if "Superuser" in canonical_targets and user.is_superuser:
-        return True
-    return any(group_name in canonical_targets for group_name in get_canonical_group_names(user))
+    return get_user_scope(user).has_role(*role_names)
 
 
 def get_linked_agent(user):
@@ -116,7 +261,7 @@ def can_manage_agent_signup_links(user, agent=None):
     if user_has_role(user, "Branch Owner"):
         return bool(user.branch_id) and bool(agent.scheme_id) and agent.scheme.branch_id == user.branch_id
     if user_has_role(user, "Scheme Manager"):
-        return user.assigned_schemes.filter(id=agent.scheme_id).exists()
+        return agent.scheme_id in (get_user_scope(user).scheme_ids or ())
     return False
 
 
@@ -151,20 +296,7 @@ def has_permission(user, permission):
     Returns:
         bool: True if the user has the permission, False otherwise
     """
-    # Superusers have all permissions
-    if user.is_superuser:
-        return True
-        
-    # Get user's groups
-    user_groups = get_canonical_group_names(user)
-    
-    # Check if user has the permission through any of their groups
-    for group_name in user_groups:
-        if group_name in ROLE_PERMISSIONS:
-            if "all" in ROLE_PERMISSIONS[group_name] or permission in ROLE_PERMISSIONS[group_name]:
-                return True
-                
-    return False
+    return get_user_scope(user).has_permission(permission)
 
 def get_user_permissions(user):
     """
@@ -176,22 +308,7 @@ def get_user_permissions(user):
     Returns:
         list: List of permissions the user has
     """
-    # Superusers have all permissions
-    if user.is_superuser:
-        return ["all"]
-        
-    # Get user's groups
-    user_groups = get_canonical_group_names(user)
-    
-    # Collect all permissions from user's groups
-    permissions = []
-    for group_name in user_groups:
-        if group_name in ROLE_PERMISSIONS:
-            if "all" in ROLE_PERMISSIONS[group_name]:
-                return ["all"]
-            permissions.extend(ROLE_PERMISSIONS[group_name])
-                
-    return list(set(permissions))  # Remove duplicates
+    return list(get_user_scope(user).permissions)
 
 def get_primary_group(user):
     """
@@ -203,20 +320,60 @@ def get_primary_group(user):
     Returns:
         str: The name of the primary group, or None if no group is found
     """
-    if user.is_superuser:
-        return "Superuser"
-        
-    group_hierarchy = CANONICAL_ROLE_HIERARCHY
-    user_groups = get_canonical_group_names(user)
+    user_groups = get_user_scope(user).roles
     
     # Find the highest priority group
-    for group_name in group_hierarchy:
+    for group_name in CANONICAL_ROLE_HIERARCHY:
         if group_name in user_groups:
             return group_name
             
     return None
 
 
+def resolve_permission_context(user):
+    """Template permission flags for ``user``, worked out from their scope."""
+    is_admin = user.is_superuser or user_has_role(user, 'Administrator', 'Superuser')
+    return {
+        'user_permissions': get_user_permissions(user),
+        'user_primary_role': get_primary_group(user),
+        'is_admin': is_admin,
+        'is_read_only': is_read_only_user(user),
+        'can_manage_users': has_permission(user, 'manage_users'),
+        'can_manage_roles': is_admin,
+        'can_view_reports': has_permission(user, 'view_reports'),
+        'can_manage_settings': has_permission(user, 'manage_settings'),
+        'can_view_all_members_report': can_view_all_members_report(user),
+        'can_view_payment_admin_report': can_view_payment_allocation_report(user, 'admin'),
+        'can_view_payment_scheme_report': can_view_payment_allocation_report(user, 'scheme'),
+        'can_view_amendments_report': can_view_amendments_report(user),
+    }
+
+
+def get_permission_context(user):
+    """
+    Return the template permission flags for ``user``.
+
+    Like the scope, the snapshot is memoized on the user object and cached
+    across requests, for ``CACHE_TIMEOUTS['user_permissions']``, and it is
+    dropped by ``invalidate_user_scope``.
+    """
+    context = getattr(user, "_permission_context", None)
+    if context is not None:
+        return context
+
+    if user.pk is None:
+        context = resolve_permission_context(user)
+    else:
+        cache_key = permission_context_cache_key(user.pk)
+        context = cache.get(cache_key)
+        if context is None:
+            context = resolve_permission_context(user)
+            cache.set(cache_key, context, get_cache_timeout("user_permissions"))
+
+    user._permission_context = context
+    return context
+
+
 # Multi-tenancy helpers
 def get_user_schemes(user):
     """
@@ -256,13 +413,13 @@ def filter_by_user_scope(queryset, user, model_class):
     Returns:
         QuerySet: Filtered queryset based on user scope
     """
+    scope = get_user_scope(user)
+
     # Superusers and internal admins see all data
-    if user.is_superuser or user_has_role(user, 'Administrator', 'Compliance Auditor', 'Finance Officer', 'Claims Officer'):
+    if scope.is_unrestricted:
         return queryset
     
-    # Get user's accessible schemes and branches
-    accessible_schemes = get_user_schemes(user)
-    accessible_branches = get_user_branches(user)
+    scheme_ids = scope.scheme_ids
     
     # Filter based on model type
     model_name = model_class.__name__
@@ -270,26 +427,28 @@ def filter_by_user_scope(queryset, user, model_class):
     if model_name in ['Member', 'Policy', 'Dependent', 'Beneficiary']:
         # These models connect through Policy -> Scheme
         if model_name == 'Policy':
-            return queryset.filter(scheme__in=accessible_schemes)
+            return queryset.filter(scheme_id__in=scheme_ids)
         if model_name == 'Member':
-            return queryset.filter(policies__scheme__in=accessible_schemes).distinct()
-        return queryset.filter(policy__scheme__in=accessible_schemes)
+            return queryset.filter(policies__scheme_id__in=scheme_ids).distinct()
+        return queryset.filter(policy__scheme_id__in=scheme_ids)
     elif model_name == 'Payment':
         # Payments connect through Policy -> Scheme
-        return queryset.filter(policy__scheme__in=accessible_schemes)
+        return queryset.filter(policy__scheme_id__in=scheme_ids)
     elif model_name == 'Claim':
         # Claims connect through Policy -> Scheme
-        return queryset.filter(policy__scheme__in=accessible_schemes)
+        return queryset.filter(policy__scheme_id__in=scheme_ids)
     elif model_name == 'Scheme':
-        return queryset.filter(id__in=accessible_schemes.values_list('id', flat=True))
+        return queryset.filter(id__in=scheme_ids)
     elif model_name == 'Plan':
         # These connect directly through branch
-        return queryset.filter(scheme__in=accessible_schemes)
+        return queryset.filter(scheme_id__in=scheme_ids)
     elif model_name == 'Agent':
-        return queryset.filter(scheme__in=accessible_schemes)
+        return queryset.filter(scheme_id__in=scheme_ids)
+    elif model_name == 'DailyPolicyRollup':
+        return queryset.filter(scheme_id__in=scheme_ids)
     elif model_name == 'Underwriter':
-        if accessible_branches.exists():
-            return queryset.filter(schemes__branch__in=accessible_branches).distinct()
+        if scope.branch_ids:
+            return queryset.filter(schemes__branch_id__in=scope.branch_ids).distinct()
         return queryset.none()
     
     # Default: no restriction (admin access)
@@ -311,21 +470,9 @@ def can_view_branch(user, branch):
     Returns:
         bool: True if user can access the branch
     """
-    # Superusers and admins can view all branches
-    if user.is_superuser:
-        return True
-    if user_has_role(user, 'Administrator', 'Compliance Auditor', 'Finance Officer', 'Claims Officer'):
-        return True
-    
-    # BranchOwners can only view their assigned branch
-    if user_has_role(user, 'Branch Owner'):
-        return user.branch_id == branch.id if user.branch else False
-
-    if user_has_role(user, 'Scheme Manager', 'Internal Admin'):
-        return user.assigned_schemes.filter(branch_id=branch.id).exists()
-    
-    # All other roles start with no access
-    return False
+    # Superusers and admins can view all branches; BranchOwners only their
+    # assigned branch and SchemeManagers the branches of their schemes
+    return get_user_scope(user).can_access_branch(branch.id)
 
 
 def can_view_scheme(user, scheme):
@@ -339,22 +486,9 @@ def can_view_scheme(user, scheme):
     Returns:
         bool: True if user can access the scheme
     """
-    # Superusers and admins can view all schemes
-    if user.is_superuser:
-        return True
-    if user_has_role(user, 'Administrator', 'Compliance Auditor', 'Finance Officer', 'Claims Officer'):
-        return True
-    
-    # SchemeManagers can only view their assigned schemes
-    if user_has_role(user, 'Scheme Manager', 'Internal Admin'):
-        return user.assigned_schemes.filter(id=scheme.id).exists()
-    
-    # BranchOwners can view schemes in their branch
-    if user_has_role(user, 'Branch Owner'):
-        return scheme.branch_id == user.branch_id if user.branch else False
-    
-    # All other roles start with no access
-    return False
+    # Superusers and admins can view all schemes; SchemeManagers only their
+    # assigned schemes and BranchOwners the schemes in their branch
+    return get_user_scope(user).can_access_scheme(scheme.id)
 
 
 def get_user_accessible_branches(user):
@@ -370,22 +504,10 @@ def get_user_accessible_branches(user):
     from branches.models import Branch
     
     # Superusers and admins see all branches
-    if user.is_superuser:
-        return Branch.objects.all()
-    if user_has_role(user, 'Administrator', 'Compliance Auditor', 'Finance Officer', 'Claims Officer'):
+    branch_ids = get_user_scope(user).branch_ids
+    if branch_ids is None:
         return Branch.objects.all()
-    
-    # BranchOwners see only their assigned branch
-    if user_has_role(user, 'Branch Owner'):
-        if user.branch:
-            return Branch.objects.filter(id=user.branch.id)
-        return Branch.objects.none()
-
-    if user_has_role(user, 'Scheme Manager', 'Internal Admin'):
-        return Branch.objects.filter(schemes__in=user.assigned_schemes.all()).distinct()
-    
-    # Other roles have no direct branch access
-    return Branch.objects.none()
+    return Branch.objects.filter(id__in=branch_ids)
 
 
 def get_user_accessible_schemes(user):
@@ -401,23 +523,10 @@ def get_user_accessible_schemes(user):
     from schemes.models import Scheme
     
     # Superusers and admins see all schemes
-    if user.is_superuser:
-        return Scheme.objects.all()
-    if user_has_role(user, 'Administrator', 'Compliance Auditor', 'Finance Officer', 'Claims Officer'):
+    scheme_ids = get_user_scope(user).scheme_ids
+    if scheme_ids is None:
         return Scheme.objects.all()
-    
-    # SchemeManagers see only their assigned schemes
-    if user_has_role(user, 'Scheme Manager', 'Internal Admin'):
-        return user.assigned_schemes.all()
-    
-    # BranchOwners see all schemes in their branch
-    if user_has_role(user, 'Branch Owner'):
-        if user.branch:
-            return Scheme.objects.filter(branch=user.branch)
-        return Scheme.objects.none()
-    
-    # Other roles have no direct scheme access
-    return Scheme.objects.none()
+    return Scheme.objects.filter(id__in=scheme_ids)
 
 
 def filter_queryset_by_user_scope(queryset, user, model_name):
@@ -432,48 +541,35 @@ def filter_queryset_by_user_scope(queryset, user, model_name):
     Returns:
         QuerySet: Filtered queryset
     """
+    scope = get_user_scope(user)
+
     # Superusers and admins see all data
-    if user.is_superuser:
-        return queryset
-    if user_has_role(user, 'Administrator', 'Compliance Auditor', 'Finance Officer', 'Claims Officer'):
+    if scope.is_unrestricted:
         return queryset
     
-    # Get user's accessible schemes
-    accessible_schemes = get_user_accessible_schemes(user)
-    accessible_branches = get_user_accessible_branches(user)
+    # SchemeManagers are limited to their assigned schemes and BranchOwners to
+    # the schemes in their branch; both are resolved into scope.scheme_ids
+    scheme_ids = scope.scheme_ids
+    scoped_roles = ('Scheme Manager', 'Internal Admin', 'Branch Owner')
     
     # Filter based on model type
     if model_name in ['Member', 'Policy', 'Claim', 'Payment']:
         # These models connect through Policy -> Scheme -> Branch
-        if user_has_role(user, 'Scheme Manager', 'Internal Admin'):
-            # SchemeManagers: filter by their assigned schemes
+        if scope.has_role(*scoped_roles):
             if model_name == 'Policy':
-                return queryset.filter(scheme__in=accessible_schemes)
+                return queryset.filter(scheme_id__in=scheme_ids)
             if model_name == 'Member':
-                return queryset.filter(policies__scheme__in=accessible_schemes).distinct()
-            return queryset.filter(policy__scheme__in=accessible_schemes)
-        elif user_has_role(user, 'Branch Owner'):
-            # BranchOwners: filter by their branch's schemes
-            if model_name == 'Policy':
-                return queryset.filter(scheme__branch=user.branch)
-            if model_name == 'Member':
-                return queryset.filter(policies__scheme__branch=user.branch).distinct()
-            return queryset.filter(policy__scheme__branch=user.branch)
+                return queryset.filter(policies__scheme_id__in=scheme_ids).distinct()
+            return queryset.filter(policy__scheme_id__in=scheme_ids)
     elif model_name in ['Scheme', 'Plan']:
         # Schemes and Plans filter by branch/assignment
-        if model_name == 'Scheme':
-            if user_has_role(user, 'Scheme Manager', 'Internal Admin'):
-                return queryset.filter(id__in=accessible_schemes.values_list('id', flat=True))
-            elif user_has_role(user, 'Branch Owner'):
-                return queryset.filter(branch=user.branch)
-        else:
-            if user_has_role(user, 'Scheme Manager', 'Internal Admin'):
-                return queryset.filter(scheme__in=accessible_schemes)
-            elif user_has_role(user, 'Branch Owner'):
-                return queryset.filter(scheme__branch=user.branch)
+        if scope.has_role(*scoped_roles):
+            if model_name == 'Scheme':
+                return queryset.filter(id__in=scheme_ids)
+            return queryset.filter(scheme_id__in=scheme_ids)
     elif model_name in ['Branch']:
         # Branches filter by direct assignment
-        return queryset.filter(id__in=accessible_branches.values_list('id', flat=True))
+        return queryset.filter(id__in=scope.branch_ids)
     
     # Default: restrict to accessible data
     return queryset.none()
@@ -0,0 +1,124 @@
+# dashboard/aggregates.py
+"""
+Grouped aggregation helpers for the dashboard charts.
+
+Every chart series is built from a single ``GROUP BY`` query over an already
+scoped queryset, so the number of round-trips stays the same no matter how
+many plans, schemes or branches a user can see. The same builders run against
+raw ``Policy`` rows or the pre-aggregated ``DailyPolicyRollup`` table.
+"""
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncMonth
+
+# Column names used to group raw policies and rollup rows respectively.
+POLICY_FIELDS = {
+    'plan': 'plan_id',
+    'scheme': 'plan__scheme_id',
+    'branch': 'plan__scheme__branch_id',
+    'date': 'inception_date',
+}
+ROLLUP_FIELDS = {
+    'plan': 'plan_id',
+    'scheme': 'scheme_id',
+    'branch': 'branch_id',
+    'date': 'date',
+}
+
+
+def count_policies_by(policies, field):
+    """Return ``{field value: policy count}`` using one grouped query."""
+    return group_totals(policies, field, Count('id'))
+
+
+def sum_rollups_by(rollups, field, column='new_policies'):
+    """Return ``{field value: summed rollup column}`` using one grouped query."""
+    return group_totals(rollups, field, Sum(column))
+
+
+def group_totals(queryset, field, measure):
+    rows = queryset.order_by().values(field).annotate(total=measure)
+    return {row[field]: row['total'] or 0 for row in rows}
+
+
+def build_labelled_series(objects, counts):
+    """Pair each object's name with its count, defaulting missing groups to 0."""
+    labels = []
+    data = []
+    for obj in objects:
+        labels.append(obj.name)
+        data.append(counts.get(obj.pk, 0))
+    return labels, data
+
+
+def build_period_series(queryset, date_field, measure, trunc, label_format, start_date=None):
+    if start_date is not None:
+        queryset = queryset.filter(**{f'{date_field}__gte': start_date})
+    rows = (
+        queryset.filter(**{f'{date_field}__isnull': False})
+        .order_by()
+        .annotate(period=trunc(date_field))
+        .values('period')
+        .annotate(total=measure)
+        .order_by('period')
+    )
+    labels = []
+    data = []
+    for row in rows:
+        labels.append(row['period'].strftime(label_format))
+        data.append(row['total'] or 0)
+    return labels, data
+
+
+def build_series(queryset, fields, measure, plans, schemes, branches, month_start):
+    def totals(key):
+        return group_totals(queryset, fields[key], measure)
+
+    plan_labels, plan_data = build_labelled_series(plans, totals('plan'))
+    scheme_labels, scheme_data = build_labelled_series(schemes, totals('scheme'))
+    branch_labels, branch_data = build_labelled_series(branches, totals('branch'))
+    monthly_labels, monthly_data = build_period_series(
+        queryset, fields['date'], measure, TruncMonth, '%b'
+    )
+    agent_signup_labels, agent_signup_counts = build_period_series(
+        queryset, fields['date'], measure, TruncDay, '%d %b', start_date=month_start
+    )
+
+    return {
+        'plan_labels': plan_labels,
+        'plan_data': plan_data,
+        'scheme_labels': scheme_labels,
+        'scheme_data': scheme_data,
+        'branch_labels': branch_labels,
+        'branch_data': branch_data,
+        'monthly_labels': monthly_labels,
+        'monthly_data': monthly_data,
+        'agent_signup_labels': agent_signup_labels,
+        'agent_signup_counts': agent_signup_counts,
+    }
+
+
+def build_distribution_series(policies, plans, schemes, branches, month_start):
+    """
+    Build every dashboard chart series from raw, already scoped policies.
+
+    Args:
+        policies: Policy queryset already restricted to the user's scope
+        plans: Plan queryset listed in the plan chart
+        schemes: Scheme queryset listed in the scheme chart
+        branches: Branch queryset listed in the branch chart
+        month_start: First day of the month used for the daily signup chart
+
+    Returns:
+        dict: Template context keys for the plan, scheme, branch, monthly and
+        daily signup charts
+    """
+    return build_series(policies, POLICY_FIELDS, Count('id'), plans, schemes, branches, month_start)
+
+
+def build_rollup_series(rollups, plans, schemes, branches, month_start):
+    """
+    Build the same chart series as ``build_distribution_series`` from
+    ``DailyPolicyRollup`` rows, summing new policies per group.
+    """
+    return build_series(rollups, ROLLUP_FIELDS, Sum('new_policies'), plans, schemes, branches, month_start)
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dashboard.rollups import rebuild_policy_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily policy rollups that feed the dashboards'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Only rebuild buckets from the last N days (default: full rebuild)'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        start_date = timezone.now().date() - timedelta(days=days) if days else None
+
+        count = rebuild_policy_rollups(start_date=start_date)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} policy rollup rows"))
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.21 on 2026-10-18 15:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('settings_app', '0005_userprofile_latest_enrollment_link'),
+        ('branches', '0001_initial'),
+        ('schemes', '0014_scheme_products'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPolicyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(blank=True, db_index=True, null=True)),
+                ('new_policies', models.PositiveIntegerField(default=0)),
+                ('active_policies', models.PositiveIntegerField(default=0)),
+                ('lapsed_policies', models.PositiveIntegerField(default=0)),
+                ('new_premium', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('payment_count', models.PositiveIntegerField(default=0)),
+                ('payment_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='settings_app.agent')),
+                ('branch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='branches.branch')),
+                ('plan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='schemes.plan')),
+                ('scheme', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='schemes.scheme')),
+            ],
+            options={
+                'verbose_name': 'Daily Policy Rollup',
+                'verbose_name_plural': 'Daily Policy Rollups',
+                'indexes': [models.Index(fields=['scheme', 'date'], name='dashboard_d_scheme__10c8a5_idx'), models.Index(fields=['branch', 'date'], name='dashboard_d_branch__3acd1b_idx')],
+                'unique_together': {('date', 'branch', 'scheme', 'plan', 'agent')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.21 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+def fill_bucket_keys(apps, schema_editor):
+    # Frozen copy of dashboard.rollups.rollup_bucket_key
+    DailyPolicyRollup = apps.get_model('dashboard', 'DailyPolicyRollup')
+
+    seen = set()
+    duplicates = []
+    for rollup in DailyPolicyRollup.objects.order_by('-updated_at', '-pk').iterator():
+        key = (rollup.date, rollup.branch_id, rollup.scheme_id, rollup.plan_id, rollup.agent_id)
+        bucket_key = '|'.join('' if value is None else str(value) for value in key)
+        if bucket_key in seen:
+            # Each refresh writes a bucket's full totals, so the newest row stands
+            duplicates.append(rollup.pk)
+            continue
+        seen.add(bucket_key)
+        DailyPolicyRollup.objects.filter(pk=rollup.pk).update(bucket_key=bucket_key)
+    DailyPolicyRollup.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='dailypolicyrollup',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='dailypolicyrollup',
+            name='bucket_key',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.RunPython(fill_bucket_keys, migrations.RunPython.noop),
+    ]
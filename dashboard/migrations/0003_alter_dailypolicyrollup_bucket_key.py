@@ -0,0 +1,20 @@
+# Generated by Django 4.2.21 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Separate from 0002 so PostgreSQL does not alter the table in the
+    # transaction that updated its rows
+
+    dependencies = [
+        ('dashboard', '0002_dailypolicyrollup_bucket_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailypolicyrollup',
+            name='bucket_key',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+    ]
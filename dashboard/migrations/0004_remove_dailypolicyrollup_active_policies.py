@@ -0,0 +1,17 @@
+# Generated by Django 4.2.21 on 2026-10-18 17:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_alter_dailypolicyrollup_bucket_key'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='dailypolicyrollup',
+            name='active_policies',
+        ),
+    ]
@@ -1,3 +1,47 @@
 from django.db import models
 
-# Create your models here.
+
+class DailyPolicyRollup(models.Model):
+    """
+    Pre-aggregated daily policy and payment counts feeding the dashboards.
+
+    Policies are bucketed by inception date (falling back to the creation
+    date) and payments by payment date, keyed by branch, scheme, plan and
+    agent (see ``dashboard.rollups.rollup_bucket_key``). Rows are refreshed incrementally when a Policy or Payment is saved
+    and rebuilt nightly by ``legacyadmin.tasks.reconcile_policy_rollups``.
+    """
+    date = models.DateField(null=True, blank=True, db_index=True)
+    branch = models.ForeignKey(
+        'branches.Branch', on_delete=models.CASCADE, null=True, blank=True, related_name='+'
+    )
+    scheme = models.ForeignKey(
+        'schemes.Scheme', on_delete=models.CASCADE, null=True, blank=True, related_name='+'
+    )
+    plan = models.ForeignKey(
+        'schemes.Plan', on_delete=models.CASCADE, null=True, blank=True, related_name='+'
+    )
+    agent = models.ForeignKey(
+        'settings_app.Agent', on_delete=models.CASCADE, null=True, blank=True, related_name='+'
+    )
+    # The key columns joined into one non-null value: NULLs never collide in a
+    # unique index, so this is what stops two rows for one bucket
+    bucket_key = models.CharField(max_length=100, unique=True)
+
+    new_policies = models.PositiveIntegerField(default=0)
+    lapsed_policies = models.PositiveIntegerField(default=0)
+    new_premium = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payment_count = models.PositiveIntegerField(default=0)
+    payment_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Daily Policy Rollup'
+        verbose_name_plural = 'Daily Policy Rollups'
+        indexes = [
+            models.Index(fields=['scheme', 'date']),
+            models.Index(fields=['branch', 'date']),
+        ]
+
+    def __str__(self):
+        return f"Rollup {self.date} scheme={self.scheme_id} plan={self.plan_id} agent={self.agent_id}"
@@ -0,0 +1,296 @@
+# dashboard/rollups.py
+"""
+Maintenance of the ``DailyPolicyRollup`` table.
+
+Rollup rows are keyed by ``(date, branch, scheme, plan, agent)``, stored
+joined as the unique ``bucket_key`` since any of them may be NULL. A Policy or
+Payment save refreshes only the buckets it touches (see ``dashboard.signals``),
+while ``rebuild_policy_rollups`` recomputes the whole table, or a date range of
+it, from a couple of grouped queries for the nightly reconcile.
+"""
+
+import logging
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BigIntegerField, Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import DailyPolicyRollup
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_KEY_FIELDS = ('date', 'branch_id', 'scheme_id', 'plan_id', 'agent_id')
+POLICY_COLUMNS = ('new_policies', 'lapsed_policies', 'new_premium')
+PAYMENT_COLUMNS = ('payment_count', 'payment_amount')
+
+
+def rollup_bucket_key(key):
+    """The ``DailyPolicyRollup.bucket_key`` value for a bucket key tuple."""
+    return '|'.join('' if value is None else str(value) for value in key)
+
+
+def empty_totals():
+    return {
+        'new_policies': 0,
+        'lapsed_policies': 0,
+        'new_premium': Decimal('0.00'),
+        'payment_count': 0,
+        'payment_amount': Decimal('0.00'),
+    }
+
+
+def annotate_policy_buckets(queryset):
+    """Annotate each policy with the rollup bucket it belongs to."""
+    return queryset.annotate(
+        bucket_date=Coalesce('inception_date', TruncDate('created_at')),
+        bucket_scheme=Coalesce('scheme_id', 'plan__scheme_id', output_field=BigIntegerField()),
+        bucket_branch=Coalesce(
+            'scheme__branch_id', 'plan__scheme__branch_id', output_field=BigIntegerField()
+        ),
+    )
+
+
+def annotate_payment_buckets(queryset):
+    """Annotate each payment with the rollup bucket of its policy."""
+    return queryset.annotate(
+        bucket_date=F('date'),
+        bucket_scheme=Coalesce(
+            'policy__scheme_id', 'policy__plan__scheme_id', output_field=BigIntegerField()
+        ),
+        bucket_branch=Coalesce(
+            'policy__scheme__branch_id', 'policy__plan__scheme__branch_id', output_field=BigIntegerField()
+        ),
+    )
+
+
+def day_start(day):
+    """Midnight of ``day`` in the current timezone, matching ``TruncDate``."""
+    start = datetime.combine(day, time.min)
+    return timezone.make_aware(start) if settings.USE_TZ else start
+
+
+def policy_date_filter(start_date=None, end_date=None):
+    """
+    Policies whose bucket date falls in ``[start_date, end_date]``, on the
+    indexed ``inception_date`` and ``created_at`` columns rather than the
+    ``bucket_date`` annotation.
+    """
+    inception = Q()
+    created = Q(inception_date__isnull=True)
+    if start_date:
+        inception &= Q(inception_date__gte=start_date)
+        created &= Q(created_at__gte=day_start(start_date))
+    if end_date:
+        inception &= Q(inception_date__lte=end_date)
+        created &= Q(created_at__lt=day_start(end_date + timedelta(days=1)))
+    return (Q(inception_date__isnull=False) & inception) | created
+
+
+def scheme_filter(scheme_id, prefix=''):
+    """The ``bucket_scheme`` match on the indexed scheme and plan columns."""
+    if scheme_id is None:
+        return Q(**{f'{prefix}scheme__isnull': True}) & (
+            Q(**{f'{prefix}plan__isnull': True}) | Q(**{f'{prefix}plan__scheme__isnull': True})
+        )
+    return Q(**{f'{prefix}scheme_id': scheme_id}) | Q(
+        **{f'{prefix}scheme__isnull': True, f'{prefix}plan__scheme_id': scheme_id}
+    )
+
+
+def collect_rollup_totals(policies, payments):
+    """
+    Aggregate policies and payments into ``{bucket key: column totals}``.
+
+    Args:
+        policies: Policy queryset annotated by ``annotate_policy_buckets``
+        payments: Payment queryset annotated by ``annotate_payment_buckets``
+
+    Returns:
+        dict: Totals keyed by ``(date, branch_id, scheme_id, plan_id, agent_id)``
+    """
+    totals = {}
+
+    policy_rows = (
+        policies.order_by()
+        .values('bucket_date', 'bucket_branch', 'bucket_scheme', 'plan_id', 'underwritten_by_id')
+        .annotate(
+            new_policies=Count('id'),
+            lapsed_policies=Count('id', filter=Q(lapse_warning='lapsed')),
+            new_premium=Sum('premium_amount'),
+        )
+    )
+    for row in policy_rows:
+        key = (row['bucket_date'], row['bucket_branch'], row['bucket_scheme'], row['plan_id'], row['underwritten_by_id'])
+        bucket = totals.setdefault(key, empty_totals())
+        for column in POLICY_COLUMNS:
+            bucket[column] += row[column] or 0
+
+    payment_rows = (
+        payments.filter(status='COMPLETED')
+        .order_by()
+        .values('bucket_date', 'bucket_branch', 'bucket_scheme', 'policy__plan_id', 'policy__underwritten_by_id')
+        .annotate(payment_count=Count('id'), payment_amount=Sum('amount'))
+    )
+    for row in payment_rows:
+        key = (
+            row['bucket_date'], row['bucket_branch'], row['bucket_scheme'],
+            row['policy__plan_id'], row['policy__underwritten_by_id'],
+        )
+        bucket = totals.setdefault(key, empty_totals())
+        for column in PAYMENT_COLUMNS:
+            bucket[column] += row[column] or 0
+
+    return totals
+
+
+def build_rollup_rows(totals):
+    return [
+        DailyPolicyRollup(bucket_key=rollup_bucket_key(key), **dict(zip(ROLLUP_KEY_FIELDS, key)), **columns)
+        for key, columns in totals.items()
+    ]
+
+
+def rebuild_policy_rollups(start_date=None, end_date=None, batch_size=1000):
+    """
+    Recompute rollup rows from the source tables.
+
+    Without a date range the whole table is replaced; with one, only buckets
+    inside the range are rebuilt so the nightly run can stay incremental.
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    from members.models import Policy
+    from payments.models import Payment
+
+    policies = annotate_policy_buckets(Policy.objects.all())
+    payments = annotate_payment_buckets(Payment.objects.all())
+    rollups = DailyPolicyRollup.objects.all()
+    if start_date or end_date:
+        policies = policies.filter(policy_date_filter(start_date, end_date))
+    if start_date:
+        payments = payments.filter(date__gte=start_date)
+        rollups = rollups.filter(date__gte=start_date)
+    if end_date:
+        payments = payments.filter(date__lte=end_date)
+        rollups = rollups.filter(date__lte=end_date)
+
+    rows = build_rollup_rows(collect_rollup_totals(policies, payments))
+    with transaction.atomic():
+        rollups.delete()
+        DailyPolicyRollup.objects.bulk_create(rows, batch_size=batch_size)
+
+    logger.info("Rebuilt %s policy rollup rows (start=%s, end=%s)", len(rows), start_date, end_date)
+    return len(rows)
+
+
+def refresh_rollup_bucket(key):
+    """
+    Recompute a single rollup bucket from its source rows.
+
+    The rows are found through indexed date, scheme, plan and agent columns;
+    only the branch is matched on its ``Coalesce`` annotation, within them.
+    """
+    from members.models import Policy
+    from payments.models import Payment
+
+    bucket_date, branch_id, scheme_id, plan_id, agent_id = key
+    if bucket_date is None:
+        policy_dates = Q(inception_date__isnull=True, created_at__isnull=True)
+    else:
+        policy_dates = policy_date_filter(bucket_date, bucket_date)
+    policies = annotate_policy_buckets(
+        Policy.objects.filter(policy_dates, scheme_filter(scheme_id), plan_id=plan_id, underwritten_by_id=agent_id)
+    ).filter(bucket_branch=branch_id)
+    payments = annotate_payment_buckets(
+        Payment.objects.filter(
+            scheme_filter(scheme_id, prefix='policy__'),
+            date=bucket_date, policy__plan_id=plan_id, policy__underwritten_by_id=agent_id,
+        )
+    ).filter(bucket_branch=branch_id)
+    columns = collect_rollup_totals(policies, payments).get(key)
+    bucket_key = rollup_bucket_key(key)
+
+    if not columns or not any(columns.values()):
+        DailyPolicyRollup.objects.filter(bucket_key=bucket_key).delete()
+        return None
+    # A concurrent refresh creating the same bucket hits the unique key and is
+    # turned into an update by update_or_create
+    rollup, _created = DailyPolicyRollup.objects.update_or_create(
+        bucket_key=bucket_key, defaults={**dict(zip(ROLLUP_KEY_FIELDS, key)), **columns}
+    )
+    return rollup
+
+
+def resolve_bucket_key(date, scheme_id, plan_id, agent_id):
+    """Build a bucket key from raw policy values, looking up scheme and branch."""
+    from schemes.models import Plan, Scheme
+
+    if scheme_id is None and plan_id is not None:
+        scheme_id = Plan.objects.filter(pk=plan_id).values_list('scheme_id', flat=True).first()
+    branch_id = None
+    if scheme_id is not None:
+        branch_id = Scheme.objects.filter(pk=scheme_id).values_list('branch_id', flat=True).first()
+    return (date, branch_id, scheme_id, plan_id, agent_id)
+
+
+def policy_bucket_date(inception_date, created_at):
+    if inception_date:
+        return inception_date
+    if created_at:
+        return timezone.localtime(created_at).date() if timezone.is_aware(created_at) else created_at.date()
+    return None
+
+
+def policy_bucket_key(policy_id):
+    from members.models import Policy
+
+    row = (
+        annotate_policy_buckets(Policy.objects.filter(pk=policy_id))
+        .values('bucket_date', 'bucket_branch', 'bucket_scheme', 'plan_id', 'underwritten_by_id')
+        .first()
+    )
+    if row is None:
+        return None
+    return (row['bucket_date'], row['bucket_branch'], row['bucket_scheme'], row['plan_id'], row['underwritten_by_id'])
+
+
+def policy_bucket_keys(policy_ids):
+    """The distinct bucket keys of many policies, read in one query."""
+    from members.models import Policy
+
+    rows = (
+        annotate_policy_buckets(Policy.objects.filter(pk__in=policy_ids))
+        .order_by()
+        .values_list('bucket_date', 'bucket_branch', 'bucket_scheme', 'plan_id', 'underwritten_by_id')
+        .distinct()
+    )
+    return set(rows)
+
+
+def payment_bucket_key(payment_date, policy_id):
+    from members.models import Policy
+
+    if policy_id is None:
+        return (payment_date, None, None, None, None)
+    row = (
+        annotate_policy_buckets(Policy.objects.filter(pk=policy_id))
+        .values('bucket_branch', 'bucket_scheme', 'plan_id', 'underwritten_by_id')
+        .first()
+    )
+    if row is None:
+        return (payment_date, None, None, None, None)
+    return (payment_date, row['bucket_branch'], row['bucket_scheme'], row['plan_id'], row['underwritten_by_id'])
+
+
+def refresh_rollup_buckets(keys):
+    for key in {key for key in keys if key is not None}:
+        try:
+            refresh_rollup_bucket(key)
+        except Exception:
+            # The nightly reconcile repairs any bucket we fail to refresh here.
+            logger.exception("Failed to refresh policy rollup bucket %s", key)
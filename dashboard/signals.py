@@ -0,0 +1,100 @@
+"""
+Signal handlers keeping ``DailyPolicyRollup`` current.
+
+Each Policy or Payment save refreshes the rollup buckets it left and entered
+once the surrounding transaction commits, so dashboard reads never wait on the
+refresh and a rolled-back save leaves the rollups untouched.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from members.models import Policy
+from payments.models import Payment
+
+from .rollups import (
+    payment_bucket_key,
+    policy_bucket_date,
+    policy_bucket_key,
+    refresh_rollup_buckets,
+    resolve_bucket_key,
+)
+
+POLICY_BUCKET_FIELDS = ('inception_date', 'created_at', 'scheme_id', 'plan_id', 'underwritten_by_id')
+PAYMENT_BUCKET_FIELDS = ('date', 'policy_id')
+
+
+def snapshot(instance, fields):
+    # Read straight from __dict__ so deferred fields never trigger a query.
+    values = instance.__dict__
+    if instance.pk is None or any(field not in values for field in fields):
+        return None
+    return tuple(values[field] for field in fields)
+
+
+def policy_origin_key(origin):
+    if origin is None:
+        return None
+    inception_date, created_at, scheme_id, plan_id, agent_id = origin
+    return resolve_bucket_key(policy_bucket_date(inception_date, created_at), scheme_id, plan_id, agent_id)
+
+
+def payment_origin_key(origin):
+    if origin is None:
+        return None
+    payment_date, policy_id = origin
+    return payment_bucket_key(payment_date, policy_id)
+
+
+def refresh_policy_rollups(policy_id, origin):
+    keys = [policy_origin_key(origin)]
+    if policy_id is not None:
+        keys.append(policy_bucket_key(policy_id))
+    refresh_rollup_buckets(keys)
+
+
+def refresh_payment_rollups(origin, current=None):
+    refresh_rollup_buckets([payment_origin_key(origin), payment_origin_key(current)])
+
+
+@receiver(post_init, sender=Policy)
+def remember_policy_bucket(sender, instance, **kwargs):
+    instance._rollup_origin = snapshot(instance, POLICY_BUCKET_FIELDS)
+
+
+@receiver(post_save, sender=Policy)
+def policy_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    origin = getattr(instance, '_rollup_origin', None)
+    instance._rollup_origin = snapshot(instance, POLICY_BUCKET_FIELDS)
+    transaction.on_commit(partial(refresh_policy_rollups, instance.pk, origin))
+
+
+@receiver(post_delete, sender=Policy)
+def policy_deleted(sender, instance, **kwargs):
+    origin = getattr(instance, '_rollup_origin', None)
+    transaction.on_commit(partial(refresh_policy_rollups, None, origin))
+
+
+@receiver(post_init, sender=Payment)
+def remember_payment_bucket(sender, instance, **kwargs):
+    instance._rollup_origin = snapshot(instance, PAYMENT_BUCKET_FIELDS)
+
+
+@receiver(post_save, sender=Payment)
+def payment_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    origin = getattr(instance, '_rollup_origin', None)
+    current = snapshot(instance, PAYMENT_BUCKET_FIELDS)
+    instance._rollup_origin = current
+    transaction.on_commit(partial(refresh_payment_rollups, origin, current))
+
+
+@receiver(post_delete, sender=Payment)
+def payment_deleted(sender, instance, **kwargs):
+    origin = getattr(instance, '_rollup_origin', None)
+    transaction.on_commit(partial(refresh_payment_rollups, origin))
@@ -1,3 +1,210 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from branches.models import Bank, Branch
+from dashboard.models import DailyPolicyRollup
+from dashboard.rollups import (
+    ROLLUP_KEY_FIELDS,
+    policy_bucket_key,
+    rebuild_policy_rollups,
+    refresh_rollup_bucket,
+    rollup_bucket_key,
+)
+from members.models import Member, Policy
+from payments.models import Payment
+from schemes.models import Plan, Scheme
+from settings_app.models import Agent
+
+
+class PolicyRollupTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='rollup_admin',
+            password='pass1234',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.client.force_login(self.user)
+
+        self.bank = Bank.objects.create(name='Bank', branch_code='123456')
+        self.branch = Branch.objects.create(name='Main Branch', bank=self.bank, code='MB01')
+        self.scheme = Scheme.objects.create(
+            branch=self.branch,
+            name='Rollup Scheme',
+            registration_no='REG1',
+            fsp_number='FSP1',
+            email='scheme@example.com',
+            phone='0123456789',
+            debit_order_no='DEB1',
+            account_no='12345',
+        )
+        self.plan = Plan.objects.create(name='Gold Plan', scheme=self.scheme, premium='150.00')
+        self.other_plan = Plan.objects.create(name='Silver Plan', scheme=self.scheme, premium='90.00')
+        self.agent = Agent.objects.create(
+            full_name='Agent Smith',
+            surname='Smith',
+            contact_number='0821111111',
+            email='agent@example.com',
+            address1='1 Main',
+            address2='Town',
+            address3='Province',
+            code='AG01',
+            scheme=self.scheme,
+        )
+        self.today = timezone.now().date()
+
+    def create_policy(self, plan=None, inception_date=None, **kwargs):
+        member = Member.objects.create(
+            first_name='Jane',
+            last_name='Doe',
+            gender='Female',
+            date_of_birth=date(1990, 1, 1),
+            phone_number='0820000000',
+        )
+        return Policy.objects.create(
+            member=member,
+            scheme=self.scheme,
+            plan=plan or self.plan,
+            inception_date=inception_date or self.today,
+            underwritten_by=self.agent,
+            premium_amount=Decimal('150.00'),
+            **kwargs
+        )
+
+    def test_rebuild_counts_new_and_lapsed_policies(self):
+        self.create_policy()
+        self.create_policy(lapse_warning='lapsed')
+        policy = self.create_policy(plan=self.other_plan)
+        Payment.objects.create(
+            member=policy.member,
+            policy=policy,
+            amount=Decimal('90.00'),
+            date=self.today,
+            payment_method='EFT',
+        )
+
+        rebuild_policy_rollups()
+
+        gold = DailyPolicyRollup.objects.get(plan=self.plan)
+        self.assertEqual(gold.date, self.today)
+        self.assertEqual(gold.branch, self.branch)
+        self.assertEqual(gold.agent, self.agent)
+        self.assertEqual(gold.new_policies, 2)
+        self.assertEqual(gold.lapsed_policies, 1)
+        self.assertEqual(gold.new_premium, Decimal('300.00'))
+
+        silver = DailyPolicyRollup.objects.get(plan=self.other_plan)
+        self.assertEqual(silver.payment_count, 1)
+        self.assertEqual(silver.payment_amount, Decimal('90.00'))
+
+    def test_rebuild_with_date_range_keeps_older_buckets(self):
+        self.create_policy(inception_date=self.today - timedelta(days=30))
+        rebuild_policy_rollups()
+        self.create_policy()
+
+        rebuild_policy_rollups(start_date=self.today - timedelta(days=1))
+
+        self.assertEqual(DailyPolicyRollup.objects.count(), 2)
+
+    def test_policy_save_refreshes_old_and_new_buckets(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            policy = self.create_policy()
+        self.assertEqual(DailyPolicyRollup.objects.get(plan=self.plan).new_policies, 1)
+
+        policy = Policy.objects.get(pk=policy.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            policy.plan = self.other_plan
+            policy.save()
+
+        self.assertFalse(DailyPolicyRollup.objects.filter(plan=self.plan).exists())
+        self.assertEqual(DailyPolicyRollup.objects.get(plan=self.other_plan).new_policies, 1)
+
+    def test_payment_save_refreshes_bucket(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            policy = self.create_policy()
+            Payment.objects.create(
+                member=policy.member,
+                policy=policy,
+                amount=Decimal('150.00'),
+                date=self.today,
+                payment_method='EFT',
+            )
+
+        rollup = DailyPolicyRollup.objects.get(plan=self.plan)
+        self.assertEqual(rollup.payment_count, 1)
+        self.assertEqual(rollup.payment_amount, Decimal('150.00'))
+
+    def test_buckets_without_a_plan_or_agent_stay_unique(self):
+        policy = self.create_policy()
+        Policy.objects.filter(pk=policy.pk).update(plan=None, underwritten_by=None)
+        key = policy_bucket_key(policy.pk)
+        self.assertEqual(key[3:], (None, None))
+
+        # Two refreshes racing to create the bucket
+        first = refresh_rollup_bucket(key)
+        second = refresh_rollup_bucket(key)
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(DailyPolicyRollup.objects.get().new_policies, 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DailyPolicyRollup.objects.create(
+                bucket_key=rollup_bucket_key(key), **dict(zip(ROLLUP_KEY_FIELDS, key))
+            )
+
+    def test_refresh_matches_rebuild_for_undated_and_plan_scheme_policies(self):
+        policy = self.create_policy()
+        Policy.objects.filter(pk=policy.pk).update(
+            inception_date=None, scheme=None, created_at=timezone.now() - timedelta(days=3)
+        )
+        rebuild_policy_rollups()
+        rebuilt = DailyPolicyRollup.objects.values(*ROLLUP_KEY_FIELDS, 'new_policies').get()
+        DailyPolicyRollup.objects.all().delete()
+
+        refresh_rollup_bucket(policy_bucket_key(policy.pk))
+
+        self.assertEqual(rebuilt['date'], self.today - timedelta(days=3))
+        self.assertEqual(rebuilt['scheme_id'], self.scheme.pk)
+        self.assertEqual(DailyPolicyRollup.objects.values(*ROLLUP_KEY_FIELDS, 'new_policies').get(), rebuilt)
+
+    def test_active_policies_follow_the_current_date(self):
+        self.create_policy()
+        self.create_policy(cover_date=self.today + timedelta(days=1))
+        rebuild_policy_rollups()
+        # The cover date passes without any policy being saved
+        Policy.objects.filter(cover_date__isnull=False).update(cover_date=self.today - timedelta(days=1))
+
+        admin = self.client.get(reverse('dashboard:admin_dashboard'))
+
+        self.assertEqual(admin.context['total_policies'], 2)
+        self.assertEqual(admin.context['active_policies'], 1)
+        self.assertEqual(admin.context['inactive_policies'], 1)
+
+    def test_dashboards_read_from_rollups(self):
+        self.create_policy()
+        self.create_policy()
+        rebuild_policy_rollups()
+
+        index = self.client.get(reverse('dashboard:index'))
+        self.assertEqual(index.status_code, 200)
+        self.assertEqual(index.context['total_policies'], 2)
+        self.assertEqual(index.context['plan_data'], [2, 0])
+
+        admin = self.client.get(reverse('dashboard:admin_dashboard'))
+        self.assertEqual(admin.status_code, 200)
+        self.assertEqual(admin.context['total_policies'], 2)
+        self.assertEqual(admin.context['active_policies'], 2)
+
+        scheme = self.client.get(reverse('dashboard:scheme_dashboard', args=[self.scheme.pk]))
+        self.assertEqual(scheme.status_code, 200)
+        self.assertEqual(scheme.context['policy_count'], 2)
+        self.assertEqual(scheme.context['agents'][0].policy_count, 2)
 
-# Create your tests here.
+        branch = self.client.get(reverse('dashboard:branch_dashboard'))
+        self.assertEqual(branch.status_code, 200)
+        self.assertContains(branch, 'Total Policies: 2')
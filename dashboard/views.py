@@ -3,14 +3,12 @@
 from datetime import date, datetime, time
 import calendar
 from collections import OrderedDict
-from branches.models import Branch
 
-import os
 from django.shortcuts import render, get_object_or_404
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Q
-from django.db.models.functions import TruncMonth, TruncDay
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
 from django.http import HttpResponse
 from django.template.loader import render_to_string
 from django.contrib.auth.models import Group
@@ -23,7 +21,9 @@ from members.models import Member, Policy, DiySignupLog
 from schemes.models import Plan, Scheme
 from settings_app.models import Agent, Underwriter
 from reports.models import Report
-from config.permissions import filter_by_user_scope, get_user_schemes, get_user_branches
+from config.permissions import can_view_scheme, filter_by_user_scope, get_user_schemes, get_user_branches, user_has_role
+from .aggregates import build_rollup_series, sum_rollups_by
+from .models import DailyPolicyRollup
 
 
 def get_active_policies_queryset(queryset=None):
@@ -38,10 +38,10 @@ def get_active_policies_queryset(queryset=None):
 
 def normalize_activity_date(value):
     if isinstance(value, datetime):
-        return value
+        return value if timezone.is_aware(value) else timezone.make_aware(value)
     if isinstance(value, date):
-        return datetime.combine(value, time.min)
-    return datetime.min
+        return timezone.make_aware(datetime.combine(value, time.min))
+    return timezone.make_aware(datetime(1970, 1, 1))
 
 
 # ─── MAIN DASHBOARD ───────────────────────────────────────────────────────────
@@ -76,81 +76,43 @@ def index(request):
 
     total_members = members_qs.count()
     total_schemes = schemes.count()
-    this_month = timezone.now().month
-
-    # Policies this month
-    monthly_signup = Policy.objects.filter(
-        member__in=members_qs,
-        inception_date__month=this_month
-    ).count()
-
-    total_policies = Policy.objects.filter(member__in=members_qs).count()
+    today = timezone.now().date()
+    month_start = today.replace(day=1)
 
-    # Monthly aggregation of policies
-    monthly_agg = (
-        Policy.objects.filter(member__in=members_qs)
-        .annotate(month=TruncMonth('inception_date'))
-        .values('month')
-        .annotate(count=Count('id'))
-        .order_by('month')
-    )
-    monthly_labels = [entry['month'].strftime('%b') for entry in monthly_agg]
-    monthly_data = [entry['count'] for entry in monthly_agg]
-
-    # Plan distribution (number of policies per plan)
-    plan_labels = [plan.name for plan in schemes]
-    plan_data = [
-        Policy.objects.filter(plan=plan, member__in=members_qs).count()
-        for plan in schemes
-    ]
+    # Policy counts and chart series read from the daily rollup table, so
+    # their cost depends on the number of buckets rather than policies.
+    rollups = filter_by_user_scope(DailyPolicyRollup.objects.all(), user, DailyPolicyRollup)
+    if selected_scheme.isdigit():
+        rollups = rollups.filter(plan_id=int(selected_scheme))
+    if selected_month.isdigit() and 1 <= int(selected_month) <= 12:
+        rollups = rollups.filter(date__month=int(selected_month))
 
-    # Scheme distribution (number of policies per scheme)
-    distinct_schemes = Scheme.objects.filter(plans__in=schemes).distinct()
-    scheme_labels = [s.name for s in distinct_schemes]
-    scheme_data = [
-        Policy.objects.filter(plan__scheme=scheme, member__in=members_qs).count()
-        for scheme in distinct_schemes
-    ]
+    total_policies = rollups.aggregate(total=Sum('new_policies'))['total'] or 0
+    monthly_signup = rollups.filter(date__gte=month_start).aggregate(total=Sum('new_policies'))['total'] or 0
 
-    # Branch distribution (number of policies per branch)
-    branches = Branch.objects.all()
-    branch_names = [b.name for b in branches]
-    branch_data = []
-    for b in branches:
-        branch_data.append(Policy.objects.filter(plan__scheme__branch=b).count())
-
-    # Daily signups for this month
-    start_month = timezone.now().replace(day=1)
-    agent_signup_data = (
-        Policy.objects.filter(inception_date__gte=start_month, member__in=members_qs)
-        .annotate(day=TruncDay('inception_date'))
-        .values('day')
-        .annotate(total=Count('id'))
-        .order_by('day')
-    )
-    agent_signup_labels = [x['day'].strftime('%d %b') for x in agent_signup_data]
-    agent_signup_counts = [x['total'] for x in agent_signup_data]
+    distinct_schemes = Scheme.objects.filter(plans__in=schemes).distinct().order_by('name')
+    branches = get_user_branches(user).order_by('name')
+    chart_series = build_rollup_series(rollups, schemes, distinct_schemes, branches, month_start)
 
     # Schemes with zero policies this month (for tracking empty schemes)
-    empty_schemes = Scheme.objects.annotate(
-        mcount=Count(
-            'plans__policy',
-            filter=Q(plans__policy__inception_date__month=this_month)
-        )
-    ).filter(mcount=0)
+    empty_schemes = Scheme.objects.exclude(
+        pk__in=DailyPolicyRollup.objects.filter(
+            date__gte=month_start, new_policies__gt=0, scheme__isnull=False
+        ).values('scheme_id')
+    )
 
     # Top agents based on the number of policies they've underwritten
     agent_stats = (
-        Policy.objects.filter(member__in=members_qs)
-        .values('underwritten_by')
-        .annotate(total=Count('id'))
+        rollups.filter(agent__isnull=False)
+        .values('agent')
+        .annotate(total=Sum('new_policies'))
         .order_by('-total')[:5]
     )
-    agent_ids = [x['underwritten_by'] for x in agent_stats]
-    agent_map = {a.id: a for a in Agent.objects.filter(id__in=agent_ids)}
+    agent_ids = [x['agent'] for x in agent_stats]
+    agent_map = {a.id: a for a in Agent.objects.select_related('scheme').filter(id__in=agent_ids)}
     top_agents = []
     for stat in agent_stats:
-        aid = stat['underwritten_by']
+        aid = stat['agent']
         agent = agent_map.get(aid)
         if agent:
             top_agents.append({
@@ -182,23 +144,14 @@ def index(request):
         'total_schemes': total_schemes,
         'monthly_signups': monthly_signup,
         'total_policies': total_policies,
-        'monthly_labels': monthly_labels,
-        'monthly_data': monthly_data,
-        'plan_labels': plan_labels,
-        'plan_data': plan_data,
-        'scheme_labels': scheme_labels,
-        'scheme_data': scheme_data,
-        'branch_labels': branch_names,
-        'branch_data': branch_data,
-        'agent_signup_labels': agent_signup_labels,
-        'agent_signup_counts': agent_signup_counts,
         'recent_members': recent_members,
         'top_agents': top_agents,
         'inactive_schemes': empty_schemes,
         'is_superuser': is_superuser,
-        'is_branch_owner': is_branch_owner,
-        'is_scheme_admin': is_scheme_admin,
+        'is_branch_owner': user_has_role(user, 'Branch Owner'),
+        'is_scheme_admin': user_has_role(user, 'Scheme Manager'),
     }
+    context.update(chart_series)
 
     # Corrected template path
     template_path = 'dashboard/index.html'
@@ -212,7 +165,6 @@ from django.utils import timezone
 from django.db.models import Count
 from members.models import Policy, Member
 from settings_app.models import Agent
-from branches.models import Branch
 from schemes.models import Scheme
 
 @login_required
@@ -220,51 +172,45 @@ def branch_dashboard(request):
     user = request.user
 
     # Only superuser or Branch Owner allowed
-    if not user.is_superuser and not user.groups.filter(name="Branch Owner").exists():
+    if not user.is_superuser and not user_has_role(user, "Branch Owner"):
         return render(request, "403.html")
 
     # Superuser sees all
     if user.is_superuser:
         branch = None
         schemes = Scheme.objects.all()
-        policies = Policy.objects.all()
-        members = Member.objects.all()
-        agents = Agent.objects.all()
     else:
-        branch = getattr(user.userprofile, "branch", None)
+        branch = getattr(user, "branch", None)
         if not branch:
             return render(request, "dashboard/branch_dashboard.html", {"error": "No branch assigned."})
+        schemes = Scheme.objects.filter(branch=branch)
 
-        # Filter schemes and related data for the branch
-        schemes = Scheme.objects.all() if user.is_superuser else Scheme.objects.filter(branch=branch)
-        policies = Policy.objects.filter(plan__scheme__in=schemes)
-        members = Member.objects.filter(policy__in=policies)
-        agents = Agent.objects.filter(scheme__in=schemes)
-
-    # Ensure there's data to display
-    if not schemes.exists() or not policies.exists() or not members.exists() or not agents.exists():
+    schemes = schemes.annotate(agent_count=Count('agents', distinct=True)).order_by('name')
+    if not schemes.exists():
         return render(request, "dashboard/branch_dashboard.html", {"error": "No data available."})
 
-    # Top agents based on the number of policies they've underwritten
+    rollups = DailyPolicyRollup.objects.filter(scheme__in=schemes)
+    month_start = timezone.now().date().replace(day=1)
+
+    scheme_policy_counts = sum_rollups_by(rollups, 'scheme_id')
+    schemes = list(schemes)
+    for scheme in schemes:
+        scheme.policy_count = scheme_policy_counts.get(scheme.pk, 0)
+
     top_agents = (
-        policies.values('agent__full_name')  # Accessing the 'full_name' field of Agent
-        .annotate(count=Count('id'))
+        rollups.filter(agent__isnull=False)
+        .values('agent__full_name')
+        .annotate(count=Sum('new_policies'))
         .order_by('-count')[:5]
     )
 
-    # Correct the `new_signups` line: filter on `inception_date` of the related `Policy` model
-    new_signups = Member.objects.filter(
-        policies__in=policies,  # Ensure we are filtering based on related Policy objects
-        policies__inception_date__month=timezone.now().month  # Now using the `inception_date` from `Policy`
-    ).count()
-
     context = {
         'branch': branch,
-        'total_members': members.count(),
-        'total_policies': policies.count(),
-        'new_signups': new_signups,
-        'scheme_count': schemes.count(),
-        'agents': agents,
+        'total_members': Member.objects.filter(policies__scheme__in=schemes).distinct().count(),
+        'total_policies': sum(scheme_policy_counts.values()),
+        'new_signups': rollups.filter(date__gte=month_start).aggregate(total=Sum('new_policies'))['total'] or 0,
+        'scheme_count': len(schemes),
+        'agents': Agent.objects.filter(scheme__in=schemes),
         'top_agents': top_agents,
         'schemes': schemes,
     }
@@ -277,26 +223,26 @@ def branch_dashboard(request):
 def scheme_dashboard(request, scheme_id):
     user = request.user
     scheme = get_object_or_404(Scheme, pk=scheme_id)
-    if not user.is_superuser and scheme.admin_user != user:
+    if not can_view_scheme(user, scheme):
         return render(request, "403.html")
 
-    policies    = Policy.objects.filter(plan__scheme=scheme)
-    members     = Member.objects.filter(policy__in=policies)
-    top_agents  = (
-        policies.values('underwritten_by__full_name')
-        .annotate(count=Count('id'))
-        .order_by('-count')[:5]
-    )
+    rollups = DailyPolicyRollup.objects.filter(scheme=scheme)
+    month_start = timezone.now().date().replace(day=1)
+
+    agent_policy_counts = sum_rollups_by(rollups, 'agent_id')
+    agents = list(Agent.objects.filter(scheme=scheme).order_by('full_name'))
+    for agent in agents:
+        agent.policy_count = agent_policy_counts.get(agent.pk, 0)
+    agents.sort(key=lambda agent: agent.policy_count, reverse=True)
 
     context = {
         'scheme':       scheme,
-        'policy_count': policies.count(),
-        'member_count': members.count(),
-        'new_signups':  members.filter(inception_date__month=timezone.now().month).count(),
-        'top_agents':   top_agents,
+        'policy_count': rollups.aggregate(total=Sum('new_policies'))['total'] or 0,
+        'member_count': Member.objects.filter(policies__scheme=scheme).distinct().count(),
+        'new_signups':  rollups.filter(date__gte=month_start).aggregate(total=Sum('new_policies'))['total'] or 0,
+        'agents':       agents,
     }
-    template_path = os.path.join('templates', 'dashboard', 'scheme_dashboard.html')
-    return render(request, template_path, context)
+    return render(request, 'dashboard/scheme_dashboard.html', context)
 
 
 # ─── EXPORT PDF ───────────────────────────────────────────────────────────────
@@ -327,7 +273,8 @@ def admin_dashboard(request):
     active_plans = Plan.objects.filter(is_active=True).count()
     inactive_plans = total_plans - active_plans
     
-    total_policies = Policy.objects.count()
+    total_policies = DailyPolicyRollup.objects.aggregate(total=Sum('new_policies'))['total'] or 0
+    # Whether a policy is active depends on today's date, so it is not rolled up
     active_policies = get_active_policies_queryset().count()
     inactive_policies = total_policies - active_policies
     
@@ -335,7 +282,20 @@ def admin_dashboard(request):
     total_agents = Agent.objects.count()
     total_underwriters = Underwriter.objects.count() if 'Underwriter' in globals() else 0
     
-    # Monthly premium data for chart (last 6 months)
+    # Monthly premium data for chart (last 6 months) from one grouped rollup query
+    first_month = current_month - 5
+    first_year = current_year
+    if first_month <= 0:
+        first_month += 12
+        first_year -= 1
+    monthly_rollups = {
+        (row['month'].year, row['month'].month): row
+        for row in DailyPolicyRollup.objects.filter(date__gte=date(first_year, first_month, 1))
+        .annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(premium=Sum('new_premium'), policies=Sum('new_policies'))
+    }
+
     months = []
     premium_data = []
     policy_counts = []
@@ -352,16 +312,9 @@ def admin_dashboard(request):
         month_name = calendar.month_name[month][:3] + f" '{str(year)[2:]}"  # e.g. Jan '23
         months.append(month_name)
         
-        # Get premium sum for this month
-        month_policies = Policy.objects.filter(
-            created_at__year=year,
-            created_at__month=month
-        )
-        monthly_premium = sum(policy.premium_amount or 0 for policy in month_policies)
-        premium_data.append(monthly_premium)
-        
-        # Count policies created this month
-        policy_counts.append(month_policies.count())
+        row = monthly_rollups.get((year, month), {})
+        premium_data.append(row.get('premium') or 0)
+        policy_counts.append(row.get('policies') or 0)
     
     # Recent activity - new policies, plan changes, etc.
     recent_policies = Policy.objects.select_related('member', 'plan').order_by('-created_at')[:10]
@@ -0,0 +1,316 @@
+# import_data/jobs.py
+"""
+Background bulk policy imports.
+
+The confirmed CSV is kept in default storage and processed by
+``import_data.tasks.run_bulk_policy_import`` in chunks of membership groups.
+Each chunk is written with ``bulk_create`` in one transaction, together with
+the progress counters on its ``ImportLog``, so a job restarted after a worker
+crash resumes after the last committed chunk instead of starting over.
+"""
+
+import logging
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from import_data.models import ImportLog
+from import_data.readers import iter_csv_rows
+from members.models import Beneficiary, Dependent, Member, Policy
+from members.search import index_policies
+from members.utils_public_enrollment import extract_dob_from_id, extract_gender_from_id
+from schemes.models import Scheme
+from settings_app.models import Agent
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_MAIN_FIELDS = ['id no', 'first names', 'scheme no', 'membership_number']
+MAX_LOGGED_ERRORS = 10
+GENDERS = {'m': 'Male', 'male': 'Male', 'f': 'Female', 'female': 'Female'}
+
+
+def policy_import_chunk_size():
+    return getattr(settings, 'POLICY_IMPORT_CHUNK_SIZE', 500)
+
+
+def start_policy_import(user, source_file, filename):
+    """
+    Create the ImportLog for a confirmed bulk policy file and queue it once
+    the transaction commits.
+    """
+    log = ImportLog.objects.create(
+        import_type='bulk_policy',
+        category='policy',
+        subtype='bulk',
+        filename=filename,
+        source_file=source_file,
+        status=ImportLog.STATUS_PROCESSING,
+        created_by=user,
+    )
+    transaction.on_commit(lambda: enqueue_policy_import(log.pk))
+    return log
+
+
+def enqueue_policy_import(log_id):
+    from .tasks import run_bulk_policy_import
+
+    run_bulk_policy_import.delay(log_id)
+
+
+def read_policy_groups(source_file):
+    """Return ``[(membership_number, rows), ...]`` in file order; the first row is the main member."""
+    groups = {}
+    for row in iter_csv_rows(default_storage.open(source_file, mode='rb')):
+        membership = row.get('membership_number')
+        if membership:
+            groups.setdefault(membership, []).append(row)
+    return list(groups.items())
+
+
+def load_import_lookups(groups):
+    """Resolve every scheme and agent the file refers to with one query each."""
+    scheme_codes = {rows[0].get('scheme no') or rows[0].get('scheme number') for _, rows in groups} - {None, ''}
+    agent_codes = {rows[0].get('agent') or rows[0].get('agent code') for _, rows in groups} - {None, ''}
+
+    schemes = {}
+    for scheme in Scheme.objects.select_related('branch').filter(
+        Q(prefix__in=scheme_codes) | Q(registration_no__in=scheme_codes)
+    ).order_by('pk'):
+        for code in (scheme.prefix, scheme.registration_no):
+            if code in scheme_codes:
+                schemes.setdefault(code, scheme)
+
+    agents = {}
+    for agent in Agent.objects.filter(code__in=agent_codes).order_by('pk'):
+        agents.setdefault(agent.code, agent)
+    return {'schemes': schemes, 'agents': agents}
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+
+def split_name(full_name):
+    first, _, last = (full_name or '').strip().partition(' ')
+    return first, last.strip()
+
+
+def person_details(row):
+    """Date of birth and gender from the row, falling back to the ID number."""
+    id_number = row.get('id no', '')
+    date_of_birth = parse_date(row.get('date of birth')) or extract_dob_from_id(id_number)
+    gender = GENDERS.get((row.get('gender') or extract_gender_from_id(id_number) or '').lower(), '')
+    return date_of_birth, gender
+
+
+def build_policy_group(membership_number, rows, lookups, today):
+    """
+    Build unsaved objects for one membership group.
+
+    Raises:
+        ValueError: If the group cannot be imported
+    """
+    main = rows[0]
+    if not all(main.get(field) for field in REQUIRED_MAIN_FIELDS):
+        raise ValueError("Missing required main member fields.")
+
+    scheme_code = main.get('scheme no') or main.get('scheme number')
+    scheme = lookups['schemes'].get(scheme_code)
+    if not scheme:
+        raise ValueError(f"Scheme not found: {scheme_code}")
+
+    date_of_birth, gender = person_details(main)
+    if not date_of_birth or not gender:
+        raise ValueError("Main member date of birth and gender could not be determined.")
+
+    member = Member(
+        first_name=main['first names'],
+        last_name=main.get('surname', ''),
+        id_number=main['id no'],
+        gender=gender,
+        date_of_birth=date_of_birth,
+        phone_number=main.get('cell number', ''),
+        email=main.get('email address', ''),
+        physical_address_line_1=main.get('address line 1', ''),
+        physical_address_line_2=main.get('address line 2', ''),
+        physical_address_city=main.get('address line 3', ''),
+        physical_address_postal_code=main.get('postal code', ''),
+    )
+    now = timezone.now()
+    policy = Policy(
+        member=member,
+        scheme=scheme,
+        membership_number=membership_number,
+        uw_membership_number=main.get('uw_membership_number', ''),
+        policy_number=f"POL-{uuid.uuid4().hex[:8].upper()}",
+        start_date=today,
+        inception_date=today,
+        cover_date=today,
+        underwritten_by=lookups['agents'].get(main.get('agent') or main.get('agent code')),
+        created_at=now,
+        updated_at=now,
+    )
+
+    beneficiaries = []
+    if main.get('beneficiary name'):
+        first_name, last_name = split_name(main['beneficiary name'])
+        beneficiary_id = main.get('beneficiary id', '')
+        beneficiaries.append(Beneficiary(
+            policy=policy,
+            first_name=first_name,
+            last_name=last_name,
+            relationship_to_main_member=main.get('beneficiary relationship', ''),
+            id_number=beneficiary_id,
+            date_of_birth=extract_dob_from_id(beneficiary_id),
+            gender=extract_gender_from_id(beneficiary_id) or '',
+            share=100,
+        ))
+
+    dependents = []
+    for row in rows[1:]:
+        dependent_dob, dependent_gender = person_details(row)
+        if not dependent_dob or not dependent_gender:
+            raise ValueError(f"Dependent {row.get('first names', '')} is missing a date of birth or gender.")
+        dependents.append(Dependent(
+            policy=policy,
+            first_name=row.get('first names', ''),
+            last_name=row.get('surname', ''),
+            id_number=row.get('id no', ''),
+            date_of_birth=dependent_dob,
+            gender=dependent_gender,
+            relationship=row.get('relationship', ''),
+        ))
+
+    return {'member': member, 'policy': policy, 'beneficiaries': beneficiaries, 'dependents': dependents}
+
+
+def write_policy_groups(prepared):
+    """Insert built groups with one bulk_create per model."""
+    Member.objects.bulk_create([group['member'] for group in prepared])
+    policies = [group['policy'] for group in prepared]
+    Policy.objects.bulk_create(policies)
+
+    # Same default Policy.save() assigns once the policy has a primary key
+    missing_uw_number = [policy for policy in policies if not policy.uw_membership_number]
+    for policy in missing_uw_number:
+        prefix = policy.scheme.name[:3].upper().replace(' ', '') if policy.scheme.name else "POL"
+        policy.uw_membership_number = f"{prefix}-{policy.pk:06d}"
+    Policy.objects.bulk_update(missing_uw_number, ['uw_membership_number'])
+    # bulk_create skips the signals that keep the search index current
+    index_policies(policies)
+
+    Beneficiary.objects.bulk_create([b for group in prepared for b in group['beneficiaries']])
+    Dependent.objects.bulk_create([d for group in prepared for d in group['dependents']])
+
+
+def import_policy_chunk(groups, lookups, today):
+    """
+    Import a chunk of membership groups.
+
+    Returns:
+        tuple: ``(successful, errors)``
+    """
+    errors = []
+    prepared = []
+    for membership_number, rows in groups:
+        try:
+            prepared.append((membership_number, rows, build_policy_group(membership_number, rows, lookups, today)))
+        except Exception as e:
+            errors.append(f"{membership_number}: {e}")
+
+    try:
+        with transaction.atomic():
+            write_policy_groups([group for _, _, group in prepared])
+        return len(prepared), errors
+    except Exception:
+        logger.exception("Bulk insert failed for a policy import chunk, retrying group by group")
+
+    # Rebuild from the rows so no object carries a primary key from the rolled-back insert
+    successful = 0
+    for membership_number, rows, _ in prepared:
+        try:
+            with transaction.atomic():
+                write_policy_groups([build_policy_group(membership_number, rows, lookups, today)])
+            successful += 1
+        except Exception as e:
+            errors.append(f"{membership_number}: {e}")
+    return successful, errors
+
+
+def append_errors(log, errors):
+    logged = log.error_message.splitlines() if log.error_message else []
+    if errors and len(logged) < MAX_LOGGED_ERRORS:
+        log.error_message = "\n".join(logged + errors[:MAX_LOGGED_ERRORS - len(logged)])
+
+
+def run_policy_import(log_id):
+    """
+    Import (or resume importing) the file behind an ImportLog.
+
+    Unexpected errors propagate so the task can retry; the retry resumes
+    after the last committed chunk.
+
+    Returns:
+        ImportLog: The finished log
+    """
+    log = ImportLog.objects.get(pk=log_id)
+    if log.status in {ImportLog.STATUS_SUCCESS, ImportLog.STATUS_FAILED}:
+        return log
+
+    groups = read_policy_groups(log.source_file)
+    lookups = load_import_lookups(groups)
+    chunk_size = policy_import_chunk_size()
+    today = timezone.now().date()
+
+    if log.chunks_completed:
+        logger.info(f"Resuming policy import {log.pk} after chunk {log.chunks_completed}")
+    log.records_total = len(groups)
+    log.save(update_fields=['records_total'])
+
+    for start in range(log.chunks_completed * chunk_size, len(groups), chunk_size):
+        chunk = groups[start:start + chunk_size]
+        with transaction.atomic():
+            successful, errors = import_policy_chunk(chunk, lookups, today)
+            log.records_processed += len(chunk)
+            log.records_successful += successful
+            log.records_failed += len(chunk) - successful
+            log.chunks_completed += 1
+            log.progress = min(100, log.records_processed * 100 // len(groups))
+            append_errors(log, errors)
+            log.save(update_fields=[
+                'records_processed', 'records_successful', 'records_failed',
+                'chunks_completed', 'progress', 'error_message',
+            ])
+
+    log.status = ImportLog.STATUS_SUCCESS if log.records_failed == 0 else ImportLog.STATUS_FAILED
+    log.progress = 100
+    log.save()  # completed_at is auto-set for finished statuses
+
+    default_storage.delete(log.source_file)
+    refresh_rollups_for(today)
+    return log
+
+
+def fail_policy_import(log_id, error):
+    """Mark an import as failed once it can no longer be retried."""
+    log = ImportLog.objects.get(pk=log_id)
+    log.status = ImportLog.STATUS_FAILED
+    append_errors(log, [str(error)])
+    log.save()
+    return log
+
+
+def refresh_rollups_for(day):
+    """bulk_create skips the rollup signals, so rebuild the day the policies were incepted."""
+    from dashboard.rollups import rebuild_policy_rollups
+
+    try:
+        rebuild_policy_rollups(start_date=day, end_date=day)
+    except Exception:
+        # The nightly reconcile repairs the rollups if this fails.
+        logger.exception("Failed to rebuild policy rollups after bulk policy import")
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.21 on 2026-10-18 16:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('import_data', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importlog',
+            name='chunks_completed',
+            field=models.PositiveIntegerField(default=0, help_text='Chunks committed so far; a restarted job resumes after these'),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='records_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='source_file',
+            field=models.CharField(blank=True, help_text='Storage path of the file being imported', max_length=255),
+        ),
+    ]
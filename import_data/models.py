@@ -30,6 +30,11 @@ STATUS_CHOICES = [
 
 
 class ImportLog(models.Model):
+    STATUS_PENDING = STATUS_PENDING
+    STATUS_PROCESSING = STATUS_PROCESSING
+    STATUS_SUCCESS = STATUS_SUCCESS
+    STATUS_FAILED = STATUS_FAILED
+
     import_type = models.CharField(
         max_length=20,
         help_text="General type of data being imported (for legacy support)",
@@ -56,6 +61,11 @@ class ImportLog(models.Model):
         default='pending'
     )
     error_message = models.TextField(blank=True, null=True)
+    # Background imports: the stored upload, how far they got and where to resume
+    source_file = models.CharField(max_length=255, blank=True, help_text="Storage path of the file being imported")
+    records_total = models.PositiveIntegerField(default=0)
+    chunks_completed = models.PositiveIntegerField(default=0, help_text="Chunks committed so far; a restarted job resumes after these")
+    progress = models.PositiveSmallIntegerField(default=0)
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(blank=True, null=True)
     created_by = models.ForeignKey(
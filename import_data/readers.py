@@ -0,0 +1,102 @@
+# import_data/readers.py
+"""
+Incremental CSV reading shared by the import pipelines.
+
+Files are decoded a buffer at a time instead of being read and decoded whole,
+so preview and apply steps keep memory flat however large the upload is.
+The encoding is taken from a byte-order mark when there is one, otherwise
+UTF-8 is assumed unless the start of the file is not valid UTF-8, in which
+case the Windows code page most bank and debit order exports use is tried.
+"""
+
+import codecs
+import csv
+import io
+from itertools import islice
+
+SNIFF_BYTES = 64 * 1024
+FALLBACK_ENCODING = 'cp1252'
+DELIMITERS = ',;\t|'
+
+# UTF-32 LE starts with the UTF-16 LE mark, so it has to be checked first
+BYTE_ORDER_MARKS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def sniff_encoding(head):
+    """Guess the encoding of a file from its first bytes."""
+    for bom, encoding in BYTE_ORDER_MARKS:
+        if head.startswith(bom):
+            return encoding
+    try:
+        # Not final: the sample may end part-way through a multi-byte character
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+
+
+def sniff_delimiter(sample):
+    first_line = sample.splitlines()[0] if sample else ''
+    try:
+        return csv.Sniffer().sniff(first_line, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        return ','
+
+
+def normalize_header(name):
+    """'  Membership  Number ' -> 'membership number'"""
+    return ' '.join((name or '').replace('﻿', '').split()).lower()
+
+
+def open_binary(file):
+    """Return a readable binary stream for an upload, FieldFile, storage file or path-less file object."""
+    if hasattr(file, 'open') and getattr(file, 'closed', True):
+        file.open('rb')
+    elif hasattr(file, 'seek'):
+        file.seek(0)
+    return getattr(file, 'file', file)
+
+
+def iter_csv_rows(file, limit=None, delimiter=None, encoding=None):
+    """
+    Yield the rows of a CSV file as dicts keyed by normalized header.
+
+    Values are stripped, missing trailing cells become '' and blank lines are
+    skipped. The file is closed once the rows are exhausted (or the generator
+    is discarded).
+
+    Args:
+        file: Uploaded file, FieldFile or storage file opened in binary mode
+        limit: Stop after this many rows
+        delimiter: Column separator; sniffed from the header line if omitted
+        encoding: Skip encoding sniffing
+    """
+    raw = open_binary(file)
+    head = raw.read(SNIFF_BYTES)
+    raw.seek(0)
+    encoding = encoding or sniff_encoding(head)
+
+    text = io.TextIOWrapper(raw, encoding=encoding, errors='replace', newline='')
+    try:
+        if delimiter is None:
+            delimiter = sniff_delimiter(head.decode(encoding, errors='replace').lstrip('﻿'))
+        reader = csv.reader(text, delimiter=delimiter)
+        headers = [normalize_header(name) for name in next(reader, [])]
+
+        rows = (values for values in reader if any(value.strip() for value in values))
+        for values in islice(rows, limit):
+            yield {
+                header: values[index].strip() if index < len(values) else ''
+                for index, header in enumerate(headers)
+                if header
+            }
+    finally:
+        # Leave closing to the caller's file object rather than the wrapper
+        text.detach()
+        file.close()
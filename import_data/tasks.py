@@ -0,0 +1,35 @@
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(
+    name="import_data.tasks.run_bulk_policy_import",
+    bind=True,
+    max_retries=5,
+    default_retry_delay=60,
+    # Redeliver the task if the worker dies mid-import; it resumes from the last committed chunk
+    acks_late=True,
+    reject_on_worker_lost=True,
+)
+def run_bulk_policy_import(self, log_id):
+    """
+    Import a confirmed bulk policy file in chunks.
+
+    Args:
+        log_id: Primary key of the ImportLog tracking the import
+    """
+    from import_data.jobs import fail_policy_import, run_policy_import
+
+    try:
+        logger.info(f"Starting bulk policy import {log_id}")
+        log = run_policy_import(log_id)
+        return {"status": log.status, "successful": log.records_successful, "failed": log.records_failed}
+    except Exception as e:
+        logger.error(f"Error in bulk policy import {log_id}: {str(e)}")
+        if self.request.retries >= self.max_retries:
+            fail_policy_import(log_id, e)
+            raise
+        raise self.retry(exc=e)
@@ -1,11 +1,18 @@
 ### import_data/tests.py
 from io import StringIO
 import csv
-from django.test import TestCase, Client
+import tempfile
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import default_storage
 from django.urls import reverse
 from members.models import Policy, Member
-from .models import PolicyAmendmentImport, PolicyAmendmentRowLog
+from .jobs import run_policy_import, start_policy_import
+from .models import ImportLog, PolicyAmendmentImport, PolicyAmendmentRowLog
+from .readers import iter_csv_rows, sniff_encoding
 
 User = get_user_model()
 
@@ -111,4 +118,156 @@ class LapsedPolicyReactivationTests(TestCase):
         self.assertTrue(self.policy_lapsed.is_active)
         self.assertEqual(str(self.policy_lapsed.cover_date), '2025-05-01')
         logs = LapsedPolicyReactivationRowLog.objects.filter(import_batch=batch)
-        self.assertEqual(logs.count(), 2)
\ No newline at end of file
+        self.assertEqual(logs.count(), 2)
+
+class BulkPolicyImportJobTests(TestCase):
+    HEADERS = [
+        'membership_number', 'scheme no', 'agent', 'first names', 'surname', 'id no',
+        'date of birth', 'gender', 'relationship', 'cell number', 'beneficiary name',
+        'beneficiary relationship', 'beneficiary id',
+    ]
+
+    def setUp(self):
+        from branches.models import Bank, Branch
+        from schemes.models import Scheme
+        from settings_app.models import Agent
+
+        self.user = User.objects.create_user(username='importer', password='pass')
+        branch = Branch.objects.create(
+            name='Main Branch', bank=Bank.objects.create(name='Bank', branch_code='123456'), code='MB01'
+        )
+        self.scheme = Scheme.objects.create(
+            branch=branch, name='Test Scheme', prefix='TS', registration_no='REG1', fsp_number='FSP1',
+            email='scheme@example.com', phone='0123456789', debit_order_no='DEB1', account_no='12345',
+        )
+        self.agent = Agent.objects.create(
+            full_name='Agent Smith', surname='Smith', contact_number='0821111111', email='agent@example.com',
+            address1='1 Main', address2='Town', address3='Province', code='AG01', scheme=self.scheme,
+        )
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        media_settings = self.settings(MEDIA_ROOT=self.media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def store_csv(self, groups):
+        buffer = StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.HEADERS)
+        writer.writeheader()
+        for index in range(groups):
+            membership = f'MB{index:03d}'
+            writer.writerow({
+                'membership_number': membership, 'scheme no': 'TS', 'agent': 'AG01',
+                'first names': f'Main{index}', 'surname': 'Member', 'id no': '8001015800085',
+                'cell number': '0820000000', 'beneficiary name': 'Ben Member',
+                'beneficiary relationship': 'Son', 'beneficiary id': '0501015800086',
+            })
+            writer.writerow({
+                'membership_number': membership, 'first names': f'Child{index}', 'surname': 'Member',
+                'date of birth': '2015-03-01', 'gender': 'F', 'relationship': 'Child',
+            })
+        writer.writerow({'membership_number': 'BAD001', 'scheme no': 'NOPE', 'first names': 'Bad', 'id no': '8001015800085'})
+        return default_storage.save('tmp/policies.csv', ContentFile(buffer.getvalue().encode('utf-8')))
+
+    def test_confirm_queues_import_on_commit(self):
+        path = self.store_csv(1)
+        self.client.force_login(self.user)
+        session = self.client.session
+        session['preview_file_path'] = path
+        session['preview_filename'] = 'policies.csv'
+        session.save()
+
+        with mock.patch('import_data.jobs.enqueue_policy_import') as enqueue:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('import_data:confirm_bulk_policy_import'))
+
+        self.assertRedirects(response, reverse('import_data:import_logs'), fetch_redirect_response=False)
+        log = ImportLog.objects.get()
+        self.assertEqual((log.status, log.source_file), (ImportLog.STATUS_PROCESSING, path))
+        enqueue.assert_called_once_with(log.pk)
+        self.assertEqual(Member.objects.count(), 0)
+
+    @override_settings(POLICY_IMPORT_CHUNK_SIZE=2)
+    def test_import_creates_policies_in_chunks(self):
+        log = start_policy_import(self.user, self.store_csv(3), 'policies.csv')
+
+        log = run_policy_import(log.pk)
+
+        self.assertEqual(log.status, ImportLog.STATUS_FAILED)
+        self.assertEqual((log.records_total, log.records_successful, log.records_failed), (4, 3, 1))
+        self.assertEqual((log.chunks_completed, log.progress), (2, 100))
+        self.assertIn('BAD001: Scheme not found: NOPE', log.error_message)
+        policy = Policy.objects.select_related('member').get(membership_number='MB001')
+        self.assertEqual((policy.scheme, policy.underwritten_by), (self.scheme, self.agent))
+        self.assertEqual(policy.uw_membership_number, f'TES-{policy.pk:06d}')
+        self.assertEqual((policy.member.gender, policy.member.date_of_birth.year), ('Male', 1980))
+        self.assertEqual(policy.dependents.get().first_name, 'Child1')
+        self.assertEqual(policy.beneficiaries.get().first_name, 'Ben')
+        self.assertFalse(default_storage.exists(log.source_file))
+
+    @override_settings(POLICY_IMPORT_CHUNK_SIZE=2)
+    def test_import_resumes_after_last_committed_chunk(self):
+        from import_data import jobs
+
+        log = start_policy_import(self.user, self.store_csv(3), 'policies.csv')
+        original_chunk = jobs.import_policy_chunk
+        calls = []
+
+        def crash_on_second_chunk(*args, **kwargs):
+            calls.append(args[0])
+            if len(calls) == 2:
+                raise RuntimeError('worker lost')
+            return original_chunk(*args, **kwargs)
+
+        with mock.patch('import_data.jobs.import_policy_chunk', side_effect=crash_on_second_chunk):
+            with self.assertRaises(RuntimeError):
+                run_policy_import(log.pk)
+
+        log.refresh_from_db()
+        self.assertEqual((log.chunks_completed, log.records_processed, log.progress), (1, 2, 50))
+        self.assertEqual(Policy.objects.count(), 2)
+
+        log = run_policy_import(log.pk)
+
+        self.assertEqual((log.records_processed, log.records_successful), (4, 3))
+        self.assertEqual(
+            sorted(Policy.objects.values_list('membership_number', flat=True)),
+            ['MB000', 'MB001', 'MB002'],
+        )
+
+
+class StreamingCsvReaderTests(SimpleTestCase):
+    def upload(self, content):
+        return SimpleUploadedFile('rows.csv', content, content_type='text/csv')
+
+    def test_headers_and_values_are_normalized(self):
+        rows = list(iter_csv_rows(self.upload(b' Membership_Number ,First  Names\r\n M1 , Thandi \r\n\r\nM2\r\n')))
+
+        self.assertEqual(rows, [
+            {'membership_number': 'M1', 'first names': 'Thandi'},
+            {'membership_number': 'M2', 'first names': ''},
+        ])
+
+    def test_byte_order_marks_and_legacy_encodings_are_decoded(self):
+        text = 'membership_number,surname\nM1,Nkosí\n'
+        for content in (
+            text.encode('utf-8-sig'),
+            text.encode('utf-16'),
+            text.encode('cp1252'),
+        ):
+            with self.subTest(encoding=sniff_encoding(content)):
+                self.assertEqual(list(iter_csv_rows(self.upload(content))), [{'membership_number': 'M1', 'surname': 'Nkosí'}])
+
+    def test_delimiter_is_sniffed(self):
+        rows = list(iter_csv_rows(self.upload(b'membership_number;amount\nM1;150,00\n')))
+
+        self.assertEqual(rows, [{'membership_number': 'M1', 'amount': '150,00'}])
+
+    def test_rows_are_read_lazily(self):
+        content = b'membership_number\n' + b''.join(b'M%d\n' % i for i in range(200000))
+        upload = self.upload(content)
+
+        rows = list(iter_csv_rows(upload, limit=3))
+
+        self.assertEqual([row['membership_number'] for row in rows], ['M0', 'M1', 'M2'])
+        self.assertTrue(upload.closed)
@@ -1,7 +1,5 @@
 # import_data/views/agent_onboarding.py
 
-import csv
-from io import TextIOWrapper
 
 from django.shortcuts import render, get_object_or_404
 from django.views import View
@@ -11,18 +9,12 @@ from django.utils.decorators import method_decorator
 from django.contrib.auth.decorators import login_required
 
 from import_data.models import AgentOnboardingImport, AgentOnboardingRowLog
+from import_data.readers import iter_csv_rows
 from import_data.forms import AgentOnboardingUploadForm
 from schemes.models import Scheme
 from settings_app.models import Agent
 
 
-# Utility function for reading CSV
-def read_csv(file):
-    """Helper function to read CSV and decode its content"""
-    f = file.open('rb')
-    text = f.read().decode('utf-8')
-    f.close()
-    return text.splitlines()
 
 
 # Centralized validation function
@@ -77,8 +69,7 @@ class AgentOnboardingUploadView(View):
         )
 
         # Read and decode file
-        lines = read_csv(batch.file)
-        reader = csv.DictReader(lines)
+        reader = iter_csv_rows(batch.file)
 
         preview_rows = []
         for idx, row in enumerate(reader, start=1):
@@ -116,8 +107,7 @@ class AgentOnboardingPreviewView(View):
         batch = get_object_or_404(AgentOnboardingImport, id=batch_id)
 
         # Read and decode file again
-        lines = read_csv(batch.file)
-        reader = csv.DictReader(lines)
+        reader = iter_csv_rows(batch.file)
 
         logs = []
         with transaction.atomic():
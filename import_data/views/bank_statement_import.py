@@ -1,7 +1,5 @@
 # import_data/views/bank_statement_import.py
 
-import csv
-from io import TextIOWrapper
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.views import View
@@ -10,41 +8,11 @@ from django.contrib.auth.decorators import login_required
 from django.db import transaction
 
 from import_data.models import BankReconciliationImport, BankReconciliationRowLog
+from import_data.readers import iter_csv_rows
 from import_data.forms import ImportForm
 from members.models import Policy
 from django.db.models import Q
 
-# Helper function for reading CSV files
-def read_csv(file):
-    """Helper function to read CSV and decode its content"""
-    f = file.open('rb')
-    text = f.read().decode('utf-8')
-    f.close()
-    return text.splitlines()
-
-# import_data/views/bank_statement_import.py
-
-import csv
-from io import TextIOWrapper
-from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib import messages
-from django.views import View
-from django.utils.decorators import method_decorator
-from django.contrib.auth.decorators import login_required
-from django.db import transaction
-
-from import_data.models import BankReconciliationImport, BankReconciliationRowLog
-from import_data.forms import ImportForm
-from members.models import Policy
-from django.db.models import Q
-
-# Helper function for reading CSV files
-def read_csv(file):
-    """Helper function to read CSV and decode its content"""
-    f = file.open('rb')
-    text = f.read().decode('utf-8')
-    f.close()
-    return text.splitlines()
 
 class BankStatementImportView(View):
     """
@@ -69,8 +37,7 @@ class BankStatementImportView(View):
                 )
 
                 # Read the CSV file
-                lines = read_csv(batch.file)
-                reader = csv.DictReader(lines)
+                reader = iter_csv_rows(batch.file)
 
                 preview_rows = []
                 for idx, row in enumerate(reader, start=1):
@@ -120,8 +87,7 @@ class BankReconciliationPreviewView(View):
         batch = get_object_or_404(BankReconciliationImport, id=batch_id)
 
         # Read the file again
-        lines = read_csv(batch.file)
-        reader = csv.DictReader(lines)
+        reader = iter_csv_rows(batch.file)
 
         logs = []
         with transaction.atomic():
@@ -1,7 +1,5 @@
 # import_data/views/debit_order_import.py
 
-import csv
-from io import TextIOWrapper
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
@@ -11,16 +9,10 @@ from django.contrib.auth.decorators import login_required
 from django.db import transaction
 
 from import_data.models import DebitOrderImport, DebitOrderRowLog
+from import_data.readers import iter_csv_rows
 from import_data.forms import ImportForm
 from members.models import Policy
 
-# Helper function for reading CSV files
-def read_csv(file):
-    """Helper function to read CSV and decode its content"""
-    f = file.open('rb')
-    text = f.read().decode('utf-8')
-    f.close()
-    return text.splitlines()
 
 
 # Validation function for debit order data
@@ -66,8 +58,7 @@ class DebitOrderImportView(View):
             )
 
             # Read the CSV file
-            lines = read_csv(batch.file)
-            reader = csv.DictReader(lines)
+            reader = iter_csv_rows(batch.file)
 
             preview_rows = []
             for idx, row in enumerate(reader, start=1):
@@ -106,8 +97,7 @@ class DebitOrderPreviewView(View):
         batch = get_object_or_404(DebitOrderImport, id=batch_id)
 
         # Read the file again
-        lines = read_csv(batch.file)
-        reader = csv.DictReader(lines)
+        reader = iter_csv_rows(batch.file)
 
         logs = []
         with transaction.atomic():
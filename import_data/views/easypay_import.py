@@ -1,7 +1,5 @@
 # import_data/views/easypay_import.py
 
-import csv
-from io import TextIOWrapper
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.views import View
@@ -10,16 +8,10 @@ from django.contrib.auth.decorators import login_required
 from django.db import transaction
 
 from import_data.models import EasypayImport, EasypayRowLog
+from import_data.readers import iter_csv_rows
 from import_data.forms import ImportForm
 from members.models import Policy
 
-# Helper function to read the CSV file
-def read_csv(file):
-    """Helper function to read CSV and decode its content"""
-    f = file.open('rb')
-    text = f.read().decode('utf-8')
-    f.close()
-    return text.splitlines()
 
 
 # Validation function for Easypay data
@@ -65,8 +57,7 @@ class EasypayImportView(View):
             )
 
             # Read the CSV file
-            lines = read_csv(batch.file)
-            reader = csv.DictReader(lines)
+            reader = iter_csv_rows(batch.file)
 
             preview_rows = []
             for idx, row in enumerate(reader, start=1):
@@ -105,8 +96,7 @@ class EasypayPreviewView(View):
         batch = get_object_or_404(EasypayImport, id=batch_id)
 
         # Read the file again
-        lines = read_csv(batch.file)
-        reader = csv.DictReader(lines)
+        reader = iter_csv_rows(batch.file)
 
         logs = []
         with transaction.atomic():
@@ -1,7 +1,5 @@
 # import_data/views/lapsed_policy_reactivation.py
 
-import csv
-from io import TextIOWrapper
 from datetime import datetime
 
 from django.shortcuts import render, redirect, get_object_or_404
@@ -15,17 +13,11 @@ from import_data.models import (
     LapsedPolicyReactivationImport,
     LapsedPolicyReactivationRowLog,
 )
+from import_data.readers import iter_csv_rows
 from import_data.forms import LapsedReactivateUploadForm
 from members.models import Policy
 
 
-# Utility function for reading CSV files
-def read_csv(file):
-    """Helper function to read CSV and decode its content"""
-    f = file.open('r', encoding='utf-8')
-    text = f.read()
-    f.close()
-    return text.splitlines()
 
 
 # Utility function for validating date fields
@@ -88,8 +80,7 @@ class LapsedPolicyReactivationPreviewView(View):
 
     def get(self, request, pk):
         batch = get_object_or_404(LapsedPolicyReactivationImport, pk=pk)
-        lines = read_csv(batch.file)
-        reader = csv.DictReader(lines)
+        reader = iter_csv_rows(batch.file)
 
         preview_rows = []
         for idx, row in enumerate(reader, start=1):
@@ -148,8 +139,7 @@ class LapsedPolicyReactivationPreviewView(View):
 
     def post(self, request, pk):
         batch = get_object_or_404(LapsedPolicyReactivationImport, pk=pk)
-        lines = read_csv(batch.file)
-        reader = csv.DictReader(lines)
+        reader = iter_csv_rows(batch.file)
 
         logs = []
         with transaction.atomic():
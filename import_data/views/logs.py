@@ -2,7 +2,7 @@
 
 from django.views.generic import ListView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count
+from django.db.models import Count, Q
 
 from import_data.models import ImportLog
 
@@ -20,8 +20,8 @@ class ImportLogListView(LoginRequiredMixin, ListView):
 
         # Use annotate() to combine the counting of success and failure logs into a single query
         log_counts = ImportLog.objects.aggregate(
-            success_count=Count('id', filter=ImportLog.objects.filter(status=ImportLog.STATUS_SUCCESS)),
-            failed_count=Count('id', filter=ImportLog.objects.filter(status=ImportLog.STATUS_FAILED)),
+            success_count=Count('id', filter=Q(status=ImportLog.STATUS_SUCCESS)),
+            failed_count=Count('id', filter=Q(status=ImportLog.STATUS_FAILED)),
         )
 
         # Add success and failure counts to the context
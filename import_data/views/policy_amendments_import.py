@@ -1,7 +1,5 @@
 # import_data/views/policy_amendments_import.py
 
-import csv
-from io import TextIOWrapper
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
@@ -11,17 +9,11 @@ from django.contrib import messages
 from django.db import transaction
 
 from import_data.models import PolicyAmendmentImport, PolicyAmendmentRowLog
+from import_data.readers import iter_csv_rows
 from import_data.forms import PolicyAmendmentUploadForm
 from members.models import Policy
 
 
-# Helper function for reading CSV files
-def read_csv(file):
-    """Helper function to read and decode CSV content."""
-    f = file.open('r', encoding='utf-8')
-    text = f.read()
-    f.close()
-    return text.splitlines()
 
 
 # Helper function to validate if the policy exists
@@ -83,8 +75,7 @@ class PolicyAmendmentPreviewView(View):
 
     def get(self, request, pk):
         batch = get_object_or_404(PolicyAmendmentImport, pk=pk)
-        lines = read_csv(batch.file)
-        reader = csv.DictReader(lines)
+        reader = iter_csv_rows(batch.file)
 
         preview_rows = []
         for idx, row in enumerate(reader, start=1):
@@ -126,8 +117,7 @@ class PolicyAmendmentPreviewView(View):
 
     def post(self, request, pk):
         batch = get_object_or_404(PolicyAmendmentImport, pk=pk)
-        lines = read_csv(batch.file)
-        reader = csv.DictReader(lines)
+        reader = iter_csv_rows(batch.file)
 
         logs = []
         with transaction.atomic():
@@ -1,11 +1,11 @@
 # import_data/views/policy_preview.py
-import io
-import csv
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.core.files.storage import default_storage
 from django.contrib.auth.decorators import login_required
 
+from import_data.readers import iter_csv_rows
+
 
 @login_required
 def preview_bulk_policy_import(request):
@@ -23,20 +23,12 @@ def preview_bulk_policy_import(request):
     # Temporarily save the uploaded file
     tmp_path = default_storage.save(f"tmp/{uploaded_file.name}", uploaded_file)
     try:
-        # Open and decode the CSV in one step
-        with default_storage.open(tmp_path, mode='r') as temp_file:
-            decoded = temp_file.read().decode('utf-8')
-
-        # Parse the CSV
-        reader = csv.DictReader(io.StringIO(decoded))
-        rows = []
-        for idx, row in enumerate(reader, start=1):
-            if idx > 100:  # Only process first 100 rows
-                break
-            rows.append(row)
+        # Stop decoding once the first 100 rows are in
+        rows = list(iter_csv_rows(default_storage.open(tmp_path, mode='rb'), limit=100))
 
         if not rows:
             messages.error(request, "CSV file appears empty.")
+            default_storage.delete(tmp_path)
             return redirect('import_data:bulk_policy_upload')
 
         # Store path & filename in session for the apply step
@@ -50,9 +42,7 @@ def preview_bulk_policy_import(request):
         })
 
     except Exception as e:
+        # Keep the file only when the preview succeeded; the confirm step imports it
+        default_storage.delete(tmp_path)
         messages.error(request, f"Could not preview file: {str(e)}")
         return redirect('import_data:bulk_policy_upload')
-
-    finally:
-        # Clean up the temporary file after use
-        default_storage.delete(tmp_path)
@@ -20,6 +20,12 @@ def get_cache_timeout(cache_name):
         'settings': 3600,           # 1 hour
         'reports': 1800,            # 30 minutes
         'user_permissions': 1800,   # 30 minutes
+        'user_scope': 60,           # 1 minute
+        'search_suggestions': 30,   # 30 seconds
+        'enrollment_stats': 3600,   # 1 hour, invalidated on status changes
+        'insight_context': 300,     # 5 minutes
+        'ai_responses': 3600,       # 1 hour
+        'ocr_results': 3600,        # 1 hour, OCR jobs and results by image hash
     })
     return cache_timeouts.get(cache_name, cache_timeouts.get('default', 300))
 
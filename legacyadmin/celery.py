@@ -40,11 +40,26 @@ app.conf.beat_schedule = {
         'schedule': 86400.0,  # Once per day (in seconds)
         'args': (),
     },
+    'reconcile-policy-rollups-nightly': {
+        'task': 'legacyadmin.tasks.reconcile_policy_rollups',
+        'schedule': 86400.0,  # Once per day (in seconds)
+        'args': (),
+    },
     'retry-failed-payments-hourly': {
         'task': 'payments.tasks.retry_failed_payments',
         'schedule': 3600.0,  # Once per hour (in seconds)
         'args': (),
     },
+    'refresh-lapse-states-nightly': {
+        'task': 'members.tasks.refresh_lapse_states',
+        'schedule': 86400.0,  # Once per day (in seconds)
+        'args': (),
+    },
+    'deliver-email-outbox-every-minute': {
+        'task': 'members.communications.tasks.deliver_email_outbox',
+        'schedule': 60.0,  # Once per minute (in seconds)
+        'args': (),
+    },
 }
 
 # Configure task routes to different queues
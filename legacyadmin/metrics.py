@@ -54,6 +54,18 @@ CELERY_TASK_LATENCY = Histogram(
     ['task_name']
 )
 
+SEARCH_SUGGESTION_CACHE = Counter(
+    'legacyadmin_search_suggestion_cache_total',
+    'Policy search suggestion cache lookups (hit, prefix reuse or miss)',
+    ['result']
+)
+
+PDF_RENDER_CACHE = Counter(
+    'legacyadmin_pdf_render_cache_total',
+    'Rendered PDF cache lookups by document kind (hit or miss)',
+    ['document', 'result']
+)
+
 
 def metrics_view(request):
     """
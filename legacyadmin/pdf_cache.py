@@ -0,0 +1,149 @@
+"""
+Content-addressed cache for rendered PDF documents.
+
+A PDF is stored in default storage under a SHA-256 of everything that goes
+into it: the document kind, the template source, ``PDF_CACHE_VERSION`` and
+the field values of each input model instance. Unchanged documents are read
+back instead of re-rendered; changing any input yields a different key, so
+stale PDFs are never served and simply age out (see ``prune_pdf_cache``).
+"""
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import models
+from django.template.loader import get_template
+from django.utils import timezone
+
+from legacyadmin.metrics import PDF_RENDER_CACHE
+
+logger = logging.getLogger(__name__)
+
+PDF_CACHE_DIR = 'pdf_cache'
+
+# Bookkeeping timestamps some models set by hand in save()
+IGNORED_FIELDS = {'updated_at', 'modified', 'last_modified'}
+
+# Where the rendered PDFs themselves are stored; other files, such as
+# logos and barcodes, are drawn into the document and stay in the key
+GENERATED_FILE_FIELDS = {'document', 'pdf_file'}
+
+
+def template_version(template_name):
+    """Hash of a template's source, so template edits produce new keys."""
+    template = get_template(template_name)
+    source = getattr(getattr(template, 'template', None), 'source', '')
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def instance_state(instance):
+    """Stable representation of a model instance's stored field values."""
+    if instance is None:
+        return None
+    values = []
+    for field in instance._meta.concrete_fields:
+        # Generated files and save timestamps change without the content changing
+        if (field.name in GENERATED_FILE_FIELDS or getattr(field, 'auto_now', False)
+                or field.name in IGNORED_FIELDS):
+            continue
+        values.append((field.attname, str(field.value_from_object(instance))))
+    return (instance._meta.label, instance.pk, values)
+
+
+def input_state(value):
+    if isinstance(value, models.Model):
+        return instance_state(value)
+    if isinstance(value, models.QuerySet):
+        # Use prefetched rows when they are already loaded
+        instances = value if value._result_cache is not None else value.order_by('pk')
+        return [instance_state(instance) for instance in sorted(instances, key=lambda instance: instance.pk)]
+    if isinstance(value, dict):
+        return sorted((key, input_state(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [input_state(item) for item in value]
+    return str(value)
+
+
+def pdf_cache_key(kind, template_name, inputs):
+    digest = hashlib.sha256()
+    digest.update(kind.encode('utf-8'))
+    digest.update(str(getattr(settings, 'PDF_CACHE_VERSION', 1)).encode('utf-8'))
+    digest.update(template_version(template_name).encode('utf-8'))
+    digest.update(repr(input_state(inputs)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def pdf_cache_path(kind, key):
+    return f"{PDF_CACHE_DIR}/{kind}/{key[:2]}/{key}.pdf"
+
+
+def read_cached_pdf(path):
+    """Cached PDF bytes at ``path``, or None if absent or unreadable."""
+    try:
+        if default_storage.exists(path):
+            with default_storage.open(path, 'rb') as cached:
+                return cached.read()
+    except OSError as e:
+        logger.warning(f"Could not read cached PDF {path}: {str(e)}")
+    return None
+
+
+def write_cached_pdf(path, content):
+    try:
+        if not default_storage.exists(path):
+            default_storage.save(path, ContentFile(content))
+    except OSError as e:
+        logger.warning(f"Could not cache PDF {path}: {str(e)}")
+
+
+def cached_pdf(kind, template_name, inputs, render):
+    """
+    Return the PDF bytes for ``inputs``, calling ``render()`` only on a miss.
+
+    Args:
+        kind: Document kind, used as the storage sub-directory
+        template_name: Template the PDF is rendered from
+        inputs: Model instances, querysets and plain values the PDF depends on
+        render: Callable producing the PDF bytes
+
+    Returns:
+        bytes: The PDF content
+    """
+    path = pdf_cache_path(kind, pdf_cache_key(kind, template_name, inputs))
+    content = read_cached_pdf(path)
+    if content is not None:
+        PDF_RENDER_CACHE.labels(document=kind, result='hit').inc()
+        return content
+
+    content = render()
+    PDF_RENDER_CACHE.labels(document=kind, result='miss').inc()
+    write_cached_pdf(path, content)
+    return content
+
+
+def prune_pdf_cache(max_age_days=30):
+    """
+    Delete cached PDFs not written for ``max_age_days``.
+
+    Returns:
+        int: Number of files deleted
+    """
+    cutoff = timezone.now() - timedelta(days=max_age_days)
+    deleted = 0
+    pending = [PDF_CACHE_DIR]
+    while pending:
+        directory = pending.pop()
+        try:
+            subdirectories, files = default_storage.listdir(directory)
+        except (FileNotFoundError, NotImplementedError):
+            continue
+        pending.extend(f"{directory}/{name}" for name in subdirectories)
+        for name in files:
+            path = f"{directory}/{name}"
+            if default_storage.get_modified_time(path) < cutoff:
+                default_storage.delete(path)
+                deleted += 1
+    return deleted
@@ -276,7 +276,10 @@ INSTALLED_APPS.insert(0, 'accounts.apps.AccountsConfig')
 
 # ─── Session Settings ───────────────────────────────────────────────────────
 SESSION_COOKIE_AGE = 3600  # 1 hour
-SESSION_SAVE_EVERY_REQUEST = True
+# Sessions are saved only when changed; AutoSaveSessionMiddleware refreshes the
+# activity time (and so the expiry) once it is AUTOSAVE_ACTIVITY_INTERVAL old
+SESSION_SAVE_EVERY_REQUEST = False
+AUTOSAVE_ACTIVITY_INTERVAL = 300  # 5 minutes
 
 # ─── Crispy Forms ───────────────────────────────────────────────────────────
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
@@ -304,6 +307,21 @@ OPENAI_API_KEY = env('OPENAI_API_KEY', '')
 # Set a default model if not specified in environment
 DEFAULT_OPENAI_MODEL = env('DEFAULT_OPENAI_MODEL', 'gpt-4o')
 
+# Shared AI client (settings_app.utils.ai_client): endpoint, timeouts in
+# seconds, and the circuit breaker that falls back to rule-based answers
+OPENAI_API_BASE = env('OPENAI_API_BASE', 'https://api.openai.com/v1')
+OPENAI_CONNECT_TIMEOUT = env_int('OPENAI_CONNECT_TIMEOUT', 5)
+OPENAI_TIMEOUT = env_int('OPENAI_TIMEOUT', 20)
+AI_CIRCUIT_FAILURE_THRESHOLD = env_int('AI_CIRCUIT_FAILURE_THRESHOLD', 5)
+AI_CIRCUIT_RESET_SECONDS = env_int('AI_CIRCUIT_RESET_SECONDS', 60)
+
+# ID-document OCR jobs (members.ocr_jobs): the largest upload in bytes,
+# seconds before a job no worker finished is reported failed, and the
+# longest side in pixels images are scaled down to
+OCR_MAX_IMAGE_SIZE = env_int('OCR_MAX_IMAGE_SIZE', 5 * 1024 * 1024)
+OCR_JOB_STALE_AFTER = env_int('OCR_JOB_STALE_AFTER', 300)
+OCR_MAX_DIMENSION = env_int('OCR_MAX_DIMENSION', 1600)
+
 # Brand settings
 BRAND_NAME = env('BRAND_NAME', 'Legacy Core')
 COMPANY_NAME = env('COMPANY_NAME', BRAND_NAME)
@@ -340,3 +358,8 @@ AUDIT_SENSITIVE_MODELS = [
 # Audit log retention (days) - old logs beyond this period can be archived
 AUDIT_LOG_RETENTION_DAYS = 365  # Keep 1 year of audit logs
 
+# Buffered audit entries are written in batches of this size when a request
+# (or an audit_buffer() block) ends; set AUDIT_LOG_ASYNC to write them from Celery
+AUDIT_LOG_BATCH_SIZE = 500
+AUDIT_LOG_ASYNC = False
+
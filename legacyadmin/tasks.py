@@ -201,3 +201,30 @@ def check_system_health(self):
             logger.error("Could not import send_admin_alert task")
         
         raise
+
+
+@shared_task(
+    name="legacyadmin.tasks.reconcile_policy_rollups",
+    bind=True
+)
+def reconcile_policy_rollups(self, days=None):
+    """
+    Rebuild the dashboard policy rollups from the Policy and Payment tables.
+
+    Args:
+        days: Only rebuild buckets from the last N days (default: full rebuild)
+    """
+    try:
+        logger.info(f"Starting policy rollup reconcile task (days={days})")
+
+        # Import here to avoid circular imports
+        from dashboard.rollups import rebuild_policy_rollups
+
+        start_date = timezone.now().date() - timedelta(days=days) if days else None
+        count = rebuild_policy_rollups(start_date=start_date)
+
+        logger.info(f"Reconciled {count} policy rollup rows")
+        return {"status": "success", "count": count}
+    except Exception as e:
+        logger.error(f"Error reconciling policy rollups: {str(e)}")
+        raise
@@ -1,11 +1,22 @@
 import json
 from django.http import JsonResponse
-from django.db.models import Q
 from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from .models import Member, Policy
+from .search import cached_suggestions
 from settings_app.models import UserRole
 
+def serialize_suggestion(policy):
+    member = policy.member
+    return {
+        'id': policy.id,
+        'text': f"{member.first_name} {member.last_name}",
+        'type': 'Policy',
+        'extra': f"#{policy.policy_number or policy.uw_membership_number or 'N/A'}",
+        'redirect_url': reverse('members:policy_detail', kwargs={'policy_id': policy.id})
+    }
+
+
 @login_required
 def search_suggestions(request):
     """
@@ -32,53 +43,25 @@ def search_suggestions(request):
     # Base queryset with role-based filtering
     policies_qs = Policy.objects.select_related('member', 'scheme', 'plan')
     
-    # Apply role-based filtering
+    # Apply role-based filtering; the scope also keys the suggestion cache
     if user_role == 'scheme_manager' and user_scheme:
         policies_qs = policies_qs.filter(scheme=user_scheme)
+        scope = f"scheme:{user_scheme.pk}"
     elif user_role == 'branch_owner' and user_branch:
         policies_qs = policies_qs.filter(scheme__branch=user_branch)
+        scope = f"branch:{user_branch.pk}"
     elif user_role not in ['internal_admin', 'compliance_auditor']:
         # For regular users or agents, only show their own policies
         if hasattr(user, 'agent'):
             policies_qs = policies_qs.filter(underwritten_by=user.agent)
+            scope = f"agent:{user.agent.pk}"
         else:
-            policies_qs = policies_qs.none()
-    
-    # Check for exact policy number match first
-    exact_match = None
-    exact_policy = policies_qs.filter(
-        Q(policy_number=query) | 
-        Q(uw_membership_number=query)
-    ).first()
-    
-    if exact_policy:
-        exact_match = {
-            'id': exact_policy.id,
-            'redirect_url': reverse('members:policy_detail', kwargs={'policy_id': exact_policy.id})
-        }
-    
-    # Search for suggestions
-    policies = policies_qs.filter(
-        Q(member__first_name__icontains=query) |
-        Q(member__last_name__icontains=query) |
-        Q(member__id_number__icontains=query) |
-        Q(member__phone_number__icontains=query) |
-        Q(policy_number__icontains=query) |
-        Q(uw_membership_number__icontains=query)
-    ).distinct()[:10]  # Limit to 10 suggestions
-    
-    suggestions = []
+            return JsonResponse({'suggestions': [], 'exact_match': False, 'redirect_url': None})
+    else:
+        scope = "all"
     
-    for policy in policies:
-        member = policy.member
-        suggestion = {
-            'id': policy.id,
-            'text': f"{member.first_name} {member.last_name}",
-            'type': 'Policy',
-            'extra': f"#{policy.policy_number or policy.uw_membership_number or 'N/A'}",
-            'redirect_url': reverse('members:policy_detail', kwargs={'policy_id': policy.id})
-        }
-        suggestions.append(suggestion)
+    # Best matches first; repeated and extended queries are served from the cache
+    suggestions, exact_match = cached_suggestions(policies_qs, query, scope, serialize_suggestion, limit=10)
     
     return JsonResponse({
         'suggestions': suggestions,
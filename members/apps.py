@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class MembersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'members'
+
+    def ready(self):
+        # Keep the policy search index current on Member/Policy saves
+        import members.signals  # noqa: F401
@@ -0,0 +1,202 @@
+# members/bulk_documents.py
+"""
+Bulk policy document generation.
+
+Policies are processed in batches of primary keys. Each batch is loaded with
+its member, scheme, plan, bank, dependents and beneficiaries in a fixed
+number of queries and its templates are rendered in this process; the HTML
+is then converted to PDF across a process pool, since WeasyPrint is CPU
+bound and needs no database. PDFs already in the render cache
+(``legacyadmin.pdf_cache``) are reused, new ones are added to it, and the
+batch's ``Policy.document`` values are written with one ``bulk_update``, so
+an interrupted run started again with ``missing_only`` carries on after the
+last finished batch.
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Q
+
+from legacyadmin.metrics import PDF_RENDER_CACHE
+from legacyadmin.pdf_cache import pdf_cache_key, pdf_cache_path, read_cached_pdf, write_cached_pdf
+from members.models import Policy
+from members.utils.pdf_generator import (
+    POLICY_DOCUMENT_KIND,
+    POLICY_DOCUMENT_TEMPLATE,
+    html_to_pdf,
+    policy_document_filename,
+    policy_document_html,
+    policy_document_inputs,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_REPORTED_FAILURES = 50
+
+BatchResult = namedtuple('BatchResult', ['number', 'generated', 'cached', 'failures', 'seconds'])
+
+
+def bulk_document_batch_size():
+    return getattr(settings, 'BULK_DOCUMENT_BATCH_SIZE', 200)
+
+
+def bulk_document_workers():
+    return getattr(settings, 'BULK_DOCUMENT_WORKERS', os.cpu_count() or 1)
+
+
+def policies_needing_documents(scheme_id=None, policy_ids=None, missing_only=False):
+    """Primary keys of the policies to generate documents for, in pk order."""
+    queryset = Policy.objects.all()
+    if scheme_id:
+        queryset = queryset.filter(scheme_id=scheme_id)
+    if policy_ids:
+        queryset = queryset.filter(pk__in=policy_ids)
+    if missing_only:
+        queryset = queryset.filter(Q(document='') | Q(document__isnull=True))
+    return list(queryset.order_by('pk').values_list('pk', flat=True))
+
+
+def load_policy_batch(policy_ids):
+    """Load a batch with everything the document template reads."""
+    # Plan.underwriter is a text field, so the plan row already carries it
+    return list(
+        Policy.objects.filter(pk__in=policy_ids)
+        .select_related('member', 'plan', 'scheme', 'bank')
+        .prefetch_related('dependents', 'beneficiaries')
+        .order_by('pk')
+    )
+
+
+def pdf_executor(workers):
+    """Process pool for PDF conversion, or None to convert in this process."""
+    # Daemonic processes (e.g. some Celery pool workers) cannot start children
+    if workers <= 1 or multiprocessing.current_process().daemon:
+        return None
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def attempt(func, *args):
+    try:
+        return func(*args)
+    except Exception as e:
+        return e
+
+
+def convert_to_pdf(html_strings, executor):
+    """PDF bytes, or the exception raised, for each HTML string."""
+    if executor is None:
+        return [attempt(html_to_pdf, html) for html in html_strings]
+    futures = [executor.submit(html_to_pdf, html) for html in html_strings]
+    return [attempt(future.result) for future in futures]
+
+
+def generate_batch(number, policy_ids, executor):
+    """
+    Generate and store the documents for one batch of policies.
+
+    Returns:
+        BatchResult: Counts, ``(policy_id, error)`` failures and elapsed seconds
+    """
+    started = time.perf_counter()
+    failures = []
+    pending = []
+    finished = []
+
+    for policy in load_policy_batch(policy_ids):
+        try:
+            inputs = policy_document_inputs(policy)
+            path = pdf_cache_path(POLICY_DOCUMENT_KIND, pdf_cache_key(POLICY_DOCUMENT_KIND, POLICY_DOCUMENT_TEMPLATE, inputs))
+            content = read_cached_pdf(path)
+            if content is not None:
+                finished.append((policy, content, True))
+                continue
+            html = policy_document_html(policy, inputs['member'], inputs['dependents'], inputs['beneficiaries'])
+            pending.append((policy, path, html))
+        except Exception as e:
+            failures.append((policy.pk, str(e)))
+
+    for (policy, path, _), content in zip(pending, convert_to_pdf([html for _, _, html in pending], executor)):
+        if isinstance(content, Exception):
+            failures.append((policy.pk, str(content)))
+            continue
+        write_cached_pdf(path, content)
+        finished.append((policy, content, False))
+
+    saved = []
+    generated = cached = 0
+    for policy, content, from_cache in finished:
+        try:
+            policy.document.save(policy_document_filename(policy), ContentFile(content), save=False)
+        except Exception as e:
+            failures.append((policy.pk, str(e)))
+            continue
+        saved.append(policy)
+        if from_cache:
+            cached += 1
+        else:
+            generated += 1
+    Policy.objects.bulk_update(saved, ['document'])
+
+    PDF_RENDER_CACHE.labels(document=POLICY_DOCUMENT_KIND, result='hit').inc(cached)
+    PDF_RENDER_CACHE.labels(document=POLICY_DOCUMENT_KIND, result='miss').inc(len(pending))
+    return BatchResult(
+        number=number,
+        generated=generated,
+        cached=cached,
+        failures=failures,
+        seconds=time.perf_counter() - started,
+    )
+
+
+def generate_policy_documents(scheme_id=None, policy_ids=None, missing_only=False,
+                              batch_size=None, workers=None, report=None):
+    """
+    Generate policy documents for many policies.
+
+    Args:
+        scheme_id: Only policies of this scheme
+        policy_ids: Only these policies
+        missing_only: Skip policies that already have a document
+        batch_size: Policies loaded and saved together
+        workers: PDF conversion processes (1 converts in this process)
+        report: Called with each ``BatchResult`` as batches finish
+
+    Returns:
+        dict: Totals, throughput and the first failures
+    """
+    batch_size = batch_size or bulk_document_batch_size()
+    workers = workers or bulk_document_workers()
+    ids = policies_needing_documents(scheme_id, policy_ids, missing_only)
+
+    started = time.perf_counter()
+    totals = {'policies': len(ids), 'generated': 0, 'cached': 0, 'failed': 0, 'failures': []}
+    executor = pdf_executor(workers)
+    try:
+        for number, start in enumerate(range(0, len(ids), batch_size), start=1):
+            result = generate_batch(number, ids[start:start + batch_size], executor)
+            totals['generated'] += result.generated
+            totals['cached'] += result.cached
+            totals['failed'] += len(result.failures)
+            room = MAX_REPORTED_FAILURES - len(totals['failures'])
+            totals['failures'].extend(result.failures[:max(room, 0)])
+            logger.info(
+                f"Policy documents batch {number}: {result.generated} generated, {result.cached} cached, "
+                f"{len(result.failures)} failed in {result.seconds:.1f}s"
+            )
+            if report:
+                report(result)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    totals['seconds'] = round(time.perf_counter() - started, 2)
+    done = totals['generated'] + totals['cached']
+    totals['per_second'] = round(done / totals['seconds'], 2) if totals['seconds'] else done
+    return totals
@@ -1,8 +1,15 @@
 from django.contrib import admin
-from members.communications.models import SMSLog
+from members.communications.models import OutboundEmail, SMSLog
 
 @admin.register(SMSLog)
 class SMSLogAdmin(admin.ModelAdmin):
     list_display = ('phone_number', 'status', 'sent_at')
     search_fields = ('phone_number', 'message')
     list_filter = ('status',)
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('to', 'subject', 'kind', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    search_fields = ('to', 'subject')
+    list_filter = ('status', 'kind')
@@ -34,3 +34,46 @@ class WhatsAppLog(models.Model):
 
     def __str__(self):
         return f"WhatsApp to {self.phone_number} at {self.sent_at:%Y-%m-%d %H:%M}"
+
+
+class OutboundEmail(models.Model):
+    """
+    Email queued for delivery by ``members.communications.outbox``.
+
+    Attachments are not stored: they are built when the email is sent from
+    ``kind`` and ``object_id`` (e.g. the cached policy document PDF).
+    """
+    STATUS_QUEUED = 'QUEUED'
+    STATUS_SENDING = 'SENDING'
+    STATUS_SENT = 'SENT'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    to           = models.EmailField()
+    from_email   = models.CharField(max_length=255, blank=True)
+    subject      = models.CharField(max_length=255)
+    body         = models.TextField()
+    html_body    = models.TextField(blank=True)
+    kind         = models.CharField(max_length=50, blank=True)   # attachment builder, e.g. "policy_document"
+    object_id    = models.PositiveIntegerField(null=True, blank=True)
+    status       = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts     = models.PositiveSmallIntegerField(default=0)
+    error        = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at   = models.DateTimeField(null=True, blank=True)
+    created_at   = models.DateTimeField(auto_now_add=True)
+    sent_at      = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+            models.Index(fields=['kind', 'object_id'], name='outbox_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind or 'Email'} to {self.to} ({self.status})"
@@ -0,0 +1,268 @@
+"""
+Queued email outbox.
+
+``queue_email`` stores an ``OutboundEmail`` and returns straight away; the
+``members.communications.tasks.deliver_email_outbox`` Celery task (queued on
+commit and run every minute by beat) sends due emails in batches, each over
+one backend connection from ``get_connection``. Attachments are built at
+send time from the email's ``kind`` and ``object_id`` using the PDF render
+cache, so nothing is rendered on the request path.
+
+Every email records its own status. Transient failures (connection drops,
+4xx SMTP replies, attachment errors) are retried with exponential backoff
+up to ``EMAIL_OUTBOX_MAX_ATTEMPTS``; refused recipients and other 5xx
+replies fail immediately.
+"""
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from members.communications.models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def outbox_setting(name, default):
+    return getattr(settings, f'EMAIL_OUTBOX_{name}', default)
+
+
+# ─── Attachments and post-send updates per kind ──────────────────────────────
+
+def policy_document_attachments(email):
+    from members.models import Policy
+    from members.utils.pdf_generator import generate_policy_document
+
+    policy = Policy.objects.select_related('member', 'plan', 'scheme').get(pk=email.object_id)
+    document = generate_policy_document(policy)
+    return [(document.name, document.read(), 'application/pdf')]
+
+
+def policy_document_sent(email):
+    from members.models import Policy
+
+    Policy.objects.filter(pk=email.object_id, email_sent_at__isnull=True).update(email_sent_at=email.sent_at)
+
+
+def public_policy_document_attachments(email):
+    from members.models_public_enrollment import PublicApplication
+    from members.policy_documents import generate_policy_pdf
+
+    application = PublicApplication.objects.select_related('plan', 'converted_policy').get(pk=email.object_id)
+    return [(f"Policy_{application.id}.pdf", generate_policy_pdf(application), 'application/pdf')]
+
+
+def receipt_attachments(email):
+    from payments.models import PaymentReceipt
+    from payments.utils.receipt_generator import generate_payment_receipt_pdf
+
+    receipt = PaymentReceipt.objects.select_related('payment__member', 'payment__policy').get(pk=email.object_id)
+    if receipt.pdf_file:
+        with receipt.pdf_file.open('rb') as pdf:
+            content = pdf.read()
+    else:
+        content = generate_payment_receipt_pdf(receipt.payment).read()
+    return [(f"Receipt_{receipt.receipt_number}.pdf", content, 'application/pdf')]
+
+
+def receipt_sent(email):
+    from payments.models import PaymentReceipt
+
+    PaymentReceipt.objects.filter(pk=email.object_id).update(
+        status='EMAILED', sent_to=email.to, sent_at=email.sent_at,
+    )
+
+
+EMAIL_KINDS = {
+    'policy_document': (policy_document_attachments, policy_document_sent),
+    'public_policy_document': (public_policy_document_attachments, None),
+    'receipt': (receipt_attachments, receipt_sent),
+}
+
+
+# ─── Queueing ────────────────────────────────────────────────────────────────
+
+def queue_email(to, subject, body, kind='', object_id=None, html_body='', from_email=None, unique=False):
+    """
+    Queue an email for delivery once the current transaction commits.
+
+    Args:
+        to: Recipient address
+        subject: Subject line
+        body: Plain text body
+        kind: Key of ``EMAIL_KINDS`` whose attachments to include
+        object_id: Primary key the attachments are built from
+        html_body: Optional HTML alternative
+        from_email: Sender, defaulting to ``DEFAULT_FROM_EMAIL``
+        unique: Skip queueing if this kind and object already have a queued or sent email
+
+    Returns:
+        OutboundEmail: The queued (or already existing) email
+    """
+    if unique:
+        existing = OutboundEmail.objects.filter(kind=kind, object_id=object_id).exclude(
+            status=OutboundEmail.STATUS_FAILED
+        ).first()
+        if existing:
+            return existing
+
+    email = OutboundEmail.objects.create(
+        to=to,
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        kind=kind,
+        object_id=object_id,
+        from_email=from_email or getattr(settings, 'DEFAULT_FROM_EMAIL', ''),
+    )
+    transaction.on_commit(enqueue_delivery)
+    return email
+
+
+def enqueue_delivery():
+    from members.communications.tasks import deliver_email_outbox
+
+    deliver_email_outbox.delay()
+
+
+# ─── Delivery ────────────────────────────────────────────────────────────────
+
+def claim_batch(batch_size):
+    """
+    Mark up to ``batch_size`` due emails as sending and return them. Emails
+    left in sending by a worker that died are reclaimed after
+    ``EMAIL_OUTBOX_CLAIM_TIMEOUT`` seconds.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=outbox_setting('CLAIM_TIMEOUT', 900))
+    due = OutboundEmail.objects.filter(
+        Q(status=OutboundEmail.STATUS_QUEUED, next_attempt_at__lte=now) |
+        Q(status=OutboundEmail.STATUS_SENDING, claimed_at__lt=stale)
+    ).order_by('next_attempt_at', 'pk')
+
+    with transaction.atomic():
+        ids = list(due.select_for_update(skip_locked=True).values_list('pk', flat=True)[:batch_size])
+        OutboundEmail.objects.filter(pk__in=ids).update(status=OutboundEmail.STATUS_SENDING, claimed_at=now)
+    return list(OutboundEmail.objects.filter(pk__in=ids).order_by('pk'))
+
+
+def build_message(email, connection):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email or None,
+        to=[email.to],
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    if email.kind:
+        attachments, _ = EMAIL_KINDS[email.kind]
+        for filename, content, mimetype in attachments(email):
+            message.attach(filename, content, mimetype)
+    return message
+
+
+def is_permanent(error):
+    """Whether retrying the same email could not succeed."""
+    if isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, KeyError)):
+        return True
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False
+    code = getattr(error, 'smtp_code', None)
+    return isinstance(code, int) and code >= 500
+
+
+def mark_sent(email):
+    email.status = OutboundEmail.STATUS_SENT
+    email.sent_at = timezone.now()
+    email.attempts += 1
+    email.error = ''
+    email.save(update_fields=['status', 'sent_at', 'attempts', 'error'])
+    _, on_sent = EMAIL_KINDS.get(email.kind, (None, None))
+    if on_sent:
+        on_sent(email)
+
+
+def mark_failed_attempt(email, error):
+    """Schedule a retry, or give up when the error is permanent or attempts run out."""
+    email.attempts += 1
+    email.error = f"{type(error).__name__}: {error}"[:2000]
+    if is_permanent(error) or email.attempts >= outbox_setting('MAX_ATTEMPTS', 6):
+        email.status = OutboundEmail.STATUS_FAILED
+        logger.error(f"Email {email.pk} to {email.to} failed: {email.error}")
+    else:
+        delay = min(outbox_setting('RETRY_BACKOFF_MAX', 3600), 60 * 2 ** (email.attempts - 1))
+        email.status = OutboundEmail.STATUS_QUEUED
+        email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        logger.warning(f"Email {email.pk} to {email.to} will be retried in {delay}s: {email.error}")
+    email.save(update_fields=['status', 'attempts', 'error', 'next_attempt_at'])
+
+
+def connection_lost(error):
+    # SMTPException subclasses OSError, but only a drop leaves the connection unusable
+    return isinstance(error, smtplib.SMTPServerDisconnected) or (
+        isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+    )
+
+
+def deliver_batch(emails):
+    """
+    Send a claimed batch over one connection.
+
+    Returns:
+        dict: Counts of sent, retried and failed emails
+    """
+    counts = {'sent': 0, 'retried': 0, 'failed': 0}
+
+    def record_failure(email, error):
+        mark_failed_attempt(email, error)
+        counts['failed' if email.status == OutboundEmail.STATUS_FAILED else 'retried'] += 1
+
+    connection = get_connection(fail_silently=False)
+    pending = list(emails)
+    try:
+        connection.open()
+        while pending:
+            email = pending.pop(0)
+            try:
+                connection.send_messages([build_message(email, connection)])
+            except Exception as e:
+                record_failure(email, e)
+                if connection_lost(e):
+                    connection.close()
+                    connection.open()
+                continue
+            mark_sent(email)
+            counts['sent'] += 1
+    except Exception as e:
+        # The server could not be reached; retry the rest of the batch later
+        for email in pending:
+            record_failure(email, e)
+    finally:
+        connection.close()
+    return counts
+
+
+def deliver_outbox(batch_size=None, max_batches=None):
+    """
+    Send due emails until none are left or ``max_batches`` batches have run.
+
+    Returns:
+        dict: Counts of sent, retried and failed emails
+    """
+    batch_size = batch_size or outbox_setting('BATCH_SIZE', 50)
+    max_batches = max_batches or outbox_setting('MAX_BATCHES', 20)
+    totals = {'sent': 0, 'retried': 0, 'failed': 0}
+    for _ in range(max_batches):
+        emails = claim_batch(batch_size)
+        if not emails:
+            break
+        for key, value in deliver_batch(emails).items():
+            totals[key] += value
+    return totals
@@ -0,0 +1,291 @@
+"""
+Batched BulkSMS dispatch for campaign sends.
+
+Messages are queued with ``queue_sms`` and sent by the
+``members.communications.tasks.dispatch_sms`` Celery task. Each worker
+process keeps one pooled HTTP session to BulkSMS and submits up to
+``SMS_BATCH_SIZE`` messages per request, grouping recipients of the same
+text into one multi-recipient message object. A token bucket kept in the
+cache holds all workers together to ``SMS_RATE_PER_SECOND`` messages, and
+the SMSLog rows of a batch are written with one ``bulk_create``.
+
+Only failures that happen before BulkSMS could have received a batch
+(connection errors and retryable HTTP statuses) are retried. A batch that
+timed out waiting for a reply is logged as ``UNKNOWN`` and not resent. The
+task records its progress after every batch, so a redelivered task skips
+the batches it already sent.
+
+Single interactive messages such as OTPs still go through
+``sms_sender.send_bulksms``.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from requests.adapters import HTTPAdapter
+
+from members.communications.models import SMSLog
+from members.communications.sms_sender import BULKSMS_API_URL, get_bulksms_auth, normalize_phone_number
+
+logger = logging.getLogger(__name__)
+
+# Provider responses worth retrying later rather than recording as failed
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+SMS_RATE_CACHE_KEY = 'sms_dispatch:rate'
+# Long enough to outlive any debt left by an oversized batch
+SMS_RATE_STATE_TIMEOUT = 3600
+SMS_PROGRESS_CACHE_PREFIX = 'sms_dispatch:progress'
+SMS_PROGRESS_TIMEOUT = 86400
+
+
+class SMSDispatchError(Exception):
+    """A batch could not be submitted now; ``remaining`` holds the unsent messages."""
+
+    def __init__(self, message, remaining):
+        super().__init__(message)
+        self.remaining = remaining
+
+
+class TokenBucket:
+    """
+    Token bucket allowing ``rate`` messages per second with bursts of up to
+    ``capacity``. ``acquire`` blocks until enough tokens are available.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def take(self, tokens):
+        """Charge ``tokens`` if the bucket allows it now; otherwise return the seconds to wait."""
+        # A request larger than the bucket waits for a full bucket and is then
+        # charged in full, leaving a debt that later requests wait to pay off
+        needed = min(tokens, self.capacity)
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= needed:
+            self.tokens -= tokens
+            return 0
+        return (needed - self.tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        with self.lock:
+            while True:
+                wait = self.take(tokens)
+                if not wait:
+                    return
+                self.sleep(wait)
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket kept in the cache, so every worker process draws on the one
+    BulkSMS account limit. The balance is read and written under a short
+    cache lock; callers wait for tokens outside it.
+    """
+
+    def __init__(self, rate, capacity=None, key=SMS_RATE_CACHE_KEY, clock=time.time, sleep=time.sleep):
+        super().__init__(rate, capacity, clock=clock, sleep=sleep)
+        self.key = key
+
+    @contextmanager
+    def locked(self):
+        lock_key = f"{self.key}:lock"
+        # Go ahead unlocked rather than stall sends when the cache is unavailable
+        acquired = False
+        for _ in range(200):
+            acquired = cache.add(lock_key, 1, 5)
+            if acquired:
+                break
+            time.sleep(0.005)
+        try:
+            yield
+        finally:
+            if acquired:
+                cache.delete(lock_key)
+
+    def acquire(self, tokens=1):
+        while True:
+            with self.locked():
+                self.tokens, self.updated = cache.get(self.key) or (self.capacity, self.clock())
+                wait = self.take(tokens)
+                cache.set(self.key, (self.tokens, self.updated), SMS_RATE_STATE_TIMEOUT)
+            if not wait:
+                return
+            self.sleep(wait)
+
+
+def sms_progress_cache_key(progress_key):
+    return f"{SMS_PROGRESS_CACHE_PREFIX}:{progress_key}"
+
+
+def digits(phone_number):
+    return re.sub(r'\D', '', phone_number or '')
+
+
+def group_by_body(batch):
+    """``[(to, body), ...]`` -> BulkSMS message objects, one per distinct body."""
+    recipients = {}
+    for to, body in batch:
+        recipients.setdefault(body, []).append(to)
+    return [{'to': numbers, 'body': body, 'encoding': 'TEXT'} for body, numbers in recipients.items()]
+
+
+class SMSDispatcher:
+    """Submits message batches to BulkSMS over one pooled session."""
+
+    def __init__(self, api_url=None, batch_size=None, rate=None, auth_config=None, bucket=None, timeout=30):
+        self.api_url = api_url or getattr(settings, 'BULKSMS_API_URL', BULKSMS_API_URL)
+        self.batch_size = batch_size or getattr(settings, 'SMS_BATCH_SIZE', 100)
+        self.bucket = bucket or SharedTokenBucket(rate or getattr(settings, 'SMS_RATE_PER_SECOND', 10))
+        self.auth_config = auth_config if auth_config is not None else get_bulksms_auth()
+        self.timeout = timeout
+        self.session = requests.Session()
+        # Retries are left to the Celery task so unsent messages survive a worker restart
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0))
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0))
+        if self.auth_config:
+            self.session.auth = self.auth_config['auth']
+            self.session.headers.update(self.auth_config.get('headers', {}))
+
+    def send(self, messages, progress_key=None):
+        """
+        Send ``(to, body)`` messages in batches and log every one of them.
+
+        With a ``progress_key`` the number of messages handled is stored in
+        the cache after each batch is logged, and a repeat call with the same
+        key and messages carries on after them instead of sending them again.
+
+        Returns:
+            list: The SMSLog rows written
+
+        Raises:
+            SMSDispatchError: A batch could not be submitted and is safe to
+                retry; earlier batches are already sent and logged
+        """
+        messages = [(normalize_phone_number(to), body) for to, body in messages if to and body]
+        logs = []
+        done = cache.get(sms_progress_cache_key(progress_key), 0) if progress_key else 0
+        if done:
+            logger.info(f"Skipping {done} SMS messages already handled by an earlier delivery")
+        for start in range(done, len(messages), self.batch_size):
+            batch = messages[start:start + self.batch_size]
+            try:
+                results = self.submit(batch)
+            except SMSDispatchError as e:
+                e.remaining = messages[start:]
+                raise
+            logs.extend(SMSLog.objects.bulk_create([
+                SMSLog(phone_number=to, message=body, status=status, detail=detail)
+                for (to, body), (status, detail) in zip(batch, results)
+            ]))
+            if progress_key:
+                cache.set(sms_progress_cache_key(progress_key), start + len(batch), SMS_PROGRESS_TIMEOUT)
+        return logs
+
+    def submit(self, batch):
+        """Submit one batch; returns ``(status, detail)`` per message."""
+        if os.getenv('OTP_TEST_MODE') == 'True':
+            return [('TEST', f"Test mode - message would be sent to {to}") for to, _ in batch]
+        if not self.auth_config:
+            return [('FAILED', 'BulkSMS credentials not configured')] * len(batch)
+
+        self.bucket.acquire(len(batch))
+        try:
+            response = self.session.post(
+                f"{self.api_url}/messages",
+                json=group_by_body(batch),
+                timeout=self.timeout,
+            )
+        except (requests.exceptions.ConnectTimeout, requests.exceptions.ConnectionError) as e:
+            raise SMSDispatchError(f"BulkSMS unreachable: {str(e)}", batch)
+        except requests.exceptions.Timeout as e:
+            # The request went out, so BulkSMS may have accepted the batch; a resend could duplicate it
+            logger.error(f"No reply from BulkSMS for a batch of {len(batch)} messages: {str(e)}")
+            return [('UNKNOWN', 'No reply from BulkSMS before the timeout - not resent')] * len(batch)
+
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            raise SMSDispatchError(f"BulkSMS HTTP {response.status_code}", batch)
+        if response.status_code >= 400:
+            detail = 'Authentication failed - check credentials' if response.status_code == 401 else (
+                f"HTTP {response.status_code}: {response.text[:500]}"
+            )
+            logger.error(f"BulkSMS rejected a batch of {len(batch)} messages: {detail}")
+            return [('FAILED', detail)] * len(batch)
+
+        return self.match_results(batch, response.json())
+
+    def match_results(self, batch, submitted):
+        """Pair each message with the provider's submission result for its number and text."""
+        accepted = {}
+        for item in submitted if isinstance(submitted, list) else []:
+            accepted.setdefault(digits(item.get('to')), []).append(item)
+
+        results = []
+        for to, body in batch:
+            matches = accepted.get(digits(to))
+            if not matches:
+                results.append(('FAILED', 'Not accepted by BulkSMS'))
+                continue
+            # Prefer the result for this text when a number gets several messages
+            item = next((match for match in matches if match.get('body') == body), matches[0])
+            matches.remove(item)
+            api_status = item.get('status', {}).get('type', 'ACCEPTED')
+            if api_status == 'FAILED':
+                results.append(('FAILED', f"Message rejected: id={item.get('id', '')} status={api_status}"))
+            else:
+                results.append(('SENT', f"Message queued: id={item.get('id', '')} status={api_status}"))
+        return results
+
+
+_dispatcher = None
+
+
+def get_dispatcher():
+    """The worker process's dispatcher, so the pooled session and rate limit are shared between tasks."""
+    global _dispatcher
+
+    if _dispatcher is None:
+        _dispatcher = SMSDispatcher()
+    return _dispatcher
+
+
+def log_failed_messages(messages, detail):
+    """Record messages that will not be retried again."""
+    return SMSLog.objects.bulk_create([
+        SMSLog(phone_number=normalize_phone_number(to), message=body, status='FAILED', detail=detail)
+        for to, body in messages
+    ])
+
+
+def queue_sms(messages, chunk_size=None):
+    """
+    Queue ``(to, body)`` messages for batched sending once the current
+    transaction commits.
+
+    Returns:
+        int: Number of dispatch tasks queued
+    """
+    from members.communications.tasks import dispatch_sms
+
+    messages = [[to, body] for to, body in messages if to and body]
+    chunk_size = chunk_size or getattr(settings, 'SMS_QUEUE_CHUNK_SIZE', 1000)
+    chunks = [messages[start:start + chunk_size] for start in range(0, len(messages), chunk_size)]
+    for chunk in chunks:
+        transaction.on_commit(partial(dispatch_sms.delay, chunk))
+    return len(chunks)
@@ -0,0 +1,60 @@
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(
+    name="members.communications.tasks.dispatch_sms",
+    bind=True,
+    max_retries=6,
+    acks_late=True,
+)
+def dispatch_sms(self, messages):
+    """
+    Send a chunk of queued SMS messages through the batched BulkSMS dispatcher.
+
+    Temporary provider or network errors retry only the unsent messages,
+    backing off exponentially; they are logged as failed once retries run out.
+    Progress is stored per delivery attempt, so a redelivered task (the task
+    acks late) skips the batches it already sent.
+
+    Args:
+        messages: ``[to, body]`` pairs
+    """
+    from django.conf import settings
+
+    from members.communications.sms_dispatch import SMSDispatchError, get_dispatcher, log_failed_messages
+
+    try:
+        # A retry carries new arguments, so each attempt keeps its own progress
+        logs = get_dispatcher().send(messages, progress_key=f"{self.request.id}:{self.request.retries}")
+    except SMSDispatchError as e:
+        if self.request.retries >= self.max_retries:
+            logger.error(f"Giving up on {len(e.remaining)} SMS messages: {str(e)}")
+            log_failed_messages(e.remaining, f"Retries exhausted: {str(e)}")
+            raise
+        countdown = min(getattr(settings, 'SMS_RETRY_BACKOFF_MAX', 900), 30 * 2 ** self.request.retries)
+        logger.warning(f"Retrying {len(e.remaining)} SMS messages in {countdown}s: {str(e)}")
+        raise self.retry(args=[[list(message) for message in e.remaining]], exc=e, countdown=countdown)
+
+    sent = sum(1 for log in logs if log.status != 'FAILED')
+    return {"sent": sent, "failed": len(logs) - sent}
+
+
+@shared_task(
+    name="members.communications.tasks.deliver_email_outbox",
+    bind=True,
+)
+def deliver_email_outbox(self):
+    """
+    Send due emails from the outbox in batches over one connection each.
+
+    Queued on commit whenever an email is queued and run every minute by beat
+    to pick up retries; failures are recorded per email rather than retrying
+    the task.
+    """
+    from members.communications.outbox import deliver_outbox
+
+    return deliver_outbox()
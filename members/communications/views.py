@@ -1,17 +1,26 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from config.permissions import has_permission
 from .forms import SmsForm
+from .sms_dispatch import queue_sms
 
+@login_required
 def sms_sending(request):
+    # Messages go out on the company's BulkSMS account
+    if not (request.user.is_superuser or has_permission(request.user, 'manage_settings')):
+        raise PermissionDenied("You do not have permission to send SMS messages.")
+
     form = SmsForm(request.POST or None)
 
     if request.method == 'POST' and form.is_valid():
         # Example: Extract data
         cellphone = form.cleaned_data['cellphone']
         message = form.cleaned_data['message']
-        # TODO: handle sending logic here
+        queue_sms([(cellphone, message)])
 
-        messages.success(request, f'SMS sent to {cellphone}')
+        messages.success(request, f'SMS queued for {cellphone}')
         return redirect('settings:sms_sending')
 
     return render(request, 'communications/sms_sending.html', {'form': form})
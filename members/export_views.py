@@ -4,8 +4,8 @@ import xlsxwriter
 from io import BytesIO
 from django.http import HttpResponse
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
 from .models import Policy, Member
+from .search import search_policies
 from settings_app.models import UserRole
 
 @login_required
@@ -57,14 +57,7 @@ def export_search_results(request):
     
     # Apply search filter if query exists
     if q:
-        policies = policies.filter(
-            Q(member__first_name__icontains=q) |
-            Q(member__last_name__icontains=q) |
-            Q(member__id_number__icontains=q) |
-            Q(member__phone_number__icontains=q) |
-            Q(policy_number__icontains=q) |
-            Q(uw_membership_number__icontains=q)
-        )
+        policies = search_policies(policies, q)
     
     # Apply advanced filters if provided
     if status:
@@ -13,6 +13,7 @@ from .models_public_enrollment import (
 from .models import Member
 from .utils import luhn_check, validate_sa_id
 from schemes.models import Plan
+from schemes.quoting import eligible_plan_ids
 from datetime import date
 
 
@@ -215,14 +216,17 @@ class PlanSelectionPublicForm(forms.ModelForm):
         widget=forms.RadioSelect(attrs={'class': 'form-check-input'})
     )
     
-    def __init__(self, scheme=None, *args, **kwargs):
+    def __init__(self, scheme=None, age=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
         if scheme:
-            self.fields['plan'].queryset = Plan.objects.filter(
+            plans = Plan.objects.filter(
                 scheme=scheme,
                 is_active=True
-            ).order_by('premium')
+            )
+            if age is not None:
+                plans = plans.filter(pk__in=eligible_plan_ids(age, scheme_id=scheme.pk))
+            self.fields['plan'].queryset = plans.order_by('premium')
         
         # Payment method choices
         self.fields['payment_method'].choices = [
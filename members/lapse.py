@@ -0,0 +1,177 @@
+# members/lapse.py
+"""
+Set-based lapse detection.
+
+Policies are processed in primary key ranges. For each range, one query
+reads the policies' current payment state, and one window query picks each
+policy's latest completed payment (``ROW_NUMBER()`` partitioned by policy,
+served by the ``(policy, status, date)`` payment index). The new ``status``,
+``lapse_warning``, ``last_payment_date`` and ``last_payment_amount`` are
+worked out in Python. Only the policies that changed are written, with one
+``bulk_update`` per range. ``bulk_update`` skips the rollup signals, so the
+dashboard buckets of policies whose lapse warning changed are refreshed once
+the run commits.
+
+A policy is a warning case after ``POLICY_LAPSE_WARNING_DAYS`` (45) days
+without a payment or when it has never paid, and is lapsed after
+``POLICY_LAPSE_DAYS`` (60) days.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from members.models import Policy
+from payments.models import Payment
+
+logger = logging.getLogger(__name__)
+
+LAPSE_FIELDS = ['status', 'lapse_warning', 'last_payment_date', 'last_payment_amount']
+
+
+def lapse_batch_size():
+    return getattr(settings, 'LAPSE_BATCH_SIZE', 5000)
+
+
+def lapse_state(status, last_payment_date, today):
+    """
+    Status and lapse warning for a policy last paid on ``last_payment_date``.
+
+    Returns:
+        tuple: ``(status, lapse_warning)``
+    """
+    if last_payment_date is None:
+        # Never paid: flag it, but a new policy stays pending until it pays
+        return status, 'warning'
+
+    days_since_payment = (today - last_payment_date).days
+    if days_since_payment > getattr(settings, 'POLICY_LAPSE_DAYS', 60):
+        return 'LAPSED', 'lapsed'
+    if days_since_payment > getattr(settings, 'POLICY_LAPSE_WARNING_DAYS', 45):
+        return 'ACTIVE', 'warning'
+    return 'ACTIVE', 'none'
+
+
+def latest_payments(first_id, last_id):
+    """``{policy_id: (date, amount)}`` of the latest completed payment per policy in the range."""
+    latest = Payment.objects.filter(
+        policy_id__gte=first_id,
+        policy_id__lte=last_id,
+        status='COMPLETED',
+    ).annotate(
+        position=Window(
+            expression=RowNumber(),
+            partition_by=[F('policy_id')],
+            order_by=[F('date').desc(), F('pk').desc()],
+        ),
+    ).filter(position=1).order_by()
+    return {policy_id: (paid_on, amount) for policy_id, paid_on, amount in latest.values_list('policy_id', 'date', 'amount')}
+
+
+def policy_ranges(queryset, batch_size):
+    """Split the queryset's primary keys into ``(first, last)`` ranges of ``batch_size`` policies."""
+    ids = queryset.order_by('pk').values_list('pk', flat=True)
+    last_id = 0
+    while True:
+        chunk = list(ids.filter(pk__gt=last_id)[:batch_size])
+        if not chunk:
+            return
+        yield chunk[0], chunk[-1]
+        last_id = chunk[-1]
+
+
+def refresh_range(queryset, first_id, last_id, today):
+    """
+    Recompute the lapse state of the policies in one primary key range.
+
+    Returns:
+        tuple: Counts of policies checked and updated, and of changes to each
+        status, and the ids of the policies whose lapse warning changed
+    """
+    policies = list(
+        queryset.filter(pk__gte=first_id, pk__lte=last_id).only('pk', *LAPSE_FIELDS).order_by()
+    )
+    payments = latest_payments(first_id, last_id)
+
+    changed = []
+    warning_changed = []
+    counts = {'checked': len(policies), 'updated': 0, 'lapsed': 0, 'warning': 0, 'active': 0}
+    for policy in policies:
+        paid_on, amount = payments.get(policy.pk, (None, None))
+        status, warning = lapse_state(policy.status, paid_on, today)
+        state = (status, warning, paid_on, amount)
+        if state == tuple(getattr(policy, field) for field in LAPSE_FIELDS):
+            continue
+        if warning != policy.lapse_warning:
+            warning_changed.append(policy.pk)
+        if status != policy.status or warning != policy.lapse_warning:
+            counts['lapsed' if status == 'LAPSED' else warning if warning == 'warning' else 'active'] += 1
+        policy.status, policy.lapse_warning, policy.last_payment_date, policy.last_payment_amount = state
+        changed.append(policy)
+
+    Policy.objects.bulk_update(changed, LAPSE_FIELDS)
+    counts['updated'] = len(changed)
+    return counts, warning_changed
+
+
+def schedule_lapse_rollups(policy_ids, batch_size):
+    """bulk_update skips the rollup signals, so refresh the changed policies' buckets on commit"""
+    if not policy_ids:
+        return
+
+    def refresh():
+        from dashboard.rollups import policy_bucket_keys, refresh_rollup_buckets
+
+        try:
+            keys = set()
+            for start in range(0, len(policy_ids), batch_size):
+                keys |= policy_bucket_keys(policy_ids[start:start + batch_size])
+            refresh_rollup_buckets(keys)
+        except Exception:
+            # The nightly reconcile repairs the rollups if this fails.
+            logger.exception("Failed to refresh policy rollups after lapse refresh")
+
+    transaction.on_commit(refresh)
+
+
+def refresh_lapse_states(scheme_id=None, policy_ids=None, batch_size=None, today=None):
+    """
+    Recompute the payment state of many policies.
+
+    Args:
+        scheme_id: Only policies of this scheme
+        policy_ids: Only these policies
+        batch_size: Policies read and written together
+        today: Date to measure days since payment from
+
+    Returns:
+        dict: Totals and elapsed seconds
+    """
+    batch_size = batch_size or lapse_batch_size()
+    today = today or timezone.now().date()
+    queryset = Policy.objects.all()
+    if scheme_id:
+        queryset = queryset.filter(scheme_id=scheme_id)
+    if policy_ids is not None:
+        queryset = queryset.filter(pk__in=policy_ids)
+
+    started = time.perf_counter()
+    totals = {'checked': 0, 'updated': 0, 'lapsed': 0, 'warning': 0, 'active': 0}
+    warning_changed = []
+    for first_id, last_id in policy_ranges(queryset, batch_size):
+        counts, changed_ids = refresh_range(queryset, first_id, last_id, today)
+        for key, value in counts.items():
+            totals[key] += value
+        warning_changed.extend(changed_ids)
+    schedule_lapse_rollups(warning_changed, batch_size)
+    totals['seconds'] = round(time.perf_counter() - started, 2)
+    logger.info(
+        f"Lapse states refreshed: {totals['checked']} checked, {totals['updated']} updated "
+        f"({totals['lapsed']} lapsed, {totals['warning']} at risk, {totals['active']} active) in {totals['seconds']}s"
+    )
+    return totals
@@ -0,0 +1,103 @@
+import random
+import statistics
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from members.models import Member, Policy
+from members.search import index_policies, suggest_policies
+
+FIRST_NAMES = ['Thandi', 'Sipho', 'Lerato', 'Johan', 'Ayesha', 'Pieter', 'Nomsa', 'Kagiso', 'Zanele', 'Ruan']
+LAST_NAMES = ['Nkosi', 'Dlamini', 'Van der Merwe', 'Naidoo', 'Botha', 'Mokoena', 'Khumalo', 'Smith', 'Pillay', 'Mahlangu']
+
+
+def legacy_search(queryset, q):
+    """The icontains OR-chain the search index replaced, for comparison."""
+    return queryset.filter(
+        Q(member__first_name__icontains=q) |
+        Q(member__last_name__icontains=q) |
+        Q(member__phone_number__icontains=q) |
+        Q(policy_number__icontains=q) |
+        Q(uw_membership_number__icontains=q)
+    ).distinct()
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure typeahead latency of the policy search index against synthetic policies. '
+        'The synthetic data is created in a transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--policies',
+            type=int,
+            default=1_000_000,
+            help='Number of synthetic policies to search (default: 1000000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Timed runs per query (default: 20)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows per bulk insert while seeding (default: 5000)'
+        )
+        parser.add_argument(
+            '--legacy',
+            action='store_true',
+            help='Also time the old icontains search'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['policies'], options['batch_size'])
+            self.stdout.write("Running queries...")
+            queries = ['nk', 'thandi', 'thandi nko', 'pol-00', 'bm-000123', '0821', '082 100 0042']
+            for q in queries:
+                self.report(q, lambda q=q: suggest_policies(Policy.objects.all(), q), options['repeat'])
+                if options['legacy']:
+                    self.report(f"{q} (legacy)", lambda q=q: legacy_search(Policy.objects.all(), q)[:10], options['repeat'])
+            transaction.set_rollback(True)
+
+    def seed(self, total, batch_size):
+        self.stdout.write(f"Seeding {total} synthetic policies...")
+        rng = random.Random(0)
+        for start in range(0, total, batch_size):
+            size = min(batch_size, total - start)
+            members = Member.objects.bulk_create([
+                Member(
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    gender='Female',
+                    date_of_birth=date(1980, 1, 1),
+                    phone_number=f"082{start + offset:07d}",
+                )
+                for offset in range(size)
+            ])
+            policies = Policy.objects.bulk_create([
+                Policy(
+                    member=member,
+                    policy_number=f"POL-{start + offset:08d}",
+                    uw_membership_number=f"BM-{start + offset:06d}",
+                )
+                for offset, member in enumerate(members)
+            ])
+            index_policies(policies, batch_size=batch_size)
+
+    def report(self, label, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(run())
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(f"{label:<24} p50 {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms")
@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand
+
+from members.bulk_documents import bulk_document_batch_size, bulk_document_workers, generate_policy_documents
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate policy documents in bulk: batches are prefetched together and '
+        'PDFs are rendered across a process pool, reusing the PDF render cache.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scheme',
+            type=int,
+            help='Only generate documents for policies of this scheme ID'
+        )
+        parser.add_argument(
+            '--policy',
+            type=int,
+            action='append',
+            dest='policy_ids',
+            help='Only generate the document for this policy ID (repeatable)'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Regenerate documents for policies that already have one'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=bulk_document_batch_size(),
+            help='Policies loaded and saved per batch'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=bulk_document_workers(),
+            help='PDF rendering processes (1 renders in this process)'
+        )
+        parser.add_argument(
+            '--queue',
+            action='store_true',
+            help='Run as a Celery task instead of in this process'
+        )
+
+    def handle(self, *args, **options):
+        kwargs = {
+            'scheme_id': options['scheme'],
+            'policy_ids': options['policy_ids'],
+            'missing_only': not options['all'],
+            'batch_size': options['batch_size'],
+            'workers': options['workers'],
+        }
+
+        if options['queue']:
+            from members.tasks import generate_policy_documents as task
+
+            result = task.delay(**kwargs)
+            self.stdout.write(self.style.SUCCESS(f"Queued policy document generation as task {result.id}"))
+            return
+
+        totals = generate_policy_documents(report=self.report_batch, **kwargs)
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['policies']} policies: {totals['generated']} generated, {totals['cached']} from cache, "
+            f"{totals['failed']} failed in {totals['seconds']}s ({totals['per_second']} documents/s)"
+        ))
+        for policy_id, error in totals['failures']:
+            self.stdout.write(self.style.ERROR(f"  Policy {policy_id}: {error}"))
+
+    def report_batch(self, result):
+        done = result.generated + result.cached
+        rate = done / result.seconds if result.seconds else done
+        line = (
+            f"Batch {result.number}: {result.generated} generated, {result.cached} cached, "
+            f"{len(result.failures)} failed in {result.seconds:.1f}s ({rate:.1f}/s)"
+        )
+        self.stdout.write(self.style.WARNING(line) if result.failures else line)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from legacyadmin.pdf_cache import prune_pdf_cache
+
+
+class Command(BaseCommand):
+    help = 'Deletes cached policy document, certificate and receipt PDFs that have not been rendered recently'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Delete cached PDFs written more than this many days ago (default: 30)'
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_pdf_cache(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} cached PDFs"))
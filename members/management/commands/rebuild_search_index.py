@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from members.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the policy search documents behind find policy and search suggestions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Policies indexed per query (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_search_index(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} policies"))
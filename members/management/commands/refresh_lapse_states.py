@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from members.lapse import lapse_batch_size, refresh_lapse_states
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute policy status, lapse warnings and last payment details from '
+        'payments, one window query and bulk update per batch of policies.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scheme',
+            type=int,
+            help='Only refresh policies of this scheme ID'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=lapse_batch_size(),
+            help='Policies read and written per batch'
+        )
+        parser.add_argument(
+            '--queue',
+            action='store_true',
+            help='Run as a Celery task instead of in this process'
+        )
+
+    def handle(self, *args, **options):
+        kwargs = {
+            'scheme_id': options['scheme'],
+            'batch_size': options['batch_size'],
+        }
+
+        if options['queue']:
+            from members.tasks import refresh_lapse_states as task
+
+            result = task.delay(**kwargs)
+            self.stdout.write(self.style.SUCCESS(f"Queued lapse refresh as task {result.id}"))
+            return
+
+        totals = refresh_lapse_states(**kwargs)
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['checked']} policies checked, {totals['updated']} updated: {totals['lapsed']} lapsed, "
+            f"{totals['warning']} at risk, {totals['active']} active in {totals['seconds']}s"
+        ))
@@ -2,23 +2,29 @@ import uuid
 from django.utils import timezone
 from django.conf import settings
 
+from members.session_activity import record_activity
+
 class AutoSaveSessionMiddleware:
     """
     Middleware to ensure sessions have a unique token for auto-save functionality.
-    This middleware also tracks the last activity time for sessions.
+    This middleware also tracks the last activity time for sessions, writing
+    it to the session only once it is stale (see ``members.session_activity``)
+    so that most requests do not save the session.
     """
     
     def __init__(self, get_response):
         self.get_response = get_response
     
     def __call__(self, request):
+        now = timezone.now()
+        
         # Process request - ensure session has auto-save token
         if not request.session.get('autosave_token'):
             request.session['autosave_token'] = str(uuid.uuid4())
-            request.session['autosave_created'] = timezone.now().isoformat()
+            request.session['autosave_created'] = now.isoformat()
         
         # Update last activity time for the session
-        request.session['autosave_last_activity'] = timezone.now().isoformat()
+        record_activity(request.session, now)
         
         # Continue processing the request
         response = self.get_response(request)
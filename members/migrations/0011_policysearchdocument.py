@@ -0,0 +1,107 @@
+# Generated by Django 4.2.21 on 2026-10-18 16:10
+
+import hashlib
+import hmac
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_trigram_index(apps, schema_editor):
+    # The portable fallback searches by prefix on the per-column B-tree indexes
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS members_policysearchdocument_document_trgm '
+        'ON members_policysearchdocument USING gin (document gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS members_policysearchdocument_document_trgm')
+
+
+# Frozen copy of members.search.build_search_document as of this migration,
+# so later changes to the live module cannot change what this backfill does
+
+def normalize_term(value):
+    return ' '.join(str(value or '').split()).lower()
+
+
+def digits(value):
+    return re.sub(r'\D', '', str(value or ''))
+
+
+def id_number_digest(id_number):
+    id_number = digits(id_number)
+    if len(id_number) != 13:
+        return ''
+    return hmac.new(settings.SECRET_KEY.encode(), id_number.encode(), hashlib.sha256).hexdigest()
+
+
+def search_document_fields(policy):
+    member = policy.member
+    fields = {
+        'first_name': normalize_term(member.first_name),
+        'last_name': normalize_term(member.last_name),
+        'phone_number': digits(member.phone_number),
+        'policy_number': normalize_term(policy.policy_number),
+        'uw_membership_number': normalize_term(policy.uw_membership_number),
+        'membership_number': normalize_term(policy.membership_number),
+    }
+    return dict(
+        fields,
+        id_number_digest=id_number_digest(member.id_number),
+        document=' '.join(value for value in fields.values() if value),
+    )
+
+
+def index_existing_policies(apps, schema_editor):
+    Policy = apps.get_model('members', 'Policy')
+    PolicySearchDocument = apps.get_model('members', 'PolicySearchDocument')
+
+    last_pk = 0
+    while True:
+        batch = list(Policy.objects.select_related('member').filter(pk__gt=last_pk).order_by('pk')[:1000])
+        if not batch:
+            return
+        PolicySearchDocument.objects.bulk_create([
+            PolicySearchDocument(policy_id=policy.pk, **search_document_fields(policy))
+            for policy in batch
+        ])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0010_enrollmentlink_short_url_and_provider'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PolicySearchDocument',
+            fields=[
+                ('policy', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='members.policy')),
+                ('first_name', models.CharField(blank=True, db_index=True, max_length=255)),
+                ('last_name', models.CharField(blank=True, db_index=True, max_length=255)),
+                ('phone_number', models.CharField(blank=True, db_index=True, max_length=20)),
+                ('policy_number', models.CharField(blank=True, db_index=True, max_length=20)),
+                ('uw_membership_number', models.CharField(blank=True, db_index=True, max_length=50)),
+                ('membership_number', models.CharField(blank=True, db_index=True, max_length=50)),
+                ('id_number_digest', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('document', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Policy Search Document',
+                'verbose_name_plural': 'Policy Search Documents',
+            },
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.RunPython(index_existing_policies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.21 on 2026-10-18 16:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0011_policysearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='policy',
+            name='last_payment_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='policy',
+            name='last_payment_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='policy',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('ACTIVE', 'Active'), ('LAPSED', 'Lapsed')], db_index=True, default='PENDING', max_length=10),
+        ),
+    ]
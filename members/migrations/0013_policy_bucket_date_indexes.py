@@ -0,0 +1,23 @@
+# Generated by Django 4.2.21 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0012_policy_payment_state'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='policy',
+            name='created_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='policy',
+            name='inception_date',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -80,11 +80,12 @@ class Policy(models.Model):
     membership_number = models.CharField(max_length=50, blank=True, null=True)
     uw_membership_number = models.CharField(max_length=50, blank=True, null=True)
     start_date = models.DateField(null=True, blank=True)
-    inception_date = models.DateField(null=True, blank=True)
+    # Indexed for the dashboard rollup buckets, dated by inception or creation
+    inception_date = models.DateField(null=True, blank=True, db_index=True)
     cover_date = models.DateField(null=True, blank=True)
     policy_number = models.CharField(max_length=20, unique=True, editable=False, null=True, blank=True)
     is_complete = models.BooleanField(default=False)
-    created_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(null=True, blank=True, db_index=True)
     updated_at = models.DateTimeField(null=True, blank=True)
 
     PAYMENT_METHODS = [
@@ -126,6 +127,16 @@ class Policy(models.Model):
     ]
     lapse_warning = models.CharField(max_length=10, choices=LAPSE_WARNING_CHOICES, default='none')
 
+    # Payment state, recomputed in bulk by members.lapse
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('ACTIVE', 'Active'),
+        ('LAPSED', 'Lapsed'),
+    ]
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING', db_index=True)
+    last_payment_date = models.DateField(null=True, blank=True)
+    last_payment_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+
     @property
     def agent(self):
         """Compatibility alias for legacy code paths that still reference policy.agent."""
@@ -173,37 +184,16 @@ class Policy(models.Model):
     def check_lapse_risk(self):
         """
         Check if the policy is at risk of lapsing based on payment history.
-        Updates the lapse_warning field and returns the warning level.
+        Updates the lapse_warning, status and last payment fields and returns
+        the warning level.
         
         Returns:
             str: 'none', 'warning', or 'lapsed'
         """
-        from payments.models import Payment
-        
-        # Get the latest successful payment
-        latest_payment = Payment.objects.filter(
-            policy=self,
-            status='successful'
-        ).order_by('-date').first()
-        
-        if not latest_payment:
-            # No payments found
-            self.lapse_warning = 'warning'
-            self.save(update_fields=['lapse_warning'])
-            return self.lapse_warning
-        
-        # Calculate days since last payment
-        days_since_payment = (timezone.now().date() - latest_payment.date).days
-        
-        # Update lapse warning based on days since last payment
-        if days_since_payment > 60:
-            self.lapse_warning = 'lapsed'
-        elif days_since_payment > 45:
-            self.lapse_warning = 'warning'
-        else:
-            self.lapse_warning = 'none'
-        
-        self.save(update_fields=['lapse_warning'])
+        from members.lapse import refresh_lapse_states
+
+        refresh_lapse_states(policy_ids=[self.pk])
+        self.refresh_from_db(fields=['status', 'lapse_warning', 'last_payment_date', 'last_payment_amount'])
         return self.lapse_warning
 
 
@@ -295,4 +285,36 @@ class DiySignupLog(models.Model):
         return f"{self.agent} – {self.completed_at:%Y-%m-%d %H:%M}"
 
 
+class PolicySearchDocument(models.Model):
+    """
+    Denormalized, lower-cased search terms for one policy.
+
+    Policy search reads this table instead of OR-ing ``icontains`` lookups
+    across the member and policy tables. Rows are refreshed when a Member or
+    Policy is saved (see ``members.signals``) and can be rebuilt with the
+    ``rebuild_search_index`` command. The ID number is encrypted on Member,
+    so only a keyed digest of it is stored for exact matches.
+    """
+    policy = models.OneToOneField(
+        'members.Policy', on_delete=models.CASCADE, primary_key=True, related_name='search_document'
+    )
+    first_name = models.CharField(max_length=255, blank=True, db_index=True)
+    last_name = models.CharField(max_length=255, blank=True, db_index=True)
+    phone_number = models.CharField(max_length=20, blank=True, db_index=True)
+    policy_number = models.CharField(max_length=20, blank=True, db_index=True)
+    uw_membership_number = models.CharField(max_length=50, blank=True, db_index=True)
+    membership_number = models.CharField(max_length=50, blank=True, db_index=True)
+    id_number_digest = models.CharField(max_length=64, blank=True, db_index=True)
+    # All of the above in one column; trigram-indexed on PostgreSQL
+    document = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Policy Search Document')
+        verbose_name_plural = _('Policy Search Documents')
+
+    def __str__(self):
+        return f"Search document for policy {self.policy_id}"
+
+
 from .models_public_enrollment import EnrollmentLink, PublicApplication  # noqa: E402,F401
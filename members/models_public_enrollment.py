@@ -259,6 +259,12 @@ class PublicApplication(models.Model):
     class Meta:
         ordering = ['-created_at']
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Stored status and scheme, so saves can detect a status transition
+        self._original_status = self.__dict__.get('status')
+        self._original_scheme_id = self.__dict__.get('scheme_id')
+    
     def __str__(self):
         return f"{self.application_id} - {self.first_name} {self.last_name}"
     
@@ -0,0 +1,111 @@
+# members/ocr_jobs.py
+"""
+Background ID-document OCR jobs.
+
+An upload is answered at once. If the same image was read before, the
+cached result is returned. Otherwise the caller gets a job id to poll while
+the ``members.tasks.read_id_document`` Celery task reads the document, so
+queued images wait in the broker rather than in web-process memory and
+survive a web worker restart. Job state is kept in the cache, so any web
+worker can answer the poll. A job still pending ``OCR_JOB_STALE_AFTER``
+(300) seconds after it was queued, e.g. because its worker was lost, is
+reported failed.
+"""
+
+import base64
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from legacyadmin.cache import get_cache_timeout
+from members.utils.ocr_processor import (
+    decode_image_data,
+    image_digest,
+    ocr_result_cache_key,
+    read_id_document,
+)
+
+logger = logging.getLogger(__name__)
+
+OCR_JOB_CACHE_PREFIX = 'ocr_job'
+
+PENDING, DONE, FAILED = 'pending', 'done', 'failed'
+
+
+class OCRImageTooLarge(ValueError):
+    """The uploaded image is over ``ocr_max_image_size()`` bytes."""
+
+
+class OCRQueueUnavailable(Exception):
+    """The job could not be handed to the Celery broker."""
+
+
+def ocr_max_image_size():
+    return getattr(settings, 'OCR_MAX_IMAGE_SIZE', 5 * 1024 * 1024)
+
+
+def ocr_job_stale_after():
+    return getattr(settings, 'OCR_JOB_STALE_AFTER', 300)
+
+
+def ocr_job_cache_key(job_id):
+    return f"{OCR_JOB_CACHE_PREFIX}:{job_id}"
+
+
+def save_job(job_id, status, result=None, started_at=None):
+    job = {'job_id': job_id, 'status': status, 'result': result, 'started_at': started_at or time.time()}
+    cache.set(ocr_job_cache_key(job_id), job, get_cache_timeout('ocr_results'))
+    return job
+
+
+def get_ocr_job(job_id):
+    """The job's ``status`` and, once finished, its ``result``; None if unknown or expired."""
+    job = cache.get(ocr_job_cache_key(job_id))
+    if job and job['status'] == PENDING and time.time() - job['started_at'] > ocr_job_stale_after():
+        logger.warning("OCR job %s was not picked up in time", job_id)
+        return save_job(job_id, FAILED, {'error': 'The document could not be read in time.'}, job['started_at'])
+    return job
+
+
+def submit_ocr_job(image_data):
+    """
+    Queue base64 ``image_data`` for reading and return the job. It is
+    already ``done`` when the image was read before.
+
+    Raises:
+        ValueError: The data is not base64
+        OCRImageTooLarge: The image is over ``ocr_max_image_size()`` bytes
+        OCRQueueUnavailable: The job could not be queued
+    """
+    image_bytes = decode_image_data(image_data)
+    if len(image_bytes) > ocr_max_image_size():
+        raise OCRImageTooLarge(len(image_bytes))
+    job_id = uuid.uuid4().hex
+
+    result = cache.get(ocr_result_cache_key(image_digest(image_bytes)))
+    if result is not None:
+        return save_job(job_id, DONE, result)
+
+    from members.tasks import read_id_document as task
+
+    job = save_job(job_id, PENDING)
+    try:
+        task.delay(job_id, base64.b64encode(image_bytes).decode('ascii'))
+    except Exception as exc:
+        logger.exception("Could not queue OCR job %s", job_id)
+        cache.delete(ocr_job_cache_key(job_id))
+        raise OCRQueueUnavailable(str(exc)) from exc
+    return job
+
+
+def run_ocr_job(job_id, image_bytes):
+    started_at = (cache.get(ocr_job_cache_key(job_id)) or {}).get('started_at')
+    try:
+        result = read_id_document(image_bytes)
+    except Exception:
+        logger.exception("OCR job %s failed", job_id)
+        return save_job(job_id, FAILED, {'error': 'The document could not be read.'}, started_at)
+    return save_job(job_id, FAILED if result.get('error') else DONE, result, started_at)
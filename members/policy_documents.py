@@ -6,10 +6,12 @@ Generates PDF policy documents and sends via email to clients
 import io
 import importlib
 import logging
-from datetime import datetime
 from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
 from django.conf import settings
+from django.utils import timezone
+
+from legacyadmin.pdf_cache import cached_pdf
 
 logger = logging.getLogger(__name__)
 
@@ -22,10 +24,16 @@ def _get_pisa():
     return module.pisa
 
 
+PUBLIC_POLICY_DOCUMENT_TEMPLATE = 'members/public_enrollment/policy_document.html'
+
+
 def generate_policy_pdf(application):
     """
     Generate PDF policy document from HTML template
     
+    Served from the PDF render cache while the application, its plan, bank
+    and converted policy are unchanged, for the day it is stamped with.
+    
     Args:
         application: PublicApplication instance
         
@@ -33,52 +41,70 @@ def generate_policy_pdf(application):
         bytes: PDF file content
     """
     try:
-        pisa = _get_pisa()
-
-        # Prepare context data
-        context = {
+        generated_date = timezone.localdate()
+        inputs = {
             'application': application,
-            'policy': application.converted_policy if application.converted_policy else None,
-            'generated_date': datetime.now(),
+            'plan': application.plan,
+            'bank': application.bank,
+            'policy': application.converted_policy,
             'company_name': getattr(settings, 'COMPANY_NAME', 'LegacyGuard'),
             'company_logo': getattr(settings, 'COMPANY_LOGO_URL', ''),
+            # The document prints the day it was generated
+            'generated_date': generated_date,
         }
-        
-        # Render HTML template
-        html_string = render_to_string('members/public_enrollment/policy_document.html', context)
-        
-        # Convert HTML to PDF
-        pdf_buffer = io.BytesIO()
-        pisa.CreatePDF(
-            html_string,
-            dest=pdf_buffer,
-            encoding='UTF-8',
-            pagesize='A4'
+        return cached_pdf(
+            'public_policy_documents', PUBLIC_POLICY_DOCUMENT_TEMPLATE, inputs,
+            lambda: render_policy_pdf(application, generated_date),
         )
         
-        pdf_buffer.seek(0)
-        return pdf_buffer.getvalue()
-        
     except Exception as e:
         logger.error(f"Error generating policy PDF: {str(e)}")
         raise
 
 
+def render_policy_pdf(application, generated_date=None):
+    """Render the public enrollment policy document, stamped ``generated_date``, to PDF bytes."""
+    pisa = _get_pisa()
+
+    # Prepare context data
+    context = {
+        'application': application,
+        'policy': application.converted_policy if application.converted_policy else None,
+        'generated_date': generated_date or timezone.localdate(),
+        'company_name': getattr(settings, 'COMPANY_NAME', 'LegacyGuard'),
+        'company_logo': getattr(settings, 'COMPANY_LOGO_URL', ''),
+    }
+    
+    # Render HTML template
+    html_string = render_to_string(PUBLIC_POLICY_DOCUMENT_TEMPLATE, context)
+    
+    # Convert HTML to PDF
+    pdf_buffer = io.BytesIO()
+    pisa.CreatePDF(
+        html_string,
+        dest=pdf_buffer,
+        encoding='UTF-8',
+        pagesize='A4'
+    )
+    
+    pdf_buffer.seek(0)
+    return pdf_buffer.getvalue()
+
+
 def send_policy_document_email(application):
     """
-    Generate policy PDF and send via email to applicant
+    Queue the policy PDF for email to the applicant. The outbox renders (or
+    reuses the cached) PDF and sends it off the request path.
     
     Args:
         application: PublicApplication instance
         
     Returns:
-        bool: True if email sent successfully
+        bool: True if the email was queued
     """
+    from members.communications.outbox import queue_email
+
     try:
-        # Generate PDF
-        pdf_content = generate_policy_pdf(application)
-        
-        # Prepare email
         subject = f"Your Policy Document - Reference {application.id}"
         
         email_context = {
@@ -107,29 +133,21 @@ Best regards,
 {getattr(settings, 'COMPANY_NAME', 'LegacyGuard')}
 """
         
-        # Send email with PDF attachment
-        email = EmailMessage(
+        queue_email(
+            to=application.email,
             subject=subject,
             body=email_text,
+            html_body=email_html,
             from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[application.email],
-            html_message=email_html,
-        )
-        
-        # Attach PDF
-        email.attach(
-            filename=f"Policy_{application.id}.pdf",
-            content=pdf_content,
-            mimetype='application/pdf'
+            kind='public_policy_document',
+            object_id=application.pk,
+            unique=True,
         )
-        
-        # Send
-        email.send()
-        logger.info(f"Policy document email sent to {application.email} for application {application.id}")
+        logger.info(f"Policy document email queued for {application.email} for application {application.id}")
         return True
         
     except Exception as e:
-        logger.error(f"Error sending policy document email: {str(e)}")
+        logger.error(f"Error queueing policy document email: {str(e)}")
         return False
 
 
@@ -0,0 +1,394 @@
+"""
+Policy search backed by the ``PolicySearchDocument`` table.
+
+Each policy has one search document holding lower-cased names, numbers and
+the phone number's digits. Queries are split into terms and every term must
+match one of the indexed columns by prefix, which keeps typeahead on plain
+B-tree indexes. On PostgreSQL the combined ``document`` column carries a
+pg_trgm GIN index, so terms also match anywhere inside a name or number.
+
+Matches are ranked (``search_rank``) with exact number or ID matches first,
+then number prefixes, surnames, first names and phone numbers.
+``suggest_policies`` serves typeahead (cached per user scope by
+``cached_suggestions``); ``search_policies`` filters the querysets behind
+the find policy page and its exports.
+"""
+import hashlib
+import hmac
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from legacyadmin.cache import get_cache_timeout
+
+from .models import Policy, PolicySearchDocument
+
+SEARCH_FIELDS = (
+    'first_name', 'last_name', 'phone_number', 'policy_number',
+    'uw_membership_number', 'membership_number', 'id_number_digest', 'document',
+)
+NUMBER_FIELDS = ('policy_number', 'uw_membership_number', 'membership_number')
+ID_NUMBER_LENGTH = 13
+# Shorter terms match too much of the table to be worth a trigram scan
+MIN_TRIGRAM_TERM = 3
+
+
+def normalize_term(value):
+    return ' '.join(str(value or '').split()).lower()
+
+
+def digits(value):
+    return re.sub(r'\D', '', str(value or ''))
+
+
+def id_number_digest(id_number):
+    """Keyed digest of an ID number, or '' when it is not a full ID number."""
+    id_number = digits(id_number)
+    if len(id_number) != ID_NUMBER_LENGTH:
+        return ''
+    return hmac.new(settings.SECRET_KEY.encode(), id_number.encode(), hashlib.sha256).hexdigest()
+
+
+def build_search_document(policy):
+    """Build the unsaved search document for a policy (``member`` should be loaded)."""
+    member = policy.member
+    fields = {
+        'first_name': normalize_term(member.first_name),
+        'last_name': normalize_term(member.last_name),
+        'phone_number': digits(member.phone_number),
+        'policy_number': normalize_term(policy.policy_number),
+        'uw_membership_number': normalize_term(policy.uw_membership_number),
+        'membership_number': normalize_term(policy.membership_number),
+    }
+    return PolicySearchDocument(
+        policy_id=policy.pk,
+        id_number_digest=id_number_digest(member.id_number),
+        document=' '.join(value for value in fields.values() if value),
+        **fields
+    )
+
+
+def index_policies(policies, batch_size=1000):
+    """Insert or refresh the search documents of the given policies."""
+    documents = [build_search_document(policy) for policy in policies]
+    # MySQL upserts on any unique key and rejects an explicit conflict target
+    unique_fields = ['policy'] if connection.features.supports_update_conflicts_with_target else None
+    PolicySearchDocument.objects.bulk_create(
+        documents,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=list(SEARCH_FIELDS) + ['updated_at'],
+    )
+    return len(documents)
+
+
+def index_policy_ids(policy_ids):
+    return index_policies(Policy.objects.select_related('member').filter(pk__in=list(policy_ids)))
+
+
+def index_member_policies(member_id):
+    return index_policies(Policy.objects.select_related('member').filter(member_id=member_id))
+
+
+def rebuild_search_index(batch_size=1000):
+    """
+    Rebuild every policy search document.
+
+    Returns:
+        int: Number of documents written
+    """
+    count = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            Policy.objects.select_related('member')
+            .filter(pk__gt=last_pk)
+            .order_by('pk')[:batch_size]
+        )
+        if not batch:
+            return count
+        count += index_policies(batch, batch_size=batch_size)
+        last_pk = batch[-1].pk
+
+
+DOCUMENT = 'search_document__'
+
+
+def uses_trigram_index():
+    return connection.vendor == 'postgresql'
+
+
+def prefix_match(field, term):
+    """Prefix lookup on a search document column that can use its B-tree index."""
+    lookup = f'{DOCUMENT}{field}'
+    if connection.vendor == 'sqlite':
+        # SQLite never indexes its case-insensitive LIKE; the columns are lower-cased, so a range is equivalent
+        return Q(**{f'{lookup}__gte': term, f'{lookup}__lt': term + '\uffff'})
+    return Q(**{f'{lookup}__startswith': term})
+
+
+def query_terms(query):
+    """Split a normalized query into terms; spaced-out phone and ID numbers stay one term."""
+    compact = query.replace(' ', '')
+    if compact.lstrip('+').isdigit():
+        return [digits(compact)]
+    return query.split()
+
+
+def term_filter(term):
+    """Lookups one query term has to satisfy."""
+    if uses_trigram_index() and len(term) >= MIN_TRIGRAM_TERM:
+        match = Q(**{f'{DOCUMENT}document__contains': term})
+    else:
+        match = Q()
+        for field in ('first_name', 'last_name') + NUMBER_FIELDS:
+            match |= prefix_match(field, term)
+
+    if term.isdigit():
+        match |= prefix_match('phone_number', term)
+        digest = id_number_digest(term)
+        if digest:
+            match |= Q(**{f'{DOCUMENT}id_number_digest': digest})
+    return match
+
+
+def rank_tiers(terms):
+    """
+    ``(rank, Q, ordering)`` for each kind of match, best first. Each prefix
+    tier is ordered by the column it matches on so its index returns the
+    first rows without sorting every match.
+    """
+    phrase = ' '.join(terms)
+    exact = Q()
+    for field in NUMBER_FIELDS:
+        exact |= Q(**{f'{DOCUMENT}{field}': phrase})
+    digest = id_number_digest(phrase)
+    if digest:
+        exact |= Q(**{f'{DOCUMENT}id_number_digest': digest})
+
+    tiers = [(5, exact, '-pk')]
+    tiers += [(4, prefix_match(field, phrase), f'{DOCUMENT}{field}') for field in NUMBER_FIELDS]
+    tiers += [
+        (3, prefix_match('last_name', terms[0]), f'{DOCUMENT}last_name'),
+        (2, prefix_match('first_name', terms[0]), f'{DOCUMENT}first_name'),
+        (1, prefix_match('phone_number', terms[0]), f'{DOCUMENT}phone_number'),
+    ]
+    if uses_trigram_index():
+        # Matches inside a name or number, which no prefix tier covers
+        tiers.append((0, Q(), '-pk'))
+    return tiers
+
+
+def match_terms(queryset, terms):
+    for term in terms:
+        queryset = queryset.filter(term_filter(term))
+    return queryset
+
+
+def search_policies(queryset, query):
+    """
+    Narrow a Policy queryset to policies matching every term of ``query``.
+
+    Returns:
+        QuerySet: ``queryset`` filtered and annotated with ``search_rank``;
+        order by ``-search_rank`` for relevance
+    """
+    terms = query_terms(normalize_term(query))
+    if not terms:
+        return queryset
+
+    rank = Case(
+        *[When(tier, then=Value(value)) for value, tier, _ in rank_tiers(terms)],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return match_terms(queryset, terms).annotate(search_rank=rank)
+
+
+def suggest_policies(queryset, query, limit=10):
+    """
+    Best ``limit`` matches for typeahead.
+
+    Rather than ranking every match, each rank tier is fetched with its own
+    ``LIMIT`` query until enough suggestions are found, so a short prefix
+    matching much of the book costs a few index reads instead of a sort.
+
+    Returns:
+        list: Policy instances, each with ``search_rank`` set
+    """
+    terms = query_terms(normalize_term(query))
+    if not terms:
+        return []
+
+    matching = match_terms(queryset, terms)
+    suggestions = []
+    for rank, tier, ordering in rank_tiers(terms):
+        remaining = limit - len(suggestions)
+        if remaining <= 0:
+            break
+        found = matching.filter(tier).exclude(pk__in=[policy.pk for policy in suggestions])
+        for policy in found.order_by(ordering)[:remaining]:
+            policy.search_rank = rank
+            suggestions.append(policy)
+    return suggestions
+
+
+def find_exact_policy(queryset, query):
+    """The policy whose policy or UW membership number is exactly ``query``, if any."""
+    query = normalize_term(query)
+    if not query:
+        return None
+    return queryset.filter(
+        Q(**{f'{DOCUMENT}policy_number': query}) |
+        Q(**{f'{DOCUMENT}uw_membership_number': query})
+    ).first()
+
+
+# Typeahead cache
+#
+# Suggestions are cached per query and per user scope for a few seconds.
+# Index changes do not invalidate them: they show up once the entries
+# expire, so busy indexing cannot empty every scope's cache.
+# Each entry holds up to SUGGESTION_POOL ranked candidates; when the pool
+# holds every match it is "complete", and a longer query extending it is
+# answered by re-matching the pooled candidates in memory.
+
+SUGGESTION_CACHE_PREFIX = 'policy_suggestions'
+SUGGESTION_POOL = 50
+MIN_SUGGESTION_QUERY = 2
+
+
+def suggestion_cache_key(scope, query):
+    digest = hashlib.md5(query.encode()).hexdigest()
+    return f'{SUGGESTION_CACHE_PREFIX}:{scope}:{digest}'
+
+
+def match_tier(fields, terms):
+    """
+    In-memory counterpart of ``rank_tiers``/``term_filter`` for a cached
+    candidate: ``(tier index, ordering value)``, or None if it does not match.
+    """
+    for term in terms:
+        if uses_trigram_index() and len(term) >= MIN_TRIGRAM_TERM:
+            found = term in fields['document']
+        else:
+            found = any(fields[field].startswith(term) for field in ('first_name', 'last_name') + NUMBER_FIELDS)
+        if term.isdigit():
+            digest = id_number_digest(term)
+            found = found or fields['phone_number'].startswith(term) or bool(digest and fields['id_number_digest'] == digest)
+        if not found:
+            return None
+
+    phrase = ' '.join(terms)
+    digest = id_number_digest(phrase)
+    if any(fields[field] == phrase for field in NUMBER_FIELDS) or (digest and fields['id_number_digest'] == digest):
+        return 0, -fields['pk']
+    for index, field in enumerate(NUMBER_FIELDS, start=1):
+        if fields[field].startswith(phrase):
+            return index, fields[field]
+    for index, field in enumerate(('last_name', 'first_name', 'phone_number'), start=len(NUMBER_FIELDS) + 1):
+        if fields[field].startswith(terms[0]):
+            return index, fields[field]
+    return len(NUMBER_FIELDS) + 4, -fields['pk']
+
+
+def narrows(prefix_terms, terms):
+    """Whether every match of ``terms`` is also a match of ``prefix_terms``."""
+    if len(prefix_terms) > len(terms):
+        return False
+    for old, new in zip(prefix_terms, terms):
+        if not new.startswith(old):
+            return False
+        # A term switching from prefix to substring matching, or becoming a full ID number, can match more
+        if uses_trigram_index() and len(old) < MIN_TRIGRAM_TERM <= len(new):
+            return False
+        if id_number_digest(new) and not id_number_digest(old):
+            return False
+    return True
+
+
+def refilter_candidates(candidates, terms):
+    ranked = []
+    for candidate in candidates:
+        tier = match_tier(candidate['fields'], terms)
+        if tier is not None:
+            ranked.append((tier, candidate))
+    ranked.sort(key=lambda item: item[0])
+    return [candidate for _, candidate in ranked]
+
+
+def without_fields(candidate):
+    return {key: value for key, value in candidate.items() if key != 'fields'}
+
+
+def present_candidates(candidates, terms, limit):
+    """Strip the matching fields and pick out the exact number match."""
+    phrase = ' '.join(terms)
+    exact_match = None
+    for candidate in candidates:
+        fields = candidate['fields']
+        if phrase in (fields['policy_number'], fields['uw_membership_number']):
+            exact_match = candidate
+            break
+    suggestions = [without_fields(candidate) for candidate in candidates[:limit]]
+    return suggestions, exact_match and without_fields(exact_match)
+
+
+def cached_suggestions(queryset, query, scope, serialize, limit=10):
+    """
+    Typeahead suggestions for ``query`` within a user scope.
+
+    Args:
+        queryset: Policies the scope may see
+        query: Text typed so far
+        scope: Cache key component identifying the scope of ``queryset``
+        serialize: Builds the JSON-ready dict for one Policy
+        limit: Number of suggestions returned
+
+    Returns:
+        tuple: ``(suggestions, exact_match)`` -- serialized suggestions, best
+        first, and the one whose policy or UW membership number equals the
+        query (or None)
+    """
+    from legacyadmin.metrics import SEARCH_SUGGESTION_CACHE
+
+    normalized = normalize_term(query)
+    terms = query_terms(normalized)
+    if len(normalized) < MIN_SUGGESTION_QUERY or not terms:
+        return [], None
+
+    timeout = get_cache_timeout('search_suggestions')
+    key = suggestion_cache_key(scope, normalized)
+
+    # One round trip for the query itself and every shorter prefix of it
+    prefixes = [normalized[:length].strip() for length in range(len(normalized), MIN_SUGGESTION_QUERY - 1, -1)]
+    keys = {prefix: suggestion_cache_key(scope, prefix) for prefix in prefixes if prefix}
+    entries = cache.get_many(list(keys.values()))
+
+    entry = entries.get(key)
+    if entry is not None:
+        SEARCH_SUGGESTION_CACHE.labels(result='hit').inc()
+        return present_candidates(entry['candidates'], terms, limit)
+
+    for prefix in prefixes[1:]:
+        pooled = entries.get(keys.get(prefix))
+        if pooled is not None and pooled['complete'] and narrows(query_terms(prefix), terms):
+            SEARCH_SUGGESTION_CACHE.labels(result='prefix').inc()
+            candidates = refilter_candidates(pooled['candidates'], terms)
+            cache.set(key, {'candidates': candidates, 'complete': True}, timeout)
+            return present_candidates(candidates, terms, limit)
+
+    SEARCH_SUGGESTION_CACHE.labels(result='miss').inc()
+    policies = suggest_policies(queryset.select_related('search_document'), normalized, limit=SUGGESTION_POOL)
+    candidates = []
+    for policy in policies:
+        document = policy.search_document
+        fields = {field: getattr(document, field) for field in SEARCH_FIELDS}
+        fields['pk'] = policy.pk
+        candidates.append(dict(serialize(policy), fields=fields))
+    cache.set(key, {'candidates': candidates, 'complete': len(candidates) < SUGGESTION_POOL}, timeout)
+    return present_candidates(candidates, terms, limit)
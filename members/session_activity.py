@@ -0,0 +1,25 @@
+"""
+Session activity tracking that avoids a session write per request.
+
+The last activity time is stored in the session only when the stored value
+is older than ``AUTOSAVE_ACTIVITY_INTERVAL`` seconds (300 by default).
+Writing it then also saves the session and extends its expiry, so the
+stored time may lag the latest request by up to that interval.
+"""
+from datetime import datetime
+
+from django.conf import settings
+
+
+def activity_interval():
+    return getattr(settings, 'AUTOSAVE_ACTIVITY_INTERVAL', 300)
+
+
+def record_activity(session, now):
+    """
+    Note activity on ``session`` at ``now``, changing the session only when
+    its stored activity time is stale.
+    """
+    stored = session.get('autosave_last_activity')
+    if stored is None or (now - datetime.fromisoformat(stored)).total_seconds() >= activity_interval():
+        session['autosave_last_activity'] = now.isoformat()
@@ -0,0 +1,54 @@
+"""
+Signal handlers keeping ``PolicySearchDocument`` and the cached enrollment
+statistics current.
+
+A Policy or Member save re-indexes the affected policies once the
+surrounding transaction commits, so a rolled-back save never reaches the
+search index. ``bulk_create`` skips these handlers; callers that bulk-insert
+policies index them with ``members.search.index_policies``.
+
+A public application that is created, deleted or changes status drops the
+statistics cached for its scheme.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Member, Policy
+from .models_public_enrollment import PublicApplication
+from .search import index_member_policies, index_policy_ids
+from .utils_public_enrollment import invalidate_enrollment_statistics
+
+
+@receiver(post_save, sender=Policy)
+def policy_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(partial(index_policy_ids, [instance.pk]))
+
+
+@receiver(post_save, sender=Member)
+def member_saved(sender, instance, created=False, raw=False, **kwargs):
+    # A new member has no policies to index yet
+    if raw or created:
+        return
+    transaction.on_commit(partial(index_member_policies, instance.pk))
+
+
+@receiver(post_save, sender=PublicApplication)
+def application_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    previous = (instance._original_status, instance._original_scheme_id)
+    if created or previous != (instance.status, instance.scheme_id):
+        transaction.on_commit(partial(
+            invalidate_enrollment_statistics, {instance.scheme_id, instance._original_scheme_id}
+        ))
+    instance._original_status, instance._original_scheme_id = instance.status, instance.scheme_id
+
+
+@receiver(post_delete, sender=PublicApplication)
+def application_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_enrollment_statistics, [instance.scheme_id]))
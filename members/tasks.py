@@ -0,0 +1,79 @@
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(
+    name="members.tasks.generate_policy_documents",
+    bind=True,
+    # Redeliver if the worker dies; finished batches are skipped as their documents are saved
+    acks_late=True,
+    reject_on_worker_lost=True,
+)
+def generate_policy_documents(self, scheme_id=None, policy_ids=None, missing_only=True, batch_size=None, workers=None):
+    """
+    Generate and store policy documents in bulk.
+
+    Args:
+        scheme_id: Only policies of this scheme
+        policy_ids: Only these policies
+        missing_only: Skip policies that already have a document
+        batch_size: Policies loaded and saved together
+        workers: PDF conversion processes
+    """
+    from members.bulk_documents import generate_policy_documents as run
+
+    logger.info(f"Starting bulk policy document generation (scheme={scheme_id})")
+    totals = run(
+        scheme_id=scheme_id,
+        policy_ids=policy_ids,
+        missing_only=missing_only,
+        batch_size=batch_size,
+        workers=workers,
+    )
+    logger.info(
+        f"Bulk policy documents done: {totals['generated']} generated, {totals['cached']} cached, "
+        f"{totals['failed']} failed in {totals['seconds']}s ({totals['per_second']}/s)"
+    )
+    return totals
+
+
+@shared_task(
+    name="members.tasks.refresh_lapse_states",
+    bind=True,
+)
+def refresh_lapse_states(self, scheme_id=None, batch_size=None):
+    """
+    Recompute policy status, lapse warnings and last payment details.
+
+    Args:
+        scheme_id: Only policies of this scheme
+        batch_size: Policies read and written together
+    """
+    from members.lapse import refresh_lapse_states as run
+
+    return run(scheme_id=scheme_id, batch_size=batch_size)
+
+
+@shared_task(
+    name="members.tasks.read_id_document",
+    bind=True,
+    # Redeliver if the worker dies; a job that is never finished is reported failed by its poll
+    acks_late=True,
+    reject_on_worker_lost=True,
+)
+def read_id_document(self, job_id, image_data):
+    """
+    Read an ID document queued by ``members.ocr_jobs.submit_ocr_job``.
+
+    Args:
+        job_id: OCR job to store the result under
+        image_data: The image, base64 encoded
+    """
+    import base64
+
+    from members.ocr_jobs import run_ocr_job
+
+    return run_ocr_job(job_id, base64.b64decode(image_data))['status']
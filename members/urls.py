@@ -19,6 +19,7 @@ from .views_ai_search import ai_search_assistant
 from .views_ai_summary import generate_policy_summary
 from .views_ai import get_payment_ai_summary
 from .views_short_links import diy_short_redirect
+from .views_api import id_document_job_status, process_id_document_api
 
 # Import the DIY URLs
 from .urls_diy import urlpatterns as diy_urls
@@ -71,6 +72,8 @@ urlpatterns = [
     path('api/search-suggestions/',                             search_suggestions,              name='search_suggestions'),
     path('api/ai-search-assistant/',                            ai_search_assistant,             name='ai_search_assistant'),
     path('api/policy/<int:policy_id>/ai-summary/',              generate_policy_summary,         name='generate_policy_summary'),
+    path('api/process-id-document/',                            process_id_document_api,         name='process_id_document'),
+    path('api/process-id-document/<str:job_id>/',               id_document_job_status,          name='id_document_job'),
     path('export-search-results/',                              export_search_results,           name='export_search_results'),
     path('policy/create/step7/<int:pk>/resend-otp/',            resend_policy_otp,              name='resend_otp'),
     
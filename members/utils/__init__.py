@@ -8,5 +8,11 @@ from .validation import luhn_check, validate_sa_id
 # Import age calculation functions
 from .age_utils import get_member_age_from_dob, get_age_range
 
+# Import plan eligibility functions
+from .plan_utils import get_filtered_plans, get_cover_amount_for_dependent
+
 # Make these functions available when importing from members.utils
-__all__ = ['luhn_check', 'validate_sa_id', 'get_member_age_from_dob', 'get_age_range']
\ No newline at end of file
+__all__ = [
+    'luhn_check', 'validate_sa_id', 'get_member_age_from_dob', 'get_age_range',
+    'get_filtered_plans', 'get_cover_amount_for_dependent',
+]
\ No newline at end of file
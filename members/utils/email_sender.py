@@ -1,21 +1,21 @@
 # members/utils/email_sender.py
 
 import logging
-from django.core.mail import EmailMessage
 from django.conf import settings
-from django.utils import timezone
+
+from members.communications.outbox import queue_email
 
 logger = logging.getLogger(__name__)
 
 def send_policy_document_email(policy):
     """
-    Send the policy document as an email attachment to the member.
+    Queue the policy document as an email attachment to the member.
     
     Args:
         policy: The Policy model instance
         
     Returns:
-        bool: True if the email was sent successfully, False otherwise
+        bool: True if the email was queued (or already sent), False otherwise
     """
     member = policy.member
     
@@ -33,10 +33,8 @@ def send_policy_document_email(policy):
         logger.info(f"Policy document email already sent to {member.email} at {policy.email_sent_at}")
         return True
     
-    try:
-        # Prepare email
-        subject = "Your Legacy Guard Policy Document"
-        body = f"""Dear {member.get_full_name()},
+    subject = "Your Legacy Guard Policy Document"
+    body = f"""Dear {member.first_name} {member.last_name},
 
 Attached is your official Legacy Guard policy document.
 
@@ -45,30 +43,17 @@ Thank you for choosing Legacy Guard for your funeral cover.
 Best regards,
 Legacy Guard Support Team
 """
-        from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'policies@legacyguard.co.za')
-        
-        # Create email message
-        email = EmailMessage(
-            subject=subject,
-            body=body,
-            from_email=from_email,
-            to=[member.email],
-        )
-        
-        # Attach the policy document
-        document_name = f"LegacyPolicy_{policy.policy_number}.pdf"
-        email.attach(document_name, policy.document.read(), 'application/pdf')
-        
-        # Send the email
-        email.send(fail_silently=False)
-        
-        # Update the policy to record that the email was sent
-        policy.email_sent_at = timezone.now()
-        policy.save(update_fields=['email_sent_at'])
-        
-        logger.info(f"Policy document email sent successfully to {member.email}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"Failed to send policy document email to {member.email}: {str(e)}")
-        return False
+    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'policies@legacyguard.co.za')
+
+    # Sent from the outbox, which attaches the cached document and records email_sent_at
+    queue_email(
+        to=member.email,
+        subject=subject,
+        body=body,
+        from_email=from_email,
+        kind='policy_document',
+        object_id=policy.pk,
+        unique=True,
+    )
+    logger.info(f"Policy document email queued for {member.email}")
+    return True
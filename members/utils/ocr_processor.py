@@ -2,14 +2,73 @@ import io
 import re
 import logging
 import base64
+import hashlib
 from datetime import datetime
 import pytesseract
-from PIL import Image
-import requests
+from PIL import Image, ImageOps
 from django.conf import settings
+from django.core.cache import cache
+
+from legacyadmin.cache import get_cache_timeout
+from settings_app.utils.ai_client import AIClientError, get_api_key, request_completion
 
 logger = logging.getLogger(__name__)
 
+OCR_RESULT_CACHE_PREFIX = 'ocr_result'
+
+# Grey level at or above which a pixel becomes white when binarizing
+BINARIZE_THRESHOLD = 150
+
+# Tesseract settings for the single-line, digits-only ID number pass
+ID_LINE_CONFIG = '--psm 7 -c tessedit_char_whitelist=0123456789'
+
+EMPTY_RESULT = {
+    'id_number': None,
+    'full_name': None,
+    'date_of_birth': None,
+    'gender': None,
+}
+
+
+def decode_image_data(image_data):
+    """Decode base64 image data, with or without a data URL prefix, to bytes."""
+    if image_data.startswith('data:image'):
+        # Remove the data URL prefix
+        image_data = image_data.split(',', 1)[1]
+    return base64.b64decode(image_data)
+
+
+def image_digest(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def ocr_result_cache_key(digest):
+    return f"{OCR_RESULT_CACHE_PREFIX}:{digest}"
+
+
+def preprocess_image(image_bytes):
+    """
+    Decode an uploaded image once and prepare it for recognition.
+
+    Returns ``(greyscale, binary)``: the photo upright, greyscale and scaled
+    down to ``OCR_MAX_DIMENSION`` pixels on its longest side, and the same
+    image thresholded to black and white for Tesseract.
+    """
+    max_dimension = getattr(settings, 'OCR_MAX_DIMENSION', 1600)
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(image_bytes)))
+    greyscale = image.convert('L')
+    greyscale.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    greyscale = ImageOps.autocontrast(greyscale)
+    binary = greyscale.point(lambda value: 255 if value >= BINARIZE_THRESHOLD else 0)
+    return greyscale, binary
+
+
+def encode_jpeg(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=85)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
 def process_id_document(image_data):
     """
     Process an ID document image to extract personal information.
@@ -21,47 +80,47 @@ def process_id_document(image_data):
         dict: Extracted information (id_number, full_name, date_of_birth, gender)
     """
     try:
-        # First try with OpenAI Vision API if configured
-        if hasattr(settings, 'OPENAI_API_KEY') and settings.OPENAI_API_KEY:
-            result = process_with_openai_vision(image_data)
-            if result and result.get('id_number'):
-                return result
-        
-        # Fallback to Tesseract OCR
-        return process_with_tesseract(image_data)
+        return read_id_document(decode_image_data(image_data))
     except Exception as e:
         logger.error(f"Error processing ID document: {str(e)}")
-        return {
-            'id_number': None,
-            'full_name': None,
-            'date_of_birth': None,
-            'gender': None,
-            'error': str(e)
-        }
+        return dict(EMPTY_RESULT, error=str(e))
+
+
+def read_id_document(image_bytes):
+    """
+    Extract ID details from raw image bytes, reusing the result for an
+    image that was read before.
+    """
+    key = ocr_result_cache_key(image_digest(image_bytes))
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    greyscale, binary = preprocess_image(image_bytes)
+
+    result = None
+    # First try with OpenAI Vision API if configured
+    if get_api_key():
+        result = process_with_openai_vision(encode_jpeg(greyscale))
+    if not (result and result.get('id_number')):
+        # Fallback to Tesseract OCR
+        result = process_with_tesseract(binary)
+
+    if not result.get('error'):
+        cache.set(key, result, get_cache_timeout('ocr_results'))
+    return result
 
 def process_with_openai_vision(image_data):
     """
     Process ID document using OpenAI Vision API
     
     Args:
-        image_data (str): Base64 encoded image data
+        image_data (str): Base64 encoded JPEG image data
         
     Returns:
         dict: Extracted information
     """
     try:
-        api_key = settings.OPENAI_API_KEY
-        
-        # Prepare the image data
-        if image_data.startswith('data:image'):
-            # Remove the data URL prefix
-            image_data = image_data.split(',')[1]
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-        
         payload = {
             "model": "gpt-4-vision-preview",
             "messages": [
@@ -84,66 +143,58 @@ def process_with_openai_vision(image_data):
             "max_tokens": 300
         }
         
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers=headers,
-            json=payload
-        )
+        # Sent through the shared AI client for its pooled session, timeouts and circuit breaker
+        content = request_completion(payload)
         
-        if response.status_code == 200:
-            result = response.json()
-            content = result['choices'][0]['message']['content']
-            
-            # Extract JSON from response
-            import json
-            import re
+        # Extract JSON from response
+        import json
+        
+        # Try to find JSON in the response
+        json_match = re.search(r'\{.*\}', content, re.DOTALL)
+        if json_match:
+            extracted_data = json.loads(json_match.group(0))
             
-            # Try to find JSON in the response
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                extracted_data = json.loads(json_match.group(0))
+            # Validate ID number
+            if extracted_data.get('id_number') and validate_sa_id(extracted_data['id_number']):
+                # If date of birth is not in the right format, try to extract from ID
+                if not extracted_data.get('date_of_birth') and extracted_data.get('id_number'):
+                    extracted_data['date_of_birth'] = extract_dob_from_id(extracted_data['id_number'])
                 
-                # Validate ID number
-                if extracted_data.get('id_number') and validate_sa_id(extracted_data['id_number']):
-                    # If date of birth is not in the right format, try to extract from ID
-                    if not extracted_data.get('date_of_birth') and extracted_data.get('id_number'):
-                        extracted_data['date_of_birth'] = extract_dob_from_id(extracted_data['id_number'])
-                    
-                    # If gender is not extracted, try to extract from ID
-                    if not extracted_data.get('gender') and extracted_data.get('id_number'):
-                        extracted_data['gender'] = extract_gender_from_id(extracted_data['id_number'])
-                    
-                    return extracted_data
+                # If gender is not extracted, try to extract from ID
+                if not extracted_data.get('gender') and extracted_data.get('id_number'):
+                    extracted_data['gender'] = extract_gender_from_id(extracted_data['id_number'])
+                
+                return extracted_data
         
+        return None
+    except AIClientError as e:
+        logger.warning(f"OpenAI Vision unavailable: {str(e)}")
         return None
     except Exception as e:
         logger.error(f"Error with OpenAI Vision: {str(e)}")
         return None
 
-def process_with_tesseract(image_data):
+def process_with_tesseract(image):
     """
     Process ID document using Tesseract OCR
     
     Args:
-        image_data (str): Base64 encoded image data
+        image: Binarized PIL image from ``preprocess_image``, or base64
+            encoded image data
         
     Returns:
         dict: Extracted information
     """
     try:
-        # Convert base64 to image
-        if image_data.startswith('data:image'):
-            # Remove the data URL prefix
-            image_data = image_data.split(',')[1]
+        if isinstance(image, str):
+            image = preprocess_image(decode_image_data(image))[1]
         
-        image_bytes = base64.b64decode(image_data)
-        image = Image.open(io.BytesIO(image_bytes))
+        # One full-page pass gives both the text and where each line sits
+        lines = ocr_lines(pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT))
+        text = '\n'.join(line for line, box in lines)
         
-        # Extract text using Tesseract
-        text = pytesseract.image_to_string(image)
-        
-        # Extract ID number
-        id_number = extract_id_number(text)
+        # Extract ID number, re-reading the likeliest ID line if the page pass missed it
+        id_number = extract_id_number(text) or read_id_line(image, lines)
         
         # Extract name
         full_name = extract_name(text)
@@ -164,13 +215,42 @@ def process_with_tesseract(image_data):
         }
     except Exception as e:
         logger.error(f"Error with Tesseract OCR: {str(e)}")
-        return {
-            'id_number': None,
-            'full_name': None,
-            'date_of_birth': None,
-            'gender': None,
-            'error': str(e)
-        }
+        return dict(EMPTY_RESULT, error=str(e))
+
+def ocr_lines(data):
+    """Group Tesseract word data into ``(text, (left, top, right, bottom))`` lines."""
+    lines = {}
+    for index, word in enumerate(data['text']):
+        if not word.strip():
+            continue
+        key = (data['block_num'][index], data['par_num'][index], data['line_num'][index])
+        left, top = data['left'][index], data['top'][index]
+        right, bottom = left + data['width'][index], top + data['height'][index]
+        words, box = lines.get(key, ([], (left, top, right, bottom)))
+        words.append(word.strip())
+        lines[key] = (words, (min(box[0], left), min(box[1], top), max(box[2], right), max(box[3], bottom)))
+    return [(' '.join(words), box) for words, box in lines.values()]
+
+def read_id_line(image, lines, padding=8):
+    """
+    Re-read the lines most likely to hold the 13-digit ID number on their
+    own, enlarged and restricted to digits.
+    """
+    candidates = sorted(
+        (line for line in lines if sum(char.isdigit() for char in line[0]) >= 10),
+        key=lambda line: -sum(char.isdigit() for char in line[0]),
+    )
+    for text, (left, top, right, bottom) in candidates[:3]:
+        region = image.crop((
+            max(left - padding, 0), max(top - padding, 0),
+            min(right + padding, image.width), min(bottom + padding, image.height),
+        ))
+        region = region.resize((region.width * 2, region.height * 2), Image.LANCZOS)
+        digits = re.sub(r'\D', '', pytesseract.image_to_string(region, config=ID_LINE_CONFIG))
+        for start in range(len(digits) - 12):
+            if validate_sa_id(digits[start:start + 13]):
+                return digits[start:start + 13]
+    return None
 
 def extract_id_number(text):
     """Extract South African ID number from text"""
@@ -6,7 +6,8 @@ from django.template.loader import get_template
 from django.http import HttpResponse
 from django.conf import settings
 from django.core.files.base import ContentFile
-from django.db.models import Sum
+
+from legacyadmin.pdf_cache import cached_pdf
 
 
 def _get_weasyprint():
@@ -18,47 +19,68 @@ def _get_weasyprint():
         ) from exc
     return HTML, CSS
 
+
+POLICY_DOCUMENT_TEMPLATE = 'members/pdf/policy_document.html'
+
+
+POLICY_DOCUMENT_KIND = 'policy_documents'
+
+
+def policy_document_inputs(policy):
+    """Everything the policy document depends on, as passed to the PDF cache."""
+    return {
+        'policy': policy,
+        'member': policy.member,
+        'scheme': policy.scheme,
+        # The plan carries the underwriter the document names
+        'plan': policy.plan,
+        'bank': policy.bank,
+        'dependents': policy.dependents.all(),
+        'beneficiaries': policy.beneficiaries.all(),
+    }
+
+
+def policy_document_filename(policy):
+    return f"LegacyPolicy_{policy.policy_number}.pdf"
+
+
 def generate_policy_document(policy):
     """
     Generate a PDF policy document for a given policy.
     
+    The PDF is served from the render cache while the policy, member, scheme,
+    plan, bank, dependents, beneficiaries and template are unchanged.
+    
     Args:
         policy: The Policy model instance
         
     Returns:
         ContentFile: A Django ContentFile containing the PDF
     """
-    # Get related data
-    member = policy.member
-    
-    # Get spouse if exists
-    spouse = policy.dependent_set.filter(relationship_type='SPOUSE').first()
-    
-    # Get children
-    children = policy.dependent_set.filter(relationship_type='CHILD')
-    
-    # Get extended family
-    extended_family = policy.dependent_set.filter(
-        relationship_type__in=['PARENT', 'PARENT_IN_LAW', 'EXTENDED']
+    inputs = policy_document_inputs(policy)
+    content = cached_pdf(
+        POLICY_DOCUMENT_KIND, POLICY_DOCUMENT_TEMPLATE, inputs,
+        lambda: render_policy_document(policy, inputs['member'], inputs['dependents'], inputs['beneficiaries']),
     )
+    return ContentFile(content, name=policy_document_filename(policy))
+
+
+def render_policy_document(policy, member, dependents, beneficiaries):
+    """Render the policy document template and convert it to PDF bytes."""
+    return html_to_pdf(policy_document_html(policy, member, dependents, beneficiaries))
+
+
+def policy_document_html(policy, member, dependents, beneficiaries):
+    """Render the policy document template; works from prefetched dependents and beneficiaries."""
+    # Split dependents by relationship
+    dependents = list(dependents)
+    spouse = next((d for d in dependents if d.relationship == 'Spouse'), None)
+    children = [d for d in dependents if d.relationship == 'Child']
+    extended_family = [d for d in dependents if d.relationship == 'Extended Family']
     
-    # Get beneficiaries
-    beneficiaries = policy.beneficiary_set.all()
-    
-    # Calculate totals
-    # Main member cover and premium
-    total_cover = policy.plan.cover_amount if policy.plan else 0
-    total_premium = policy.plan.premium if policy.plan else 0
-    
-    # Add dependents cover and premium
-    dependents_cover = policy.dependent_set.aggregate(total=Sum('cover_amount'))
-    dependents_premium = policy.dependent_set.aggregate(total=Sum('premium'))
-    
-    if dependents_cover['total']:
-        total_cover += dependents_cover['total']
-    
-    if dependents_premium['total']:
-        total_premium += dependents_premium['total']
+    # Dependents carry no cover or premium fields, so totals come from the policy
+    total_cover = policy.cover_amount or (policy.plan.main_cover if policy.plan else 0)
+    total_premium = policy.premium_amount or (policy.plan.premium if policy.plan else 0)
     
     # Prepare context for template
     context = {
@@ -74,22 +96,27 @@ def generate_policy_document(policy):
     }
     
     # Render template
-    template = get_template('members/pdf/policy_document.html')
-    html_string = template.render(context)
+    template = get_template(POLICY_DOCUMENT_TEMPLATE)
+    return template.render(context)
+
+
+def html_to_pdf(html_string):
+    """
+    Convert a rendered policy document to PDF bytes with WeasyPrint.
+    
+    Needs no database access, so bulk generation runs it in worker processes.
+    """
     HTML, CSS = _get_weasyprint()
     
     # Generate PDF using WeasyPrint
     pdf_file = BytesIO()
-    HTML(string=html_string, base_url=settings.MEDIA_ROOT).write_pdf(
+    HTML(string=html_string, base_url=str(settings.MEDIA_ROOT)).write_pdf(
         pdf_file,
         stylesheets=[
             CSS(string='@page { size: A4; margin: 2cm; }')
         ]
     )
-    
-    # Create a ContentFile from the BytesIO buffer
-    filename = f"LegacyPolicy_{policy.policy_number}.pdf"
-    return ContentFile(pdf_file.getvalue(), name=filename)
+    return pdf_file.getvalue()
 
 def generate_and_save_policy_document(policy):
     """
@@ -0,0 +1,41 @@
+"""
+Plan eligibility and cover utilities for the members application.
+
+Both helpers answer from the in-memory quote tables in ``schemes.quoting``.
+"""
+from schemes.models import Plan
+from schemes.quoting import eligible_plan_ids, tier_cover
+
+from .age_utils import get_member_age_from_dob
+
+
+def get_filtered_plans(member):
+    """
+    Get the active plans whose main member age band includes the member's age.
+    
+    Args:
+        member (Member): The member to filter plans for
+        
+    Returns:
+        QuerySet: Plans the member is eligible for
+    """
+    if not member or not member.date_of_birth:
+        return Plan.objects.none()
+    
+    age = get_member_age_from_dob(member.date_of_birth)
+    return Plan.objects.filter(pk__in=eligible_plan_ids(age))
+
+
+def get_cover_amount_for_dependent(plan, age, relationship):
+    """
+    Get the cover amount for a dependent from the plan's tiers.
+    
+    Args:
+        plan (Plan): The policy plan
+        age (int): The dependent's age
+        relationship (str): 'spouse', 'child', 'extended' or a Dependent relationship label
+        
+    Returns:
+        Decimal: The tier's cover amount, or 0.00 when no tier applies
+    """
+    return tier_cover(plan.pk if plan else None, relationship, age)
@@ -406,21 +406,79 @@ def generate_enrollment_link_qrcode(link):
         return None
 
 
+ENROLLMENT_STATS_CACHE_PREFIX = 'enrollment_stats'
+
+ENROLLMENT_STATUSES = [status for status, _ in PublicApplication.STATUS_CHOICES]
+
+
+def enrollment_stats_cache_key(scheme_id=None):
+    return f"{ENROLLMENT_STATS_CACHE_PREFIX}:{scheme_id or 'all'}"
+
+
+def application_status_counts():
+    """Conditional aggregates counting applications in total and per status."""
+    from django.db.models import Count, Q
+
+    counts = {'total': Count('pk')}
+    counts.update({status: Count('pk', filter=Q(status=status)) for status in ENROLLMENT_STATUSES})
+    return counts
+
+
 def get_enrollment_statistics(scheme=None):
     """
     Get enrollment statistics for dashboard
+    
+    Counted with one conditional aggregation query and cached until an
+    application in the scheme changes status.
     """
+    from django.core.cache import cache
+    from legacyadmin.cache import get_cache_timeout
     
-    query = PublicApplication.objects.all()
+    scheme_id = getattr(scheme, 'pk', scheme)
+    if scheme_id:
+        return get_scheme_enrollment_statistics([scheme_id])[scheme_id]
     
-    if scheme:
-        query = query.filter(scheme=scheme)
+    cache_key = enrollment_stats_cache_key()
+    stats = cache.get(cache_key)
+    if stats is None:
+        stats = PublicApplication.objects.aggregate(**application_status_counts())
+        cache.set(cache_key, stats, get_cache_timeout('enrollment_stats'))
+    return stats
+
+
+def get_scheme_enrollment_statistics(scheme_ids):
+    """
+    Enrollment statistics for each of ``scheme_ids``. Schemes missing from
+    the cache are counted together in one grouped aggregation query.
     
-    return {
-        'total': query.count(),
-        'draft': query.filter(status='draft').count(),
-        'submitted': query.filter(status='submitted').count(),
-        'approved': query.filter(status='approved').count(),
-        'rejected': query.filter(status='rejected').count(),
-        'completed': query.filter(status='completed').count(),
-    }
+    Returns:
+        dict: ``{scheme_id: stats}``
+    """
+    from django.core.cache import cache
+    from legacyadmin.cache import get_cache_timeout
+    
+    keys = {scheme_id: enrollment_stats_cache_key(scheme_id) for scheme_id in scheme_ids}
+    cached = cache.get_many(keys.values())
+    stats = {scheme_id: cached[key] for scheme_id, key in keys.items() if key in cached}
+    
+    missing = [scheme_id for scheme_id in keys if scheme_id not in stats]
+    if missing:
+        computed = {scheme_id: dict.fromkeys(['total', *ENROLLMENT_STATUSES], 0) for scheme_id in missing}
+        rows = PublicApplication.objects.filter(scheme_id__in=missing).values('scheme_id').annotate(
+            **application_status_counts()
+        ).order_by()
+        for row in rows:
+            computed[row.pop('scheme_id')] = row
+        cache.set_many({keys[scheme_id]: counts for scheme_id, counts in computed.items()},
+                       get_cache_timeout('enrollment_stats'))
+        stats.update(computed)
+    return stats
+
+
+def invalidate_enrollment_statistics(scheme_ids=()):
+    """Drop the cached statistics of these schemes and the overall totals."""
+    from django.core.cache import cache
+    
+    cache.delete_many([enrollment_stats_cache_key()] + [
+        enrollment_stats_cache_key(scheme_id) for scheme_id in scheme_ids if scheme_id
+    ])
@@ -1119,7 +1119,7 @@ def step9_policy_confirmation(request, pk):
     if policy.document and member.email and not policy.email_sent_at:
         from members.utils.email_sender import send_policy_document_email
         if send_policy_document_email(policy):
-            messages.success(request, f"Policy document has been emailed to {member.email}.")
+            messages.success(request, f"Policy document will be emailed to {member.email} shortly.")
         else:
             messages.warning(request, "There was an issue sending the policy document via email. Please try again later.")
     
@@ -1332,11 +1332,12 @@ def download_policy_certificate(request, policy_id):
     # Get the policy object by ID or return 404 if not found
     policy = get_object_or_404(Policy, pk=policy_id)
 
-    # Generate or fetch the certificate (This is a simple example; replace with actual certificate generation logic)
-    certificate_content = f"Certificate for policy: {policy.membership_number}"
+    # The certificate is the policy document, served from the PDF render cache when unchanged
+    from members.utils.pdf_generator import generate_policy_document
+    certificate = generate_policy_document(policy)
 
     # Create the response with a PDF content type
-    response = HttpResponse(certificate_content, content_type='application/pdf')
+    response = HttpResponse(certificate.read(), content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="policy_{policy.membership_number}_certificate.pdf"'
 
     return response
@@ -11,7 +11,7 @@ from django.utils import timezone
 from datetime import datetime
 
 from members.models_public_enrollment import PublicApplication
-from members.utils_public_enrollment import convert_application_to_policy
+from members.utils_public_enrollment import convert_application_to_policy, get_enrollment_statistics
 
 logger = logging.getLogger(__name__)
 
@@ -47,12 +47,13 @@ def applications_list(request):
             Q(application_id__icontains=search_query)
         )
     
-    # Count by status
+    # Count by status (cached, refreshed on status changes)
+    stats = get_enrollment_statistics()
     status_stats = {
-        'submitted': PublicApplication.objects.filter(status='submitted').count(),
-        'approved': PublicApplication.objects.filter(status='approved').count(),
-        'rejected': PublicApplication.objects.filter(status='rejected').count(),
-        'completed': PublicApplication.objects.filter(status='completed').count(),
+        'submitted': stats['submitted'],
+        'approved': stats['approved'],
+        'rejected': stats['rejected'],
+        'completed': stats['completed'],
     }
     
     context = {
@@ -60,7 +61,7 @@ def applications_list(request):
         'status_filter': status_filter,
         'search_query': search_query,
         'status_stats': status_stats,
-        'total_count': PublicApplication.objects.count(),
+        'total_count': stats['total'],
     }
     
     return render(request, 'members/admin/applications_list.html', context)
@@ -172,11 +173,12 @@ def application_stats(request):
     """
     Admin dashboard: Application statistics
     """
-    total = PublicApplication.objects.count()
-    submitted = PublicApplication.objects.filter(status='submitted').count()
-    approved = PublicApplication.objects.filter(status='approved').count()
-    rejected = PublicApplication.objects.filter(status='rejected').count()
-    completed = PublicApplication.objects.filter(status='completed').count()
+    stats = get_enrollment_statistics()
+    total = stats['total']
+    submitted = stats['submitted']
+    approved = stats['approved']
+    rejected = stats['rejected']
+    completed = stats['completed']
     
     # Recent applications
     recent = PublicApplication.objects.all().order_by('-created_at')[:10]
@@ -13,6 +13,7 @@ from django.views.decorators.http import require_POST
 from django.conf import settings
 
 from settings_app.models import AIRequestLog, AIUserConsent
+from settings_app.utils.ai_client import AIClientError, chat_completion, get_api_key
 from settings_app.utils.ai_privacy import redact_pii, prepare_ai_prompt
 from settings_app.models import UserRole
 
@@ -81,14 +82,7 @@ def ai_search_assistant(request):
         )
         
         # Call OpenAI to convert the query to filters
-        import openai
-        
-        # Get API key from settings
-        api_key = getattr(settings, 'OPENAI_API_KEY', None)
-        if not api_key:
-            api_key = settings.OPENAI_API_KEY
-        
-        if not api_key:
+        if not get_api_key():
             logger.error("OpenAI API key not found in settings")
             return JsonResponse({
                 'success': False,
@@ -126,21 +120,25 @@ def ai_search_assistant(request):
         IMPORTANT: Never include any personally identifiable information (PII) in your response.
         """
         
-        # Call OpenAI API
-        client = openai.OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model=getattr(settings, 'DEFAULT_OPENAI_MODEL', 'gpt-4o'),
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": safe_query}
-            ],
-            temperature=0.2,  # Lower temperature for more deterministic responses
-            max_tokens=500,
-            user="anonymous"  # Ensure OpenAI doesn't use our data for training
-        )
-        
-        # Extract the response
-        ai_response = response.choices[0].message.content.strip()
+        # Call OpenAI through the shared client
+        try:
+            ai_response = chat_completion(
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": safe_query}
+                ],
+                model=getattr(settings, 'DEFAULT_OPENAI_MODEL', 'gpt-4o'),
+                max_tokens=500,
+                temperature=0.2,
+            )
+        except AIClientError as e:
+            logger.error(f"AI search request failed: {str(e)}")
+            log_entry.response_status = False
+            log_entry.save(update_fields=['response_status'])
+            return JsonResponse({
+                'success': False,
+                'error': 'The AI Search Assistant is temporarily unavailable. Please use the standard search filters.'
+            })
         
         # Try to parse the JSON response
         try:
@@ -15,6 +15,7 @@ from django.shortcuts import get_object_or_404
 
 from members.models import Policy
 from settings_app.models import AIRequestLog, AIUserConsent
+from settings_app.utils.ai_client import AIClientError, chat_completion, get_api_key
 from settings_app.utils.ai_privacy import redact_pii, prepare_ai_prompt
 
 logger = logging.getLogger(__name__)
@@ -97,14 +98,7 @@ def generate_policy_summary(request, policy_id):
         )
         
         # Call OpenAI to generate the summary
-        import openai
-        
-        # Get API key from settings
-        api_key = getattr(settings, 'OPENAI_API_KEY', None)
-        if not api_key:
-            api_key = settings.OPENAI_API_KEY
-        
-        if not api_key:
+        if not get_api_key():
             logger.error("OpenAI API key not found in settings")
             return JsonResponse({
                 'success': False,
@@ -132,21 +126,25 @@ def generate_policy_summary(request, policy_id):
         Format your response in markdown for better readability.
         """
         
-        # Call OpenAI API
-        client = openai.OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model=getattr(settings, 'DEFAULT_OPENAI_MODEL', 'gpt-4o'),
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": json.dumps(policy_data)}
-            ],
-            temperature=0.3,  # Lower temperature for more factual responses
-            max_tokens=800,
-            user="anonymous"  # Ensure OpenAI doesn't use our data for training
-        )
-        
-        # Extract the response
-        ai_response = response.choices[0].message.content.strip()
+        # Call OpenAI through the shared client
+        try:
+            ai_response = chat_completion(
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": json.dumps(policy_data)}
+                ],
+                model=getattr(settings, 'DEFAULT_OPENAI_MODEL', 'gpt-4o'),
+                max_tokens=800,
+                temperature=0.3,
+            )
+        except AIClientError as e:
+            logger.error(f"AI summary request failed: {str(e)}")
+            log_entry.response_status = False
+            log_entry.save(update_fields=['response_status'])
+            return JsonResponse({
+                'success': False,
+                'error': 'AI summaries are temporarily unavailable. Please review the policy details directly.'
+            })
         
         # Add disclaimer
         disclaimer = """
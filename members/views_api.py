@@ -1,22 +1,66 @@
 import json
 import logging
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import RequestDataTooBig
 from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.urls import reverse
+from django.views.decorators.http import require_GET, require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import get_object_or_404
 
 from schemes.models import Plan
 from settings_app.models import PlanMemberTier
-from .utils.ocr_processor import process_id_document
+from .ocr_jobs import (
+    DONE,
+    FAILED,
+    PENDING,
+    OCRImageTooLarge,
+    OCRQueueUnavailable,
+    get_ocr_job,
+    ocr_max_image_size,
+    submit_ocr_job,
+)
 from .utils.plan_chat import get_plan_answer
 
 logger = logging.getLogger(__name__)
 
+def ocr_job_response(job):
+    """JSON for an OCR job: the extracted fields once done, otherwise its status."""
+    result = job['result']
+    if job['status'] == FAILED:
+        return JsonResponse({'error': result['error'], 'job_id': job['job_id']}, status=400)
+    if job['status'] == PENDING:
+        return JsonResponse({
+            'success': True,
+            'job_id': job['job_id'],
+            'status': PENDING,
+            'poll_url': reverse('members:id_document_job', args=[job['job_id']]),
+        }, status=202)
+    return JsonResponse({
+        'success': True,
+        'job_id': job['job_id'],
+        'status': DONE,
+        'data': {
+            'id_number': result.get('id_number'),
+            'full_name': result.get('full_name'),
+            'date_of_birth': result.get('date_of_birth'),
+            'gender': result.get('gender')
+        }
+    })
+
+def image_too_large_response():
+    max_mb = ocr_max_image_size() // (1024 * 1024)
+    return JsonResponse({'error': f'File too large. Maximum size is {max_mb}MB'}, status=400)
+
+@login_required
 @csrf_exempt
 @require_POST
 def process_id_document_api(request):
     """
-    API endpoint to process an ID document and extract information
+    API endpoint to process an ID document and extract information.
+
+    Answers 200 with the data for an image read before, otherwise 202 with
+    a ``poll_url`` for ``id_document_job_status``.
     """
     try:
         data = json.loads(request.body)
@@ -25,25 +69,35 @@ def process_id_document_api(request):
         if not image_data:
             return JsonResponse({'error': 'No image data provided'}, status=400)
         
-        # Process the document
-        result = process_id_document(image_data)
-        
-        if result.get('error'):
-            return JsonResponse({'error': result['error']}, status=400)
+        # Queue the document; reading it takes seconds
+        try:
+            job = submit_ocr_job(image_data)
+        except OCRImageTooLarge:
+            return image_too_large_response()
+        except ValueError:
+            return JsonResponse({'error': 'Image data is not valid base64'}, status=400)
+        except OCRQueueUnavailable:
+            return JsonResponse({'error': 'Document reading is unavailable, please try again shortly'}, status=503)
         
-        return JsonResponse({
-            'success': True,
-            'data': {
-                'id_number': result.get('id_number'),
-                'full_name': result.get('full_name'),
-                'date_of_birth': result.get('date_of_birth'),
-                'gender': result.get('gender')
-            }
-        })
+        return ocr_job_response(job)
+    except RequestDataTooBig:
+        # The body is over DATA_UPLOAD_MAX_MEMORY_SIZE
+        return image_too_large_response()
     except Exception as e:
         logger.error(f"Error processing ID document: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
 
+@login_required
+@require_GET
+def id_document_job_status(request, job_id):
+    """
+    API endpoint to poll an ID document job started by ``process_id_document_api``
+    """
+    job = get_ocr_job(job_id)
+    if job is None:
+        return JsonResponse({'error': 'Unknown or expired job'}, status=404)
+    return ocr_job_response(job)
+
 @csrf_exempt
 @require_POST
 def plan_chat_api(request):
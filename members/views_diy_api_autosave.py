@@ -7,37 +7,51 @@ from django.conf import settings
 from django.contrib.auth.decorators import login_required
 
 import json
-import decimal
 
 from settings_app.models import Agent
 from schemes.models import Scheme, Plan
+from schemes.quoting import quote_household, quote_plan
 from .models_incomplete import IncompleteApplication
 
 
+def optional_age(value):
+    """Parse an optional age parameter, returning None when missing or invalid."""
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
 @require_GET
 def get_plans(request):
-    """Get available plans for a scheme"""
+    """Get available plans for a scheme, quoted for the main member's age when given"""
     scheme_id = request.GET.get('scheme_id')
     if not scheme_id:
         return JsonResponse({'error': 'Scheme ID is required'}, status=400)
     
     try:
         scheme = Scheme.objects.get(id=scheme_id)
+        quotes = {
+            quote.plan_id: quote
+            for quote in quote_household(optional_age(request.GET.get('age')), scheme_id=scheme.id, diy_only=True)
+        }
         plans = []
         
-        for plan in scheme.plans.all():
+        for plan in scheme.plans.filter(pk__in=quotes):
+            quote = quotes[plan.pk]
             plans.append({
                 'id': plan.id,
                 'name': plan.name,
                 'description': plan.description,
-                'base_premium': float(plan.base_premium),
+                'base_premium': float(quote.premium),
                 'features': [
-                    f"Cover up to R{int(plan.max_cover_amount):,}",
-                    f"Includes {plan.included_benefits}",
-                    f"Waiting period: {plan.waiting_period} days"
+                    f"Cover up to R{int(quote.cover):,}",
+                    f"Spouses: {plan.spouses_allowed}, children: {plan.children_allowed}, extended family: {plan.extended_allowed}",
+                    f"Waiting period: {plan.waiting_period} months"
                 ]
             })
         
+        plans.sort(key=lambda plan: plan['base_premium'])
         return JsonResponse({'plans': plans})
     except Scheme.DoesNotExist:
         return JsonResponse({'error': 'Scheme not found'}, status=404)
@@ -48,59 +62,48 @@ def get_plans(request):
 @require_POST
 @ensure_csrf_cookie
 def calculate_premium(request):
-    """Calculate premium based on selected plan and options"""
+    """Calculate the household premium for the selected plan from its tiers"""
     try:
         data = json.loads(request.body)
         plan_id = data.get('plan_id')
-        cover_amount = data.get('cover_amount', 10000)
+        age = optional_age(data.get('age'))
         has_spouse = data.get('has_spouse', False)
         has_children = data.get('has_children', False)
-        children_count = data.get('children_count', 0)
+        children_count = int(data.get('children_count') or 0)
         has_extended_family = data.get('has_extended_family', False)
-        extended_family_count = data.get('extended_family_count', 0)
+        extended_family_count = int(data.get('extended_family_count') or 0)
         
         if not plan_id:
             return JsonResponse({'error': 'Plan ID is required'}, status=400)
         
         try:
-            plan = Plan.objects.get(id=plan_id)
+            plan = Plan.objects.get(id=plan_id, is_active=True)
         except Plan.DoesNotExist:
             return JsonResponse({'error': 'Plan not found'}, status=404)
         
-        # Base premium calculation
-        base_premium = plan.base_premium
-        
-        # Cover amount adjustment
-        cover_factor = decimal.Decimal(cover_amount) / decimal.Decimal(10000)  # Base cover is 10,000
-        premium = base_premium * cover_factor
-        
-        # Add spouse premium
+        # Dependent ages are not known at this step, so each dependent is
+        # priced on the youngest band of their type
+        dependents = []
         if has_spouse:
-            premium += premium * decimal.Decimal('0.5')  # 50% of main member premium
-        
-        # Add children premium
-        if has_children and children_count > 0:
-            child_premium = premium * decimal.Decimal('0.2')  # 20% of main member premium per child
-            premium += child_premium * decimal.Decimal(min(children_count, 10))  # Max 10 children
-        
-        # Add extended family premium
-        if has_extended_family and extended_family_count > 0:
-            extended_premium = premium * decimal.Decimal('0.3')  # 30% of main member premium per extended family member
-            premium += extended_premium * decimal.Decimal(min(extended_family_count, 10))  # Max 10 extended family members
-        
-        # Round to 2 decimal places
-        premium = round(premium, 2)
+            dependents.append(('spouse', None))
+        if has_children or children_count:
+            dependents.extend([('child', None)] * children_count)
+        if has_extended_family or extended_family_count:
+            dependents.extend([('extended', None)] * extended_family_count)
         
-        # Save plan name for display in review step
-        plan_name = plan.name
+        quote = quote_plan(plan.id, age, dependents)
+        if quote is None:
+            return JsonResponse({'error': 'Plan is not available for these members'}, status=400)
         
         return JsonResponse({
-            'premium': float(premium),
-            'plan_name': plan_name,
-            'cover_amount': cover_amount
+            'premium': float(quote.premium),
+            'plan_name': plan.name,
+            'cover_amount': float(quote.cover)
         })
     except json.JSONDecodeError:
         return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'Invalid member counts'}, status=400)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -29,6 +29,7 @@ from .forms_diy import (
 )
 from settings_app.models import Agent
 from schemes.models import Plan, PlanTier
+from schemes.quoting import quote_household
 from .utils.ocr_processor import process_id_document
 
 # Inline implementation of get_plan_answer to avoid import issues
@@ -273,7 +274,14 @@ class DIYPolicySelectionView(DIYApplicationMixin, FormView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['plans'] = Plan.objects.filter(is_active=True)
+        application = self.get_application(self.request)
+        applicant = getattr(application, 'applicant', None)
+        age = applicant.get_age() if applicant else None
+        quotes = {quote.plan_id: quote for quote in quote_household(age, diy_only=True)}
+        plans = list(Plan.objects.filter(pk__in=quotes))
+        for plan in plans:
+            plan.quote = quotes[plan.pk]
+        context['plans'] = sorted(plans, key=lambda plan: plan.quote.premium)
         return context
 
     def form_valid(self, form):
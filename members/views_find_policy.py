@@ -1,12 +1,13 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Count
+from django.db.models import Count
 from django.urls import reverse
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
 from settings_app.models import Branch, Agent
 from schemes.models import Scheme, Plan
 from members.models import Policy, Member
+from members.search import find_exact_policy, search_policies
 
 @login_required
 def find_policy(request):
@@ -28,10 +29,7 @@ def find_policy(request):
     
     # Check if we have an exact policy number match for auto-redirect
     if q and len(q.strip()) >= 5:  # Only check for longer queries that might be policy numbers
-        exact_policy = Policy.objects.filter(
-            Q(policy_number=q) | 
-            Q(uw_membership_number=q)
-        ).first()
+        exact_policy = find_exact_policy(Policy.objects.all(), q)
         
         if exact_policy:
             return redirect(reverse('members:policy_detail', kwargs={'policy_id': exact_policy.id}))
@@ -79,14 +77,7 @@ def find_policy(request):
     
     # Apply search filter if query exists
     if q:
-        policies = policies.filter(
-            Q(member__first_name__icontains=q) |
-            Q(member__last_name__icontains=q) |
-            Q(member__id_number__icontains=q) |
-            Q(member__phone_number__icontains=q) |
-            Q(policy_number__icontains=q) |
-            Q(uw_membership_number__icontains=q)
-        )
+        policies = search_policies(policies, q)
     
     # Apply advanced filters if provided
     if status:
@@ -138,8 +129,11 @@ def find_policy(request):
     if payment_method:
         policies = policies.filter(payment_method=payment_method)
     
-    # Order by most recent start date first
-    policies = policies.order_by('-start_date')
+    # Best matches first when searching, then most recent start date first
+    if q:
+        policies = policies.order_by('-search_rank', '-start_date')
+    else:
+        policies = policies.order_by('-start_date')
     
     # Pagination - 25 results per page
     paginator = Paginator(policies, 25)
@@ -16,7 +16,8 @@ from .multi_step_utils import (
     get_or_create_policy, validate_policy_step, 
     clear_policy_session, mark_policy_complete
 )
-from schemes.models import Scheme, Plan
+from schemes.models import Scheme, Plan, PlanTier
+from schemes.quoting import eligible_plan_ids, plan_tiers, quote_plan
 from .communications.sms_sender import send_otp_sms
 from utils.easypay import generate_easypay_number
 import json
@@ -177,11 +178,7 @@ def step2_policy_details(request, policy):
     )
     
     # Get available schemes and plans based on user permissions
-    age_filtered_plans = Plan.objects.filter(
-        is_active=True,
-        main_age_from__lte=age,
-        main_age_to__gte=age,
-    )
+    age_filtered_plans = Plan.objects.filter(pk__in=eligible_plan_ids(age))
 
     if public_context['is_public_enrollment']:
         schemes_qs = Scheme.objects.filter(pk=public_context['scheme_id'], active=True)
@@ -221,8 +218,13 @@ def step2_policy_details(request, policy):
             if policy.plan_id:
                 selected_plan = policy.plan
                 policy.scheme = selected_plan.scheme
-                policy.premium_amount = selected_plan.main_premium if selected_plan.main_premium is not None else selected_plan.premium
-                policy.cover_amount = selected_plan.main_cover if selected_plan.main_cover is not None else 0
+                quote = quote_plan(selected_plan.pk, age)
+                if quote:
+                    policy.premium_amount = quote.premium
+                    policy.cover_amount = quote.cover
+                else:
+                    policy.premium_amount = selected_plan.main_premium if selected_plan.main_premium is not None else selected_plan.premium
+                    policy.cover_amount = selected_plan.main_cover if selected_plan.main_cover is not None else 0
 
             _apply_public_link_context(policy, public_context)
             
@@ -258,20 +260,22 @@ def step2_policy_details(request, policy):
         form.fields['scheme'].queryset = schemes_qs
         form.fields['plan'].queryset = plans_qs
     
-    plans_qs = plans_qs.select_related('scheme').prefetch_related('plan_tiers')
+    plans_qs = plans_qs.select_related('scheme')
+    tier_labels = dict(PlanTier.USER_TYPE_CHOICES)
 
     # Prepare plans data with all required fields used by the template.
+    # Tiers come from the in-memory quote tables rather than a prefetch.
     plans_data = []
     for plan in plans_qs:
         tiers = [
             {
-                'member_type': tier.get_user_type_display(),
-                'age_from': tier.age_from,
-                'age_to': tier.age_to,
-                'premium': float(tier.premium_amount),
-                'cover': float(tier.cover_amount),
+                'member_type': tier_labels[tier['member_type']],
+                'age_from': tier['age_from'],
+                'age_to': tier['age_to'],
+                'premium': float(tier['premium']),
+                'cover': float(tier['cover']),
             }
-            for tier in plan.plan_tiers.all()
+            for tier in plan_tiers(plan.id)
         ]
 
         in_member_scheme = True if not policy.scheme_id else (plan.scheme_id == policy.scheme_id)
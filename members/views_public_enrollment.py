@@ -28,9 +28,11 @@ from members.forms_public_enrollment import (
     OTPVerificationForm, OTPResendForm
 )
 from schemes.models import Scheme, Plan
+from schemes.quoting import eligible_plan_ids, quote_plan
 from branches.models import Branch
 from settings_app.models import Agent
 from members.communications.sms_sender import send_otp_sms, send_bulk_sms
+from members.utils import get_member_age_from_dob
 
 logger = logging.getLogger(__name__)
 
@@ -207,6 +209,15 @@ class Step2AddressView(FormView):
         return redirect('public_enrollment:step3_plan')
 
 
+def _enrollment_age(session):
+    """Main member's age from the personal details step, or None if not captured."""
+    date_of_birth = session.get('enrollment_personal', {}).get('date_of_birth')
+    try:
+        return get_member_age_from_dob(date.fromisoformat(date_of_birth))
+    except (TypeError, ValueError):
+        return None
+
+
 class Step3PlanSelectionView(FormView):
     """
     Step 3: Plan Selection
@@ -225,6 +236,7 @@ class Step3PlanSelectionView(FormView):
         scheme_id = self.request.session.get('enrollment_scheme_id')
         if scheme_id:
             kwargs['scheme'] = Scheme.objects.get(id=scheme_id)
+            kwargs['age'] = _enrollment_age(self.request.session)
         return kwargs
     
     def get_context_data(self, **kwargs):
@@ -237,14 +249,19 @@ class Step3PlanSelectionView(FormView):
             scheme = Scheme.objects.get(id=scheme_id)
             context['scheme'] = scheme
             context['plans'] = scheme.plans.filter(is_active=True)
+            age = _enrollment_age(self.request.session)
+            if age is not None:
+                context['plans'] = context['plans'].filter(pk__in=eligible_plan_ids(age, scheme_id=scheme.pk))
         
         return context
     
     def form_valid(self, form):
+        plan = form.cleaned_data['plan']
+        quote = quote_plan(plan.id, _enrollment_age(self.request.session))
         self.request.session['enrollment_plan'] = {
-            'plan_id': form.cleaned_data['plan'].id,
-            'plan_name': form.cleaned_data['plan'].name,
-            'plan_premium': str(form.cleaned_data['plan'].premium),
+            'plan_id': plan.id,
+            'plan_name': plan.name,
+            'plan_premium': str(quote.premium if quote else plan.premium),
             'payment_method': form.cleaned_data['payment_method'],
         }
         
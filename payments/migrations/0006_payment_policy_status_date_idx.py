@@ -0,0 +1,17 @@
+# Generated by Django 4.2.21 on 2026-10-18 16:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_alter_payment_payment_method'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['policy', 'status', 'date'], name='payments_pa_policy__44bf3e_idx'),
+        ),
+    ]
@@ -139,6 +139,7 @@ class Payment(models.Model):
         indexes = [
             models.Index(fields=['member']),
             models.Index(fields=['date']),
+            models.Index(fields=['policy', 'status', 'date']),
         ]
     
     # Audit fields for tracking status changes
@@ -286,6 +287,11 @@ class PaymentAllocation(models.Model):
         return self.wholesale_amount + Decimal(self.agent_commission or 0)
 
     def save(self, *args, **kwargs):
+        self.populate_from_policy()
+        super().save(*args, **kwargs)
+
+    def populate_from_policy(self):
+        """Fill in the policy, plan and agent snapshot fields (also used before bulk_create)."""
         self.coverage_month = normalize_coverage_month(self.coverage_month)
 
         if self.payment_id:
@@ -320,8 +326,6 @@ class PaymentAllocation(models.Model):
                 self.other_fees = self.other_fees or Decimal((plan.other_fees if plan else 0) or 0)
                 self.agent_commission = self.agent_commission or calculate_agent_commission(policy)
 
-        super().save(*args, **kwargs)
-
 class PaymentReceipt(models.Model):
     RECEIPT_STATUS = [
         ('GENERATED', 'Generated'),
@@ -1,17 +1,31 @@
-from datetime import date
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
 
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
 from branches.models import Bank, Branch
 from members.models import Member, Policy
-from payments.models import Payment, PaymentAllocation
+from members.search import index_policy_ids
+from payments.models import ImportRecord, Payment, PaymentAllocation, PaymentImport
+from payments.utils.reconciliation import (
+	MATCH_MEMBERSHIP_NUMBER,
+	MATCH_POLICY_NUMBER,
+	ReferenceIndex,
+	build_import_row,
+	reconcile_import_rows,
+)
 from schemes.models import Plan, Scheme
 from settings_app.models import Agent
 
 
-class PaymentAllocationBackfillCommandTests(TestCase):
+class PaymentTestCase(TestCase):
 	def setUp(self):
 		self.user = get_user_model().objects.create_user(username='capturer', password='pass1234')
 		bank = Bank.objects.create(name='Bank', branch_code='123456')
@@ -67,6 +81,9 @@ class PaymentAllocationBackfillCommandTests(TestCase):
 			premium_amount='150.00',
 		)
 
+
+
+class PaymentAllocationBackfillCommandTests(PaymentTestCase):
 	def test_backfill_payment_allocations_creates_missing_rows(self):
 		payment = Payment.objects.create(
 			member=self.policy.member,
@@ -97,3 +114,133 @@ class PaymentAllocationBackfillCommandTests(TestCase):
 		call_command('backfill_payment_allocations', '--dry-run')
 
 		self.assertEqual(PaymentAllocation.objects.count(), 0)
+
+
+class PaymentImportReconciliationTests(PaymentTestCase):
+	def setUp(self):
+		super().setUp()
+		self.policy.easypay_number = '9123456789'
+		self.policy.save()
+		self.id_member = Member.objects.create(
+			first_name='Sam',
+			last_name='Ndlovu',
+			gender='Male',
+			date_of_birth=date(1985, 6, 1),
+			phone_number='0821234567',
+			id_number='8506015800085',
+		)
+		self.id_policy = Policy.objects.create(
+			member=self.id_member,
+			scheme=self.policy.scheme,
+			plan=self.policy.plan,
+			membership_number='M456',
+			start_date=date(2026, 4, 1),
+		)
+		# Search documents, which carry the ID number digest, are written on commit
+		index_policy_ids([self.id_policy.pk])
+		self.payment_import = PaymentImport.objects.create(
+			import_type='EASYPAY',
+			file=SimpleUploadedFile('easypay.csv', b''),
+			imported_by=self.user,
+		)
+
+	def test_index_matches_every_reference_type_case_insensitively(self):
+		index = ReferenceIndex.build(['9123456789', self.policy.policy_number.lower(), 'm123', '8506015800085'])
+
+		self.assertEqual(index.match('9123456789'), (self.policy.member, self.policy))
+		self.assertEqual(index.match(self.policy.policy_number.lower())[1], self.policy)
+		self.assertEqual(index.match(' m123 ')[1], self.policy)
+		self.assertEqual(index.match('8506015800085'), (self.id_member, self.id_policy))
+		self.assertEqual(index.match('unknown'), (None, None))
+
+	def test_id_numbers_match_without_reading_every_member(self):
+		for index in range(20):
+			Member.objects.create(
+				first_name=f'Other{index}',
+				last_name='Member',
+				gender='Female',
+				date_of_birth=date(1990, 1, 1),
+				phone_number='0820000000',
+				id_number=f'90010150000{index:02d}',
+			)
+
+		with CaptureQueriesContext(connection) as context:
+			index = ReferenceIndex.build(['8506015800085'])
+
+		self.assertEqual(index.match('8506015800085'), (self.id_member, self.id_policy))
+		# The reference columns and one digest lookup, however many members there are
+		self.assertEqual(len(context.captured_queries), 2)
+
+	def test_reconcile_writes_in_bulk(self):
+		rows = [
+			build_import_row('m123' if i % 2 else 'M456', 150, date(2026, 4, 15), [str(i)])
+			for i in range(200)
+		]
+		rows.append(build_import_row('NOPE', 150, date(2026, 4, 15), ['unmatched']))
+
+		with CaptureQueriesContext(connection) as context:
+			result = reconcile_import_rows(
+				self.payment_import,
+				rows,
+				self.user,
+				payment_method='BANK_TRANSFER',
+				keys=(MATCH_POLICY_NUMBER, MATCH_MEMBERSHIP_NUMBER),
+			)
+
+		self.assertEqual(result, {'matched': 200, 'unmatched': 1})
+		# Row-by-row matching needed several queries per row; bulk writes only split on backend limits.
+		self.assertLess(len(context.captured_queries), 30)
+		self.assertEqual(Payment.objects.filter(policy=self.policy).count(), 100)
+		self.assertEqual(PaymentAllocation.objects.filter(policy=self.id_policy).count(), 100)
+		self.assertEqual(
+			PaymentAllocation.objects.filter(policy=self.policy).first().agent_code, 'AG01'
+		)
+		self.assertEqual(ImportRecord.objects.filter(status='PROCESSED', payment__isnull=False).count(), 200)
+		self.assertEqual(ImportRecord.objects.get(status='UNMATCHED').reference, 'NOPE')
+
+	def test_reconcile_recomputes_policy_status(self):
+		paid_on = date.today() - timedelta(days=5)
+		rows = [build_import_row('M456', 150, paid_on, ['recent'])]
+
+		reconcile_import_rows(
+			self.payment_import,
+			rows,
+			self.user,
+			payment_method='BANK_TRANSFER',
+			keys=(MATCH_MEMBERSHIP_NUMBER,),
+		)
+
+		self.id_policy.refresh_from_db()
+		self.assertEqual(self.id_policy.status, 'ACTIVE')
+		self.assertEqual(self.id_policy.lapse_warning, 'none')
+		self.assertEqual(self.id_policy.last_payment_date, paid_on)
+		self.assertEqual(self.id_policy.last_payment_amount, Decimal('150.00'))
+
+	def test_easypay_import_matches_easypay_and_id_numbers(self):
+		self.user.is_staff = True
+		self.user.save()
+		self.client.force_login(self.user)
+		content = (
+			'reference,amount,date\n'
+			'9123456789,R150.00,2026-04-15\n'
+			'8506015800085,150.00,15/04/2026\n'
+			'0000000000,150.00,2026-04-15\n'
+		).encode('utf-8')
+
+		with tempfile.TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+			payment_import = PaymentImport.objects.create(
+				import_type='EASYPAY',
+				file=SimpleUploadedFile('easypay.csv', content),
+				imported_by=self.user,
+			)
+			response = self.client.get(reverse('payments:process_easypay_import', args=[payment_import.pk]))
+
+		self.assertEqual(response.status_code, 302)
+		payment_import.refresh_from_db()
+		self.assertEqual(payment_import.status, 'PARTIAL')
+		self.assertEqual((payment_import.successful_records, payment_import.failed_records), (2, 1))
+		self.assertEqual(
+			set(Payment.objects.filter(payment_method='EASYPAY').values_list('policy_id', flat=True)),
+			{self.policy.pk, self.id_policy.pk},
+		)
+
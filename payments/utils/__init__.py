@@ -5,7 +5,7 @@ This package contains utility functions for the payments app.
 """
 
 # Import utility functions to make them available at the package level
-from .policy_utils import update_policy_status, calculate_outstanding_balance
+from .policy_utils import update_policy_status, update_policy_statuses, calculate_outstanding_balance
 from .receipt_generator import (
     generate_payment_receipt_pdf,
     create_payment_receipt,
@@ -16,6 +16,7 @@ from .ai_summary import get_payment_summary_for_member
 
 __all__ = [
     'update_policy_status',
+    'update_policy_statuses',
     'calculate_outstanding_balance',
     'generate_payment_receipt_pdf',
     'create_payment_receipt',
@@ -4,6 +4,7 @@ from datetime import timedelta
 from django.utils import timezone
 from django.db.models import Avg, Count
 from payments.models import Payment, AIRequestLog
+from settings_app.utils.ai_client import chat_completion
 
 logger = logging.getLogger(__name__)
 
@@ -59,34 +60,18 @@ def get_payment_summary_for_member(member, user):
             "Include average amount, most common method, time since last payment."
         )
         
-        # Try to get summary from OpenAI
+        # Try to get summary from OpenAI, falling back to the rule-based summary
         try:
-            import openai
-            from django.conf import settings
-            
-            # Check if OpenAI API key is configured
-            api_key = getattr(settings, 'OPENAI_API_KEY', None)
-            if not api_key:
-                logger.warning("OpenAI API key not configured")
-                return generate_fallback_summary(payment_data)
-                
-            # Configure OpenAI
-            openai.api_key = api_key
-            
-            # Make API call
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
+            summary = chat_completion(
+                [
                     {"role": "system", "content": "You are a helpful assistant that summarizes payment data for funeral policies."},
                     {"role": "user", "content": f"{prompt}\n\nData: {json.dumps(payment_data)}"}
                 ],
+                model="gpt-3.5-turbo",
                 max_tokens=100,
-                temperature=0.7
+                temperature=0.7,
             )
             
-            # Extract summary from response
-            summary = response.choices[0].message.content.strip()
-            
             # Log the AI request for compliance auditing
             AIRequestLog.objects.create(
                 user=user,
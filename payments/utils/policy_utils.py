@@ -1,13 +1,11 @@
 """
 Utility functions for policy-related operations.
 """
-from django.utils import timezone
-from django.db import transaction
 from django.db.models import Sum, F
 from django.core.exceptions import ValidationError
 
 from payments.models import Payment
-from members.models import Policy
+from members.lapse import LAPSE_FIELDS, refresh_lapse_states
 
 def update_policy_status(policy):
     """
@@ -23,35 +21,9 @@ def update_policy_status(policy):
         return False
         
     try:
-        with transaction.atomic():
-            # Get total paid amount for the policy
-            total_paid = Payment.objects.filter(
-                policy=policy,
-                status='COMPLETED'
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
-            # Update the policy's paid amount
-            policy.total_paid = total_paid
-            
-            # Calculate outstanding balance
-            policy.outstanding_balance = max(0, policy.premium - total_paid)
-            
-            # Update status based on payments
-            if total_paid >= policy.premium:
-                policy.status = 'ACTIVE'
-            elif policy.status == 'PENDING' and total_paid > 0:
-                policy.status = 'ACTIVE'
-            elif policy.status == 'ACTIVE' and total_paid < policy.premium:
-                policy.status = 'LAPSED'
-                
-            policy.last_updated = timezone.now()
-            policy.save(update_fields=[
-                'total_paid', 
-                'outstanding_balance', 
-                'status', 
-                'last_updated'
-            ])
-            return True
+        refresh_lapse_states(policy_ids=[policy.pk])
+        policy.refresh_from_db(fields=LAPSE_FIELDS)
+        return True
             
     except Exception as e:
         # Log the error and return False
@@ -60,6 +32,31 @@ def update_policy_status(policy):
         logger.error(f"Error updating policy {policy.id} status: {str(e)}")
         return False
 
+def update_policy_statuses(policies, batch_size=500):
+    """
+    Update the status of many policies at once with the set-based lapse
+    engine (one window query and one bulk update per batch).
+    
+    Args:
+        policies: Iterable of Policy instances to update
+        batch_size: Number of policies read and written together
+        
+    Returns:
+        int: Number of policies checked
+    """
+    policy_ids = [policy.pk for policy in policies if policy]
+    if not policy_ids:
+        return 0
+        
+    try:
+        return refresh_lapse_states(policy_ids=policy_ids, batch_size=batch_size)['checked']
+            
+    except Exception as e:
+        import logging
+        logger = logging.getLogger(__name__)
+        logger.error(f"Error updating status for {len(policy_ids)} policies: {str(e)}")
+        return 0
+
 def calculate_outstanding_balance(policy):
     """
     Calculate the outstanding balance for a policy.
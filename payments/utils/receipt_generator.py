@@ -5,10 +5,10 @@ from datetime import datetime
 from django.template.loader import get_template
 from django.conf import settings
 from django.core.files.base import ContentFile
-from django.core.mail import EmailMessage
 from django.utils import timezone
 
 from payments.models import Payment, PaymentReceipt
+from legacyadmin.pdf_cache import cached_pdf
 
 logger = logging.getLogger(__name__)
 
@@ -22,36 +22,66 @@ def _get_weasyprint():
         ) from exc
     return HTML, CSS
 
+PAYMENT_RECEIPT_TEMPLATE = 'payments/pdf/payment_receipt.html'
+
+
+def company_details():
+    return {
+        'company_name': getattr(settings, 'COMPANY_NAME', 'Legacy Guard'),
+        'company_address': getattr(settings, 'COMPANY_ADDRESS', '123 Main Street, Pretoria'),
+        'company_phone': getattr(settings, 'COMPANY_PHONE', '012 345 6789'),
+        'company_email': getattr(settings, 'COMPANY_EMAIL', 'info@legacyguard.co.za'),
+        'company_website': getattr(settings, 'COMPANY_WEBSITE', 'www.legacyguard.co.za'),
+        'company_logo': getattr(settings, 'COMPANY_LOGO', '/static/img/logo.png'),
+    }
+
+
 def generate_payment_receipt_pdf(payment):
     """
     Generate a PDF receipt for a payment.
     
+    The PDF is served from the render cache while the payment, its receipts
+    and capturer, the member, policy and template are unchanged, for the day
+    it is stamped with.
+    
     Args:
         payment: The Payment model instance
         
     Returns:
         ContentFile: A Django ContentFile containing the PDF
     """
-    # Get related data
-    member = payment.member
-    policy = payment.policy
+    inputs = {
+        'payment': payment,
+        'member': payment.member,
+        'policy': payment.policy,
+        'receipts': payment.receipts.all(),
+        'captured_by': (payment.created_by.get_full_name() or payment.created_by.username) if payment.created_by else None,
+        'company': company_details(),
+        # The receipt prints the day it was generated
+        'generated_on': timezone.localdate(),
+    }
+    content = cached_pdf(
+        'receipts', PAYMENT_RECEIPT_TEMPLATE, inputs,
+        lambda: render_payment_receipt(payment, inputs['generated_on']),
+    )
     
+    filename = f"receipt_{payment.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
+    return ContentFile(content, name=filename)
+
+
+def render_payment_receipt(payment, generated_on=None):
+    """Render the receipt template, stamped ``generated_on``, and convert it to PDF bytes."""
     # Prepare context for template
     context = {
         'payment': payment,
-        'member': member,
-        'policy': policy,
-        'generated_at': timezone.now(),
-        'company_name': getattr(settings, 'COMPANY_NAME', 'Legacy Guard'),
-        'company_address': getattr(settings, 'COMPANY_ADDRESS', '123 Main Street, Pretoria'),
-        'company_phone': getattr(settings, 'COMPANY_PHONE', '012 345 6789'),
-        'company_email': getattr(settings, 'COMPANY_EMAIL', 'info@legacyguard.co.za'),
-        'company_website': getattr(settings, 'COMPANY_WEBSITE', 'www.legacyguard.co.za'),
-        'company_logo': getattr(settings, 'COMPANY_LOGO', '/static/img/logo.png'),
+        'member': payment.member,
+        'policy': payment.policy,
+        'generated_at': generated_on or timezone.localdate(),
+        **company_details(),
     }
     
     # Render HTML template
-    template = get_template('payments/pdf/payment_receipt.html')
+    template = get_template(PAYMENT_RECEIPT_TEMPLATE)
     html_string = template.render(context)
     HTML, CSS = _get_weasyprint()
     
@@ -63,13 +93,7 @@ def generate_payment_receipt_pdf(payment):
             CSS(string='@page { size: A4; margin: 1cm }')
         ]
     )
-    
-    # Reset file pointer
-    pdf_file.seek(0)
-    
-    # Create a ContentFile
-    filename = f"receipt_{payment.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
-    return ContentFile(pdf_file.read(), name=filename)
+    return pdf_file.getvalue()
 
 def create_payment_receipt(payment, user=None):
     """
@@ -108,15 +132,18 @@ def create_payment_receipt(payment, user=None):
 
 def send_receipt_email(receipt, email_address):
     """
-    Send a payment receipt via email.
+    Queue a payment receipt for email. The outbox attaches the receipt PDF
+    and marks the receipt as emailed once it is sent.
     
     Args:
         receipt: The PaymentReceipt instance
         email_address: Email address to send to
         
     Returns:
-        bool: True if sent successfully, False otherwise
+        bool: True if queued successfully, False otherwise
     """
+    from members.communications.outbox import queue_email
+
     try:
         payment = receipt.payment
         member = payment.member
@@ -134,31 +161,18 @@ Best regards,
 """
         from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'receipts@legacyguard.co.za')
         
-        # Create email message
-        email = EmailMessage(
+        queue_email(
+            to=email_address,
             subject=subject,
             body=body,
             from_email=from_email,
-            to=[email_address],
+            kind='receipt',
+            object_id=receipt.pk,
         )
-        
-        # Attach the receipt
-        receipt_name = f"Receipt_{receipt.receipt_number}.pdf"
-        email.attach(receipt_name, receipt.pdf_file.read(), 'application/pdf')
-        
-        # Send email
-        email.send(fail_silently=False)
-        
-        # Update receipt status
-        receipt.status = 'EMAILED'
-        receipt.sent_to = email_address
-        receipt.sent_at = timezone.now()
-        receipt.save()
-        
         return True
         
     except Exception as e:
-        logger.error(f"Error sending receipt email: {str(e)}")
+        logger.error(f"Error queueing receipt email: {str(e)}")
         return False
 
 def get_whatsapp_link(phone_number, receipt_number):
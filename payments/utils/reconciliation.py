@@ -0,0 +1,284 @@
+"""
+Bulk matching engine for payment imports.
+
+Instead of querying for every row, all candidate policies for a file are
+loaded up front into in-memory indexes keyed by EasyPay, ID, policy and
+membership number (case-insensitive). Payments, allocations and import
+records are then written with ``bulk_create`` and the affected policies'
+statuses recomputed in one batch.
+"""
+import json
+import logging
+import re
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from members.models import Policy
+from members.search import id_number_digest
+from payments.models import ImportRecord, Payment, PaymentAllocation, infer_coverage_month_for_payment
+
+from .policy_utils import update_policy_statuses
+
+logger = logging.getLogger(__name__)
+
+MATCH_EASYPAY_NUMBER = 'easypay_number'
+MATCH_ID_NUMBER = 'id_number'
+MATCH_POLICY_NUMBER = 'policy_number'
+MATCH_MEMBERSHIP_NUMBER = 'membership_number'
+MATCH_KEYS = (MATCH_EASYPAY_NUMBER, MATCH_ID_NUMBER, MATCH_POLICY_NUMBER, MATCH_MEMBERSHIP_NUMBER)
+
+# Reference columns stored on Policy itself (ID numbers live on the encrypted Member field,
+# and are matched through the policy search documents)
+POLICY_REFERENCE_FIELDS = (MATCH_EASYPAY_NUMBER, MATCH_POLICY_NUMBER, MATCH_MEMBERSHIP_NUMBER)
+
+ID_NUMBER_PATTERN = re.compile(r'^\d{13}$')
+LOOKUP_CHUNK_SIZE = 500
+BULK_BATCH_SIZE = 1000
+
+
+def normalize_reference(value):
+    """Return an upper-cased, stripped reference, or '' for blanks and NaN cells"""
+    if value is None:
+        return ''
+    value = str(value).strip()
+    if value.lower() in ('nan', 'none'):
+        return ''
+    return value.upper()
+
+
+def chunked(values, size=LOOKUP_CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def candidate_policies():
+    return Policy.objects.select_related(
+        'member', 'scheme__branch', 'plan', 'underwritten_by'
+    ).order_by('pk')
+
+
+class ReferenceIndex:
+    """
+    In-memory lookup of policies by reference number.
+
+    Where several policies share a reference the oldest one wins, matching the
+    ``.first()`` lookups the per-row import used to do.
+    """
+
+    def __init__(self, keys=MATCH_KEYS):
+        self.keys = tuple(keys)
+        self.policies = {key: {} for key in self.keys}
+
+    @classmethod
+    def build(cls, references, keys=MATCH_KEYS):
+        """
+        Load every policy (and member) that any of the references could match.
+
+        Policy reference columns are looked up with one query per chunk of
+        references. ID numbers are encrypted at rest, so they are matched on
+        the keyed ``id_number_digest`` of the policies' search documents.
+        """
+        index = cls(keys)
+        references = {normalize_reference(reference) for reference in references} - {''}
+        if not references:
+            return index
+
+        policy_fields = [field for field in POLICY_REFERENCE_FIELDS if field in index.keys]
+        if policy_fields:
+            annotations = {f'{field}_upper': Upper(field) for field in policy_fields}
+            for chunk in chunked(sorted(references)):
+                condition = Q()
+                for field in policy_fields:
+                    condition |= Q(**{f'{field}_upper__in': chunk})
+                for policy in candidate_policies().annotate(**annotations).filter(condition):
+                    index.add_policy(policy)
+
+        id_numbers = {reference for reference in references if ID_NUMBER_PATTERN.match(reference)}
+        if MATCH_ID_NUMBER in index.keys and id_numbers:
+            index.load_members_by_id_number(id_numbers)
+        return index
+
+    def add_policy(self, policy):
+        for field in POLICY_REFERENCE_FIELDS:
+            if field in self.policies:
+                value = normalize_reference(getattr(policy, field))
+                if value:
+                    self.policies[field].setdefault(value, policy)
+
+    def load_members_by_id_number(self, id_numbers):
+        digests = {id_number_digest(id_number): id_number for id_number in id_numbers}
+        for chunk in chunked(sorted(digests)):
+            policies = candidate_policies().annotate(
+                id_digest=F('search_document__id_number_digest')
+            ).filter(id_digest__in=chunk)
+            for policy in policies:
+                self.policies[MATCH_ID_NUMBER].setdefault(digests[policy.id_digest], policy)
+
+    def match(self, reference):
+        """
+        Return ``(member, policy)`` for a reference, or ``(None, None)``.
+
+        Keys are tried in the order the index was built with.
+        """
+        reference = normalize_reference(reference)
+        if not reference:
+            return None, None
+        for key in self.keys:
+            policy = self.policies[key].get(reference)
+            if policy:
+                return policy.member, policy
+        return None, None
+
+
+def build_import_row(reference, amount, date, raw_data, payment_status='COMPLETED', notes='', error=None):
+    """
+    Describe one parsed row of an import file.
+
+    Rows with an ``error`` are recorded as failed without being matched.
+    """
+    return {
+        'reference': reference,
+        'amount': amount,
+        'date': date,
+        'raw_data': raw_data,
+        'payment_status': payment_status,
+        'notes': notes,
+        'error': error,
+    }
+
+
+def reconcile_import_rows(payment_import, rows, user, payment_method, keys=MATCH_KEYS, matched_status='PROCESSED'):
+    """
+    Match parsed import rows to policies and write the results in bulk.
+
+    Args:
+        payment_import: The PaymentImport the rows belong to
+        rows: Dicts built with build_import_row
+        user: User recorded as the creator of the payments
+        payment_method: Payment.payment_method for created payments
+        keys: Reference keys to match on, in order of preference
+        matched_status: ImportRecord status for successfully matched rows
+
+    Returns:
+        dict: ``matched`` and ``unmatched`` row counts
+    """
+    rows = list(rows)
+    index = ReferenceIndex.build((row['reference'] for row in rows if not row['error']), keys)
+    processed_at = timezone.now()
+
+    records = []
+    payments = []
+    matched_count = 0
+    unmatched_count = 0
+
+    for row in rows:
+        record = ImportRecord(
+            payment_import=payment_import,
+            reference=row['reference'],
+            identifier=row['reference'],
+            amount=row['amount'],
+            date=row['date'],
+            raw_data=row['raw_data'] if isinstance(row['raw_data'], str) else json.dumps(row['raw_data']),
+        )
+        records.append(record)
+
+        if row['error']:
+            record.status = 'FAILED'
+            record.error_message = row['error']
+            unmatched_count += 1
+            continue
+
+        member, policy = index.match(row['reference'])
+        if member is None:
+            record.status = 'UNMATCHED'
+            record.error_message = (
+                "No matching member found for this reference."
+                if row['payment_status'] == 'COMPLETED'
+                else "Failed payment with no matching member."
+            )
+            unmatched_count += 1
+            continue
+
+        payment = Payment(
+            member=member,
+            policy=policy,
+            amount=row['amount'],
+            date=row['date'],
+            payment_method=payment_method,
+            status=row['payment_status'],
+            reference_number=row['reference'],
+            notes=row['notes'],
+            created_by=user,
+        )
+        payments.append((record, payment))
+        record.processed_at = processed_at
+
+        if row['payment_status'] == 'COMPLETED':
+            record.status = matched_status
+            matched_count += 1
+        else:
+            record.status = 'FAILED'
+            record.error_message = "Payment failed"
+            unmatched_count += 1
+
+    with transaction.atomic():
+        Payment.objects.bulk_create([payment for _, payment in payments], batch_size=BULK_BATCH_SIZE)
+        for record, payment in payments:
+            record.payment = payment
+        PaymentAllocation.objects.bulk_create(
+            build_default_allocations(payment for _, payment in payments),
+            batch_size=BULK_BATCH_SIZE,
+        )
+        ImportRecord.objects.bulk_create(records, batch_size=BULK_BATCH_SIZE)
+
+        affected_policies = {payment.policy_id: payment.policy for _, payment in payments if payment.policy_id}
+        update_policy_statuses(affected_policies.values())
+        schedule_rollup_rebuild([payment.date for _, payment in payments])
+
+    logger.info(
+        f"Reconciled import {payment_import.pk}: {matched_count} matched, {unmatched_count} unmatched"
+    )
+    return {'matched': matched_count, 'unmatched': unmatched_count}
+
+
+def build_default_allocations(payments):
+    """Unsaved allocations equivalent to Payment.create_default_allocation for completed payments"""
+    allocations = []
+    for payment in payments:
+        if not payment.policy_id or payment.status != 'COMPLETED':
+            continue
+        allocation = PaymentAllocation(
+            payment=payment,
+            member=payment.member,
+            policy=payment.policy,
+            coverage_month=infer_coverage_month_for_payment(payment),
+            allocated_amount=payment.amount,
+            allocation_status='ALLOCATED',
+            notes=payment.notes,
+            created_by=payment.created_by,
+        )
+        allocation.populate_from_policy()
+        allocations.append(allocation)
+    return allocations
+
+
+def schedule_rollup_rebuild(dates):
+    """bulk_create skips the rollup signals, so rebuild the imported date range once on commit"""
+    dates = [date for date in dates if date]
+    if not dates:
+        return
+
+    def rebuild():
+        from dashboard.rollups import rebuild_policy_rollups
+
+        try:
+            rebuild_policy_rollups(start_date=min(dates), end_date=max(dates))
+        except Exception:
+            # The nightly reconcile repairs the rollups if this fails.
+            logger.exception("Failed to rebuild policy rollups after payment import")
+
+    transaction.on_commit(rebuild)
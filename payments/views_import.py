@@ -3,9 +3,9 @@ Payment import views for EasyPay and Linkserv integration.
 """
 import csv
 import io
-import json
 import logging
 import os
+import re
 import pandas as pd
 from datetime import datetime
 
@@ -17,13 +17,20 @@ from django.urls import reverse
 from django.utils import timezone
 from django.http import HttpResponse, JsonResponse
 from django.db import transaction
-from django.db.models import Q
 from django.core.paginator import Paginator
 
 from members.models import Member, Policy
 from .models import Payment, PaymentImport, ImportRecord
 from .forms import PaymentImportForm
 from .utils.policy_utils import update_policy_status
+from .utils.reconciliation import (
+    MATCH_EASYPAY_NUMBER,
+    MATCH_ID_NUMBER,
+    MATCH_MEMBERSHIP_NUMBER,
+    MATCH_POLICY_NUMBER,
+    build_import_row,
+    reconcile_import_rows,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -133,8 +140,8 @@ def process_easypay_import(request, import_id):
         payment_import.total_records = total_records
         payment_import.save()
         
-        matched_count = 0
-        unmatched_count = 0
+        import_notes = f"Imported from EasyPay file on {timezone.now().date()}"
+        import_rows = []
         
         for row in rows:
             # Extract data (adjust indices based on file format)
@@ -160,72 +167,21 @@ def process_easypay_import(request, import_id):
                 except (ValueError, IndexError):
                     payment_date = timezone.now().date()
                 
-                # Create import record
-                import_record = ImportRecord(
-                    payment_import=payment_import,
-                    reference=reference,
-                    identifier=reference,  # EasyPay number is the identifier
-                    amount=amount,
-                    date=payment_date,
-                    raw_data=json.dumps(row)
-                )
-                
-                # Try to match with a member
-                member = None
-                
-                # First try to match by EasyPay number
-                members = Member.objects.filter(
-                    Q(easypay_number=reference) | 
-                    Q(id_number=reference) |
-                    Q(policies__policy_number=reference)
-                )
-                
-                if members.exists():
-                    member = members.first()
-                    policy = member.policies.first() if hasattr(member, 'policies') else None
-                    
-                    # Create payment
-                    payment = Payment.objects.create(
-                        member=member,
-                        policy=policy,
-                        amount=amount,
-                        date=payment_date,
-                        payment_method='EASYPAY',
-                        status='COMPLETED',
-                        reference_number=reference,
-                        notes=f"Imported from EasyPay file on {timezone.now().date()}",
-                        created_by=request.user
-                    )
-                    
-                    # Update import record
-                    import_record.payment = payment
-                    import_record.status = 'PROCESSED'
-                    import_record.processed_at = timezone.now()
-                    import_record.save()
-                    
-                    # Update policy status
-                    if policy:
-                        update_policy_status(policy)
-                    
-                    matched_count += 1
-                else:
-                    # No match found
-                    import_record.status = 'UNMATCHED'
-                    import_record.error_message = "No matching member found for this reference."
-                    import_record.save()
-                    unmatched_count += 1
+                import_rows.append(build_import_row(reference, amount, payment_date, row, notes=import_notes))
             else:
                 # Invalid row format
-                import_record = ImportRecord(
-                    payment_import=payment_import,
-                    status='FAILED',
-                    error_message="Invalid row format",
-                    raw_data=json.dumps(row),
-                    date=timezone.now().date(),
-                    amount=0
-                )
-                import_record.save()
-                unmatched_count += 1
+                import_rows.append(build_import_row('', 0, timezone.now().date(), row, error="Invalid row format"))
+        
+        # Match against EasyPay, ID and policy numbers and write everything in bulk
+        result = reconcile_import_rows(
+            payment_import,
+            import_rows,
+            request.user,
+            payment_method='EASYPAY',
+            keys=(MATCH_EASYPAY_NUMBER, MATCH_ID_NUMBER, MATCH_POLICY_NUMBER),
+        )
+        matched_count = result['matched']
+        unmatched_count = result['unmatched']
         
         # Update import status
         payment_import.successful_records = matched_count
@@ -304,8 +260,7 @@ def process_bank_reconciliation_import(request, import_id):
         
         # Process rows
         total_rows = len(rows)
-        matched_count = 0
-        unmatched_count = 0
+        import_rows = []
         
         for row in rows:
             if len(row) <= max(date_col, desc_col, ref_col, amount_col):
@@ -330,7 +285,6 @@ def process_bank_reconciliation_import(request, import_id):
                     amount = float(amount_str)
                 except ValueError:
                     # Try to extract numeric value from string with currency symbols
-                    import re
                     amount_match = re.search(r'[\d.,]+', amount_str)
                     if amount_match:
                         amount = float(amount_match.group().replace(',', ''))
@@ -345,84 +299,51 @@ def process_bank_reconciliation_import(request, import_id):
                 policy_ref = reference
                 if not policy_ref or len(policy_ref) < 4:
                     # Try to extract policy number from description
-                    import re
                     ref_match = re.search(r'\b([A-Z0-9]{5,})\b', description)
                     if ref_match:
                         policy_ref = ref_match.group(1)
                 
-                # Create import record
-                record = ImportRecord(
-                    import_log=payment_import,
-                    reference=policy_ref,
-                    amount=amount,
-                    transaction_date=transaction_date,
-                    raw_data=json.dumps({
-                        'date': str(row[date_col]),
-                        'description': description,
-                        'reference': reference,
-                        'amount': amount_str
-                    })
-                )
-                
-                # Try to match to a policy
+                raw_data = {
+                    'date': str(row[date_col]),
+                    'description': description,
+                    'reference': reference,
+                    'amount': amount_str
+                }
                 if policy_ref and len(policy_ref) >= 4:
-                    policies = Policy.objects.filter(
-                        Q(policy_number__iexact=policy_ref) | 
-                        Q(membership_number__iexact=policy_ref)
-                    )
-                    
-                    if policies.exists():
-                        policy = policies.first()
-                        record.status = 'MATCHED'
-                        record.save()
-                        
-                        # Create payment
-                        payment = Payment(
-                            policy=policy,
-                            amount=amount,
-                            payment_date=transaction_date,
-                            payment_method='BANK_TRANSFER',
-                            reference=reference,
-                            notes=f"Imported from bank reconciliation: {description}",
-                            created_by=request.user,
-                            import_record=record
-                        )
-                        payment.save()
-                        
-                        # Update policy status if needed
-                        update_policy_status(policy)
-                        
-                        matched_count += 1
-                    else:
-                        record.status = 'UNMATCHED'
-                        record.error_message = 'No policy found with this reference number'
-                        record.save()
-                        unmatched_count += 1
+                    import_rows.append(build_import_row(
+                        policy_ref, amount, transaction_date, raw_data,
+                        notes=f"Imported from bank reconciliation: {description}"
+                    ))
                 else:
-                    record.status = 'UNMATCHED'
-                    record.error_message = 'Invalid or missing policy reference'
-                    record.save()
-                    unmatched_count += 1
+                    import_rows.append(build_import_row(
+                        policy_ref, amount, transaction_date, raw_data,
+                        error='Invalid or missing policy reference'
+                    ))
                     
             except Exception as e:
                 logger.error(f"Error processing bank reconciliation row: {str(e)}")
-                record = ImportRecord(
-                    import_log=payment_import,
-                    reference=reference if 'reference' in locals() else '',
-                    amount=amount if 'amount' in locals() else 0,
-                    transaction_date=transaction_date if 'transaction_date' in locals() else datetime.now().date(),
-                    status='ERROR',
-                    error_message=str(e),
-                    raw_data=json.dumps(row) if isinstance(row, list) else str(row)
-                )
-                record.save()
-                unmatched_count += 1
+                import_rows.append(build_import_row(
+                    '', 0, datetime.now().date(), [str(value) for value in row], error=str(e)
+                ))
+        
+        # Match against policy and membership numbers and write everything in bulk
+        result = reconcile_import_rows(
+            payment_import,
+            import_rows,
+            request.user,
+            payment_method='BANK_TRANSFER',
+            keys=(MATCH_POLICY_NUMBER, MATCH_MEMBERSHIP_NUMBER),
+            matched_status='MATCHED',
+        )
+        matched_count = result['matched']
+        unmatched_count = result['unmatched']
         
         # Update import status
         payment_import.total_records = total_rows
-        payment_import.matched_records = matched_count
+        payment_import.successful_records = matched_count
         payment_import.failed_records = unmatched_count
         payment_import.status = 'COMPLETED'
+        payment_import.processed_at = timezone.now()
         payment_import.save()
         
         messages.success(request, f"Bank reconciliation import completed: {matched_count} matched, {unmatched_count} unmatched records.")
@@ -430,7 +351,7 @@ def process_bank_reconciliation_import(request, import_id):
     except Exception as e:
         logger.error(f"Error processing bank reconciliation import: {str(e)}")
         payment_import.status = 'FAILED'
-        payment_import.error_message = str(e)
+        payment_import.notes = f"Error: {str(e)}"
         payment_import.save()
         messages.error(request, f"Error processing bank reconciliation import: {str(e)}")
     
@@ -471,9 +392,6 @@ def process_linkserv_import(request, import_id):
         payment_import.total_records = total_records
         payment_import.save()
         
-        matched_count = 0
-        unmatched_count = 0
-        
         # Determine column names (they might vary)
         reference_col = next((col for col in df.columns if 'reference' in col.lower() or 'policy' in col.lower()), None)
         amount_col = next((col for col in df.columns if 'amount' in col.lower()), None)
@@ -482,6 +400,9 @@ def process_linkserv_import(request, import_id):
         if not (reference_col and amount_col):
             raise ValueError("Could not identify required columns in the Excel file.")
         
+        payment_date = timezone.now().date()
+        import_rows = []
+        
         for _, row in df.iterrows():
             # Extract data
             reference = str(row[reference_col]).strip() if reference_col else ""
@@ -494,102 +415,26 @@ def process_linkserv_import(request, import_id):
             status = str(row[status_col]).lower() if status_col else "success"
             payment_status = 'COMPLETED' if 'success' in status else 'FAILED'
             
-            payment_date = timezone.now().date()
-            
-            # Create import record
-            import_record = ImportRecord(
-                payment_import=payment_import,
-                reference=reference,
-                identifier=reference,
-                amount=amount,
-                date=payment_date,
-                raw_data=row.to_json()
-            )
-            
-            # Only process successful payments
+            # Failed debit orders are still recorded against the policy (they may lapse it)
             if payment_status == 'COMPLETED':
-                # Try to match with a member
-                members = Member.objects.filter(
-                    Q(policies__policy_number=reference) | 
-                    Q(id_number=reference)
-                )
-                
-                if members.exists():
-                    member = members.first()
-                    policy = member.policies.first() if hasattr(member, 'policies') else None
-                    
-                    # Create payment
-                    payment = Payment.objects.create(
-                        member=member,
-                        policy=policy,
-                        amount=amount,
-                        date=payment_date,
-                        payment_method='DEBIT_ORDER',
-                        status='COMPLETED',
-                        reference_number=reference,
-                        notes=f"Imported from Linkserv debit order file on {timezone.now().date()}",
-                        created_by=request.user
-                    )
-                    
-                    # Update import record
-                    import_record.payment = payment
-                    import_record.status = 'PROCESSED'
-                    import_record.processed_at = timezone.now()
-                    import_record.save()
-                    
-                    # Update policy status
-                    if policy:
-                        update_policy_status(policy)
-                    
-                    matched_count += 1
-                else:
-                    # No match found
-                    import_record.status = 'UNMATCHED'
-                    import_record.error_message = "No matching member found for this reference."
-                    import_record.save()
-                    unmatched_count += 1
+                notes = f"Imported from Linkserv debit order file on {payment_date}"
             else:
-                # Failed debit order
-                members = Member.objects.filter(
-                    Q(policies__policy_number=reference) | 
-                    Q(id_number=reference)
-                )
-                
-                if members.exists():
-                    member = members.first()
-                    policy = member.policies.first() if hasattr(member, 'policies') else None
-                    
-                    # Create payment record for failed debit
-                    payment = Payment.objects.create(
-                        member=member,
-                        policy=policy,
-                        amount=amount,
-                        date=payment_date,
-                        payment_method='DEBIT_ORDER',
-                        status='FAILED',
-                        reference_number=reference,
-                        notes=f"Failed debit order imported from Linkserv file on {timezone.now().date()}",
-                        created_by=request.user
-                    )
-                    
-                    # Update import record
-                    import_record.payment = payment
-                    import_record.status = 'FAILED'
-                    import_record.error_message = "Debit order failed"
-                    import_record.processed_at = timezone.now()
-                    import_record.save()
-                    
-                    # Update policy status (may mark as lapsed)
-                    if policy:
-                        update_policy_status(policy)
-                    
-                    unmatched_count += 1
-                else:
-                    # No match found for failed debit
-                    import_record.status = 'UNMATCHED'
-                    import_record.error_message = "Failed debit order with no matching member."
-                    import_record.save()
-                    unmatched_count += 1
+                notes = f"Failed debit order imported from Linkserv file on {payment_date}"
+            import_rows.append(build_import_row(
+                reference, amount, payment_date, row.to_json(),
+                payment_status=payment_status, notes=notes
+            ))
+        
+        # Match against policy and ID numbers and write everything in bulk
+        result = reconcile_import_rows(
+            payment_import,
+            import_rows,
+            request.user,
+            payment_method='DEBIT_ORDER',
+            keys=(MATCH_POLICY_NUMBER, MATCH_ID_NUMBER),
+        )
+        matched_count = result['matched']
+        unmatched_count = result['unmatched']
         
         # Update import status
         payment_import.successful_records = matched_count
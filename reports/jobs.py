@@ -0,0 +1,209 @@
+# reports/jobs.py
+"""
+Background report exports.
+
+A ``ReportJob`` is created (or reused) for each report/format/filter/scope
+combination, built by ``reports.tasks.generate_report_job`` and downloaded
+once finished. Jobs with identical parameters share one artifact until it is
+older than ``REPORT_JOB_MAX_AGE`` seconds. A pending or running job that has
+not finished within ``REPORT_JOB_STALE_AFTER`` seconds is taken to be lost
+(its enqueue failed or its worker died), marked failed and replaced.
+"""
+
+import csv
+import hashlib
+import json
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from config.permissions import user_has_role
+
+from .models import ReportJob
+
+logger = logging.getLogger(__name__)
+
+REPORT_JOB_PARAM_KEYS = (
+    'branch', 'scheme', 'agent', 'status', 'search', 'cover_month', 'start_date', 'end_date', 'source', 'page',
+)
+REPORT_JOB_FORMATS = {'csv': 'csv', 'excel': 'xlsx', 'pdf': 'pdf'}
+PROGRESS_UPDATE_EVERY = 500
+
+
+def report_job_max_age():
+    return timedelta(seconds=getattr(settings, 'REPORT_JOB_MAX_AGE', 3600))
+
+
+def report_job_stale_after():
+    return timedelta(seconds=getattr(settings, 'REPORT_JOB_STALE_AFTER', 3600))
+
+
+def fail_stale_report_jobs(params_hash):
+    """Mark in-flight jobs for these parameters that have stalled as failed."""
+    now = timezone.now()
+    cutoff = now - report_job_stale_after()
+    return ReportJob.objects.filter(params_hash=params_hash).filter(
+        Q(status=ReportJob.STATUS_PENDING, created_at__lt=cutoff)
+        | Q(status=ReportJob.STATUS_RUNNING, started_at__lt=cutoff)
+    ).update(
+        status=ReportJob.STATUS_FAILED,
+        error_message='The report job stopped responding. Please request it again.',
+        completed_at=now,
+    )
+
+
+def report_scope_key(user):
+    """Users who see all data share artifacts; everyone else gets their own."""
+    if user.is_superuser or user_has_role(user, 'Administrator'):
+        return 'all'
+    return f'user:{user.pk}'
+
+
+def normalize_report_params(params):
+    return {
+        key: str(params.get(key, '')).strip()
+        for key in REPORT_JOB_PARAM_KEYS
+        if str(params.get(key, '')).strip()
+    }
+
+
+def hash_report_params(report_key, export_format, params, scope_key):
+    payload = json.dumps(
+        {'report': report_key, 'format': export_format, 'params': params, 'scope': scope_key},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_or_create_report_job(user, report_key, export_format, params):
+    """
+    Return a job for the given export, reusing a matching one when possible.
+
+    A pending or running job with the same parameters is returned as-is unless
+    it has stalled, as is a completed one younger than ``REPORT_JOB_MAX_AGE``.
+    Otherwise a new job is created and queued once the transaction commits.
+
+    Returns:
+        tuple: ``(job, created)``
+    """
+    if export_format not in REPORT_JOB_FORMATS:
+        raise ValueError(f'Unsupported export format: {export_format}')
+
+    params = normalize_report_params(params)
+    if export_format != 'pdf':
+        # Only PDF exports are split into parts.
+        params.pop('page', None)
+    scope_key = report_scope_key(user)
+    params_hash = hash_report_params(report_key, export_format, params, scope_key)
+
+    fail_stale_report_jobs(params_hash)
+    reusable = ReportJob.objects.filter(params_hash=params_hash).filter(
+        Q(status__in=[ReportJob.STATUS_PENDING, ReportJob.STATUS_RUNNING])
+        | Q(status=ReportJob.STATUS_COMPLETED, completed_at__gte=timezone.now() - report_job_max_age())
+    ).order_by('-created_at').first()
+    if reusable:
+        return reusable, False
+
+    job = ReportJob.objects.create(
+        report_key=report_key,
+        export_format=export_format,
+        params=params,
+        params_hash=params_hash,
+        scope_key=scope_key,
+        requested_by=user,
+    )
+    transaction.on_commit(lambda: enqueue_report_job(job.pk))
+    return job, True
+
+
+def enqueue_report_job(job_id):
+    from .tasks import generate_report_job
+
+    generate_report_job.delay(job_id)
+
+
+def track_progress(job_id, rows, total):
+    """Yield rows unchanged while recording how many have been written."""
+    written = 0
+    for row in rows:
+        yield row
+        written += 1
+        if written % PROGRESS_UPDATE_EVERY == 0:
+            ReportJob.objects.filter(pk=job_id).update(
+                rows_written=written,
+                progress=min(99, written * 100 // total) if total else 0,
+            )
+    ReportJob.objects.filter(pk=job_id).update(rows_written=written)
+
+
+def write_report_artifact(output, export_format, title, headers, rows):
+    from .views import Echo, build_report_workbook, render_pdf
+
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        output.write(writer.writerow(headers).encode('utf-8'))
+        for row in rows:
+            output.write(writer.writerow(row).encode('utf-8'))
+    elif export_format == 'excel':
+        build_report_workbook(title, headers, rows).save(output)
+    else:
+        output.write(render_pdf(title, headers, rows))
+
+
+def run_report_job(job_id):
+    """
+    Build the artifact for a report job and store it on the job.
+
+    Returns:
+        ReportJob: The job after it completed or failed
+    """
+    from .views import build_report_export, pdf_export_page
+
+    job = ReportJob.objects.select_related('requested_by').get(pk=job_id)
+    if job.status == ReportJob.STATUS_COMPLETED:
+        return job
+
+    job.status = ReportJob.STATUS_RUNNING
+    job.started_at = timezone.now()
+    job.error_message = ''
+    job.save(update_fields=['status', 'started_at', 'error_message'])
+
+    try:
+        if job.requested_by is None:
+            raise ValueError('The user who requested this report no longer exists.')
+
+        items, build_dataset, filename = build_report_export(job.report_key, job.requested_by, job.params)
+        filename = f'{filename}.{REPORT_JOB_FORMATS[job.export_format]}'
+        if job.export_format == 'pdf':
+            title, headers, rows, filename = pdf_export_page(items, job.params.get('page'), build_dataset, filename)
+            # A PDF part is rendered in one go, so it only reports 0 or 100%.
+            total = 0
+        else:
+            title, headers, rows = build_dataset(items)
+            total = items.count() if isinstance(items, QuerySet) else len(items)
+
+        ReportJob.objects.filter(pk=job.pk).update(rows_total=total)
+        with tempfile.TemporaryFile() as output:
+            write_report_artifact(output, job.export_format, title, headers, track_progress(job.pk, rows, total))
+            output.seek(0)
+            job.artifact.save(filename, File(output), save=False)
+
+        job.refresh_from_db(fields=['rows_total', 'rows_written'])
+        job.status = ReportJob.STATUS_COMPLETED
+        job.progress = 100
+        job.completed_at = timezone.now()
+        job.save(update_fields=['artifact', 'status', 'progress', 'completed_at'])
+        logger.info("Report job %s completed with %s rows", job.pk, job.rows_written)
+    except Exception as e:
+        logger.exception("Report job %s failed", job.pk)
+        job.status = ReportJob.STATUS_FAILED
+        job.error_message = str(e)
+        job.completed_at = timezone.now()
+        job.save(update_fields=['status', 'error_message', 'completed_at'])
+    return job
@@ -0,0 +1,23 @@
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(
+    name="reports.tasks.generate_report_job",
+    bind=True
+)
+def generate_report_job(self, job_id):
+    """
+    Build the export artifact for a ReportJob outside the web request.
+
+    Args:
+        job_id: Primary key of the ReportJob to build
+    """
+    from reports.jobs import run_report_job
+
+    logger.info(f"Starting report job {job_id}")
+    job = run_report_job(job_id)
+    return {"status": job.status, "rows": job.rows_written}
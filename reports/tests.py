@@ -1,11 +1,18 @@
 import io
-from datetime import date
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
 from decimal import Decimal
+from unittest import mock
 
 from django.contrib.auth.models import Group
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from openpyxl import load_workbook
 
 from audit.models import AuditLog
@@ -15,6 +22,9 @@ from payments.models import Payment
 from schemes.models import Plan, Scheme
 from branches.models import Bank, Branch
 from settings_app.models import Agent
+from reports.jobs import run_report_job
+from reports.models import ReportJob
+from reports.views import collect_amendment_entries, csv_response
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 
@@ -184,7 +194,7 @@ class PaymentAllocationReportTests(TestCase):
             response['Content-Type'],
             'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
-        workbook = load_workbook(io.BytesIO(response.content))
+        workbook = load_workbook(io.BytesIO(response.getvalue()))
         worksheet = workbook.active
         self.assertEqual(worksheet['A1'].value, 'Payment Allocation Report May 2026 (Admin)')
         self.assertEqual(worksheet['A4'].value, '2026-04-15')
@@ -196,7 +206,7 @@ class PaymentAllocationReportTests(TestCase):
         })
 
         self.assertEqual(response.status_code, 200)
-        workbook = load_workbook(io.BytesIO(response.content))
+        workbook = load_workbook(io.BytesIO(response.getvalue()))
         worksheet = workbook.active
         self.assertEqual(worksheet['A1'].value, 'All Members Report')
         self.assertEqual(worksheet['A4'].value, 'Test Scheme')
@@ -230,7 +240,7 @@ class PaymentAllocationReportTests(TestCase):
         })
         self.assertEqual(response.status_code, 200)
         self.assertIn('text/csv', response['Content-Type'])
-        self.assertIn('Test Scheme', response.content.decode())
+        self.assertIn('Test Scheme', response.getvalue().decode())
 
     def test_payment_allocation_report_exports_pdf(self):
         payment = Payment.objects.create(
@@ -253,6 +263,49 @@ class PaymentAllocationReportTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'application/pdf')
 
+    def test_all_members_report_streams_csv(self):
+        response = self.client.get(reverse('reports:all_members_report'), {
+            'export': 'csv',
+        })
+
+        self.assertTrue(response.streaming)
+        lines = response.getvalue().decode().splitlines()
+        self.assertEqual(lines[0].split(',')[0], 'Scheme')
+        self.assertEqual(len(lines), 2)
+
+    def test_csv_export_memory_does_not_grow_with_rows(self):
+        def peak_memory(row_count):
+            rows = ([index, 'Jane Doe', '150.00'] for index in range(row_count))
+            tracemalloc.start()
+            for _chunk in csv_response(['Row', 'Client', 'Premium'], rows, 'rows.csv').streaming_content:
+                pass
+            _current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return peak
+
+        small = peak_memory(1000)
+        large = peak_memory(100000)
+
+        self.assertLess(large, small * 2)
+
+    def test_all_members_report_splits_large_pdf_exports(self):
+        Policy.objects.create(
+            member=self.member,
+            scheme=self.scheme,
+            plan=self.plan,
+            membership_number='M124',
+            underwritten_by=self.agent,
+        )
+
+        with mock.patch('reports.views.PDF_ROWS_PER_EXPORT', 1):
+            response = self.client.get(reverse('reports:all_members_report'), {
+                'export': 'pdf',
+                'page': 2,
+            })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('all-members-report-part-2.pdf', response['Content-Disposition'])
+
     def test_payment_allocation_report_filters_by_branch_agent_and_search(self):
         payment = Payment.objects.create(
             member=self.member,
@@ -300,6 +353,30 @@ class PaymentAllocationReportTests(TestCase):
         self.assertContains(response, 'premium_amount')
         self.assertContains(response, '175.00')
 
+    def test_amendments_report_pagination_keeps_encoded_filters(self):
+        Member.objects.filter(pk=self.member.pk).update(last_name='Doe & Co #1')
+        batch = PolicyAmendmentImport.objects.create(
+            uploaded_by=self.user,
+            file=SimpleUploadedFile('amendments.csv', b'membership_number,premium_amount\n'),
+            status='completed',
+        )
+        PolicyAmendmentRowLog.objects.bulk_create([
+            PolicyAmendmentRowLog(
+                import_batch=batch,
+                row_number=row_number,
+                membership_number=self.policy.membership_number,
+                status='success',
+                changes={'premium_amount': ['150.00', f'{150 + row_number}.00']},
+            )
+            for row_number in range(1, 52)
+        ])
+
+        response = self.client.get(reverse('reports:amendments_report'), {'search': 'Doe & Co #1'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'search=Doe%20%26%20Co%20%231&start_date=')
+        self.assertNotContains(response, 'search=Doe & Co')
+
     def test_amendments_report_includes_audit_changes(self):
         AuditLog.objects.create(
             user=self.user,
@@ -342,7 +419,7 @@ class PaymentAllocationReportTests(TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertIn('text/csv', response['Content-Type'])
-        self.assertIn('premium_amount', response.content.decode())
+        self.assertIn('premium_amount', response.getvalue().decode())
 
     def test_amendments_report_filters_by_branch_and_search(self):
         batch = PolicyAmendmentImport.objects.create(
@@ -368,6 +445,162 @@ class PaymentAllocationReportTests(TestCase):
         self.assertContains(response, 'premium_amount')
         self.assertContains(response, 'Jane Doe')
 
+    def add_amendment_activity(self, count):
+        batch = PolicyAmendmentImport.objects.create(
+            uploaded_by=self.user,
+            file=SimpleUploadedFile('amendments.csv', b'membership_number,premium_amount\n'),
+            status='completed',
+        )
+        policy_ct = ContentType.objects.get_for_model(Policy)
+        member_ct = ContentType.objects.get_for_model(Member)
+        for index in range(count):
+            member = Member.objects.create(
+                first_name=f'Client{index}',
+                last_name='Doe',
+                gender='Female',
+                date_of_birth=date(1990, 1, 1),
+                phone_number='0820000000',
+            )
+            policy = Policy.objects.create(
+                member=member,
+                scheme=self.scheme,
+                plan=self.plan,
+                membership_number=f'BULK{index}',
+                underwritten_by=self.agent,
+            )
+            PolicyAmendmentRowLog.objects.create(
+                import_batch=batch,
+                row_number=index + 1,
+                membership_number=policy.membership_number,
+                status='success',
+                changes={'premium_amount': ['150.00', '175.00']},
+            )
+            for content_type, object_id in ((policy_ct, policy.id), (member_ct, member.id)):
+                AuditLog.objects.create(
+                    user=self.user,
+                    username=self.user.username,
+                    action='update',
+                    content_type=content_type,
+                    object_id=str(object_id),
+                    object_repr=str(member),
+                    data={'field': 'phone_number', 'old_value': '1', 'new_value': '2'},
+                )
+
+    def count_amendment_queries(self, **filters):
+        with CaptureQueriesContext(connection) as context:
+            entries = collect_amendment_entries(**filters)
+        return len(context.captured_queries), entries
+
+    def test_amendment_entries_query_count_does_not_grow_with_logs(self):
+        self.add_amendment_activity(2)
+        small_count, small_entries = self.count_amendment_queries(filter_scheme=str(self.scheme.id))
+        self.add_amendment_activity(10)
+        large_count, large_entries = self.count_amendment_queries(filter_scheme=str(self.scheme.id))
+
+        self.assertEqual(len(small_entries), 6)
+        self.assertEqual(len(large_entries), 36)
+        self.assertEqual(small_count, large_count)
+
+    def test_amendment_entries_resolve_member_logs_to_latest_policy(self):
+        self.add_amendment_activity(1)
+
+        _count, entries = self.count_amendment_queries(source='audit', search_term='Client0')
+
+        self.assertEqual(len(entries), 2)
+        self.assertEqual({entry['membership_number'] for entry in entries}, {'BULK0'})
+        self.assertEqual({entry['entity'] for entry in entries}, {'Policy', 'Member'})
+
+    def test_amendment_entries_filter_out_other_branches(self):
+        self.add_amendment_activity(1)
+        other_branch = Branch.objects.create(name='Other Branch', bank=self.bank, code='OB01')
+
+        entries = collect_amendment_entries(filter_branch=str(other_branch.id))
+
+        self.assertEqual(entries, [])
+
+    def test_amendments_report_paginates_entries(self):
+        self.add_amendment_activity(20)
+
+        response = self.client.get(reverse('reports:amendments_report'), {'page': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].number, 2)
+        self.assertEqual(len(response.context['entries']), 10)
+
+    def test_report_job_deduplicates_identical_requests(self):
+        params = {'report': 'all_members', 'export': 'csv', 'scheme': self.scheme.id}
+
+        first = self.client.post(reverse('reports:report_job_create'), params)
+        second = self.client.post(reverse('reports:report_job_create'), params)
+        other = self.client.post(reverse('reports:report_job_create'), dict(params, export='excel'))
+
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.json()['id'], second.json()['id'])
+        self.assertNotEqual(first.json()['id'], other.json()['id'])
+        self.assertEqual(ReportJob.objects.count(), 2)
+
+    def test_report_job_replaces_stalled_jobs(self):
+        params = {'report': 'all_members', 'export': 'csv', 'scheme': self.scheme.id}
+        lost = self.client.post(reverse('reports:report_job_create'), params).json()['id']
+        crashed = self.client.post(reverse('reports:report_job_create'), dict(params, export='excel')).json()['id']
+        long_ago = timezone.now() - timedelta(hours=2)
+        ReportJob.objects.filter(pk=lost).update(created_at=long_ago)
+        ReportJob.objects.filter(pk=crashed).update(
+            status=ReportJob.STATUS_RUNNING, created_at=long_ago, started_at=long_ago,
+        )
+
+        replaced = self.client.post(reverse('reports:report_job_create'), params)
+        self.client.post(reverse('reports:report_job_create'), dict(params, export='excel'))
+
+        self.assertEqual(replaced.status_code, 202)
+        self.assertNotEqual(replaced.json()['id'], lost)
+        self.assertEqual(
+            set(ReportJob.objects.filter(pk__in=[lost, crashed]).values_list('status', flat=True)),
+            {ReportJob.STATUS_FAILED},
+        )
+        self.assertEqual(ReportJob.objects.filter(status=ReportJob.STATUS_PENDING).count(), 2)
+
+    def test_report_job_builds_downloadable_artifact(self):
+        with tempfile.TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            response = self.client.post(reverse('reports:report_job_create'), {
+                'report': 'all_members',
+                'export': 'csv',
+                'scheme': self.scheme.id,
+            })
+            job = run_report_job(response.json()['id'])
+
+            self.assertEqual(job.status, ReportJob.STATUS_COMPLETED)
+            self.assertEqual(job.progress, 100)
+            self.assertEqual(job.rows_total, 1)
+            self.assertEqual(job.rows_written, 1)
+
+            status = self.client.get(reverse('reports:report_job_status', args=[job.pk])).json()
+            self.assertEqual(status['status'], 'completed')
+            download = self.client.get(status['download_url'])
+            content = download.getvalue().decode()
+            download.close()
+            self.assertEqual(download.status_code, 200)
+            self.assertIn('Jane Doe', content)
+
+            reused = self.client.post(reverse('reports:report_job_create'), {
+                'report': 'all_members',
+                'export': 'csv',
+                'scheme': self.scheme.id,
+            })
+            self.assertEqual(reused.json()['id'], job.pk)
+            self.assertEqual(reused.json()['download_url'], status['download_url'])
+
+    def test_report_job_download_waits_for_completion(self):
+        response = self.client.post(reverse('reports:report_job_create'), {
+            'report': 'amendments',
+            'export': 'excel',
+        })
+
+        download = self.client.get(reverse('reports:report_job_download', args=[response.json()['id']]))
+
+        self.assertEqual(download.status_code, 404)
+
     def test_ai_reports_route_is_not_available(self):
         response = self.client.get('/reports/ai/')
         self.assertEqual(response.status_code, 404)
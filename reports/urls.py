@@ -9,4 +9,7 @@ urlpatterns = [
     path('payment_allocation_report/', views.payment_allocation_report, name='payment_allocation_report'),
     path('amendments_report/', views.amendments_report, name='amendments_report'),
     path('generate_report/', views.generate_report, name='generate_report'),
+    path('jobs/', views.report_job_create, name='report_job_create'),
+    path('jobs/<int:job_id>/', views.report_job_status, name='report_job_status'),
+    path('jobs/<int:job_id>/download/', views.report_job_download, name='report_job_download'),
 ]
\ No newline at end of file
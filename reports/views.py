@@ -1,22 +1,28 @@
 from datetime import datetime
 from decimal import Decimal
-import io
 import csv
+import os
+import tempfile
 from urllib.parse import urlencode
 
 from django.apps import apps
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
-from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
-from django.http import HttpResponse
-from django.shortcuts import redirect, render
+from django.core.paginator import Paginator
+from django.db.models import CharField, Count, DecimalField, ExpressionWrapper, F, Q, QuerySet, Sum, Value
+from django.db.models.functions import Cast, Concat
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.template.loader import render_to_string
 from django.utils import timezone
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
 from openpyxl.styles import Font, PatternFill
 from django.contrib.contenttypes.models import ContentType
 from django.utils.html import escape
+from django.views.decorators.http import require_POST
 from weasyprint import HTML
 
 from config.permissions import (
@@ -29,12 +35,15 @@ from config.permissions import (
     user_has_role,
 )
 from branches.models import Branch
-from members.models import Policy
+from members.models import Member, Policy
 from schemes.models import Scheme
 from import_data.models import PolicyAmendmentRowLog
 from audit.models import AuditLog
 from settings_app.models import Agent
 
+from .jobs import REPORT_JOB_FORMATS, get_or_create_report_job, report_scope_key
+from .models import ReportJob
+
 
 def parse_month_param(value):
     if not value:
@@ -64,64 +73,108 @@ def apply_policy_filters(queryset, filter_scheme, filter_status):
     return queryset
 
 
+EXPORT_CHUNK_SIZE = 2000
+PDF_ROWS_PER_EXPORT = 1000
+
+ALL_MEMBERS_HEADERS = [
+    'Scheme', 'Branch', 'Policy Number', 'Membership Number', 'Client Name', 'ID Number', 'Phone',
+    'Plan', 'Product Type', 'Retail Rate', 'Cover Amount', 'Underwriter Premium', 'Underwriter Cover',
+    'Payment Method', 'Agent Name', 'Agent Code', 'Dependants', 'Beneficiaries', 'Start Date', 'Cover Date'
+]
+PAYMENT_ALLOCATION_SCHEME_HEADERS = [
+    'Paid Date', 'Cover Month', 'Scheme', 'Policy Number', 'Client Name', 'Product', 'Payment Method',
+    'Allocated Amount', 'Retail Rate', 'Wholesale Amount', 'Agent Commission', 'Agent Name', 'Agent Code'
+]
+PAYMENT_ALLOCATION_ADMIN_HEADERS = [
+    'Paid Date', 'Cover Month', 'Scheme', 'Policy Number', 'Client Name', 'Product', 'Payment Method',
+    'Allocated Amount', 'Retail Rate', 'Underwriter Premium', 'Admin Fee', 'Scheme Fee', 'Branch Fee',
+    'Manager Fee', 'Cash Payout', 'Loyalty Programme', 'Other Fees', 'Agent Commission', 'Agent Name', 'Agent Code'
+]
+AMENDMENTS_HEADERS = [
+    'Date', 'Source', 'Scheme', 'Policy Number', 'Membership Number', 'Client', 'Entity',
+    'Field', 'Old Value', 'New Value', 'Changed By', 'Reference', 'Notes'
+]
+
+
+def iterate_export_items(items):
+    """Stream querysets from the database in chunks; other iterables pass through."""
+    if isinstance(items, QuerySet):
+        return items.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return iter(items)
+
+
 def build_report_workbook(title, headers, rows):
-    workbook = Workbook()
-    worksheet = workbook.active
-    worksheet.title = title[:31]
+    """
+    Build a write-only workbook so rows are flushed to disk as they are added.
+
+    Column widths are sized from the headers because write-only sheets cannot
+    be revisited once rows have been written.
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(title=title[:31])
 
     title_fill = PatternFill(fill_type='solid', fgColor='1F4E78')
     header_fill = PatternFill(fill_type='solid', fgColor='D9EAF7')
     bold_font = Font(bold=True, color='FFFFFF')
     header_font = Font(bold=True)
 
-    worksheet.cell(row=1, column=1, value=title)
-    worksheet.cell(row=1, column=1).fill = title_fill
-    worksheet.cell(row=1, column=1).font = bold_font
-
     for column, header in enumerate(headers, start=1):
-        cell = worksheet.cell(row=3, column=column, value=header)
+        worksheet.column_dimensions[get_column_letter(column)].width = min(max(len(str(header)) + 2, 12), 28)
+    worksheet.freeze_panes = 'A4'
+
+    title_cell = WriteOnlyCell(worksheet, value=title)
+    title_cell.fill = title_fill
+    title_cell.font = bold_font
+    worksheet.append([title_cell])
+    worksheet.append([])
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(worksheet, value=header)
         cell.fill = header_fill
         cell.font = header_font
+        header_cells.append(cell)
+    worksheet.append(header_cells)
 
-    for row_index, row_data in enumerate(rows, start=4):
-        for column, value in enumerate(row_data, start=1):
-            worksheet.cell(row=row_index, column=column, value=value)
-
-    for column_cells in worksheet.columns:
-        max_length = 0
-        column_letter = column_cells[0].column_letter
-        for cell in column_cells:
-            if cell.value is not None:
-                max_length = max(max_length, len(str(cell.value)))
-        worksheet.column_dimensions[column_letter].width = min(max_length + 2, 28)
+    for row_data in rows:
+        worksheet.append(row_data)
 
-    worksheet.freeze_panes = 'A4'
     return workbook
 
 
 def workbook_response(workbook, filename):
-    output = io.BytesIO()
+    output = tempfile.TemporaryFile()
     workbook.save(output)
     output.seek(0)
-    response = HttpResponse(
-        output.read(),
+    response = FileResponse(
+        output,
         content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
     return response
 
 
+class Echo:
+    """File-like object whose ``write`` hands the value back to ``csv.writer``."""
+
+    def write(self, value):
+        return value
+
+
 def csv_response(headers, rows, filename):
-        response = HttpResponse(content_type='text/csv')
+        writer = csv.writer(Echo())
+
+        def stream():
+                yield writer.writerow(headers)
+                for row in rows:
+                        yield writer.writerow(row)
+
+        response = StreamingHttpResponse(stream(), content_type='text/csv')
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        writer = csv.writer(response)
-        writer.writerow(headers)
-        for row in rows:
-                writer.writerow(row)
         return response
 
 
-def pdf_response(title, headers, rows, filename):
+def render_pdf(title, headers, rows):
         table_headers = ''.join(f'<th>{escape(str(header))}</th>' for header in headers)
         table_rows = ''.join(
                 '<tr>' + ''.join(f'<td>{escape(str(value))}</td>' for value in row) + '</tr>'
@@ -147,220 +200,213 @@ def pdf_response(title, headers, rows, filename):
             </body>
         </html>
         """
-        pdf_bytes = HTML(string=html).write_pdf()
-        response = HttpResponse(pdf_bytes, content_type='application/pdf')
+        return HTML(string=html).write_pdf()
+
+
+def pdf_response(title, headers, rows, filename):
+        response = HttpResponse(render_pdf(title, headers, rows), content_type='application/pdf')
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
 
 
-def export_all_members_report(policies, cover_title):
-    headers = [
-        'Scheme', 'Branch', 'Policy Number', 'Membership Number', 'Client Name', 'ID Number', 'Phone',
-        'Plan', 'Product Type', 'Retail Rate', 'Cover Amount', 'Underwriter Premium', 'Underwriter Cover',
-        'Payment Method', 'Agent Name', 'Agent Code', 'Dependants', 'Beneficiaries', 'Start Date', 'Cover Date'
+def pdf_export_page(items, page, build_dataset, filename):
+    """
+    Select one part of ``PDF_ROWS_PER_EXPORT`` rows so large reports are split
+    across several PDF downloads instead of one document held in memory.
+
+    Returns:
+        tuple: ``(title, headers, rows, filename)`` for the selected part
+    """
+    page_obj = Paginator(items, PDF_ROWS_PER_EXPORT).get_page(page)
+    title, headers, rows = build_dataset(page_obj.object_list)
+    if page_obj.paginator.num_pages > 1:
+        title = f'{title} (Part {page_obj.number} of {page_obj.paginator.num_pages})'
+        stem, _, extension = filename.rpartition('.')
+        filename = f'{stem}-part-{page_obj.number}.{extension}'
+    return title, headers, rows, filename
+
+
+def paginated_pdf_response(items, page, build_dataset, filename):
+    return pdf_response(*pdf_export_page(items, page, build_dataset, filename))
+
+
+def all_members_row(policy):
+    return [
+        policy.scheme.name if policy.scheme else '',
+        policy.scheme.branch.name if policy.scheme and policy.scheme.branch_id else '',
+        policy.policy_number or policy.unique_policy_number or '',
+        policy.membership_number or '',
+        f"{policy.member.first_name} {policy.member.last_name}",
+        policy.member.id_number or '',
+        policy.member.phone_number or '',
+        policy.plan.name if policy.plan else '',
+        policy.plan.get_policy_type_display() if policy.plan else '',
+        float(policy.plan.premium if policy.plan else policy.premium_amount or 0),
+        float(policy.plan.main_cover if policy.plan else policy.cover_amount or 0),
+        float(policy.plan.main_uw_premium if policy.plan else 0),
+        float(policy.plan.main_uw_cover if policy.plan else 0),
+        policy.get_payment_method_display() if policy.payment_method else '',
+        policy.underwritten_by.full_name if policy.underwritten_by else '',
+        policy.underwritten_by.code if policy.underwritten_by else '',
+        policy.dependents_count,
+        policy.beneficiaries_count,
+        policy.start_date.isoformat() if policy.start_date else '',
+        policy.cover_date.isoformat() if policy.cover_date else '',
     ]
-    rows = [
-        [
-            policy.scheme.name if policy.scheme else '',
-            policy.scheme.branch.name if policy.scheme and policy.scheme.branch_id else '',
-            policy.policy_number or policy.unique_policy_number or '',
-            policy.membership_number or '',
-            f"{policy.member.first_name} {policy.member.last_name}",
-            policy.member.id_number or '',
-            policy.member.phone_number or '',
-            policy.plan.name if policy.plan else '',
-            policy.plan.get_policy_type_display() if policy.plan else '',
-            float(policy.plan.premium if policy.plan else policy.premium_amount or 0),
-            float(policy.plan.main_cover if policy.plan else policy.cover_amount or 0),
-            float(policy.plan.main_uw_premium if policy.plan else 0),
-            float(policy.plan.main_uw_cover if policy.plan else 0),
-            policy.get_payment_method_display() if policy.payment_method else '',
-            policy.underwritten_by.full_name if policy.underwritten_by else '',
-            policy.underwritten_by.code if policy.underwritten_by else '',
-            policy.dependents_count,
-            policy.beneficiaries_count,
-            policy.start_date.isoformat() if policy.start_date else '',
-            policy.cover_date.isoformat() if policy.cover_date else '',
-        ]
-        for policy in policies
+
+
+def payment_allocation_row(allocation, report_version):
+    row = [
+        allocation.payment.date.isoformat(),
+        allocation.coverage_month.strftime('%Y-%m'),
+        allocation.scheme.name if allocation.scheme else '',
+        allocation.policy.policy_number,
+        f"{allocation.member.first_name} {allocation.member.last_name}",
+        allocation.product_name or (allocation.plan.name if allocation.plan else ''),
+        allocation.payment.get_payment_method_display(),
+        float(allocation.allocated_amount),
+        float(allocation.retail_premium),
     ]
-    workbook = build_report_workbook(cover_title, headers, rows)
+    if report_version == 'scheme':
+        row.append(float(allocation.wholesale_amount))
+    else:
+        row.extend([
+            float(allocation.underwriter_premium),
+            float(allocation.admin_fee),
+            float(allocation.scheme_fee),
+            float(allocation.branch_fee),
+            float(allocation.manager_fee),
+            float(allocation.cash_payout),
+            float(allocation.loyalty_programme),
+            float(allocation.other_fees),
+        ])
+    row.extend([
+        float(allocation.agent_commission),
+        allocation.agent_name,
+        allocation.agent_code,
+    ])
+    return row
+
+
+def export_all_members_report(policies, cover_title):
+    title, headers, rows = build_all_members_dataset(policies, title=cover_title)
+    workbook = build_report_workbook(title, headers, rows)
     return workbook_response(workbook, 'all-members-report.xlsx')
 
 
 def build_all_members_dataset(policies, title='All Members Report'):
-    headers = [
-        'Scheme', 'Branch', 'Policy Number', 'Membership Number', 'Client Name', 'ID Number', 'Phone',
-        'Plan', 'Product Type', 'Retail Rate', 'Cover Amount', 'Underwriter Premium', 'Underwriter Cover',
-        'Payment Method', 'Agent Name', 'Agent Code', 'Dependants', 'Beneficiaries', 'Start Date', 'Cover Date'
-    ]
-    rows = [
-        [
-            policy.scheme.name if policy.scheme else '',
-            policy.scheme.branch.name if policy.scheme and policy.scheme.branch_id else '',
-            policy.policy_number or policy.unique_policy_number or '',
-            policy.membership_number or '',
-            f"{policy.member.first_name} {policy.member.last_name}",
-            policy.member.id_number or '',
-            policy.member.phone_number or '',
-            policy.plan.name if policy.plan else '',
-            policy.plan.get_policy_type_display() if policy.plan else '',
-            float(policy.plan.premium if policy.plan else policy.premium_amount or 0),
-            float(policy.plan.main_cover if policy.plan else policy.cover_amount or 0),
-            float(policy.plan.main_uw_premium if policy.plan else 0),
-            float(policy.plan.main_uw_cover if policy.plan else 0),
-            policy.get_payment_method_display() if policy.payment_method else '',
-            policy.underwritten_by.full_name if policy.underwritten_by else '',
-            policy.underwritten_by.code if policy.underwritten_by else '',
-            policy.dependents_count,
-            policy.beneficiaries_count,
-            policy.start_date.isoformat() if policy.start_date else '',
-            policy.cover_date.isoformat() if policy.cover_date else '',
-        ]
-        for policy in policies
-    ]
-    return title, headers, rows
+    rows = (all_members_row(policy) for policy in iterate_export_items(policies))
+    return title, ALL_MEMBERS_HEADERS, rows
 
 
 def export_payment_allocation_report(allocations, cover_month, report_version):
-    if report_version == 'scheme':
-        headers = [
-            'Paid Date', 'Cover Month', 'Scheme', 'Policy Number', 'Client Name', 'Product', 'Payment Method',
-            'Allocated Amount', 'Retail Rate', 'Wholesale Amount', 'Agent Commission', 'Agent Name', 'Agent Code'
-        ]
-        rows = [
-            [
-                allocation.payment.date.isoformat(),
-                allocation.coverage_month.strftime('%Y-%m'),
-                allocation.scheme.name if allocation.scheme else '',
-                allocation.policy.policy_number,
-                f"{allocation.member.first_name} {allocation.member.last_name}",
-                allocation.product_name or (allocation.plan.name if allocation.plan else ''),
-                allocation.payment.get_payment_method_display(),
-                float(allocation.allocated_amount),
-                float(allocation.retail_premium),
-                float(allocation.wholesale_amount),
-                float(allocation.agent_commission),
-                allocation.agent_name,
-                allocation.agent_code,
-            ]
-            for allocation in allocations
-        ]
-    else:
-        headers = [
-            'Paid Date', 'Cover Month', 'Scheme', 'Policy Number', 'Client Name', 'Product', 'Payment Method',
-            'Allocated Amount', 'Retail Rate', 'Underwriter Premium', 'Admin Fee', 'Scheme Fee', 'Branch Fee',
-            'Manager Fee', 'Cash Payout', 'Loyalty Programme', 'Other Fees', 'Agent Commission', 'Agent Name', 'Agent Code'
-        ]
-        rows = [
-            [
-                allocation.payment.date.isoformat(),
-                allocation.coverage_month.strftime('%Y-%m'),
-                allocation.scheme.name if allocation.scheme else '',
-                allocation.policy.policy_number,
-                f"{allocation.member.first_name} {allocation.member.last_name}",
-                allocation.product_name or (allocation.plan.name if allocation.plan else ''),
-                allocation.payment.get_payment_method_display(),
-                float(allocation.allocated_amount),
-                float(allocation.retail_premium),
-                float(allocation.underwriter_premium),
-                float(allocation.admin_fee),
-                float(allocation.scheme_fee),
-                float(allocation.branch_fee),
-                float(allocation.manager_fee),
-                float(allocation.cash_payout),
-                float(allocation.loyalty_programme),
-                float(allocation.other_fees),
-                float(allocation.agent_commission),
-                allocation.agent_name,
-                allocation.agent_code,
-            ]
-            for allocation in allocations
-        ]
-
-    workbook = build_report_workbook(
-        f"Payment Allocation Report {cover_month.strftime('%B %Y')} ({report_version.title()})",
-        headers,
-        rows,
-    )
+    title, headers, rows = build_payment_allocation_dataset(allocations, cover_month, report_version)
+    workbook = build_report_workbook(title, headers, rows)
     return workbook_response(workbook, f'payment-allocation-{cover_month.strftime("%Y-%m")}-{report_version}.xlsx')
 
 
 def build_payment_allocation_dataset(allocations, cover_month, report_version):
     title = f"Payment Allocation Report {cover_month.strftime('%B %Y')} ({report_version.title()})"
     if report_version == 'scheme':
-        headers = [
-            'Paid Date', 'Cover Month', 'Scheme', 'Policy Number', 'Client Name', 'Product', 'Payment Method',
-            'Allocated Amount', 'Retail Rate', 'Wholesale Amount', 'Agent Commission', 'Agent Name', 'Agent Code'
-        ]
-        rows = [
-            [
-                allocation.payment.date.isoformat(),
-                allocation.coverage_month.strftime('%Y-%m'),
-                allocation.scheme.name if allocation.scheme else '',
-                allocation.policy.policy_number,
-                f"{allocation.member.first_name} {allocation.member.last_name}",
-                allocation.product_name or (allocation.plan.name if allocation.plan else ''),
-                allocation.payment.get_payment_method_display(),
-                float(allocation.allocated_amount),
-                float(allocation.retail_premium),
-                float(allocation.wholesale_amount),
-                float(allocation.agent_commission),
-                allocation.agent_name,
-                allocation.agent_code,
-            ] for allocation in allocations
-        ]
+        headers = PAYMENT_ALLOCATION_SCHEME_HEADERS
     else:
-        headers = [
-            'Paid Date', 'Cover Month', 'Scheme', 'Policy Number', 'Client Name', 'Product', 'Payment Method',
-            'Allocated Amount', 'Retail Rate', 'Underwriter Premium', 'Admin Fee', 'Scheme Fee', 'Branch Fee',
-            'Manager Fee', 'Cash Payout', 'Loyalty Programme', 'Other Fees', 'Agent Commission', 'Agent Name', 'Agent Code'
-        ]
-        rows = [
-            [
-                allocation.payment.date.isoformat(),
-                allocation.coverage_month.strftime('%Y-%m'),
-                allocation.scheme.name if allocation.scheme else '',
-                allocation.policy.policy_number,
-                f"{allocation.member.first_name} {allocation.member.last_name}",
-                allocation.product_name or (allocation.plan.name if allocation.plan else ''),
-                allocation.payment.get_payment_method_display(),
-                float(allocation.allocated_amount),
-                float(allocation.retail_premium),
-                float(allocation.underwriter_premium),
-                float(allocation.admin_fee),
-                float(allocation.scheme_fee),
-                float(allocation.branch_fee),
-                float(allocation.manager_fee),
-                float(allocation.cash_payout),
-                float(allocation.loyalty_programme),
-                float(allocation.other_fees),
-                float(allocation.agent_commission),
-                allocation.agent_name,
-                allocation.agent_code,
-            ] for allocation in allocations
-        ]
+        headers = PAYMENT_ALLOCATION_ADMIN_HEADERS
+    rows = (
+        payment_allocation_row(allocation, report_version)
+        for allocation in iterate_export_items(allocations)
+    )
     return title, headers, rows
 
 
 def build_amendments_dataset(entries):
-    headers = [
-        'Date', 'Source', 'Scheme', 'Policy Number', 'Membership Number', 'Client', 'Entity',
-        'Field', 'Old Value', 'New Value', 'Changed By', 'Reference', 'Notes'
-    ]
-    rows = [
+    rows = (
         [
             entry['date'], entry['source'], entry['scheme'], entry['policy_number'], entry['membership_number'],
             entry['client'], entry['entity'], entry['field'], entry['old_value'], entry['new_value'],
             entry['changed_by'], entry['reference'], entry['notes']
         ] for entry in entries
-    ]
-    return 'Amendments Report', headers, rows
+    )
+    return 'Amendments Report', AMENDMENTS_HEADERS, rows
 
 
-def collect_amendment_entries(filter_scheme='', filter_branch='', start_date='', end_date='', source='', search_term=''):
-    entries = []
+AMENDMENT_CHUNK_SIZE = 500
+AMENDMENTS_PER_PAGE = 50
+
 
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def amendment_policy_queryset(filter_scheme='', filter_branch='', search_term=''):
+    """Policies matching the report's scheme, branch and search filters."""
+    policies = Policy.objects.all()
+    if filter_scheme:
+        policies = policies.filter(scheme_id=filter_scheme)
+    if filter_branch:
+        policies = policies.filter(scheme__branch_id=filter_branch)
+    if search_term:
+        policies = policies.annotate(
+            client_name=Concat('member__first_name', Value(' '), 'member__last_name', output_field=CharField())
+        ).filter(
+            Q(policy_number__icontains=search_term)
+            | Q(membership_number__icontains=search_term)
+            | Q(client_name__icontains=search_term)
+        )
+    return policies
+
+
+def resolve_policies_by_membership_number(membership_numbers):
+    """Map each membership number to its first policy in one query."""
+    policies = {}
+    queryset = Policy.objects.select_related('member', 'scheme').filter(
+        membership_number__in=membership_numbers
+    ).order_by('pk')
+    for policy in queryset:
+        policies.setdefault(policy.membership_number, policy)
+    return policies
+
+
+def resolve_audit_policies(logs, policy_ct, member_ct):
+    """
+    Map ``(content_type_id, object_id)`` to the policy each audit log refers to.
+
+    Policy logs resolve to the policy itself and member logs to the member's
+    latest policy, using one query per content type.
+    """
+    object_ids = {policy_ct.id: set(), member_ct.id: set()}
+    for log in logs:
+        if log.content_type_id in object_ids and str(log.object_id).isdigit():
+            object_ids[log.content_type_id].add(int(log.object_id))
+
+    resolved = {}
+    if object_ids[policy_ct.id]:
+        for policy in Policy.objects.select_related('member', 'scheme').filter(pk__in=object_ids[policy_ct.id]):
+            resolved[(policy_ct.id, str(policy.pk))] = policy
+    if object_ids[member_ct.id]:
+        latest_first = Policy.objects.select_related('member', 'scheme').filter(
+            member_id__in=object_ids[member_ct.id]
+        ).order_by('member_id', '-created_at', '-id')
+        for policy in latest_first:
+            resolved.setdefault((member_ct.id, str(policy.member_id)), policy)
+    return resolved
+
+
+def policy_in_filters(policy, filter_scheme, filter_branch):
+    if filter_scheme and (not policy or str(policy.scheme_id) != str(filter_scheme)):
+        return False
+    if filter_branch and (not policy or str(policy.scheme.branch_id if policy.scheme_id else '') != str(filter_branch)):
+        return False
+    return True
+
+
+def collect_import_amendment_entries(filter_scheme='', filter_branch='', start_date='', end_date='', search_term=''):
     import_logs = PolicyAmendmentRowLog.objects.filter(status='success').exclude(changes={}).select_related(
         'import_batch', 'import_batch__uploaded_by'
     ).order_by('-import_batch__uploaded_at', '-row_number')
@@ -368,45 +414,55 @@ def collect_amendment_entries(filter_scheme='', filter_branch='', start_date='',
         import_logs = import_logs.filter(import_batch__uploaded_at__date__gte=start_date)
     if end_date:
         import_logs = import_logs.filter(import_batch__uploaded_at__date__lte=end_date)
+    if filter_scheme or filter_branch:
+        import_logs = import_logs.filter(
+            membership_number__in=amendment_policy_queryset(filter_scheme, filter_branch).values('membership_number')
+        )
+    if search_term:
+        import_logs = import_logs.filter(
+            Q(membership_number__icontains=search_term)
+            | Q(changes__icontains=search_term)
+            | Q(membership_number__in=amendment_policy_queryset(search_term=search_term).values('membership_number'))
+        )
 
-    for log in import_logs:
-        policy = Policy.objects.select_related('member', 'scheme').filter(membership_number=log.membership_number).first()
-        if filter_scheme and (not policy or str(policy.scheme_id) != str(filter_scheme)):
-            continue
-        if filter_branch and (not policy or str(policy.scheme.branch_id if policy and policy.scheme_id else '') != str(filter_branch)):
-            continue
-        if source and source != 'import':
-            continue
-        for field_name, values in (log.changes or {}).items():
-            old_value, new_value = (values + ['', ''])[:2] if isinstance(values, list) else ('', values)
+    for logs in chunked(import_logs.iterator(chunk_size=AMENDMENT_CHUNK_SIZE), AMENDMENT_CHUNK_SIZE):
+        policies = resolve_policies_by_membership_number({log.membership_number for log in logs})
+        for log in logs:
+            policy = policies.get(log.membership_number)
+            if not policy_in_filters(policy, filter_scheme, filter_branch):
+                continue
             client_name = f"{policy.member.first_name} {policy.member.last_name}" if policy and policy.member_id else ''
-            if search_term:
-                haystack = ' '.join([
-                    log.membership_number or '',
-                    policy.policy_number if policy else '',
-                    client_name,
-                    field_name,
-                ]).lower()
-                if search_term.lower() not in haystack:
-                    continue
-            entries.append({
-                'date': log.import_batch.uploaded_at.strftime('%Y-%m-%d %H:%M'),
-                'source': 'Import Amendment',
-                'scheme': policy.scheme.name if policy and policy.scheme else '',
-                'policy_number': policy.policy_number if policy else '',
-                'membership_number': log.membership_number,
-                'client': client_name,
-                'entity': 'Policy',
-                'field': field_name,
-                'old_value': old_value,
-                'new_value': new_value,
-                'changed_by': log.import_batch.uploaded_by.username if log.import_batch.uploaded_by else 'system',
-                'reference': f'AMEND-{log.import_batch_id}-ROW-{log.row_number}',
-                'notes': '',
-            })
-
+            for field_name, values in (log.changes or {}).items():
+                old_value, new_value = (values + ['', ''])[:2] if isinstance(values, list) else ('', values)
+                if search_term:
+                    haystack = ' '.join([
+                        log.membership_number or '',
+                        (policy.policy_number or '') if policy else '',
+                        client_name,
+                        field_name,
+                    ]).lower()
+                    if search_term.lower() not in haystack:
+                        continue
+                yield {
+                    'date': log.import_batch.uploaded_at.strftime('%Y-%m-%d %H:%M'),
+                    'source': 'Import Amendment',
+                    'scheme': policy.scheme.name if policy and policy.scheme else '',
+                    'policy_number': policy.policy_number if policy else '',
+                    'membership_number': log.membership_number,
+                    'client': client_name,
+                    'entity': 'Policy',
+                    'field': field_name,
+                    'old_value': old_value,
+                    'new_value': new_value,
+                    'changed_by': log.import_batch.uploaded_by.username if log.import_batch.uploaded_by else 'system',
+                    'reference': f'AMEND-{log.import_batch_id}-ROW-{log.row_number}',
+                    'notes': '',
+                }
+
+
+def collect_audit_amendment_entries(filter_scheme='', filter_branch='', start_date='', end_date='', search_term=''):
     policy_ct = ContentType.objects.get_for_model(Policy)
-    member_ct = ContentType.objects.get(app_label='members', model='member')
+    member_ct = ContentType.objects.get_for_model(Member)
     audit_logs = AuditLog.objects.select_related('user', 'content_type').filter(
         action='update',
         content_type__in=[policy_ct, member_ct],
@@ -416,49 +472,199 @@ def collect_amendment_entries(filter_scheme='', filter_branch='', start_date='',
     if end_date:
         audit_logs = audit_logs.filter(timestamp__date__lte=end_date)
 
-    for log in audit_logs:
-        if source and source != 'audit':
-            continue
-        obj = log.content_object
-        policy = obj if isinstance(obj, Policy) else None
-        if obj is not None and not policy and hasattr(obj, 'policies'):
-            policy = obj.policies.select_related('scheme', 'member').order_by('-created_at', '-id').first()
-        if filter_scheme and (not policy or str(policy.scheme_id) != str(filter_scheme)):
-            continue
-        if filter_branch and (not policy or str(policy.scheme.branch_id if policy and policy.scheme_id else '') != str(filter_branch)):
-            continue
-        data = log.data or {}
-        client_name = f"{policy.member.first_name} {policy.member.last_name}" if policy and policy.member_id else log.object_repr
-        if search_term:
-            haystack = ' '.join([
-                policy.policy_number if policy else '',
-                policy.membership_number if policy else '',
-                client_name,
-                data.get('field', ''),
-                log.object_repr or '',
-            ]).lower()
-            if search_term.lower() not in haystack:
+    def matching_objects(policies):
+        policy_ids = policies.annotate(object_key=Cast('pk', CharField())).values('object_key')
+        member_ids = policies.annotate(object_key=Cast('member_id', CharField())).values('object_key')
+        return (
+            Q(content_type=policy_ct, object_id__in=policy_ids)
+            | Q(content_type=member_ct, object_id__in=member_ids)
+        )
+
+    if filter_scheme or filter_branch:
+        audit_logs = audit_logs.filter(matching_objects(amendment_policy_queryset(filter_scheme, filter_branch)))
+    if search_term:
+        audit_logs = audit_logs.filter(
+            Q(object_repr__icontains=search_term)
+            | Q(data__icontains=search_term)
+            | matching_objects(amendment_policy_queryset(search_term=search_term))
+        )
+
+    for logs in chunked(audit_logs.iterator(chunk_size=AMENDMENT_CHUNK_SIZE), AMENDMENT_CHUNK_SIZE):
+        policies = resolve_audit_policies(logs, policy_ct, member_ct)
+        for log in logs:
+            policy = policies.get((log.content_type_id, str(log.object_id)))
+            if not policy_in_filters(policy, filter_scheme, filter_branch):
                 continue
-        entries.append({
-            'date': log.timestamp.strftime('%Y-%m-%d %H:%M'),
-            'source': 'Audit Update',
-            'scheme': policy.scheme.name if policy and policy.scheme else '',
-            'policy_number': policy.policy_number if policy else '',
-            'membership_number': policy.membership_number if policy else '',
-            'client': client_name,
-            'entity': log.content_type.model.title(),
-            'field': data.get('field', 'Record updated'),
-            'old_value': data.get('old_value', ''),
-            'new_value': data.get('new_value', ''),
-            'changed_by': log.username,
-            'reference': f'AUDIT-{log.id}',
-            'notes': data.get('reason', '') or data.get('details', ''),
-        })
+            data = log.data or {}
+            client_name = f"{policy.member.first_name} {policy.member.last_name}" if policy and policy.member_id else log.object_repr
+            if search_term:
+                haystack = ' '.join([
+                    (policy.policy_number or '') if policy else '',
+                    (policy.membership_number or '') if policy else '',
+                    client_name,
+                    data.get('field', ''),
+                    log.object_repr or '',
+                ]).lower()
+                if search_term.lower() not in haystack:
+                    continue
+            yield {
+                'date': log.timestamp.strftime('%Y-%m-%d %H:%M'),
+                'source': 'Audit Update',
+                'scheme': policy.scheme.name if policy and policy.scheme else '',
+                'policy_number': policy.policy_number if policy else '',
+                'membership_number': policy.membership_number if policy else '',
+                'client': client_name,
+                'entity': log.content_type.model.title(),
+                'field': data.get('field', 'Record updated'),
+                'old_value': data.get('old_value', ''),
+                'new_value': data.get('new_value', ''),
+                'changed_by': log.username,
+                'reference': f'AUDIT-{log.id}',
+                'notes': data.get('reason', '') or data.get('details', ''),
+            }
+
+
+def collect_amendment_entries(filter_scheme='', filter_branch='', start_date='', end_date='', source='', search_term=''):
+    """
+    Gather amendment activity from import row logs and audited updates.
+
+    Scheme, branch, date and search filters are applied in SQL; logs are then
+    read in chunks and the policy for every chunk is resolved with a fixed
+    number of queries, so the query count does not grow with the log volume.
+    """
+    filters = {
+        'filter_scheme': filter_scheme,
+        'filter_branch': filter_branch,
+        'start_date': start_date,
+        'end_date': end_date,
+        'search_term': search_term,
+    }
+    entries = []
+    if not source or source == 'import':
+        entries.extend(collect_import_amendment_entries(**filters))
+    if not source or source == 'audit':
+        entries.extend(collect_audit_amendment_entries(**filters))
 
     entries.sort(key=lambda item: item['date'], reverse=True)
     return entries
 
 
+def get_all_members_policies(user, params):
+    """Scoped, filtered and ordered policies for the all members report."""
+    filter_scheme = params.get('scheme', '').strip()
+    filter_branch = params.get('branch', '').strip()
+    filter_agent = params.get('agent', '').strip()
+    filter_status = params.get('status', '').strip()
+    search_term = params.get('search', '').strip()
+
+    policies = filter_by_user_scope(
+        Policy.objects.select_related('member', 'scheme', 'scheme__branch', 'plan', 'underwritten_by').annotate(
+            dependents_count=Count('dependents', distinct=True),
+            beneficiaries_count=Count('beneficiaries', distinct=True),
+        ),
+        user,
+        Policy,
+    )
+    if filter_branch:
+        policies = policies.filter(scheme__branch_id=filter_branch)
+    if filter_agent:
+        policies = policies.filter(underwritten_by_id=filter_agent)
+    if search_term:
+        policies = policies.filter(
+            Q(member__first_name__icontains=search_term)
+            | Q(member__last_name__icontains=search_term)
+            | Q(policy_number__icontains=search_term)
+            | Q(unique_policy_number__icontains=search_term)
+            | Q(membership_number__icontains=search_term)
+        )
+    return apply_policy_filters(policies, filter_scheme, filter_status).order_by(
+        'scheme__name', 'member__last_name', 'member__first_name'
+    )
+
+
+def get_payment_allocations(user, params, cover_month):
+    """Scoped and filtered completed allocations for one cover month."""
+    filter_branch = params.get('branch', '').strip()
+    filter_scheme = params.get('scheme', '').strip()
+    filter_agent = params.get('agent', '').strip()
+    search_term = params.get('search', '').strip()
+
+    allocations = payment_allocation_model().objects.select_related(
+        'payment', 'member', 'policy', 'scheme', 'branch', 'plan', 'agent'
+    ).filter(
+        payment__status='COMPLETED',
+        allocation_status='ALLOCATED',
+    )
+
+    if not user.is_superuser and not user_has_role(user, 'Administrator'):
+        allocations = allocations.filter(scheme__in=get_user_schemes(user))
+
+    if filter_branch:
+        allocations = allocations.filter(scheme__branch_id=filter_branch)
+    if filter_scheme:
+        allocations = allocations.filter(scheme_id=filter_scheme)
+    if filter_agent:
+        allocations = allocations.filter(agent_id=filter_agent)
+    if search_term:
+        allocations = allocations.filter(
+            Q(member__first_name__icontains=search_term)
+            | Q(member__last_name__icontains=search_term)
+            | Q(policy__policy_number__icontains=search_term)
+            | Q(policy__membership_number__icontains=search_term)
+        )
+
+    return allocations.filter(coverage_month=cover_month).order_by(
+        'scheme__name', 'payment__date', 'policy__policy_number'
+    )
+
+
+def build_report_export(report_key, user, params):
+    """
+    Resolve a report key and its filter parameters to an exportable dataset.
+
+    Returns:
+        tuple: ``(items, build_dataset, filename)`` where ``build_dataset``
+        turns ``items`` (or a page of them) into ``(title, headers, rows)``
+    """
+    require_report_access(report_key, user)
+    if report_key == 'all_members':
+        return get_all_members_policies(user, params), build_all_members_dataset, 'all-members-report'
+
+    if report_key in ('payment_admin', 'payment_scheme'):
+        report_version = report_key.split('_', 1)[1]
+        cover_month = parse_month_param(params.get('cover_month')) or timezone.now().date().replace(day=1)
+        allocations = get_payment_allocations(user, params, cover_month)
+        return (
+            allocations,
+            lambda items: build_payment_allocation_dataset(items, cover_month, report_version),
+            f'payment-allocation-{cover_month.strftime("%Y-%m")}-{report_version}',
+        )
+
+    if report_key == 'amendments':
+        entries = collect_amendment_entries(
+            filter_scheme=params.get('scheme', '').strip(),
+            filter_branch=params.get('branch', '').strip(),
+            start_date=params.get('start_date', '').strip(),
+            end_date=params.get('end_date', '').strip(),
+            source=params.get('source', '').strip(),
+            search_term=params.get('search', '').strip(),
+        )
+        return entries, build_amendments_dataset, 'amendments-report'
+
+    raise ValueError(f'Unknown report: {report_key}')
+
+
+def require_report_access(report_key, user):
+    if report_key == 'all_members':
+        require_all_members_access(user)
+    elif report_key in ('payment_admin', 'payment_scheme'):
+        require_payment_allocation_access(user, report_key.split('_', 1)[1])
+    elif report_key == 'amendments':
+        require_amendments_access(user)
+    else:
+        raise PermissionDenied('Unknown report.')
+
+
 def require_all_members_access(user):
     if not can_view_all_members_report(user):
         raise PermissionDenied('You do not have access to the all members report.')
@@ -572,37 +778,19 @@ def all_members_report(request):
     filter_status = request.GET.get('status', '').strip()
     search_term = request.GET.get('search', '').strip()
 
-    policies = filter_by_user_scope(
-        Policy.objects.select_related('member', 'scheme', 'scheme__branch', 'plan', 'underwritten_by').annotate(
-            dependents_count=Count('dependents', distinct=True),
-            beneficiaries_count=Count('beneficiaries', distinct=True),
-        ),
-        request.user,
-        Policy,
-    )
-    if filter_branch:
-        policies = policies.filter(scheme__branch_id=filter_branch)
-    if filter_agent:
-        policies = policies.filter(underwritten_by_id=filter_agent)
-    if search_term:
-        policies = policies.filter(
-            Q(member__first_name__icontains=search_term)
-            | Q(member__last_name__icontains=search_term)
-            | Q(policy_number__icontains=search_term)
-            | Q(unique_policy_number__icontains=search_term)
-            | Q(membership_number__icontains=search_term)
-        )
-    policies = apply_policy_filters(policies, filter_scheme, filter_status).order_by('scheme__name', 'member__last_name', 'member__first_name')
+    policies = get_all_members_policies(request.user, request.GET)
 
     export_format = request.GET.get('export')
     if export_format:
+        if export_format == 'pdf':
+            return paginated_pdf_response(
+                policies, request.GET.get('page'), build_all_members_dataset, 'all-members-report.pdf'
+            )
         title, headers, rows = build_all_members_dataset(policies)
         if export_format == 'excel':
             return workbook_response(build_report_workbook(title, headers, rows), 'all-members-report.xlsx')
         if export_format == 'csv':
             return csv_response(headers, rows, 'all-members-report.csv')
-        if export_format == 'pdf':
-            return pdf_response(title, headers, rows, 'all-members-report.pdf')
 
     return render(request, 'reports/all_members_report.html', {
         'branches': branches,
@@ -637,35 +825,7 @@ def payment_allocation_report(request):
     filter_agent = request.GET.get('agent', '').strip()
     search_term = request.GET.get('search', '').strip()
     cover_month = parse_month_param(request.GET.get('cover_month')) or timezone.now().date().replace(day=1)
-    payment_allocation = payment_allocation_model()
-
-    allocations = payment_allocation.objects.select_related(
-        'payment', 'member', 'policy', 'scheme', 'branch', 'plan', 'agent'
-    ).filter(
-        payment__status='COMPLETED',
-        allocation_status='ALLOCATED',
-    )
-
-    if not request.user.is_superuser and not user_has_role(request.user, 'Administrator'):
-        allocations = allocations.filter(scheme__in=get_user_schemes(request.user))
-
-    if filter_branch:
-        allocations = allocations.filter(scheme__branch_id=filter_branch)
-    if filter_scheme:
-        allocations = allocations.filter(scheme_id=filter_scheme)
-    if filter_agent:
-        allocations = allocations.filter(agent_id=filter_agent)
-    if search_term:
-        allocations = allocations.filter(
-            Q(member__first_name__icontains=search_term)
-            | Q(member__last_name__icontains=search_term)
-            | Q(policy__policy_number__icontains=search_term)
-            | Q(policy__membership_number__icontains=search_term)
-        )
-
-    allocations = allocations.filter(coverage_month=cover_month).order_by(
-        'scheme__name', 'payment__date', 'policy__policy_number'
-    )
+    allocations = get_payment_allocations(request.user, request.GET, cover_month)
 
     wholesale_expression = ExpressionWrapper(
         F('underwriter_premium')
@@ -697,13 +857,18 @@ def payment_allocation_report(request):
 
     export_format = request.GET.get('export')
     if export_format:
+        if export_format == 'pdf':
+            return paginated_pdf_response(
+                allocations,
+                request.GET.get('page'),
+                lambda items: build_payment_allocation_dataset(items, cover_month, report_version),
+                f'payment-allocation-{cover_month.strftime("%Y-%m")}-{report_version}.pdf',
+            )
         title, headers, rows = build_payment_allocation_dataset(allocations, cover_month, report_version)
         if export_format == 'excel':
             return workbook_response(build_report_workbook(title, headers, rows), f'payment-allocation-{cover_month.strftime("%Y-%m")}-{report_version}.xlsx')
         if export_format == 'csv':
             return csv_response(headers, rows, f'payment-allocation-{cover_month.strftime("%Y-%m")}-{report_version}.csv')
-        if export_format == 'pdf':
-            return pdf_response(title, headers, rows, f'payment-allocation-{cover_month.strftime("%Y-%m")}-{report_version}.pdf')
 
     return render(request, 'reports/payment_allocation_report.html', {
         'allocations': allocations,
@@ -786,18 +951,23 @@ def amendments_report(request):
     )
     export_format = request.GET.get('export')
     if export_format:
+        if export_format == 'pdf':
+            return paginated_pdf_response(
+                entries, request.GET.get('page'), build_amendments_dataset, 'amendments-report.pdf'
+            )
         title, headers, rows = build_amendments_dataset(entries)
         if export_format == 'excel':
             return workbook_response(build_report_workbook(title, headers, rows), 'amendments-report.xlsx')
         if export_format == 'csv':
             return csv_response(headers, rows, 'amendments-report.csv')
-        if export_format == 'pdf':
-            return pdf_response(title, headers, rows, 'amendments-report.pdf')
+
+    page_obj = Paginator(entries, AMENDMENTS_PER_PAGE).get_page(request.GET.get('page'))
 
     return render(request, 'reports/amendments_report.html', {
         'branches': branches,
         'schemes': schemes,
-        'entries': entries,
+        'entries': page_obj.object_list,
+        'page_obj': page_obj,
         'report_hub_url': build_hub_url('amendments', {
             'branch': filter_branch,
             'scheme': filter_scheme,
@@ -813,3 +983,55 @@ def amendments_report(request):
         'source': source,
         'search_term': search_term,
     })
+
+
+def get_report_job(request, job_id):
+    job = get_object_or_404(ReportJob, pk=job_id)
+    require_report_access(job.report_key, request.user)
+    if job.scope_key != report_scope_key(request.user):
+        raise PermissionDenied('You do not have access to this report job.')
+    return job
+
+
+def report_job_payload(job):
+    return {
+        'id': job.pk,
+        'report': job.report_key,
+        'format': job.export_format,
+        'status': job.status,
+        'progress': job.progress,
+        'rows_written': job.rows_written,
+        'rows_total': job.rows_total,
+        'error': job.error_message,
+        'status_url': reverse('reports:report_job_status', args=[job.pk]),
+        'download_url': (
+            reverse('reports:report_job_download', args=[job.pk])
+            if job.status == ReportJob.STATUS_COMPLETED else ''
+        ),
+    }
+
+
+@login_required
+@require_POST
+def report_job_create(request):
+    report_key = request.POST.get('report', '').strip()
+    export_format = request.POST.get('export', 'csv').strip()
+    require_report_access(report_key, request.user)
+    if export_format not in REPORT_JOB_FORMATS:
+        return JsonResponse({'error': 'Unsupported export format.'}, status=400)
+
+    job, created = get_or_create_report_job(request.user, report_key, export_format, request.POST)
+    return JsonResponse(report_job_payload(job), status=202 if created else 200)
+
+
+@login_required
+def report_job_status(request, job_id):
+    return JsonResponse(report_job_payload(get_report_job(request, job_id)))
+
+
+@login_required
+def report_job_download(request, job_id):
+    job = get_report_job(request, job_id)
+    if job.status != ReportJob.STATUS_COMPLETED or not job.artifact:
+        raise Http404('This report is not ready yet.')
+    return FileResponse(job.artifact.open('rb'), as_attachment=True, filename=os.path.basename(job.artifact.name))
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SchemesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'schemes'
+
+    def ready(self):
+        # Rebuild the plan quote tables when plans or tiers change
+        import schemes.signals  # noqa: F401
@@ -0,0 +1,271 @@
+"""
+In-memory plan eligibility and premium quoting.
+
+Every active Plan and its PlanTier rows are loaded once per process into
+array-backed columns (money held as integer cents), with each plan's tiers
+stored as one contiguous, age-sorted run. A household quote is then pure
+arithmetic over those columns: no per-plan or per-tier queries.
+
+Plan and PlanTier saves and deletes bump a version key in the shared cache
+(see ``schemes.signals``); each process reloads its tables on the next
+quote after the version it loaded went stale.
+"""
+from array import array
+from collections import namedtuple
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from .models import Plan, PlanTier
+
+QUOTE_TABLES_VERSION_KEY = 'plan_quote_tables:version'
+
+MEMBER_TYPES = ('main', 'spouse', 'child', 'extended')
+ALLOWANCE_FIELDS = (('spouse', 'spouses_allowed'), ('child', 'children_allowed'), ('extended', 'extended_allowed'))
+# Dependent.relationship and form values -> PlanTier.user_type
+RELATIONSHIP_TYPES = {
+    'main': 'main',
+    'spouse': 'spouse',
+    'child': 'child',
+    'children': 'child',
+    'extended': 'extended',
+    'extended family': 'extended',
+}
+
+QuoteLine = namedtuple('QuoteLine', ['member_type', 'age', 'premium', 'cover'])
+PlanQuote = namedtuple('PlanQuote', ['plan_id', 'scheme_id', 'premium', 'cover', 'lines'])
+
+_tables = None
+_tables_version = None
+
+
+def to_cents(amount):
+    return int((amount or 0) * 100)
+
+
+def from_cents(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def member_type_for(relationship):
+    """Map a relationship label ('Spouse', 'Extended Family', ...) to a tier member type."""
+    return RELATIONSHIP_TYPES.get((relationship or '').strip().lower())
+
+
+class QuoteTables:
+    """Column store of active plans and their tiers."""
+
+    def __init__(self, plans, tiers):
+        self.plan_ids = array('q')
+        self.scheme_ids = array('q')
+        self.diy_visible = array('b')
+        self.main_age_from = array('l')
+        self.main_age_to = array('l')
+        self.main_premium = array('q')
+        self.main_cover = array('q')
+        self.allowed = {member_type: array('l') for member_type, _ in ALLOWANCE_FIELDS}
+        self.rows = {}
+
+        for (plan_id, scheme_id, diy_visible, age_from, age_to, main_premium, premium, main_cover,
+             spouses, children, extended) in plans:
+            self.rows[plan_id] = len(self.plan_ids)
+            self.plan_ids.append(plan_id)
+            self.scheme_ids.append(scheme_id)
+            self.diy_visible.append(bool(diy_visible))
+            self.main_age_from.append(age_from)
+            self.main_age_to.append(age_to)
+            # Plans priced only through ``premium`` leave main_premium at its default of 0
+            self.main_premium.append(to_cents(main_premium or premium))
+            self.main_cover.append(to_cents(main_cover))
+            for member_type, count in zip(('spouse', 'child', 'extended'), (spouses, children, extended)):
+                self.allowed[member_type].append(count or 0)
+
+        # Tiers of plan row i live at tier_start[i]:tier_start[i + 1]
+        grouped = [[] for _ in self.plan_ids]
+        for plan_id, user_type, age_from, age_to, premium, cover in tiers:
+            row = self.rows.get(plan_id)
+            if row is not None and user_type in MEMBER_TYPES:
+                grouped[row].append((MEMBER_TYPES.index(user_type), age_from, age_to, to_cents(premium), to_cents(cover)))
+
+        self.tier_start = array('l', [0])
+        self.tier_type = array('b')
+        self.tier_age_from = array('l')
+        self.tier_age_to = array('l')
+        self.tier_premium = array('q')
+        self.tier_cover = array('q')
+        for plan_tiers in grouped:
+            for member_type, age_from, age_to, premium, cover in sorted(plan_tiers):
+                self.tier_type.append(member_type)
+                self.tier_age_from.append(age_from)
+                self.tier_age_to.append(age_to)
+                self.tier_premium.append(premium)
+                self.tier_cover.append(cover)
+            self.tier_start.append(len(self.tier_type))
+
+    @classmethod
+    def load(cls):
+        plans = Plan.objects.filter(is_active=True).order_by('pk').values_list(
+            'pk', 'scheme_id', 'is_diy_visible', 'main_age_from', 'main_age_to',
+            'main_premium', 'premium', 'main_cover',
+            'spouses_allowed', 'children_allowed', 'extended_allowed',
+        )
+        tiers = PlanTier.objects.filter(plan__is_active=True).values_list(
+            'plan_id', 'user_type', 'age_from', 'age_to', 'premium_amount', 'cover_amount',
+        )
+        return cls(list(plans), list(tiers))
+
+    def find_tier(self, row, member_type, age=None):
+        """
+        Index of the tier pricing a member of ``member_type`` aged ``age`` on
+        plan ``row``. Without an age the youngest band of that type is used.
+        """
+        type_code = MEMBER_TYPES.index(member_type)
+        for index in range(self.tier_start[row], self.tier_start[row + 1]):
+            if self.tier_type[index] != type_code:
+                continue
+            if age is None or self.tier_age_from[index] <= age <= self.tier_age_to[index]:
+                return index
+        return None
+
+    def eligible_rows(self, age=None, scheme_id=None, plan_ids=None, diy_only=False):
+        rows = range(len(self.plan_ids)) if plan_ids is None else sorted(
+            self.rows[plan_id] for plan_id in plan_ids if plan_id in self.rows
+        )
+        return [
+            row for row in rows
+            if (age is None or self.main_age_from[row] <= age <= self.main_age_to[row])
+            and (scheme_id is None or self.scheme_ids[row] == scheme_id)
+            and (not diy_only or self.diy_visible[row])
+        ]
+
+    def quote(self, row, main_age=None, dependents=()):
+        """
+        Price a household on plan ``row``, or return None when the plan does
+        not allow that many dependents of some type. A member no tier covers
+        is carried at zero premium and cover.
+        """
+        counts = {}
+        for member_type, _ in dependents:
+            counts[member_type] = counts.get(member_type, 0) + 1
+        if any(count > self.allowed[member_type][row] for member_type, count in counts.items()):
+            return None
+
+        tier = self.find_tier(row, 'main', main_age) if main_age is not None else None
+        if tier is None:
+            lines = [QuoteLine('main', main_age, self.main_premium[row], self.main_cover[row])]
+        else:
+            lines = [QuoteLine('main', main_age, self.tier_premium[tier], self.tier_cover[tier])]
+        for member_type, age in dependents:
+            tier = self.find_tier(row, member_type, age)
+            if tier is None:
+                lines.append(QuoteLine(member_type, age, 0, 0))
+            else:
+                lines.append(QuoteLine(member_type, age, self.tier_premium[tier], self.tier_cover[tier]))
+
+        return PlanQuote(
+            plan_id=self.plan_ids[row],
+            scheme_id=self.scheme_ids[row],
+            premium=from_cents(sum(line.premium for line in lines)),
+            cover=from_cents(sum(line.cover for line in lines)),
+            lines=[line._replace(premium=from_cents(line.premium), cover=from_cents(line.cover)) for line in lines],
+        )
+
+    def tiers(self, plan_id):
+        row = self.rows.get(plan_id)
+        if row is None:
+            return []
+        return [
+            {
+                'member_type': MEMBER_TYPES[self.tier_type[index]],
+                'age_from': self.tier_age_from[index],
+                'age_to': self.tier_age_to[index],
+                'premium': from_cents(self.tier_premium[index]),
+                'cover': from_cents(self.tier_cover[index]),
+            }
+            for index in range(self.tier_start[row], self.tier_start[row + 1])
+        ]
+
+
+def get_quote_tables():
+    """The current process's quote tables, reloaded if a plan changed since they were built."""
+    global _tables, _tables_version
+
+    version = cache.get(QUOTE_TABLES_VERSION_KEY, 0)
+    if _tables is None or _tables_version != version:
+        _tables = QuoteTables.load()
+        _tables_version = version
+    return _tables
+
+
+def invalidate_quote_tables():
+    """Make every process rebuild its quote tables on the next quote."""
+    global _tables
+
+    _tables = None
+    try:
+        cache.incr(QUOTE_TABLES_VERSION_KEY)
+    except ValueError:
+        cache.set(QUOTE_TABLES_VERSION_KEY, 1, None)
+
+
+def normalize_dependents(dependents):
+    """``[(relationship, age), ...]`` -> ``[(member_type, age), ...]``, dropping unknown relationships."""
+    normalized = []
+    for relationship, age in dependents:
+        member_type = member_type_for(relationship)
+        if member_type and member_type != 'main':
+            normalized.append((member_type, age))
+    return normalized
+
+
+def eligible_plan_ids(age, scheme_id=None, diy_only=False):
+    """IDs of the active plans whose main member age band includes ``age``."""
+    tables = get_quote_tables()
+    return [tables.plan_ids[row] for row in tables.eligible_rows(age, scheme_id=scheme_id, diy_only=diy_only)]
+
+
+def quote_household(main_age, dependents=(), scheme_id=None, plan_ids=None, diy_only=False):
+    """
+    Quote every eligible plan for a household in one pass.
+
+    Args:
+        main_age: Main member's age, or None to skip the age check
+        dependents: ``(relationship, age)`` pairs; age may be None
+        scheme_id: Only quote this scheme's plans
+        plan_ids: Only quote these plans
+        diy_only: Only quote plans offered in the DIY flow
+
+    Returns:
+        list: ``PlanQuote`` per eligible plan, cheapest first
+    """
+    tables = get_quote_tables()
+    dependents = normalize_dependents(dependents)
+    quotes = []
+    for row in tables.eligible_rows(main_age, scheme_id=scheme_id, plan_ids=plan_ids, diy_only=diy_only):
+        quote = tables.quote(row, main_age, dependents)
+        if quote is not None:
+            quotes.append(quote)
+    quotes.sort(key=lambda quote: (quote.premium, quote.plan_id))
+    return quotes
+
+
+def quote_plan(plan_id, main_age=None, dependents=()):
+    """``PlanQuote`` for one plan, or None if it is inactive or the household is not eligible."""
+    quotes = quote_household(main_age, dependents, plan_ids=[plan_id])
+    return quotes[0] if quotes else None
+
+
+def tier_cover(plan_id, relationship, age):
+    """Cover for a member of the given relationship and age on a plan (0 when no tier applies)."""
+    tables = get_quote_tables()
+    row = tables.rows.get(plan_id)
+    member_type = member_type_for(relationship)
+    if row is None or member_type is None:
+        return Decimal('0.00')
+    tier = tables.find_tier(row, member_type, age)
+    return from_cents(tables.tier_cover[tier]) if tier is not None else Decimal('0.00')
+
+
+def plan_tiers(plan_id):
+    """Tier rows of an active plan as dicts, ordered by member type and age band."""
+    return get_quote_tables().tiers(plan_id)
@@ -0,0 +1,19 @@
+"""
+Signal handlers keeping the in-memory quote tables (``schemes.quoting``) current.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Plan, PlanTier
+from .quoting import invalidate_quote_tables
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+@receiver(post_save, sender=PlanTier)
+@receiver(post_delete, sender=PlanTier)
+def plan_changed(sender, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(invalidate_quote_tables)
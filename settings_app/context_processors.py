@@ -31,7 +31,7 @@ def current_scheme(request):
 def settings_context(request):
     from django.conf import settings as django_settings
     from .models import Settings
-    settings = Settings.load()
+    settings = Settings.cached()
     return {
         'settings': settings,
         'deployment_marker': getattr(django_settings, 'DEPLOYMENT_MARKER', ''),
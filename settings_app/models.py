@@ -1,6 +1,7 @@
 # settings_app/models.py
 
 from django.conf import settings
+from django.core.cache import cache
 from django.db import models
 from django.utils import timezone
 from django.core import signing
@@ -380,6 +381,12 @@ class PagePermission(models.Model):
     def __str__(self):
         return f"{self.group.name} - {self.page_name}"
 
+SETTINGS_VERSION_KEY = 'settings_app:settings:version'
+
+# (version, Settings) loaded by this process
+_cached_settings = {}
+
+
 class Settings(models.Model):
     # Add your global settings here
     site_name = models.CharField(max_length=255, default="Legacy Admin")
@@ -388,11 +395,44 @@ class Settings(models.Model):
     def __str__(self):
         return "Global Settings"
 
+    def save(self, *args, **kwargs):
+        # load() creates the default row; no process holds an older copy yet
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if not adding:
+            self.bump_version()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.bump_version()
+        return result
+
     @classmethod
     def load(cls):
         obj, created = cls.objects.get_or_create(pk=1)
         return obj
 
+    @classmethod
+    def cached(cls):
+        """
+        The settings row kept in this process, reloaded only after a save in
+        any process bumps the shared version stamp. Treat it as read-only.
+        """
+        version = cache.get(SETTINGS_VERSION_KEY, 0)
+        entry = _cached_settings.get('entry')
+        if entry is None or entry[0] != version:
+            # Read the version first so a concurrent save is never missed
+            entry = (version, cls.load())
+            _cached_settings['entry'] = entry
+        return entry[1]
+
+    @staticmethod
+    def bump_version():
+        try:
+            cache.incr(SETTINGS_VERSION_KEY)
+        except ValueError:
+            cache.set(SETTINGS_VERSION_KEY, 1, None)
+
 class UserImportLog(models.Model):
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
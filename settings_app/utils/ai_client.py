@@ -0,0 +1,242 @@
+"""
+Shared OpenAI chat client for the AI helpers.
+
+Every AI feature calls ``chat_completion``, which:
+
+- sends requests through one pooled ``requests.Session`` per process, with
+  connect and read timeouts;
+- redacts PII from user messages and caches the reply under a hash of the
+  model, parameters and redacted messages for
+  ``CACHE_TIMEOUTS['ai_responses']`` seconds;
+- coalesces identical requests already in flight in this process into one
+  HTTPS call;
+- opens a circuit after ``AI_CIRCUIT_FAILURE_THRESHOLD`` consecutive
+  timeouts or server errors. While it is open, calls fail fast with
+  ``AIUnavailable`` for ``AI_CIRCUIT_RESET_SECONDS``, so callers fall back
+  to their rule-based answers.
+
+``OPENAI_API_BASE`` points the client at any OpenAI-compatible server,
+such as a local stub in tests.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+from legacyadmin.cache import get_cache_timeout
+from settings_app.utils.ai_privacy import redact_pii
+
+logger = logging.getLogger(__name__)
+
+AI_RESPONSE_CACHE_PREFIX = 'ai_response'
+
+
+class AIClientError(Exception):
+    """The AI service rejected the request or returned an unusable reply."""
+
+
+class AIUnavailable(AIClientError):
+    """The AI service is not configured, not reachable, or the circuit is open."""
+
+
+def get_api_key():
+    return getattr(settings, 'OPENAI_API_KEY', None) or os.environ.get('OPENAI_API_KEY')
+
+
+def request_timeout():
+    """(connect, read) timeouts in seconds for a chat completion."""
+    return (
+        getattr(settings, 'OPENAI_CONNECT_TIMEOUT', 5),
+        getattr(settings, 'OPENAI_TIMEOUT', 20),
+    )
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """The process-wide HTTP session, so connections to the API are reused."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_maxsize=getattr(settings, 'OPENAI_POOL_SIZE', 10))
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker. Once open, one trial call is let
+    through after the reset period; its outcome closes or reopens the circuit.
+    """
+
+    def __init__(self, threshold=None, reset_after=None, clock=time.monotonic):
+        self._threshold = threshold
+        self._reset_after = reset_after
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    @property
+    def threshold(self):
+        return self._threshold or getattr(settings, 'AI_CIRCUIT_FAILURE_THRESHOLD', 5)
+
+    @property
+    def reset_after(self):
+        return self._reset_after or getattr(settings, 'AI_CIRCUIT_RESET_SECONDS', 60)
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if not self.trial and self.clock() - self.opened_at >= self.reset_after:
+                self.trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial = False
+            if self.failures >= self.threshold:
+                self.opened_at = self.clock()
+
+    def reset(self):
+        self.record_success()
+
+
+circuit = CircuitBreaker()
+
+
+class InFlight:
+    """The eventual outcome of a request other callers are waiting on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def coalesced(key, call):
+    """
+    Run ``call`` once for concurrent callers sharing ``key``; followers wait
+    for the leader and get its result or exception.
+    """
+    with _inflight_lock:
+        pending = _inflight.get(key)
+        leader = pending is None
+        if leader:
+            pending = _inflight[key] = InFlight()
+
+    if not leader:
+        if not pending.done.wait(sum(request_timeout())):
+            raise AIUnavailable('Timed out waiting for an identical AI request')
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    try:
+        pending.result = call()
+        return pending.result
+    except Exception as error:
+        pending.error = error
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+        pending.done.set()
+
+
+def response_cache_key(payload):
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{AI_RESPONSE_CACHE_PREFIX}:{digest}"
+
+
+def request_completion(payload):
+    """POST ``payload`` to the chat completions endpoint and return the reply text."""
+    api_key = get_api_key()
+    if not api_key:
+        raise AIUnavailable('OpenAI API key is not configured')
+    if not circuit.allow():
+        raise AIUnavailable('AI service is temporarily unavailable')
+
+    base_url = getattr(settings, 'OPENAI_API_BASE', 'https://api.openai.com/v1').rstrip('/')
+    try:
+        response = get_session().post(
+            f"{base_url}/chat/completions",
+            json=payload,
+            headers={'Authorization': f'Bearer {api_key}'},
+            timeout=request_timeout(),
+        )
+    except requests.RequestException as error:
+        circuit.record_failure()
+        raise AIUnavailable(f"AI request failed: {error}") from error
+
+    if response.status_code == 429 or response.status_code >= 500:
+        circuit.record_failure()
+        raise AIUnavailable(f"AI service returned {response.status_code}")
+    circuit.record_success()
+    if response.status_code != 200:
+        raise AIClientError(f"AI service returned {response.status_code}: {response.text[:200]}")
+
+    try:
+        return response.json()['choices'][0]['message']['content'].strip()
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError) as error:
+        raise AIClientError('Unexpected response from the AI service') from error
+
+
+def chat_completion(messages, model=None, max_tokens=500, temperature=0.7, use_cache=True):
+    """
+    Return the model's reply to ``messages`` as text.
+
+    Raises ``AIUnavailable`` when the service cannot be reached and
+    ``AIClientError`` when it rejects the request.
+    """
+    payload = {
+        'model': model or getattr(settings, 'DEFAULT_OPENAI_MODEL', 'gpt-4o'),
+        'messages': [
+            dict(message, content=redact_pii(message['content'])) if message['role'] == 'user' else message
+            for message in messages
+        ],
+        'max_tokens': max_tokens,
+        'temperature': temperature,
+        # Ensure OpenAI doesn't use our data for training
+        'user': 'anonymous',
+    }
+    key = response_cache_key(payload)
+    if use_cache:
+        reply = cache.get(key)
+        if reply is not None:
+            return reply
+
+    def fetch():
+        reply = request_completion(payload)
+        if use_cache:
+            cache.set(key, reply, get_cache_timeout('ai_responses'))
+        return reply
+
+    return coalesced(key, fetch)
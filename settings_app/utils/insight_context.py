@@ -0,0 +1,159 @@
+"""
+Aggregated, anonymised context for the AI scheme and branch insights.
+
+Every figure comes from grouped ORM aggregates, so a context costs three
+queries whatever the size of the book. Contexts are cached per scheme or
+branch for ``CACHE_TIMEOUTS['insight_context']`` seconds; insight questions
+asked in quick succession reuse them.
+"""
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q
+
+from legacyadmin.cache import get_cache_timeout
+
+INSIGHT_CONTEXT_CACHE_PREFIX = 'insight_context'
+
+
+def insight_context_cache_key(kind, pk):
+    return f"{INSIGHT_CONTEXT_CACHE_PREFIX}:{kind}:{pk}"
+
+
+def rounded(value):
+    """Round an aggregate to two places as a JSON-serialisable float."""
+    return round(float(value or 0), 2)
+
+
+def lapse_rate(lapsed, total):
+    return round(lapsed / total * 100, 2) if total else 0
+
+
+def policy_aggregates(prefix='', scope=None):
+    """
+    Aggregate keyword arguments over policies reached through ``prefix``
+    (e.g. ``'policy__'`` from a related model), limited to ``scope``.
+    """
+    scope = scope or Q()
+    return {
+        'policies_count': Count(f'{prefix}id', filter=scope),
+        'active_count': Count(f'{prefix}id', filter=scope & Q(**{f'{prefix}status': 'ACTIVE'})),
+        'lapsed_count': Count(f'{prefix}id', filter=scope & Q(**{f'{prefix}status': 'LAPSED'})),
+        'average_premium': Avg(f'{prefix}premium_amount', filter=scope),
+        'average_cover': Avg(f'{prefix}cover_amount', filter=scope),
+    }
+
+
+def policy_statistics(policies):
+    totals = policies.aggregate(**policy_aggregates())
+    return {
+        'total': totals['policies_count'],
+        'active': totals['active_count'],
+        'lapsed': totals['lapsed_count'],
+        'lapse_rate': lapse_rate(totals['lapsed_count'], totals['policies_count']),
+    }
+
+
+def build_scheme_context(scheme):
+    from members.models import Policy
+    from schemes.models import Plan
+    from settings_app.models import Agent
+
+    in_scheme = Q(policy__scheme=scheme)
+    agents = (
+        Agent.objects.filter(scheme=scheme)
+        .annotate(**policy_aggregates('policy__', in_scheme))
+        .order_by('id')
+        .values('id', 'policies_count', 'lapsed_count', 'average_premium')
+    )
+    plans = (
+        Plan.objects.filter(scheme=scheme)
+        .annotate(**policy_aggregates('policy__', in_scheme))
+        .order_by('id')
+        .values('id', 'policies_count', 'average_premium', 'average_cover')
+    )
+
+    agent_data = [
+        {
+            'agent_id': f"AG{agent['id']}",  # Anonymized identifier
+            'policies_count': agent['policies_count'],
+            'lapsed_count': agent['lapsed_count'],
+            'lapse_percentage': lapse_rate(agent['lapsed_count'], agent['policies_count']),
+            'average_premium': rounded(agent['average_premium']),
+        }
+        for agent in agents
+    ]
+    plan_data = [
+        {
+            'plan_id': f"PL{plan['id']}",  # Anonymized identifier
+            'policies_count': plan['policies_count'],
+            'average_cover': rounded(plan['average_cover']),
+            'average_premium': rounded(plan['average_premium']),
+        }
+        for plan in plans
+    ]
+    return {
+        'scheme_id': f"SC{scheme.id}",  # Anonymized identifier
+        'agent_count': len(agent_data),
+        'plan_count': len(plan_data),
+        'agent_data': agent_data,
+        'plan_data': plan_data,
+        'policy_statistics': policy_statistics(Policy.objects.filter(scheme=scheme)),
+    }
+
+
+def build_branch_context(branch):
+    from members.models import Policy
+    from schemes.models import Scheme
+    from settings_app.models import Agent
+
+    schemes = (
+        Scheme.objects.filter(branch=branch)
+        .annotate(**policy_aggregates('policy__'))
+        .order_by('id')
+        .values('id', 'policies_count', 'active_count', 'lapsed_count', 'average_premium', 'average_cover')
+    )
+    agent_counts = dict(
+        Agent.objects.filter(scheme__branch=branch)
+        .values_list('scheme')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+
+    scheme_data = [
+        {
+            'scheme_id': f"SC{scheme['id']}",  # Anonymized identifier
+            'policies_count': scheme['policies_count'],
+            'active_policies': scheme['active_count'],
+            'lapsed_policies': scheme['lapsed_count'],
+            'lapse_rate': lapse_rate(scheme['lapsed_count'], scheme['policies_count']),
+            'average_premium': rounded(scheme['average_premium']),
+            'average_cover': rounded(scheme['average_cover']),
+            'agents_count': agent_counts.get(scheme['id'], 0),
+        }
+        for scheme in schemes
+    ]
+    return {
+        'branch_id': f"BR{branch.id}",  # Anonymized identifier
+        'scheme_count': len(scheme_data),
+        'agent_count': sum(agent_counts.values()),
+        'scheme_data': scheme_data,
+        'policy_statistics': policy_statistics(Policy.objects.filter(scheme__branch=branch)),
+    }
+
+
+def cached_context(kind, obj, build):
+    key = insight_context_cache_key(kind, obj.pk)
+    context = cache.get(key)
+    if context is None:
+        context = build(obj)
+        cache.set(key, context, get_cache_timeout('insight_context'))
+    return context
+
+
+def get_scheme_context(scheme):
+    """Aggregated agent, plan and policy statistics for ``scheme``."""
+    return cached_context('scheme', scheme, build_scheme_context)
+
+
+def get_branch_context(branch):
+    """Aggregated per-scheme and policy statistics for ``branch``."""
+    return cached_context('branch', branch, build_branch_context)
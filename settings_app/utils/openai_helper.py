@@ -1,13 +1,13 @@
 import os
 import json
 import logging
-import requests
-import os
 from django.conf import settings
 from django.contrib.auth.models import User
 
 # Import AI privacy utilities
+from settings_app.utils.ai_client import AIClientError, chat_completion
 from settings_app.utils.ai_privacy import redact_pii, prepare_ai_prompt, AIPrivacyLog
+from settings_app.utils.insight_context import get_branch_context, get_scheme_context
 from settings_app.models import AISettings
 
 logger = logging.getLogger(__name__)
@@ -81,75 +81,56 @@ def suggest_tiers_from_description(plan_name, description, policy_type, premium,
             )
         
         
-        # Call OpenAI API - always server-side, never expose key to client
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-        
         # Get model from settings or use default
         model_to_use = model or getattr(settings, 'DEFAULT_OPENAI_MODEL', 'gpt-4')
         
-        # Configure API call with privacy-focused settings
-        payload = {
-            "model": model_to_use,
-            "messages": [
-                {"role": "system", "content": "You are a helpful assistant that suggests appropriate tiers for funeral policies based on plan details. Do not include or request any personal information in your response."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 1000,
-            # Ensure OpenAI doesn't use our data for training
-            "user": "anonymous"
-        }
-        
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers=headers,
-            json=payload
-        )
-        
-        # Parse the response
-        if response.status_code == 200:
-            response_data = response.json()
-            content = response_data['choices'][0]['message']['content']
+        # Call OpenAI through the shared client - always server-side, never expose key to client
+        try:
+            content = chat_completion(
+                [
+                    {"role": "system", "content": "You are a helpful assistant that suggests appropriate tiers for funeral policies based on plan details. Do not include or request any personal information in your response."},
+                    {"role": "user", "content": prompt}
+                ],
+                model=model_to_use,
+                max_tokens=1000,
+                temperature=0.7,
+            )
+        except AIClientError as e:
+            logger.error(f"OpenAI API error: {str(e)}")
             
-            # Update log with success status if we're tracking
+            # Update log with failure status if we're tracking
             if user and hasattr(AIPrivacyLog, 'log_ai_request') and 'log_id' in locals():
                 try:
                     from settings_app.models import AIRequestLog
-                    AIRequestLog.objects.filter(id=log_id).update(response_status=True)
+                    AIRequestLog.objects.filter(id=log_id).update(response_status=False)
                 except Exception as e:
                     logger.warning(f"Could not update AI request log: {str(e)}")
             
-            # Extract the JSON array from the response
+            return []
+        
+        # Update log with success status if we're tracking
+        if user and hasattr(AIPrivacyLog, 'log_ai_request') and 'log_id' in locals():
             try:
-                # Find JSON array in the content
-                json_start = content.find('[')
-                json_end = content.rfind(']') + 1
-                
-                if json_start != -1 and json_end != -1:
-                    json_str = content[json_start:json_end]
-                    suggested_tiers = json.loads(json_str)
-                    return suggested_tiers
-                else:
-                    logger.error("Could not find JSON array in OpenAI response")
-                    return []
+                from settings_app.models import AIRequestLog
+                AIRequestLog.objects.filter(id=log_id).update(response_status=True)
             except Exception as e:
-                logger.error(f"Error parsing OpenAI response: {str(e)}")
-                return []
-        else:
-            # Log the error
-            logger.error(f"OpenAI API error: {response.status_code} - {response.text}")
-            
-            # Update log with failure status if we're tracking
-            if user and hasattr(AIPrivacyLog, 'log_ai_request') and 'log_id' in locals():
-                try:
-                    from settings_app.models import AIRequestLog
-                    AIRequestLog.objects.filter(id=log_id).update(response_status=False)
-                except Exception as e:
-                    logger.warning(f"Could not update AI request log: {str(e)}")
+                logger.warning(f"Could not update AI request log: {str(e)}")
+        
+        # Extract the JSON array from the response
+        try:
+            # Find JSON array in the content
+            json_start = content.find('[')
+            json_end = content.rfind(']') + 1
             
+            if json_start != -1 and json_end != -1:
+                json_str = content[json_start:json_end]
+                suggested_tiers = json.loads(json_str)
+                return suggested_tiers
+            else:
+                logger.error("Could not find JSON array in OpenAI response")
+                return []
+        except Exception as e:
+            logger.error(f"Error parsing OpenAI response: {str(e)}")
             return []
     except Exception as e:
         logger.error(f"Error in suggest_tiers_from_description: {str(e)}")
@@ -254,38 +235,6 @@ def get_scheme_insights(scheme, question, user=None):
                 model_used=model
             )
         
-        # Get scheme data - only aggregate data, no individual policy details
-        agents = scheme.agents.all()
-        policies = scheme.policies.all() if hasattr(scheme, 'policies') else []
-        plans = scheme.plans.all() if hasattr(scheme, 'plans') else []
-        
-        # Prepare agent data - using only aggregated statistics, no PII
-        agent_data = []
-        for agent in agents:
-            agent_policies = [p for p in policies if p.agent == agent]
-            lapsed_policies = [p for p in agent_policies if p.status == 'lapsed']
-            
-            # Only include agent ID and aggregated metrics, no personal details
-            agent_data.append({
-                'agent_id': f"AG{agent.id}",  # Anonymized identifier
-                'policies_count': len(agent_policies),
-                'lapsed_count': len(lapsed_policies),
-                'lapse_percentage': round((len(lapsed_policies) / len(agent_policies) * 100) if agent_policies else 0, 2),
-                'average_premium': round(sum(p.premium for p in agent_policies) / len(agent_policies) if agent_policies else 0, 2)
-            })
-        
-        # Prepare plan data - using only aggregated statistics
-        plan_data = []
-        for plan in plans:
-            plan_policies = [p for p in policies if p.plan == plan]
-            
-            plan_data.append({
-                'plan_id': f"PL{plan.id}",  # Anonymized identifier
-                'policies_count': len(plan_policies),
-                'average_cover': round(sum(p.cover_amount for p in plan_policies) / len(plan_policies) if plan_policies else 0, 2),
-                'average_premium': round(sum(p.premium for p in plan_policies) / len(plan_policies) if plan_policies else 0, 2)
-            })
-        
         # Prepare the system message with privacy requirements
         system_message = """
         You are an analytics assistant for a funeral insurance company. Your role is to provide factual insights 
@@ -313,90 +262,55 @@ def get_scheme_insights(scheme, question, user=None):
         Keep your answers concise, factual, and data-driven.
         """
         
-        # Create context data dictionary
-        context_data = {
-            "scheme_id": f"SC{scheme.id}",  # Anonymized identifier
-            "agent_count": len(agent_data),
-            "plan_count": len(plan_data),
-            "agent_data": agent_data,
-            "plan_data": plan_data,
-            "policy_statistics": {
-                "total": len(policies),
-                "active": len([p for p in policies if p.status == 'active']),
-                "lapsed": len([p for p in policies if p.status == 'lapsed']),
-                "lapse_rate": round(len([p for p in policies if p.status == 'lapsed']) / len(policies) * 100 if policies else 0, 2)
-            }
-        }
+        # Aggregated statistics only - agent and plan IDs are anonymized, no PII
+        context_data = get_scheme_context(scheme)
         
         # Use the privacy-aware prompt preparation
         base_prompt = f"Question: {question}"
         prompt = prepare_ai_prompt(base_prompt, context_data, include_pii=False, format_type='json')
         
-        # Call OpenAI API - always server-side, never expose key to client
-        headers = {
-            'Authorization': f'Bearer {api_key}',
-            'Content-Type': 'application/json'
-        }
-        
-        # Use settings from AISettings
-        data = {
-            'model': model,
-            'messages': [
-                {'role': 'system', 'content': system_message},
-                {'role': 'user', 'content': prompt}
-            ],
-            'max_tokens': max_tokens,
-            'temperature': temperature,
-            # Ensure OpenAI doesn't use our data for training
-            'user': 'anonymous'
-        }
-        
-        response = requests.post(
-            'https://api.openai.com/v1/chat/completions',
-            headers=headers,
-            data=json.dumps(data)
-        )
+        # Call OpenAI through the shared client - always server-side, never expose key to client
+        try:
+            insight = chat_completion(
+                [
+                    {'role': 'system', 'content': system_message},
+                    {'role': 'user', 'content': prompt}
+                ],
+                model=model,
+                max_tokens=max_tokens,
+                temperature=temperature,
+            )
+        except AIClientError as e:
+            logger.error(f"Could not generate AI insights: {str(e)}")
+            
+            # Update log with failure status
+            if user and hasattr(AIPrivacyLog, 'log_ai_request') and log_id is not None:
+                try:
+                    from settings_app.models import AIRequestLog
+                    AIRequestLog.objects.filter(id=log_id).update(response_status=False)
+                except Exception as e:
+                    logger.warning(f"Could not update AI request log: {str(e)}")
+            
+            return "Sorry, I couldn't generate insights at this time. Please try again later."
         
         # Update log with success status if we're tracking
-        if response.status_code == 200 and user and hasattr(AIPrivacyLog, 'log_ai_request') and log_id is not None:
+        if user and hasattr(AIPrivacyLog, 'log_ai_request') and log_id is not None:
             try:
                 from settings_app.models import AIRequestLog
                 AIRequestLog.objects.filter(id=log_id).update(response_status=True)
             except Exception as e:
                 logger.warning(f"Could not update AI request log: {str(e)}")
         
-        # Process the response
-        try:
-            response_data = response.json()
-            
-            if 'choices' in response_data and len(response_data['choices']) > 0:
-                insight = response_data['choices'][0]['message']['content'].strip()
-                
-                # Final PII check on the response
-                insight = redact_pii(insight)
-                
-                # Add a disclaimer
-                disclaimer = (
-                    "\n\n*Note: This insight is generated by AI and should be used as a general guide only. "
-                    "No personally identifiable information was used in generating this response.*"
-                )
-                
-                return insight + disclaimer
-            else:
-                logger.error(f"Unexpected response from OpenAI: {response_data}")
-                
-                # Update log with failure status
-                if user and hasattr(AIPrivacyLog, 'log_ai_request') and log_id is not None:
-                    try:
-                        from settings_app.models import AIRequestLog
-                        AIRequestLog.objects.filter(id=log_id).update(response_status=False)
-                    except Exception as e:
-                        logger.warning(f"Could not update AI request log: {str(e)}")
-                
-                return "Sorry, I couldn't generate insights at this time. Please try again later."
-        except Exception as e:
-            logger.error(f"Error processing OpenAI response: {str(e)}")
-            return "Sorry, I couldn't process the AI response. Please try again later."
+        # Final PII check on the response
+        insight = redact_pii(insight)
+        
+        # Add a disclaimer
+        disclaimer = (
+            "\n\n*Note: This insight is generated by AI and should be used as a general guide only. "
+            "No personally identifiable information was used in generating this response.*"
+        )
+        
+        return insight + disclaimer
             
     except Exception as e:
         logger.exception(f"Error generating scheme insights: {e}")
@@ -468,49 +382,8 @@ def get_branch_insights(branch, question, user=None):
                 model_used=model
             )
         
-        # Get branch data - only aggregate data, no individual details
-        schemes = branch.schemes.all()
-        agents = []
-        for scheme in schemes:
-            agents.extend(scheme.agents.all())
-        
-        # Get all policies related to this branch - aggregated only
-        policies = []
-        for agent in agents:
-            agent_policies = agent.policies.all() if hasattr(agent, 'policies') else []
-            policies.extend(agent_policies)
-        
-        # Prepare scheme data - using only anonymized identifiers and aggregated statistics
-        scheme_data = []
-        for scheme in schemes:
-            scheme_policies = [p for p in policies if p.agent.scheme == scheme]
-            active_policies = [p for p in scheme_policies if p.status == 'active']
-            lapsed_policies = [p for p in scheme_policies if p.status == 'lapsed']
-            
-            scheme_data.append({
-                'scheme_id': f"SC{scheme.id}",  # Anonymized identifier
-                'policies_count': len(scheme_policies),
-                'active_policies': len(active_policies),
-                'lapsed_policies': len(lapsed_policies),
-                'lapse_rate': round(len(lapsed_policies) / len(scheme_policies) * 100 if scheme_policies else 0, 2),
-                'average_premium': round(sum(p.premium for p in scheme_policies) / len(scheme_policies) if scheme_policies else 0, 2),
-                'average_cover': round(sum(p.cover_amount for p in scheme_policies) / len(scheme_policies) if scheme_policies else 0, 2),
-                'agents_count': scheme.agents.count() if hasattr(scheme, 'agents') else 0
-            })
-        
-        # Create context data dictionary with aggregated statistics only
-        context_data = {
-            "branch_id": f"BR{branch.id}",  # Anonymized identifier
-            "scheme_count": len(schemes),
-            "agent_count": len(agents),
-            "scheme_data": scheme_data,
-            "policy_statistics": {
-                "total": len(policies),
-                "active": len([p for p in policies if p.status == 'active']),
-                "lapsed": len([p for p in policies if p.status == 'lapsed']),
-                "lapse_rate": round(len([p for p in policies if p.status == 'lapsed']) / len(policies) * 100 if policies else 0, 2)
-            }
-        }
+        # Aggregated statistics only - scheme IDs are anonymized, no PII
+        context_data = get_branch_context(branch)
         
         # Prepare the system message with privacy requirements
         system_message = """
@@ -543,71 +416,48 @@ def get_branch_insights(branch, question, user=None):
         base_prompt = f"Question: {question}"
         prompt = prepare_ai_prompt(base_prompt, context_data, include_pii=False, format_type='json')
         
-        # Call OpenAI API - always server-side, never expose key to client
-        headers = {
-            'Authorization': f'Bearer {api_key}',
-            'Content-Type': 'application/json'
-        }
-        
-        # Use settings from AISettings
-        data = {
-            'model': model,
-            'messages': [
-                {'role': 'system', 'content': system_message},
-                {'role': 'user', 'content': prompt}
-            ],
-            'max_tokens': max_tokens,
-            'temperature': temperature,
-            # Ensure OpenAI doesn't use our data for training
-            'user': 'anonymous'
-        }
-        
-        response = requests.post(
-            'https://api.openai.com/v1/chat/completions',
-            headers=headers,
-            data=json.dumps(data)
-        )
+        # Call OpenAI through the shared client - always server-side, never expose key to client
+        try:
+            insight = chat_completion(
+                [
+                    {'role': 'system', 'content': system_message},
+                    {'role': 'user', 'content': prompt}
+                ],
+                model=model,
+                max_tokens=max_tokens,
+                temperature=temperature,
+            )
+        except AIClientError as e:
+            logger.error(f"Could not generate AI insights: {str(e)}")
+            
+            # Update log with failure status
+            if user and hasattr(AIPrivacyLog, 'log_ai_request') and log_id is not None:
+                try:
+                    from settings_app.models import AIRequestLog
+                    AIRequestLog.objects.filter(id=log_id).update(response_status=False)
+                except Exception as e:
+                    logger.warning(f"Could not update AI request log: {str(e)}")
+            
+            return "Sorry, I couldn't generate insights at this time. Please try again later."
         
         # Update log with success status if we're tracking
-        if response.status_code == 200 and user and hasattr(AIPrivacyLog, 'log_ai_request') and log_id is not None:
+        if user and hasattr(AIPrivacyLog, 'log_ai_request') and log_id is not None:
             try:
                 from settings_app.models import AIRequestLog
                 AIRequestLog.objects.filter(id=log_id).update(response_status=True)
             except Exception as e:
                 logger.warning(f"Could not update AI request log: {str(e)}")
         
-        # Process the response
-        try:
-            response_data = response.json()
-            
-            if 'choices' in response_data and len(response_data['choices']) > 0:
-                insight = response_data['choices'][0]['message']['content'].strip()
-                
-                # Final PII check on the response
-                insight = redact_pii(insight)
-                
-                # Add a disclaimer
-                disclaimer = (
-                    "\n\n*Note: This insight is generated by AI and should be used as a general guide only. "
-                    "No personally identifiable information was used in generating this response.*"
-                )
-                
-                return insight + disclaimer
-            else:
-                logger.error(f"Unexpected response from OpenAI: {response_data}")
-                
-                # Update log with failure status
-                if user and hasattr(AIPrivacyLog, 'log_ai_request') and log_id is not None:
-                    try:
-                        from settings_app.models import AIRequestLog
-                        AIRequestLog.objects.filter(id=log_id).update(response_status=False)
-                    except Exception as e:
-                        logger.warning(f"Could not update AI request log: {str(e)}")
-                
-                return "Sorry, I couldn't generate insights at this time. Please try again later."
-        except Exception as e:
-            logger.error(f"Error processing OpenAI response: {str(e)}")
-            return "Sorry, I couldn't process the AI response. Please try again later."
+        # Final PII check on the response
+        insight = redact_pii(insight)
+        
+        # Add a disclaimer
+        disclaimer = (
+            "\n\n*Note: This insight is generated by AI and should be used as a general guide only. "
+            "No personally identifiable information was used in generating this response.*"
+        )
+        
+        return insight + disclaimer
             
     except Exception as e:
         logger.exception(f"Error generating branch insights: {e}")
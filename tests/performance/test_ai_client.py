@@ -0,0 +1,147 @@
+"""
+Benchmarks for the shared AI client against a local OpenAI-compatible stub.
+
+Repeated and concurrent identical prompts must cost one upstream call, and
+an unhealthy upstream must trip the circuit so helpers fall back to their
+rule-based answers without waiting on the network.
+"""
+import json
+import threading
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from django.core.cache import cache
+
+from payments.utils.ai_summary import get_payment_summary_for_member
+from settings_app.utils.ai_client import AIUnavailable, chat_completion, circuit
+from settings_app.utils.openai_helper import get_scheme_insights
+from tests.conftest import create_payment, create_scheme
+
+
+class StubOpenAI(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with server.lock:
+            server.requests.append(payload)
+        time.sleep(server.delay)
+        if server.status != 200:
+            body = {'error': {'message': 'upstream failure'}}
+        else:
+            body = {'choices': [{'message': {'content': f" Reply to: {payload['messages'][-1]['content'][:40]} "}}]}
+        encoded = json.dumps(body).encode()
+        try:
+            self.send_response(server.status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(encoded)))
+            self.end_headers()
+            self.wfile.write(encoded)
+        except ConnectionError:
+            pass  # The client timed out and hung up
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub(settings):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubOpenAI)
+    server.lock, server.requests, server.delay, server.status = threading.Lock(), [], 0, 200
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    settings.OPENAI_API_BASE = f"http://127.0.0.1:{server.server_port}/v1"
+    settings.OPENAI_API_KEY = 'test-key'
+    settings.AI_CIRCUIT_FAILURE_THRESHOLD = 2
+    cache.clear()
+    circuit.reset()
+    yield server
+    server.shutdown()
+    server.server_close()
+    circuit.reset()
+    cache.clear()
+
+
+def ask(question, **kwargs):
+    return chat_completion([{'role': 'user', 'content': question}], model='gpt-4o', **kwargs)
+
+
+class TestResponseCache:
+    def test_repeated_prompts_reach_the_service_once(self, stub):
+        replies = [ask('How many policies lapsed?') for _ in range(10)]
+
+        assert len(stub.requests) == 1
+        assert set(replies) == {'Reply to: How many policies lapsed?'}
+        ask('How many policies are active?')
+        assert len(stub.requests) == 2
+
+    def test_prompts_are_redacted_before_sending_and_caching(self, stub):
+        ask('Summarise member 9001015000086')
+        ask('Summarise member 8502025000081')
+
+        assert len(stub.requests) == 1
+        assert '9001015000086' not in json.dumps(stub.requests[0])
+        assert stub.requests[0]['user'] == 'anonymous'
+
+
+def test_concurrent_identical_prompts_share_one_call(stub):
+    stub.delay = 0.3
+    replies = []
+
+    def worker():
+        replies.append(ask('Which scheme has the highest lapse rate?', use_cache=False))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(stub.requests) == 1
+    assert len(replies) == 8 and len(set(replies)) == 1
+
+
+class TestCircuitBreaker:
+    def test_failures_open_the_circuit(self, stub):
+        stub.status = 503
+
+        for _ in range(2):
+            with pytest.raises(AIUnavailable):
+                ask('Question', use_cache=False)
+        with pytest.raises(AIUnavailable, match='temporarily unavailable'):
+            ask('Question', use_cache=False)
+
+        assert len(stub.requests) == 2
+
+    def test_timeouts_count_as_failures(self, stub, settings):
+        settings.OPENAI_TIMEOUT = 0.1
+        stub.delay = 0.5
+
+        with pytest.raises(AIUnavailable):
+            ask('Slow question')
+
+        assert circuit.failures == 1
+
+    def test_payment_summary_falls_back_to_rules(self, stub, db):
+        stub.status = 500
+        payment = create_payment(amount=Decimal('250.00'))
+
+        summaries = [get_payment_summary_for_member(payment.member, None) for _ in range(3)]
+
+        assert len(stub.requests) == 2
+        assert set(summaries) == {
+            'This member made 1 payments in the past 6 months. '
+            'Average payment is R250.00. They last paid via DEBIT_ORDER 0 days ago.'
+        }
+
+
+def test_scheme_insights_use_the_shared_client(stub, db):
+    scheme = create_scheme()
+
+    first = get_scheme_insights(scheme, 'Which agents need attention?')
+    second = get_scheme_insights(scheme, 'Which agents need attention?')
+
+    assert first == second and first.startswith('Reply to: ')
+    assert 'generated by AI' in first
+    assert len(stub.requests) == 1
@@ -0,0 +1,98 @@
+"""
+Benchmarks for bulk policy document generation.
+
+A batch of policies must be loaded and saved in a fixed number of queries
+however many dependents and beneficiaries they have, and one bad document
+must not stop the rest of the batch.
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from branches.models import Bank
+from members import bulk_documents
+from members.models import Beneficiary, Dependent, Policy
+from tests.conftest import create_member, create_policy, create_scheme
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def converted(monkeypatch):
+    """Replace WeasyPrint with a stub that fails for policies marked BROKEN."""
+    calls = []
+
+    def html_to_pdf(html):
+        calls.append(html)
+        if 'BROKEN' in html:
+            raise ValueError('bad markup')
+        return b'%PDF stub'
+
+    monkeypatch.setattr(bulk_documents, 'html_to_pdf', html_to_pdf)
+    return calls
+
+
+def create_household(scheme, number, dependents=2):
+    policy = create_policy(member=create_member(last_name=f'Household{number}'), scheme=scheme)
+    policy.bank = Bank.objects.create(name=f'Bank {number}', branch_code='250655')
+    policy.save()
+    for index in range(dependents):
+        Dependent.objects.create(
+            policy=policy, relationship='Child', first_name=f'Child{index}', last_name='Doe',
+            gender='Female', date_of_birth='2012-01-01',
+        )
+    Beneficiary.objects.create(policy=policy, relationship_to_main_member='Spouse', first_name='Ben', last_name='Doe')
+    return policy
+
+
+def generate(**kwargs):
+    with CaptureQueriesContext(connection) as captured:
+        totals = bulk_documents.generate_policy_documents(workers=1, **kwargs)
+    return len(captured.captured_queries), totals
+
+
+class TestBulkPolicyDocuments:
+    def test_batch_queries_do_not_grow_with_policies(self, db, converted):
+        scheme = create_scheme()
+        small = [create_household(scheme, number).pk for number in range(2)]
+        large = [create_household(scheme, number, dependents=4).pk for number in range(2, 8)]
+
+        small_queries, small_totals = generate(policy_ids=small)
+        large_queries, large_totals = generate(policy_ids=large)
+
+        assert small_totals['generated'] == 2
+        assert large_totals['generated'] == 6
+        assert large_queries == small_queries
+
+    def test_failures_are_reported_per_policy(self, db, converted):
+        scheme = create_scheme()
+        good = create_household(scheme, 1)
+        bad = create_household(scheme, 2)
+        Policy.objects.filter(pk=bad.pk).update(policy_number='BROKEN-1')
+        batches = []
+
+        _, totals = generate(scheme_id=scheme.pk, batch_size=1, report=batches.append)
+
+        assert [batch.number for batch in batches] == [1, 2]
+        assert totals['generated'] == 1
+        assert totals['failed'] == 1
+        assert totals['failures'][0] == (bad.pk, 'bad markup')
+        assert Policy.objects.get(pk=good.pk).document.name.startswith('policies/LegacyPolicy_')
+        assert not Policy.objects.get(pk=bad.pk).document
+
+    def test_missing_only_reuses_the_render_cache(self, db, converted):
+        scheme = create_scheme()
+        policy = create_household(scheme, 1)
+        generate(scheme_id=scheme.pk)
+
+        _, rerun = generate(scheme_id=scheme.pk, missing_only=True)
+        _, forced = generate(scheme_id=scheme.pk)
+
+        assert rerun['policies'] == 0
+        assert forced['cached'] == 1
+        assert len(converted) == 1
+        assert Policy.objects.get(pk=policy.pk).document
@@ -0,0 +1,80 @@
+"""
+Query-count benchmarks for the global template context processors.
+
+Once warm, rendering a page must not query the database for the site
+settings or the user's permission flags; saving settings or changing a
+user's groups must show up on the next request.
+"""
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser, Group
+from django.core.cache import cache
+from django.test import RequestFactory
+
+from accounts.context_processors import user_permissions
+from settings_app.context_processors import settings_context
+from settings_app import models as settings_models
+from settings_app.models import Settings
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    settings_models._cached_settings.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def finance_officer(db):
+    user = get_user_model().objects.create_user(username='finance', password='pass1234')
+    user.groups.set([Group.objects.get_or_create(name='Finance Officer')[0]])
+    return user
+
+
+def page_request(user):
+    request = RequestFactory().get('/dashboard/')
+    # A fresh user object per request, as AuthenticationMiddleware loads it
+    request.user = get_user_model().objects.get(pk=user.pk) if user.pk else user
+    return request
+
+
+class TestSettingsContext:
+    def test_settings_are_loaded_once_per_version(self, db, django_assert_num_queries):
+        settings_context(page_request(AnonymousUser()))
+
+        with django_assert_num_queries(0):
+            context = settings_context(page_request(AnonymousUser()))
+        assert context['settings'].site_name == 'Legacy Admin'
+
+    def test_saving_settings_reloads_them(self, db):
+        settings_context(page_request(AnonymousUser()))
+
+        settings = Settings.load()
+        settings.site_name = 'Legacy Guard Admin'
+        settings.save()
+
+        assert settings_context(page_request(AnonymousUser()))['settings'].site_name == 'Legacy Guard Admin'
+
+
+class TestUserPermissionsContext:
+    def test_steady_state_costs_no_queries(self, finance_officer, django_assert_num_queries):
+        user_permissions(page_request(finance_officer))
+        request = page_request(finance_officer)
+
+        with django_assert_num_queries(0):
+            context = user_permissions(request)
+
+        assert context['user_primary_role'] == 'Finance Officer'
+        assert context['can_view_reports'] and not context['can_manage_users']
+
+    def test_group_change_invalidates_the_snapshot(self, finance_officer):
+        assert not user_permissions(page_request(finance_officer))['is_admin']
+
+        finance_officer.groups.add(Group.objects.get_or_create(name='Administrator')[0])
+
+        context = user_permissions(page_request(finance_officer))
+        assert context['is_admin'] and context['can_manage_users']
+
+    def test_anonymous_users_get_no_flags(self, db):
+        assert user_permissions(page_request(AnonymousUser())) == {}
@@ -0,0 +1,104 @@
+"""
+Query-count benchmarks for the dashboard chart aggregation.
+
+The dashboard charts must cost the same number of queries whether the book
+holds one plan or dozens of plans, schemes and branches.
+"""
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from branches.models import Branch
+from members.models import Policy
+from schemes.models import Plan, Scheme
+from dashboard.aggregates import build_distribution_series
+from tests.conftest import create_bank, create_branch, create_member, create_scheme
+
+
+def add_book(bank, index):
+    """Create a branch with one scheme, one plan and two policies"""
+    branch = create_branch(bank=bank, name=f'Branch {index}', location=f'Town {index}')
+    scheme = create_scheme(branch=branch, name=f'Scheme {index}')
+    plan = Plan.objects.create(
+        name=f'Plan {index}',
+        scheme=scheme,
+        premium=Decimal('100.00'),
+    )
+    for policy_index in range(2):
+        Policy.objects.create(
+            member=create_member(first_name=f'Member{index}', last_name=f'Book{policy_index}'),
+            scheme=scheme,
+            plan=plan,
+            inception_date=date.today().replace(day=1),
+        )
+    return plan
+
+
+def count_series_queries():
+    with CaptureQueriesContext(connection) as captured:
+        series = build_distribution_series(
+            Policy.objects.all(),
+            Plan.objects.order_by('name'),
+            Scheme.objects.order_by('name'),
+            Branch.objects.order_by('name'),
+            date.today().replace(day=1),
+        )
+    return len(captured.captured_queries), series
+
+
+def count_view_queries(client):
+    # Warm up once so one-off setup (site settings row, session) is excluded
+    client.get(reverse('dashboard:index'))
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(reverse('dashboard:index'))
+    assert response.status_code == 200
+    return len(captured.captured_queries)
+
+
+class TestDashboardAggregateQueryCount:
+    """Chart aggregation query count must not grow with the book"""
+
+    def test_series_counts_match_policies(self, db):
+        bank = create_bank()
+        for index in range(3):
+            add_book(bank, index)
+
+        _, series = count_series_queries()
+
+        assert series['plan_labels'] == ['Plan 0', 'Plan 1', 'Plan 2']
+        assert series['plan_data'] == [2, 2, 2]
+        assert series['scheme_data'] == [2, 2, 2]
+        assert series['branch_data'] == [2, 2, 2]
+        assert sum(series['agent_signup_counts']) == 6
+
+    def test_series_query_count_is_constant(self, db):
+        bank = create_bank()
+        add_book(bank, 0)
+        small_count, _ = count_series_queries()
+
+        for index in range(1, 12):
+            add_book(bank, index)
+        large_count, series = count_series_queries()
+
+        assert len(series['plan_labels']) == 12
+        assert large_count == small_count
+
+    def test_index_view_query_count_is_constant(self, db, client):
+        user = get_user_model().objects.create_superuser(
+            username='dashboard_admin',
+            email='dashboard@test.com',
+            password='adminpass123',
+        )
+        client.force_login(user)
+        bank = create_bank()
+        add_book(bank, 0)
+        small_count = count_view_queries(client)
+
+        for index in range(1, 12):
+            add_book(bank, index)
+        large_count = count_view_queries(client)
+
+        assert large_count == small_count
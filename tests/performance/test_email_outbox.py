@@ -0,0 +1,129 @@
+"""
+Benchmarks for the queued email outbox.
+
+Sending a policy document must not touch the mail server on the request
+path; the outbox then delivers a whole batch over one connection, records
+each email's outcome and retries only transient failures.
+"""
+import smtplib
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+
+from members.communications.models import OutboundEmail
+from members.communications.outbox import deliver_outbox, queue_email
+from members.models import Policy
+from members.utils import pdf_generator
+from members.utils.email_sender import send_policy_document_email
+from tests.conftest import create_member, create_policy, create_scheme
+
+
+class CountingBackend(EmailBackend):
+    """locmem backend counting connections and failing chosen recipients."""
+
+    opened = 0
+    failures = {}
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            error = self.failures.get(message.to[0])
+            if error:
+                raise error
+        return super().send_messages(messages)
+
+
+@pytest.fixture(autouse=True)
+def backend(settings, tmp_path, monkeypatch):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.EMAIL_BACKEND = f"{__name__}.CountingBackend"
+    monkeypatch.setattr(CountingBackend, 'opened', 0)
+    monkeypatch.setattr(CountingBackend, 'failures', {})
+    monkeypatch.setattr(
+        pdf_generator, 'render_policy_document',
+        lambda policy, member, dependents, beneficiaries: f"%PDF {policy.policy_number}".encode(),
+    )
+    return CountingBackend
+
+
+@pytest.fixture
+def deliveries(monkeypatch):
+    """Record outbox tasks queued on commit instead of running them."""
+    queued = []
+    monkeypatch.setattr('members.communications.tasks.deliver_email_outbox.delay', lambda: queued.append(True))
+    return queued
+
+
+def policies_with_documents(count):
+    scheme = create_scheme()
+    policies = []
+    for index in range(count):
+        policy = create_policy(member=create_member(first_name=f"Member{index}"), scheme=scheme)
+        policy.document.name = f"policies/{policy.pk}.pdf"
+        policies.append(policy)
+    return policies
+
+
+class TestPolicyDocumentEmails:
+    def test_request_path_only_queues(self, db, deliveries, django_capture_on_commit_callbacks):
+        policy = policies_with_documents(1)[0]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assert send_policy_document_email(policy)
+            assert send_policy_document_email(policy)
+
+        assert mail.outbox == []
+        assert OutboundEmail.objects.filter(kind='policy_document', object_id=policy.pk).count() == 1
+        assert deliveries == [True]
+
+    def test_batch_is_sent_over_one_connection(self, db, backend, deliveries, django_capture_on_commit_callbacks):
+        policies = policies_with_documents(5)
+        with django_capture_on_commit_callbacks(execute=True):
+            for policy in policies:
+                send_policy_document_email(policy)
+
+        assert deliver_outbox(batch_size=10) == {'sent': 5, 'retried': 0, 'failed': 0}
+
+        assert backend.opened == 1
+        assert len(mail.outbox) == 5
+        assert all(message.attachments[0][1].startswith(b'%PDF') for message in mail.outbox)
+        assert not Policy.objects.filter(email_sent_at__isnull=True).exists()
+        assert set(OutboundEmail.objects.values_list('status', flat=True)) == {OutboundEmail.STATUS_SENT}
+
+
+class TestFailures:
+    def test_transient_errors_retry_and_permanent_errors_fail(self, db, backend):
+        backend.failures = {
+            'busy@test.com': smtplib.SMTPResponseException(421, b'Try again later'),
+            'unknown@test.com': smtplib.SMTPRecipientsRefused({'unknown@test.com': (550, b'No such user')}),
+        }
+        for to in ('ok@test.com', 'busy@test.com', 'unknown@test.com'):
+            queue_email(to=to, subject='Premium due', body='Your premium is due')
+
+        assert deliver_outbox() == {'sent': 1, 'retried': 1, 'failed': 1}
+
+        statuses = dict(OutboundEmail.objects.values_list('to', 'status'))
+        assert statuses == {
+            'ok@test.com': OutboundEmail.STATUS_SENT,
+            'busy@test.com': OutboundEmail.STATUS_QUEUED,
+            'unknown@test.com': OutboundEmail.STATUS_FAILED,
+        }
+        # The retry is not due yet, so another run sends nothing
+        assert deliver_outbox() == {'sent': 0, 'retried': 0, 'failed': 0}
+
+    def test_retries_stop_after_max_attempts(self, db, backend, settings):
+        settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 2
+        backend.failures = {'busy@test.com': smtplib.SMTPResponseException(421, b'Try again later')}
+        email = queue_email(to='busy@test.com', subject='Premium due', body='Your premium is due')
+
+        deliver_outbox()
+        OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=email.created_at)
+        deliver_outbox()
+
+        email.refresh_from_db()
+        assert (email.status, email.attempts) == (OutboundEmail.STATUS_FAILED, 2)
+        assert '421' in email.error
@@ -0,0 +1,92 @@
+"""
+Benchmarks for public enrollment statistics.
+
+Dashboard counts must come from one aggregation query, then from the cache
+until an application changes status, however many applications exist.
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+
+from members.models_public_enrollment import PublicApplication
+from members.utils_public_enrollment import (
+    get_enrollment_statistics,
+    get_scheme_enrollment_statistics,
+)
+from schemes.models import Plan
+from tests.conftest import create_scheme
+
+
+def create_application(scheme, status='submitted', index=0):
+    plan = Plan.objects.filter(scheme=scheme).first() or Plan.objects.create(
+        scheme=scheme, name='Family', premium=Decimal('150.00'),
+        main_premium=Decimal('150.00'), main_cover=Decimal('10000.00'),
+    )
+    return PublicApplication.objects.create(
+        first_name=f"Applicant{index}", last_name='Doe', email=f"applicant{index}@test.com",
+        phone_number='0712345678', id_number='9001015000086', date_of_birth=date(1990, 1, 1),
+        gender='Male', scheme=scheme, plan=plan, status=status,
+    )
+
+
+@pytest.fixture
+def applications(db, django_capture_on_commit_callbacks):
+    cache.clear()
+    alpha, beta = create_scheme(name='Alpha'), create_scheme(name='Beta')
+    with django_capture_on_commit_callbacks(execute=True):
+        for index, status in enumerate(['draft', 'submitted', 'submitted', 'approved', 'completed']):
+            create_application(alpha, status, index)
+        create_application(beta, 'rejected', 10)
+    yield alpha, beta
+    cache.clear()
+
+
+class TestEnrollmentStatistics:
+    def test_counts_in_one_query_then_from_cache(self, applications, django_assert_num_queries):
+        alpha, _ = applications
+
+        with django_assert_num_queries(1):
+            stats = get_enrollment_statistics()
+        with django_assert_num_queries(0):
+            assert get_enrollment_statistics() == stats
+
+        assert stats == {'total': 6, 'draft': 1, 'submitted': 2, 'approved': 1, 'rejected': 1, 'completed': 1}
+        assert get_enrollment_statistics(alpha)['submitted'] == 2
+
+    def test_uncached_schemes_share_one_query(self, applications, django_assert_num_queries):
+        alpha, beta = applications
+        empty = create_scheme(name='Empty')
+
+        with django_assert_num_queries(1):
+            stats = get_scheme_enrollment_statistics([alpha.pk, beta.pk, empty.pk])
+
+        assert stats[beta.pk]['rejected'] == 1
+        assert stats[empty.pk]['total'] == 0
+
+    def test_status_transition_invalidates_the_scheme(self, applications, django_capture_on_commit_callbacks):
+        alpha, beta = applications
+        get_enrollment_statistics()
+        get_scheme_enrollment_statistics([alpha.pk, beta.pk])
+        application = PublicApplication.objects.filter(scheme=alpha, status='submitted').first()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            application.approve()
+
+        assert get_enrollment_statistics()['approved'] == 2
+        assert get_enrollment_statistics(alpha)['approved'] == 2
+
+    def test_saves_without_a_status_change_keep_the_cache(self, applications, django_capture_on_commit_callbacks,
+                                                         django_assert_num_queries):
+        get_enrollment_statistics()
+        application = PublicApplication.objects.first()
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            application.review_notes = 'Checked ID'
+            application.save()
+
+        assert callbacks == []
+        with django_assert_num_queries(0):
+            get_enrollment_statistics()
+
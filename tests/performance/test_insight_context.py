@@ -0,0 +1,101 @@
+"""
+Benchmarks for the AI scheme and branch insight context.
+
+The anonymised statistics sent with an insight question must come from a
+fixed number of aggregate queries however many policies the scheme holds,
+then from the cache for repeat questions.
+"""
+import json
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+
+from members.models import Policy
+from schemes.models import Plan
+from settings_app.models import Agent
+from settings_app.utils.insight_context import get_branch_context, get_scheme_context
+from tests.conftest import create_branch, create_member, create_policy, create_scheme
+
+
+def create_agent(scheme, name):
+    return Agent.objects.create(
+        scheme=scheme, full_name=name, surname='Agent', contact_number='0712345678',
+        email=f"{name.lower()}@test.com", address1='1 Main Road', address2='Town', address3='Province', code='0001',
+    )
+
+
+def create_plan(scheme, name, premium):
+    return Plan.objects.create(
+        scheme=scheme, name=name, premium=Decimal(premium),
+        main_premium=Decimal(premium), main_cover=Decimal('10000.00'),
+    )
+
+
+def populate(scheme, count, agent, plan, status='ACTIVE', premium='100.00', cover='10000.00'):
+    for index in range(count):
+        policy = create_policy(member=create_member(first_name=f"{scheme.name}{status}{index}"), scheme=scheme)
+        Policy.objects.filter(pk=policy.pk).update(
+            underwritten_by=agent, plan=plan, status=status,
+            premium_amount=Decimal(premium), cover_amount=Decimal(cover),
+        )
+
+
+@pytest.fixture
+def book(db):
+    cache.clear()
+    branch = create_branch()
+    alpha, beta = create_scheme(branch=branch, name='Alpha'), create_scheme(branch=branch, name='Beta')
+    ann, bob = create_agent(alpha, 'Ann'), create_agent(alpha, 'Bob')
+    create_agent(beta, 'Cal')
+    basic, family = create_plan(alpha, 'Basic', '100.00'), create_plan(alpha, 'Family', '200.00')
+    populate(alpha, 3, ann, basic)
+    populate(alpha, 1, ann, family, status='LAPSED', premium='200.00', cover='20000.00')
+    populate(alpha, 2, bob, family, premium='200.00', cover='20000.00')
+    populate(beta, 2, None, None, status='LAPSED')
+    yield branch, alpha, beta, (ann, bob), (basic, family)
+    cache.clear()
+
+
+class TestSchemeContext:
+    def test_aggregates_in_three_queries_then_cached(self, book, django_assert_num_queries):
+        _, alpha, _, (ann, bob), (basic, family) = book
+
+        with django_assert_num_queries(3):
+            context = get_scheme_context(alpha)
+        with django_assert_num_queries(0):
+            assert get_scheme_context(alpha) == context
+
+        assert context['agent_data'] == [
+            {'agent_id': f"AG{ann.id}", 'policies_count': 4, 'lapsed_count': 1,
+             'lapse_percentage': 25.0, 'average_premium': 125.0},
+            {'agent_id': f"AG{bob.id}", 'policies_count': 2, 'lapsed_count': 0,
+             'lapse_percentage': 0, 'average_premium': 200.0},
+        ]
+        assert context['plan_data'][1] == {
+            'plan_id': f"PL{family.id}", 'policies_count': 3, 'average_cover': 20000.0, 'average_premium': 200.0,
+        }
+        assert context['policy_statistics'] == {'total': 6, 'active': 5, 'lapsed': 1, 'lapse_rate': 16.67}
+        # The context is sent to the model as JSON
+        json.dumps(context)
+
+    def test_query_count_does_not_grow_with_the_book(self, book, django_assert_num_queries):
+        _, alpha, _, (ann, _), (basic, _) = book
+        populate(alpha, 20, ann, basic)
+
+        with django_assert_num_queries(3):
+            assert get_scheme_context(alpha)['policy_statistics']['total'] == 26
+
+
+def test_branch_context(book, django_assert_num_queries):
+    branch, alpha, beta, _, _ = book
+
+    with django_assert_num_queries(3):
+        context = get_branch_context(branch)
+
+    assert context['scheme_count'] == 2 and context['agent_count'] == 3
+    assert context['scheme_data'][1] == {
+        'scheme_id': f"SC{beta.id}", 'policies_count': 2, 'active_policies': 0, 'lapsed_policies': 2,
+        'lapse_rate': 100.0, 'average_premium': 100.0, 'average_cover': 10000.0, 'agents_count': 1,
+    }
+    assert context['policy_statistics'] == {'total': 8, 'active': 5, 'lapsed': 3, 'lapse_rate': 37.5}
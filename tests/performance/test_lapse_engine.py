@@ -0,0 +1,119 @@
+"""
+Benchmarks for the set-based lapse engine.
+
+Refreshing lapse state must cost a fixed number of queries per batch of
+policies, whatever the number of policies or payments, and must only write
+policies whose state changed.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Sum
+
+from dashboard.models import DailyPolicyRollup
+from dashboard.rollups import rebuild_policy_rollups
+from members.lapse import refresh_lapse_states
+from members.models import Policy
+from payments.models import Payment
+from payments.utils import update_policy_status
+from tests.conftest import create_member, create_policy, create_scheme
+
+TODAY = date(2026, 6, 30)
+
+
+def pay(policy, days_ago, amount='150.00', status='COMPLETED'):
+    return Payment.objects.create(
+        member=policy.member,
+        policy=policy,
+        amount=Decimal(amount),
+        date=TODAY - timedelta(days=days_ago),
+        payment_method='DEBIT_ORDER',
+        status=status,
+    )
+
+
+def policies(count, scheme=None):
+    scheme = scheme or create_scheme()
+    return [create_policy(member=create_member(first_name=f"Member{index}"), scheme=scheme) for index in range(count)]
+
+
+class TestLapseStates:
+    def test_state_follows_latest_completed_payment(self, db):
+        current, at_risk, lapsed, never_paid = policies(4)
+        pay(current, 90)
+        pay(current, 10, amount='175.00')
+        pay(current, 2, status='FAILED')
+        pay(at_risk, 50)
+        pay(lapsed, 61)
+
+        totals = refresh_lapse_states(today=TODAY)
+
+        state = {
+            policy.pk: (policy.status, policy.lapse_warning, policy.last_payment_date, policy.last_payment_amount)
+            for policy in Policy.objects.all()
+        }
+        assert state[current.pk] == ('ACTIVE', 'none', TODAY - timedelta(days=10), Decimal('175.00'))
+        assert state[at_risk.pk][:2] == ('ACTIVE', 'warning')
+        assert state[lapsed.pk][:2] == ('LAPSED', 'lapsed')
+        assert state[never_paid.pk] == ('PENDING', 'warning', None, None)
+        assert totals['checked'] == 4
+
+    def test_unchanged_policies_are_not_written(self, db):
+        for policy in policies(3):
+            pay(policy, 5)
+
+        assert refresh_lapse_states(today=TODAY)['updated'] == 3
+        assert refresh_lapse_states(today=TODAY)['updated'] == 0
+
+    def test_reinstated_policy_becomes_active(self, db):
+        policy = policies(1)[0]
+        pay(policy, 80)
+        refresh_lapse_states(today=TODAY)
+        pay(policy, 0)
+
+        refresh_lapse_states(today=TODAY)
+
+        policy.refresh_from_db()
+        assert (policy.status, policy.lapse_warning) == ('ACTIVE', 'none')
+
+    def test_dashboard_rollups_follow_lapses(self, db, django_capture_on_commit_callbacks):
+        current, lapsed = policies(2)
+        pay(current, 5)
+        pay(lapsed, 61)
+        rebuild_policy_rollups()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            refresh_lapse_states(today=TODAY)
+
+        assert DailyPolicyRollup.objects.aggregate(lapsed=Sum('lapsed_policies'))['lapsed'] == 1
+
+
+class TestQueryCount:
+    def test_queries_do_not_grow_with_policies(self, db, django_assert_max_num_queries):
+        for index, policy in enumerate(policies(40)):
+            pay(policy, index * 3)
+            pay(policy, index * 3 + 30)
+
+        # Per batch: one range query, the policies, the window query and one bulk update
+        with django_assert_max_num_queries(1 + 4 * 5):
+            totals = refresh_lapse_states(batch_size=10, today=TODAY)
+
+        assert totals['checked'] == totals['updated'] == 40
+
+    def test_scheme_filter(self, db):
+        included = policies(2)
+        excluded = policies(2, scheme=create_scheme(name='Other Scheme'))
+
+        totals = refresh_lapse_states(scheme_id=included[0].scheme_id, today=TODAY)
+
+        assert totals['checked'] == 2
+        assert not Policy.objects.filter(pk__in=[policy.pk for policy in excluded], lapse_warning='warning').exists()
+
+
+def test_update_policy_status_uses_the_engine(db):
+    policy = policies(1)[0]
+    pay(policy, (TODAY - date.today()).days, amount='210.00')
+
+    assert update_policy_status(policy)
+    assert policy.status == 'ACTIVE'
+    assert policy.last_payment_amount == Decimal('210.00')
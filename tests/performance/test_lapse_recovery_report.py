@@ -0,0 +1,102 @@
+"""
+Benchmarks for the lapsed policy recovery report.
+
+Finding reactivations must take one query whatever the number of policies,
+and the per-scheme parallel mode must produce the same report.
+"""
+import csv
+import io
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+
+from members.lapse_recovery import report_filters, write_report, write_report_by_scheme
+from payments.models import Payment
+from tests.conftest import create_branch, create_member, create_policy, create_scheme
+
+END = date(2026, 6, 30)
+START = END - timedelta(days=30)
+
+
+def pay(policy, on, amount='150.00', status='COMPLETED'):
+    Payment.objects.create(
+        member=policy.member, policy=policy, amount=Decimal(amount),
+        date=on, payment_method='DEBIT_ORDER', status=status,
+    )
+
+
+@pytest.fixture
+def schemes(db):
+    branch = create_branch()
+    return create_scheme(branch=branch, name='Alpha'), create_scheme(branch=branch, name='Beta')
+
+
+@pytest.fixture
+def payment_history(schemes):
+    """Three reactivations (two in Alpha, one in Beta) among regular payers."""
+    alpha, beta = schemes
+    expected = {}
+    for index, scheme in enumerate([alpha, alpha, beta]):
+        policy = create_policy(member=create_member(first_name=f"Lapsed{index}"), scheme=scheme)
+        pay(policy, END - timedelta(days=150))
+        pay(policy, END - timedelta(days=5), amount='300.00')
+        expected[policy.policy_number] = '145'
+    new = create_policy(member=create_member(first_name='New'), scheme=beta)
+    pay(new, END - timedelta(days=2))
+    expected[new.policy_number] = 'N/A'
+
+    for index in range(5):
+        regular = create_policy(member=create_member(first_name=f"Regular{index}"), scheme=alpha)
+        for months in range(6):
+            pay(regular, END - timedelta(days=30 * months + 3))
+    # Exactly the lapse period between payments is not a lapse
+    boundary = create_policy(member=create_member(first_name='Boundary'), scheme=alpha)
+    pay(boundary, END - timedelta(days=70))
+    pay(boundary, END - timedelta(days=10))
+    # A failed payment does not end a lapse
+    failed = create_policy(member=create_member(first_name='Failed'), scheme=beta)
+    pay(failed, END - timedelta(days=200))
+    pay(failed, END - timedelta(days=4), status='FAILED')
+    return expected
+
+
+def read_report(path):
+    with open(path, newline='') as report:
+        return list(csv.DictReader(report))
+
+
+class TestRecoveryReport:
+    def test_one_query_finds_reactivations(self, payment_history, tmp_path, django_assert_num_queries):
+        path = tmp_path / 'report.csv'
+
+        with django_assert_num_queries(1):
+            assert write_report(path, START, END) == 4
+
+        rows = read_report(path)
+        assert {row['Policy Number']: row['Days Lapsed'] for row in rows} == payment_history
+        assert {row['Scheme'] for row in rows} == {'Alpha', 'Beta'}
+
+    def test_scheme_filter(self, payment_history, schemes, tmp_path):
+        alpha, _ = schemes
+
+        assert write_report(tmp_path / 'alpha.csv', START, END, report_filters(scheme_id=alpha.pk)) == 2
+        assert write_report(tmp_path / 'branch.csv', START, END, report_filters(branch_id=alpha.branch_id)) == 4
+
+    def test_parts_by_scheme_match_the_single_report(self, payment_history, tmp_path):
+        write_report(tmp_path / 'single.csv', START, END)
+
+        assert write_report_by_scheme(tmp_path / 'parts.csv', START, END) == 4
+
+        assert read_report(tmp_path / 'parts.csv') == read_report(tmp_path / 'single.csv')
+        # The per-scheme part files are removed
+        assert sorted(path.name for path in tmp_path.iterdir()) == ['parts.csv', 'single.csv']
+
+
+def test_command_writes_report(db, tmp_path):
+    call_command('generate_lapse_recovery_report', output=str(tmp_path), stdout=io.StringIO())
+
+    reports = list(tmp_path.glob('lapsed_policy_recovery_report_*.csv'))
+    assert len(reports) == 1
+    assert read_report(reports[0]) == []
@@ -0,0 +1,169 @@
+"""
+Benchmarks for the ID-document OCR job pipeline.
+
+An upload must return without waiting for recognition, the image must be
+decoded and shrunk once per job, and a document read before must be
+answered from the cache without another OCR pass. Jobs are read by a
+Celery worker, stood in for here by a thread.
+"""
+import base64
+import io
+import threading
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from PIL import Image
+
+from members.ocr_jobs import ocr_job_cache_key
+from members.tasks import read_id_document
+from members.utils import ocr_processor
+from members.utils.ocr_processor import preprocess_image, read_id_line
+
+ID_NUMBER = '8001015009087'
+
+
+def upload(width=4000, height=3000):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 190, 180)).save(buffer, format='JPEG')
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+@pytest.fixture
+def slow_tesseract(settings, monkeypatch):
+    """A Tesseract pass that blocks until released and records the image it was given."""
+    settings.OPENAI_API_KEY = ''
+    cache.clear()
+    release = threading.Event()
+    images = []
+
+    def process_with_tesseract(image):
+        images.append(image)
+        release.wait(5)
+        return {'id_number': ID_NUMBER, 'full_name': 'Jane Doe', 'date_of_birth': '1980-01-01', 'gender': 'M'}
+
+    def delay(job_id, image_data):
+        threading.Thread(target=read_id_document, args=(job_id, image_data)).start()
+
+    monkeypatch.setattr(ocr_processor, 'process_with_tesseract', process_with_tesseract)
+    monkeypatch.setattr('members.tasks.read_id_document.delay', delay)
+    yield images, release
+    release.set()
+    cache.clear()
+
+
+@pytest.fixture
+def api_client(client, db):
+    client.force_login(get_user_model().objects.create_user(username='clerk', password='pass1234'))
+    return client
+
+
+def post_document(client, image_data):
+    return client.post(
+        reverse('members:process_id_document'), {'image_data': image_data}, content_type='application/json',
+    )
+
+
+def poll(client, poll_url, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = client.get(poll_url)
+        if response.status_code != 202:
+            return response
+        time.sleep(0.02)
+    raise AssertionError('OCR job did not finish')
+
+
+class TestOcrJobs:
+    def test_upload_returns_before_recognition_finishes(self, api_client, slow_tesseract):
+        images, release = slow_tesseract
+        started = time.monotonic()
+
+        response = post_document(api_client, upload())
+
+        assert time.monotonic() - started < 1
+        assert response.status_code == 202
+        assert api_client.get(response.json()['poll_url']).json()['status'] == 'pending'
+
+        release.set()
+        result = poll(api_client, response.json()['poll_url'])
+        assert result.status_code == 200
+        assert result.json()['data']['id_number'] == ID_NUMBER
+        # Tesseract got the shrunk black-and-white image, not the upload
+        assert max(images[0].size) == 1600
+
+    def test_repeat_upload_is_served_from_the_cache(self, api_client, slow_tesseract):
+        images, release = slow_tesseract
+        release.set()
+        image_data = upload()
+        poll(api_client, post_document(api_client, image_data).json()['poll_url'])
+
+        response = post_document(api_client, image_data)
+
+        assert response.status_code == 200
+        assert response.json()['data']['full_name'] == 'Jane Doe'
+        assert len(images) == 1
+
+    def test_invalid_and_unknown_jobs(self, api_client):
+        assert post_document(api_client, 'not base64!').status_code == 400
+        assert api_client.get(reverse('members:id_document_job', args=['missing'])).status_code == 404
+
+    def test_oversized_upload_is_refused(self, api_client, slow_tesseract, settings):
+        images, release = slow_tesseract
+        settings.OCR_MAX_IMAGE_SIZE = 1024
+
+        response = post_document(api_client, upload())
+
+        assert response.status_code == 400
+        assert 'too large' in response.json()['error']
+        assert images == []
+
+    def test_unreachable_broker_answers_503(self, api_client, slow_tesseract, monkeypatch):
+        def delay(job_id, image_data):
+            raise ConnectionError('broker down')
+
+        monkeypatch.setattr('members.tasks.read_id_document.delay', delay)
+
+        assert post_document(api_client, upload()).status_code == 503
+
+    def test_lost_job_reports_failed(self, api_client, slow_tesseract, monkeypatch, settings):
+        # The worker never picks the job up
+        monkeypatch.setattr('members.tasks.read_id_document.delay', lambda job_id, image_data: None)
+        settings.OCR_JOB_STALE_AFTER = 60
+        job = post_document(api_client, upload()).json()
+        poll_url = job['poll_url']
+        assert api_client.get(poll_url).status_code == 202
+
+        key = ocr_job_cache_key(job['job_id'])
+        cache.set(key, {**cache.get(key), 'started_at': time.time() - 61})
+
+        response = api_client.get(poll_url)
+        assert response.status_code == 400
+        assert 'in time' in response.json()['error']
+
+
+def test_preprocessing_shrinks_and_binarizes():
+    greyscale, binary = preprocess_image(base64.b64decode(upload().split(',', 1)[1]))
+
+    assert greyscale.size == (1600, 1200) and greyscale.mode == 'L'
+    assert {level for level, count in enumerate(binary.histogram()) if count} <= {0, 255}
+
+
+def test_id_line_pass_reads_the_digit_line_only(monkeypatch):
+    regions = []
+
+    def image_to_string(region, config=''):
+        regions.append((region.size, config))
+        return '8001 0150 0908 7\n'
+
+    monkeypatch.setattr(ocr_processor.pytesseract, 'image_to_string', image_to_string)
+    image = Image.new('L', (1600, 1000), 255)
+    lines = [('REPUBLIC OF SOUTH AFRICA', (100, 50, 900, 90)), ('8OO1 O15 5OO9 O87', (100, 600, 700, 640))]
+
+    assert read_id_line(image, lines) is None
+    lines[1] = ('80010 15009 O87', (100, 600, 700, 640))
+    assert read_id_line(image, lines) == ID_NUMBER
+    # Only the ID line, with padding, enlarged twice, digits only
+    assert regions == [((1232, 112), ocr_processor.ID_LINE_CONFIG)]
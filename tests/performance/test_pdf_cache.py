@@ -0,0 +1,152 @@
+"""
+Benchmarks for the rendered PDF cache.
+
+Downloading an unchanged policy document or receipt must not render the
+template or run the PDF engine again, and any change to the inputs must
+produce a fresh render.
+"""
+from datetime import date
+
+import pytest
+from django.contrib.auth import get_user_model
+
+from branches.models import Bank
+from legacyadmin.pdf_cache import cached_pdf, prune_pdf_cache
+from members.models import Dependent
+from members.utils import pdf_generator
+from payments.models import PaymentReceipt
+from payments.utils import receipt_generator
+from tests.conftest import create_payment, create_policy
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Replace the policy document renderer with a counting stub."""
+    calls = []
+
+    def render(policy, member, dependents, beneficiaries):
+        calls.append(policy.pk)
+        return f"%PDF {policy.policy_number} {dependents.count()}".encode()
+
+    monkeypatch.setattr(pdf_generator, 'render_policy_document', render)
+    return calls
+
+
+class TestPolicyDocumentCache:
+    """Policy documents are rendered once per distinct set of inputs"""
+
+    def test_unchanged_document_is_not_rerendered(self, db, renders):
+        policy = create_policy()
+
+        first = pdf_generator.generate_policy_document(policy).read()
+        second = pdf_generator.generate_policy_document(policy).read()
+
+        assert first == second
+        assert renders == [policy.pk]
+
+    def test_input_changes_render_a_new_document(self, db, renders):
+        policy = create_policy()
+        pdf_generator.generate_policy_document(policy)
+
+        Dependent.objects.create(
+            policy=policy, relationship='Child', first_name='Lwazi', last_name='Doe',
+            gender='Male', date_of_birth='2015-04-01',
+        )
+        with_child = pdf_generator.generate_policy_document(policy).read()
+        policy.cover_amount = 20000
+        pdf_generator.generate_policy_document(policy)
+
+        assert renders == [policy.pk] * 3
+        assert with_child.endswith(b' 1')
+
+    def test_related_rows_the_template_reads_render_a_new_document(self, db, renders):
+        policy = create_policy()
+        policy.bank = Bank.objects.create(name='First Bank', branch_code='250655')
+        policy.save()
+        pdf_generator.generate_policy_document(policy)
+
+        policy.scheme.name = 'Renamed Scheme'
+        policy.scheme.save()
+        pdf_generator.generate_policy_document(policy)
+        policy.bank.name = 'Second Bank'
+        policy.bank.save()
+        pdf_generator.generate_policy_document(policy)
+        pdf_generator.generate_policy_document(policy)
+
+        assert renders == [policy.pk] * 3
+
+    def test_saving_the_document_does_not_invalidate_it(self, db, renders):
+        policy = create_policy()
+
+        assert pdf_generator.generate_and_save_policy_document(policy)
+        pdf_generator.generate_policy_document(policy)
+
+        assert renders == [policy.pk]
+
+
+class TestReceiptCache:
+    """Receipts are keyed on the receipt rows and capturer they print"""
+
+    @pytest.fixture
+    def receipt_renders(self, monkeypatch):
+        calls = []
+
+        def render(payment, generated_on=None):
+            calls.append(payment.pk)
+            return f"%PDF {payment.receipts.first()}".encode()
+
+        monkeypatch.setattr(receipt_generator, 'render_payment_receipt', render)
+        return calls
+
+    def test_receipt_number_and_capturer_changes_render_a_new_receipt(self, db, receipt_renders):
+        payment = create_payment()
+        receipt_generator.generate_payment_receipt_pdf(payment)
+        receipt_generator.generate_payment_receipt_pdf(payment)
+
+        receipt = PaymentReceipt.objects.create(payment=payment, receipt_number='R1-001')
+        receipt_generator.generate_payment_receipt_pdf(payment)
+        receipt.receipt_number = 'R1-002'
+        receipt.save()
+        receipt_generator.generate_payment_receipt_pdf(payment)
+        payment.created_by = get_user_model().objects.create_user(username='cashier', first_name='Thandi')
+        receipt_generator.generate_payment_receipt_pdf(payment)
+        payment.created_by.first_name = 'Thandiwe'
+        receipt_generator.generate_payment_receipt_pdf(payment)
+
+        assert receipt_renders == [payment.pk] * 5
+
+    def test_storing_the_receipt_pdf_does_not_invalidate_it(self, db, receipt_renders):
+        payment = create_payment()
+        receipt = PaymentReceipt.objects.create(payment=payment, receipt_number='R1-001')
+        content = receipt_generator.generate_payment_receipt_pdf(payment)
+
+        receipt.pdf_file.save(content.name, content)
+        receipt_generator.generate_payment_receipt_pdf(payment)
+
+        assert receipt_renders == [payment.pk]
+
+
+    def test_receipt_is_rerendered_on_a_new_day(self, db, receipt_renders, monkeypatch):
+        payment = create_payment()
+        receipt_generator.generate_payment_receipt_pdf(payment)
+
+        # The receipt prints the day it was generated
+        monkeypatch.setattr(receipt_generator.timezone, 'localdate', lambda: date(2099, 1, 1))
+        receipt_generator.generate_payment_receipt_pdf(payment)
+        receipt_generator.generate_payment_receipt_pdf(payment)
+
+        assert receipt_renders == [payment.pk] * 2
+
+
+class TestPdfCacheStorage:
+    def test_cached_pdfs_are_pruned_by_age(self, db):
+        cached_pdf('receipts', 'members/pdf/policy_document.html', {'payment': 1}, lambda: b'%PDF')
+
+        assert prune_pdf_cache(max_age_days=1) == 0
+        assert prune_pdf_cache(max_age_days=-1) == 1
@@ -0,0 +1,104 @@
+"""
+Benchmarks for the in-memory plan quoting engine.
+
+Once the quote tables are loaded, quoting a household against every plan
+must not touch the database, and Plan or PlanTier changes must reach the
+next quote.
+"""
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from members.utils import get_cover_amount_for_dependent
+from schemes.models import Plan, PlanTier
+from schemes.quoting import eligible_plan_ids, invalidate_quote_tables, quote_household, quote_plan
+from tests.conftest import create_scheme
+
+
+def create_plan(scheme, name, premium, cover='10000.00', **fields):
+    return Plan.objects.create(
+        scheme=scheme,
+        name=name,
+        premium=Decimal(premium),
+        main_premium=Decimal(premium),
+        main_cover=Decimal(cover),
+        **fields
+    )
+
+
+def create_tier(plan, user_type, age_from, age_to, premium, cover):
+    return PlanTier.objects.create(
+        plan=plan,
+        user_type=user_type,
+        age_from=age_from,
+        age_to=age_to,
+        premium_amount=Decimal(premium),
+        cover_amount=Decimal(cover),
+    )
+
+
+@pytest.fixture
+def plans(db, django_capture_on_commit_callbacks):
+    invalidate_quote_tables()
+    with django_capture_on_commit_callbacks(execute=True):
+        scheme = create_scheme()
+        family = create_plan(scheme, 'Family', '150.00', main_age_from=18, main_age_to=64,
+                             spouses_allowed=1, children_allowed=4)
+        create_tier(family, 'spouse', 18, 64, '60.00', '10000.00')
+        create_tier(family, 'child', 0, 5, '10.00', '2500.00')
+        create_tier(family, 'child', 6, 21, '15.00', '5000.00')
+        senior = create_plan(scheme, 'Senior', '200.00', main_age_from=65, main_age_to=85)
+        single = create_plan(scheme, 'Single', '90.00', main_age_from=18, main_age_to=85)
+    yield {'family': family, 'senior': senior, 'single': single}
+    invalidate_quote_tables()
+
+
+class TestHouseholdQuotes:
+    """Eligibility and premiums come from the plan and tier tables"""
+
+    def test_household_quote_sums_tier_premiums(self, plans):
+        quotes = quote_household(35, [('Spouse', 33), ('Child', 3), ('Child', 10)])
+
+        assert [quote.plan_id for quote in quotes] == [plans['family'].pk]
+        assert quotes[0].premium == Decimal('235.00')
+        assert quotes[0].cover == Decimal('27500.00')
+
+    def test_age_and_allowances_limit_eligibility(self, plans):
+        assert eligible_plan_ids(70) == [plans['senior'].pk, plans['single'].pk]
+        assert [quote.plan_id for quote in quote_household(40)] == [plans['single'].pk, plans['family'].pk]
+        assert quote_plan(plans['family'].pk, 40, [('spouse', 40), ('spouse', 38)]) is None
+
+    def test_dependent_cover_matches_tier(self, plans):
+        assert get_cover_amount_for_dependent(plans['family'], 8, 'child') == Decimal('5000.00')
+        assert get_cover_amount_for_dependent(plans['family'], 30, 'Extended Family') == Decimal('0.00')
+
+
+class TestQuoteQueryCount:
+    """Warm tables answer quotes without queries and follow plan changes"""
+
+    def count_queries(self, *args, **kwargs):
+        with CaptureQueriesContext(connection) as captured:
+            quotes = quote_household(*args, **kwargs)
+        return len(captured.captured_queries), quotes
+
+    def test_warm_quotes_do_not_query(self, plans):
+        quote_household(35)
+
+        queries, quotes = self.count_queries(35, [('spouse', 30), ('child', 4)])
+
+        # The staleness check is a cache read, not a query
+        assert queries == 0
+        assert len(quotes) == 1
+
+    def test_tier_save_reloads_tables(self, plans, django_capture_on_commit_callbacks):
+        quote_household(35)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            create_tier(plans['family'], 'main', 30, 39, '120.00', '15000.00')
+        queries, quotes = self.count_queries(35)
+
+        assert queries > 0
+        assert quotes[-1].premium == Decimal('120.00')
+        assert quotes[-1].cover == Decimal('15000.00')
@@ -0,0 +1,229 @@
+"""
+Benchmarks for the policy search index.
+
+Typeahead suggestions must be served from the search document table with a
+fixed number of LIMIT queries (one per rank tier), however many policies
+match the prefix being typed, and repeated or extended queries must not hit
+the database at all while the suggestion cache is warm.
+"""
+import importlib
+import time
+
+import pytest
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from legacyadmin.metrics import SEARCH_SUGGESTION_CACHE
+from members.models import Member, Policy, PolicySearchDocument
+from members.search import (
+    SEARCH_FIELDS,
+    build_search_document,
+    cached_suggestions,
+    index_policies,
+    rank_tiers,
+    search_policies,
+    suggest_policies,
+)
+from tests.conftest import create_member, create_policy, create_scheme
+
+
+@pytest.fixture
+def indexed(db, django_capture_on_commit_callbacks):
+    """Create policies with the on-commit search indexing applied."""
+    def create(**member_fields):
+        with django_capture_on_commit_callbacks(execute=True):
+            member = create_member(**member_fields)
+            return create_policy(member=member, scheme=scheme)
+
+    scheme = create_scheme()
+    return create
+
+
+class TestSearchIndexMaintenance:
+    """Member and Policy saves keep the search documents current"""
+
+    def test_policy_save_indexes_member_and_numbers(self, indexed):
+        policy = indexed(first_name='Thandi', last_name='Van der Merwe')
+
+        document = PolicySearchDocument.objects.get(policy=policy)
+        assert document.first_name == 'thandi'
+        assert document.last_name == 'van der merwe'
+        assert document.phone_number == '0712345678'
+        assert document.policy_number == policy.policy_number.lower()
+        assert document.uw_membership_number == policy.uw_membership_number.lower()
+
+    def test_member_save_refreshes_documents(self, indexed, django_capture_on_commit_callbacks):
+        policy = indexed(first_name='Thandi', last_name='Nkosi')
+        member = policy.member
+        member.last_name = 'Dlamini'
+        member.id_number = '9001015800087'
+
+        with django_capture_on_commit_callbacks(execute=True):
+            member.save()
+
+        assert list(search_policies(Policy.objects.all(), 'dlam')) == [policy]
+        assert list(search_policies(Policy.objects.all(), '900101 5800 087')) == [policy]
+        assert not search_policies(Policy.objects.all(), 'nkosi').exists()
+
+    def test_bulk_inserted_policies_can_be_indexed(self, db):
+        member = create_member(first_name='Sipho', last_name='Khumalo')
+        policies = Policy.objects.bulk_create([Policy(member=member, policy_number='POL-BULK0001')])
+        PolicySearchDocument.objects.all().delete()
+
+        assert index_policies(Policy.objects.select_related('member').filter(pk=policies[0].pk)) == 1
+        assert list(search_policies(Policy.objects.all(), 'pol-bulk')) == policies
+
+    def test_migration_backfill_matches_the_live_documents(self, db):
+        migration = importlib.import_module('members.migrations.0011_policysearchdocument')
+        member = create_member(first_name=' Thandi ', last_name='Mokoena')
+        Member.objects.filter(pk=member.pk).update(id_number='9001015800087')
+        policy = Policy.objects.bulk_create([Policy(member=member, policy_number='POL-MIG0001')])[0]
+        PolicySearchDocument.objects.all().delete()
+
+        migration.index_existing_policies(apps, None)
+
+        backfilled = PolicySearchDocument.objects.get(policy=policy)
+        live = build_search_document(Policy.objects.select_related('member').get(pk=policy.pk))
+        for field in SEARCH_FIELDS:
+            assert getattr(backfilled, field) == getattr(live, field)
+
+
+class TestPolicySearch:
+    """Ranked prefix search over the index"""
+
+    def test_every_term_must_match(self, indexed):
+        thandi_nkosi = indexed(first_name='Thandi', last_name='Nkosi')
+        indexed(first_name='Thandi', last_name='Botha')
+        indexed(first_name='Sipho', last_name='Nkosi')
+
+        assert list(search_policies(Policy.objects.all(), ' THANDI  nk ')) == [thandi_nkosi]
+
+    def test_suggestions_rank_number_matches_first(self, indexed):
+        by_name = indexed(first_name='Pol', last_name='Smith')
+        by_number = indexed(first_name='Johan', last_name='Botha')
+
+        suggestions = suggest_policies(Policy.objects.all(), by_number.uw_membership_number)
+
+        assert suggestions[0] == by_number
+        assert suggestions[0].search_rank == 5
+        assert by_name not in suggestions
+
+    def test_suggestions_respect_the_queryset_scope(self, indexed):
+        visible = indexed(first_name='Lerato', last_name='Naidoo')
+        indexed(first_name='Lerato', last_name='Pillay')
+
+        suggestions = suggest_policies(Policy.objects.filter(pk=visible.pk), 'lerato')
+
+        assert suggestions == [visible]
+
+
+class TestSuggestionQueryCount:
+    """Suggestion cost is bounded by the rank tiers, not the number of matches"""
+
+    def count_queries(self, query):
+        with CaptureQueriesContext(connection) as captured:
+            suggestions = suggest_policies(Policy.objects.all(), query, limit=5)
+        return len(captured.captured_queries), suggestions
+
+    def test_query_count_is_constant(self, indexed):
+        for index in range(3):
+            indexed(first_name='Nomsa', last_name=f'Mokoena{index}')
+        few_queries, few = self.count_queries('zz')
+
+        for index in range(12):
+            indexed(first_name='Nomsa', last_name=f'Mokoena{index}')
+        many_queries, many = self.count_queries('mokoena')
+
+        assert few == []
+        assert len(many) == 5
+        assert few_queries <= len(rank_tiers(['zz']))
+        # A full tier stops the search early
+        assert many_queries < few_queries
+
+
+def serialize(policy):
+    return {'id': policy.pk, 'text': policy.member.last_name}
+
+
+def cache_lookups(result):
+    return SEARCH_SUGGESTION_CACHE.labels(result=result)._value.get()
+
+
+class TestSuggestionCache:
+    """Typeahead results are cached per scope and reused for longer queries"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+
+    def suggest(self, query, scope='all', queryset=None):
+        with CaptureQueriesContext(connection) as captured:
+            suggestions, exact = cached_suggestions(
+                queryset if queryset is not None else Policy.objects.select_related('member'),
+                query, scope, serialize,
+            )
+        return len(captured.captured_queries), suggestions, exact
+
+    def test_repeated_query_is_a_cache_hit(self, indexed):
+        indexed(first_name='Zanele', last_name='Mahlangu')
+        hits = cache_lookups('hit')
+
+        first_queries, first, _ = self.suggest('mahl')
+        repeat_queries, repeat, _ = self.suggest('MAHL ')
+
+        assert first_queries > 0
+        assert repeat_queries == 0
+        assert repeat == first
+        assert cache_lookups('hit') == hits + 1
+
+    def test_extended_query_filters_cached_candidates(self, indexed):
+        mahlangu = indexed(first_name='Zanele', last_name='Mahlangu')
+        indexed(first_name='Ruan', last_name='Mahomed')
+        reused = cache_lookups('prefix')
+
+        self.suggest('ma')
+        queries, suggestions, exact = self.suggest('mahla')
+        _, by_number, exact_number = self.suggest(mahlangu.uw_membership_number)
+
+        assert queries == 0
+        assert [s['id'] for s in suggestions] == [mahlangu.pk]
+        assert exact is None
+        assert cache_lookups('prefix') == reused + 1
+        assert exact_number == {'id': mahlangu.pk, 'text': 'Mahlangu'}
+
+    def test_scopes_do_not_share_entries(self, indexed):
+        visible = indexed(first_name='Kagiso', last_name='Mokoena')
+        indexed(first_name='Kagiso', last_name='Mokoena')
+
+        _, everyone, _ = self.suggest('kagiso')
+        queries, scoped, _ = self.suggest('kagiso', scope='agent:1', queryset=Policy.objects.filter(pk=visible.pk))
+
+        assert len(everyone) == 2
+        assert queries > 0
+        assert [s['id'] for s in scoped] == [visible.pk]
+
+    def test_index_changes_keep_cached_suggestions(self, indexed):
+        indexed(first_name='Pieter', last_name='Botha')
+        self.suggest('botha', scope='agent:1')
+
+        indexed(first_name='Johan', last_name='Botha')
+        queries, suggestions, _ = self.suggest('botha', scope='agent:1')
+
+        assert queries == 0
+        assert len(suggestions) == 1
+
+    def test_index_changes_show_once_suggestions_expire(self, indexed, settings):
+        settings.CACHE_TIMEOUTS = {'search_suggestions': 1}
+        indexed(first_name='Pieter', last_name='Botha')
+        self.suggest('botha')
+
+        indexed(first_name='Johan', last_name='Botha')
+        time.sleep(1.1)
+        queries, suggestions, _ = self.suggest('botha')
+
+        assert queries > 0
+        assert len(suggestions) == 2
@@ -0,0 +1,85 @@
+"""
+Benchmarks for session writes made by AutoSaveSessionMiddleware.
+
+Saving the session on every request, as SESSION_SAVE_EVERY_REQUEST and a
+per-request activity timestamp did, costs one write per hit. With stale-only
+activity updates, 1,000 requests spread over about 17 minutes save the
+session only a handful of times.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+
+import pytest
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.http import JsonResponse
+from django.test import RequestFactory
+
+from members import middleware
+from members.middleware import AutoSaveSessionMiddleware
+
+REQUESTS = 1000
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Advance the middleware's clock by one second per request."""
+    now = [datetime(2026, 6, 1, 8, 0, tzinfo=dt_timezone.utc)]
+
+    def tick():
+        now[0] += timedelta(seconds=1)
+        return now[0]
+
+    monkeypatch.setattr(middleware, 'timezone', SimpleNamespace(now=tick))
+    return now
+
+
+@pytest.fixture
+def session_saves(monkeypatch):
+    saves = []
+    original = SessionStore.save
+
+    def save(self, must_create=False):
+        # create() saves again with must_create; count the write once
+        if not must_create:
+            saves.append(self.session_key)
+        return original(self, must_create=must_create)
+
+    monkeypatch.setattr(SessionStore, 'save', save)
+    return saves
+
+
+def poll(count):
+    """Send ``count`` JSON polls through the session and autosave middleware, reusing the cookie."""
+    chain = SessionMiddleware(AutoSaveSessionMiddleware(lambda request: JsonResponse({'ok': True})))
+    factory = RequestFactory()
+    cookie = None
+    for _ in range(count):
+        request = factory.get('/members/api/autosave/status/')
+        if cookie:
+            request.COOKIES[settings.SESSION_COOKIE_NAME] = cookie
+        response = chain(request)
+        if settings.SESSION_COOKIE_NAME in response.cookies:
+            cookie = response.cookies[settings.SESSION_COOKIE_NAME].value
+    return cookie
+
+
+class TestSessionWrites:
+    def test_every_request_saved_before(self, db, settings, clock, session_saves):
+        settings.SESSION_SAVE_EVERY_REQUEST = True
+        settings.AUTOSAVE_ACTIVITY_INTERVAL = 0
+
+        poll(REQUESTS)
+
+        assert len(session_saves) == REQUESTS
+
+    def test_stale_only_activity_writes(self, db, settings, clock, session_saves):
+        settings.SESSION_SAVE_EVERY_REQUEST = False
+        settings.AUTOSAVE_ACTIVITY_INTERVAL = 300
+
+        poll(REQUESTS)
+
+        # The first request creates the session, then one save per 5 minutes
+        assert len(session_saves) == 1 + REQUESTS // 300
+
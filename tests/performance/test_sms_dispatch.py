@@ -0,0 +1,253 @@
+"""
+Benchmarks for batched BulkSMS dispatch, run against a local HTTP stand-in.
+
+A campaign must reach the provider as a handful of multi-recipient requests
+over one reused connection, with one SMSLog insert per batch, and temporary
+provider errors must hand back exactly the messages still to send.
+"""
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+
+from members.communications import sms_dispatch
+from members.communications.models import SMSLog
+from members.communications.sms_dispatch import (
+    SharedTokenBucket,
+    SMSDispatcher,
+    SMSDispatchError,
+    TokenBucket,
+    queue_sms,
+)
+
+
+class StandIn:
+    """Minimal BulkSMS /messages endpoint recording what it receives."""
+
+    def __init__(self):
+        self.requests = []
+        self.connections = 0
+        self.fail_requests = set()
+        self.slow_requests = set()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                stand_in.connections += 1
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stand_in.requests.append(payload)
+                if len(stand_in.requests) in stand_in.slow_requests:
+                    time.sleep(0.5)
+                if len(stand_in.requests) in stand_in.fail_requests:
+                    return self.reply(503, {'title': 'Service unavailable'})
+                self.reply(201, [
+                    {'id': f"{index}-{to}", 'to': to.lstrip('+'), 'body': message['body'], 'status': {'type': 'ACCEPTED'}}
+                    for index, message in enumerate(payload)
+                    for to in message['to']
+                ])
+
+            def reply(self, status, body):
+                content = json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                except ConnectionError:
+                    pass  # The client timed out and hung up
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    monkeypatch.delenv('OTP_TEST_MODE', raising=False)
+    server = StandIn()
+    yield server
+    server.close()
+
+
+def dispatcher(stand_in, **kwargs):
+    auth = {'auth': ('token-id', 'token-secret'), 'headers': {'Accept': 'application/json'}}
+    return SMSDispatcher(api_url=stand_in.url, auth_config=auth, rate=1000, **kwargs)
+
+
+def campaign(count):
+    return [(f"07{index:08d}", 'Your premium is due' if index % 2 else 'Your policy is at risk of lapsing')
+            for index in range(count)]
+
+
+class TestBatchedDispatch:
+    def test_campaign_is_sent_in_multi_recipient_batches(self, db, stand_in, django_assert_max_num_queries):
+        with django_assert_max_num_queries(3):
+            logs = dispatcher(stand_in, batch_size=100).send(campaign(250))
+
+        assert len(stand_in.requests) == 3
+        assert stand_in.connections == 1
+        assert all(len(payload) == 2 for payload in stand_in.requests)
+        assert sum(len(message['to']) for message in stand_in.requests[0]) == 100
+        assert len(logs) == 250
+        assert SMSLog.objects.filter(status='SENT', phone_number='+27700000001').count() == 1
+
+    def test_temporary_errors_return_the_unsent_messages(self, db, stand_in):
+        stand_in.fail_requests = {2}
+        messages = campaign(25)
+
+        with pytest.raises(SMSDispatchError) as raised:
+            dispatcher(stand_in, batch_size=10).send(messages)
+
+        assert SMSLog.objects.count() == 10
+        assert [to for to, _ in raised.value.remaining] == [f"+27{to[1:]}" for to, _ in messages[10:]]
+
+    def test_unanswered_batches_are_not_resent(self, db, stand_in):
+        stand_in.slow_requests = {1}
+
+        logs = dispatcher(stand_in, batch_size=10, timeout=0.2).send(campaign(15))
+
+        assert len(stand_in.requests) == 2
+        assert [log.status for log in logs] == ['UNKNOWN'] * 10 + ['SENT'] * 5
+
+    def test_unreachable_provider_is_retried(self, db, stand_in):
+        with socket.socket() as unused:
+            unused.bind(('127.0.0.1', 0))
+            port = unused.getsockname()[1]
+        sender = dispatcher(stand_in, batch_size=10)
+        sender.api_url = f"http://127.0.0.1:{port}/v1"
+
+        with pytest.raises(SMSDispatchError) as raised:
+            sender.send(campaign(15))
+
+        assert len(raised.value.remaining) == 15
+        assert not SMSLog.objects.exists()
+
+    def test_redelivered_sends_skip_logged_batches(self, db, stand_in):
+        cache.clear()
+        stand_in.fail_requests = {2}
+        messages = campaign(25)
+        with pytest.raises(SMSDispatchError):
+            dispatcher(stand_in, batch_size=10).send(messages, progress_key='task-1:0')
+
+        # The worker is lost and the broker delivers the same task again
+        stand_in.fail_requests = set()
+        logs = dispatcher(stand_in, batch_size=10).send(messages, progress_key='task-1:0')
+
+        assert [len(payload[0]['to']) + len(payload[1]['to']) for payload in stand_in.requests] == [10, 10, 10, 5]
+        assert len(logs) == 15
+        assert SMSLog.objects.count() == 25
+
+    def test_queue_sms_splits_messages_into_tasks(self, db, monkeypatch, django_capture_on_commit_callbacks):
+        queued = []
+        monkeypatch.setattr('members.communications.tasks.dispatch_sms.delay', queued.append)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assert queue_sms(campaign(5) + [('', 'no number')], chunk_size=2) == 3
+
+        assert [len(chunk) for chunk in queued] == [2, 2, 1]
+
+
+class TestTokenBucket:
+    def test_sends_wait_for_tokens(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=10, capacity=20, clock=lambda: now[0], sleep=sleep)
+        bucket.acquire(20)
+        bucket.acquire(5)
+
+        assert sleeps == [pytest.approx(0.5)]
+
+    def test_batches_larger_than_the_bucket_pay_in_full(self):
+        now = [0.0]
+
+        def sleep(seconds):
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=10, capacity=10, clock=lambda: now[0], sleep=sleep)
+        for _ in range(5):
+            bucket.acquire(100)
+
+        # 500 messages at 10/s: the first batch uses the burst, each later one waits 10s
+        assert now[0] == pytest.approx(40.0)
+        assert bucket.tokens == pytest.approx(-90.0)
+
+
+def test_shared_bucket_limits_all_processes_together():
+    cache.clear()
+    now = [1000.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    # One bucket per worker process, drawing on the same cached balance
+    first, second = (
+        SharedTokenBucket(rate=10, capacity=20, clock=lambda: now[0], sleep=sleep) for _ in range(2)
+    )
+    first.acquire(20)
+    second.acquire(5)
+
+    assert sleeps == [pytest.approx(0.5)]
+    cache.clear()
+
+
+def test_dispatcher_is_reused_per_process(monkeypatch):
+    monkeypatch.setattr(sms_dispatch, '_dispatcher', None)
+
+    assert sms_dispatch.get_dispatcher() is sms_dispatch.get_dispatcher()
+
+
+class TestSmsSendingView:
+    """Only settings managers can send SMS from the settings page"""
+
+    def post(self, client):
+        return client.post(reverse('settings:sms_sending'), {'cellphone': '0712345678', 'message': 'Hello'})
+
+    @pytest.fixture
+    def queued(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr('members.communications.views.queue_sms', calls.append)
+        return calls
+
+    def test_anonymous_users_are_sent_to_login(self, client, db, queued):
+        response = self.post(client)
+
+        assert response.status_code == 302 and 'login' in response['Location']
+        assert queued == []
+
+    def test_users_without_the_permission_are_refused(self, client, db, queued):
+        client.force_login(get_user_model().objects.create_user(username='capturer', password='pass1234'))
+
+        assert self.post(client).status_code == 403
+        assert queued == []
+
+    def test_superusers_can_queue_messages(self, client, db, queued):
+        client.force_login(get_user_model().objects.create_superuser(username='admin', password='pass1234'))
+
+        assert self.post(client).status_code == 302
+        assert queued == [[('0712345678', 'Hello')]]
@@ -0,0 +1,93 @@
+"""
+Query-count benchmarks for user scope resolution.
+
+Role and scheme lookups for a user must hit the database once per request
+(and not at all while the cached scope is warm), however many permission
+helpers a view calls.
+"""
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from config.permissions import (
+    can_view_scheme,
+    filter_by_user_scope,
+    get_user_branches,
+    get_user_schemes,
+    get_user_scope,
+    user_has_role,
+)
+from members.models import Policy
+from schemes.models import Scheme
+from tests.conftest import create_bank, create_branch, create_scheme
+
+
+@pytest.fixture
+def scheme_manager(db):
+    cache.clear()
+    branch = create_branch(bank=create_bank())
+    user = get_user_model().objects.create_user(username='manager', password='pass1234')
+    user.groups.set([Group.objects.get_or_create(name='SchemeManager')[0]])
+    user.assigned_schemes.add(create_scheme(branch=branch, name='Managed Scheme'))
+    create_scheme(branch=branch, name='Other Scheme')
+    return get_user_model().objects.get(pk=user.pk)
+
+
+def call_scope_helpers(user):
+    user_has_role(user, 'Scheme Manager')
+    user_has_role(user, 'Administrator', 'Branch Owner')
+    list(get_user_schemes(user))
+    list(get_user_branches(user))
+    list(filter_by_user_scope(Policy.objects.all(), user, Policy))
+    list(filter_by_user_scope(Scheme.objects.all(), user, Scheme))
+
+
+@pytest.mark.django_db
+class TestUserScope:
+    def test_scope_resolves_roles_and_assignments(self, scheme_manager):
+        scope = get_user_scope(scheme_manager)
+
+        assert scope.roles == ('Scheme Manager',)
+        assert scope.scheme_ids == {Scheme.objects.get(name='Managed Scheme').pk}
+        assert not scope.is_unrestricted
+        assert [s.name for s in filter_by_user_scope(Scheme.objects.all(), scheme_manager, Scheme)] == ['Managed Scheme']
+
+    def test_helpers_resolve_scope_once_per_request(self, scheme_manager):
+        get_user_scope(scheme_manager)
+
+        with CaptureQueriesContext(connection) as context:
+            call_scope_helpers(scheme_manager)
+
+        # Only the four querysets being listed hit the database.
+        assert len(context.captured_queries) == 4
+
+    def test_cached_scope_is_reused_across_requests(self, scheme_manager):
+        get_user_scope(scheme_manager)
+        next_request_user = get_user_model().objects.get(pk=scheme_manager.pk)
+
+        with CaptureQueriesContext(connection) as context:
+            get_user_scope(next_request_user)
+
+        assert len(context.captured_queries) == 0
+
+    def test_scheme_assignment_change_invalidates_scope(self, scheme_manager):
+        other_scheme = Scheme.objects.get(name='Other Scheme')
+        assert not can_view_scheme(scheme_manager, other_scheme)
+
+        scheme_manager.assigned_schemes.add(other_scheme)
+
+        assert can_view_scheme(scheme_manager, other_scheme)
+        fresh_user = get_user_model().objects.get(pk=scheme_manager.pk)
+        assert can_view_scheme(fresh_user, other_scheme)
+
+    def test_group_change_from_group_side_invalidates_scope(self, scheme_manager):
+        assert not user_has_role(scheme_manager, 'Administrator')
+
+        Group.objects.get_or_create(name='Administrator')[0].custom_user_groups.add(scheme_manager)
+
+        fresh_user = get_user_model().objects.get(pk=scheme_manager.pk)
+        assert user_has_role(fresh_user, 'Administrator')
+        assert get_user_scope(fresh_user).is_unrestricted